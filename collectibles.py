@@ -8,31 +8,28 @@ Supports forums, auction houses, and content sites.
 import argparse
 import sys
 import os
+import time
 from pathlib import Path
 from typing import Optional
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from tools.scrapers.forums import Net54Scraper
-from tools.scrapers.auctions import HeritageScraper
-from tools.scrapers.base.storage import MultiArchiveStorage
+# Scrapers are resolved lazily through the registry so that commands which
+# only read archives never import requests, bs4, lxml or the legacy scripts
+from tools.scrapers import registry
 
 
 class CollectiblesCLI:
     """Main CLI for collectibles repository"""
     
     def __init__(self):
-        self.scrapers = {
-            'net54': Net54Scraper,
-            'heritage': HeritageScraper,
-            # Add more scrapers as they're implemented
-            # 'psa': PSAScraper,
-            # 'prewarcards': PrewarCardsScraper,
-        }
+        self.scrapers = registry.available_scrapers()
     
     def list_archives(self):
         """List all available archives"""
+        from tools.scrapers.base.storage import MultiArchiveStorage
+        
         print("\n📚 Available Archives:\n")
         
         # Check configured archives
@@ -64,13 +61,12 @@ class CollectiblesCLI:
         """
         if archive not in self.scrapers:
             print(f"❌ Unknown archive: {archive}")
-            print(f"   Available: {', '.join(self.scrapers.keys())}")
+            print(f"   Available: {', '.join(self.scrapers)}")
             return
         
         print(f"\n🔄 Starting {archive} scraper...\n")
         
         # Initialize and run scraper
-        scraper_class = self.scrapers[archive]
         config_path = f'configs/{archive}.yaml'
         
         if not Path(config_path).exists():
@@ -78,21 +74,10 @@ class CollectiblesCLI:
             return
         
         try:
+            scraper_class = registry.get_scraper_class(archive)
             scraper = scraper_class(config_path)
             
-            # Pass archive-specific arguments
-            if archive == 'net54':
-                scraper.scrape(
-                    forum_id=kwargs.get('forum_id'),
-                    thread_limit=kwargs.get('limit')
-                )
-            elif archive == 'heritage':
-                scraper.scrape(
-                    auction_id=kwargs.get('auction_id'),
-                    lot_limit=kwargs.get('limit')
-                )
-            else:
-                scraper.scrape()
+            scraper.scrape(**self.scrape_kwargs(archive, **kwargs))
                 
         except KeyboardInterrupt:
             print("\n⚠️  Scraping interrupted by user")
@@ -101,44 +86,124 @@ class CollectiblesCLI:
             import traceback
             traceback.print_exc()
     
-    def show_stats(self, archive: Optional[str] = None):
+    @staticmethod
+    def scrape_kwargs(archive: str, **kwargs) -> dict:
+        """Map generic CLI options onto an archive scraper's scrape() arguments"""
+        if archive == 'net54':
+            return {'forum_id': kwargs.get('forum_id'), 'thread_limit': kwargs.get('limit')}
+        if archive == 'heritage':
+            return {'auction_id': kwargs.get('auction_id'), 'lot_limit': kwargs.get('limit')}
+        return {}
+    
+    def scrape_all(self, archives: Optional[list] = None, limit: Optional[int] = None,
+                   workers: Optional[int] = None, max_minutes: Optional[float] = None,
+                   progress_interval: float = 30.0):
+        """Scrape several archives concurrently in this process
+        
+        Args:
+            archives: Archives to scrape (defaults to every registered
+                archive that has a config)
+            limit: Item limit passed to each archive
+            workers: Host lanes run at once (defaults to one per host)
+            max_minutes: Global deadline; scrapers stop cleanly when it passes
+            progress_interval: Seconds between combined progress lines
+        """
+        from tools.scrapers.orchestrator import ScrapeOrchestrator
+        
+        if not archives:
+            archives = [a for a in self.scrapers if Path(f'configs/{a}.yaml').exists()]
+        unknown = [a for a in archives if a not in self.scrapers]
+        if unknown:
+            print(f"❌ Unknown archive(s): {', '.join(unknown)}")
+            print(f"   Available: {', '.join(self.scrapers)}")
+            return
+        missing = [a for a in archives if not Path(f'configs/{a}.yaml').exists()]
+        if missing:
+            print(f"❌ Configuration not found for: {', '.join(missing)}")
+            return
+        
+        deadline = time.time() + max_minutes * 60 if max_minutes else None
+        orchestrator = ScrapeOrchestrator(
+            {archive: self.scrape_kwargs(archive, limit=limit) for archive in archives},
+            max_workers=workers,
+            deadline=deadline,
+            progress_interval=progress_interval
+        )
+        
+        lanes = ', '.join(f"{host} ({', '.join(r.name for r in runs)})"
+                          for host, runs in orchestrator.lanes.items())
+        print(f"\n🔄 Scraping {len(archives)} archives concurrently: {lanes}\n")
+        
+        try:
+            runs = orchestrator.run()
+        except KeyboardInterrupt:
+            print("\n⚠️  Scraping interrupted by user")
+            return
+        
+        print("\n📋 Summary:")
+        icons = {'done': '✅', 'stopped': '⏸️ ', 'skipped': '⏭️ ', 'failed': '❌'}
+        for run in runs:
+            line = f"   {icons.get(run.status, '•')} {run.name}: {run.status}"
+            if run.elapsed is not None:
+                line += f" after {run.elapsed / 60:.1f} min"
+            if run.error:
+                line += f" - {run.error}"
+            print(line)
+    
+    def show_stats(self, archive: Optional[str] = None, deep: bool = False):
         """Show statistics for archives
         
+        Answers from each archive's materialized stats view; with ``deep``
+        the view is first rebuilt by scanning every item file in parallel.
+        
         Args:
             archive: Specific archive to show stats for (optional)
+            deep: Rebuild statistics from the files on disk
         """
+        from tools.archive.scan import find_archives
+        from tools.archive.stats import ArchiveStats, rebuild_stats, stats_path_for
+        
         print("\n📊 Archive Statistics\n")
         
+        archives = find_archives('archives')
         if archive:
-            archives = [archive]
-        else:
-            # Find all archives with data
-            archives = []
-            for archive_type in ['forums', 'auctions', 'content']:
-                type_dir = Path(f'archives/{archive_type}')
-                if type_dir.exists():
-                    for archive_dir in type_dir.iterdir():
-                        if archive_dir.is_dir() and (archive_dir / 'data').exists():
-                            archives.append(archive_dir.name)
+            if archive not in archives:
+                print(f"❌ No data found for archive: {archive}")
+                return
+            archives = {archive: archives[archive]}
         
         total_items = 0
         total_size = 0
         
-        for archive_name in archives:
+        for archive_name, (root, layout) in archives.items():
             try:
-                storage = MultiArchiveStorage(archive_name, 'archives')
-                stats = storage.get_stats()
+                if deep:
+                    view = rebuild_stats(root)
+                else:
+                    view = ArchiveStats(stats_path_for(root, layout))
+                    if not view.exists():
+                        print(f"📁 {archive_name}")
+                        print(f"   No materialized stats yet - run: collectibles.py stats {archive_name} --deep\n")
+                        continue
+                stats = view.summary()
                 
                 print(f"📁 {archive_name}")
-                print(f"   Type: {stats['archive_type']}")
+                print(f"   Location: {root}")
                 print(f"   Total items: {stats['total_items']:,}")
+                print(f"   Total posts: {stats['total_posts']:,}")
                 print(f"   Total size: {stats['total_size_mb']:.2f} MB")
-                print(f"   Last update: {stats['last_update'] or 'Never'}")
+                print(f"   Distinct authors: {stats['distinct_authors']:,}")
+                if stats['first_post']:
+                    print(f"   Post dates: {stats['first_post'][:10]} to {stats['last_post'][:10]}")
+                print(f"   Stats updated: {stats['updated_at'] or 'Never'}")
                 
-                if stats['items_by_type']:
-                    print("   Items by type:")
-                    for item_type, count in stats['items_by_type'].items():
-                        print(f"     - {item_type}: {count:,}")
+                if stats['groups']:
+                    label = 'forum' if layout == 'forums' else 'type'
+                    print(f"   Items by {label}:")
+                    for group, group_stats in stats['groups'].items():
+                        print(f"     - {group}: {group_stats['items']:,} items, "
+                              f"{group_stats['posts']:,} posts, {group_stats['size_mb']:.2f} MB, "
+                              f"{group_stats['authors']:,} authors")
                 
                 print()
                 
@@ -153,6 +218,517 @@ class CollectiblesCLI:
             print(f"   Items: {total_items:,}")
             print(f"   Size: {total_size:.2f} MB")
     
+    def reconcile_archive(self, archive: str, processes: Optional[int] = None,
+                          post_limit: int = 50, dry_run: bool = False):
+        """Rebuild progress from the files on disk and list threads to refetch
+        
+        Args:
+            archive: Archive to reconcile
+            processes: Worker processes for the scan (defaults to CPU count)
+            post_limit: Per-topic post cap used when judging truncation
+            dry_run: Report only, do not write progress/stats/repair files
+        """
+        from tools.archive.reconcile import reconcile_archive
+        from tools.archive.scan import find_archives
+        
+        archives = find_archives('archives')
+        if archive not in archives:
+            print(f"❌ No data found for archive: {archive}")
+            return
+        root, layout = archives[archive]
+        if layout != 'forums':
+            print(f"❌ Reconcile supports forum archives only ({archive} stores {layout})")
+            return
+        
+        print(f"\n🔧 Reconciling {archive} ({root})\n")
+        summary = reconcile_archive(root, processes=processes, post_limit=post_limit, dry_run=dry_run)
+        
+        for forum_id, counts in summary['forums'].items():
+            print(f"   Forum {forum_id}: {counts['threads']:,} threads, {counts['repairs']:,} need repair")
+        for reason, count in sorted(summary['reasons'].items()):
+            print(f"   - {reason}: {count:,}")
+        
+        if dry_run:
+            print("\n(dry run - nothing written)")
+        elif summary['repairs']:
+            print(f"\n✅ Progress rebuilt; {len(summary['repairs']):,} threads written to {root / 'repair.json'}")
+            print("   Refetch them with: python scripts/tapatalk_scraper.py --repair")
+        else:
+            print("\n✅ Progress rebuilt; no threads need repair")
+    
+    def build_index(self, archive: str, rebuild: bool = False, processes: Optional[int] = None):
+        """Create or catch up an archive's indexes
+        
+        Once an archive has indexes, the storages keep them current on every
+        save; this indexes what was written before or elsewhere.
+        
+        Args:
+            archive: Archive to index
+            rebuild: Reindex every item, not just changed ones
+            processes: Worker processes reading changed item files
+        """
+        from tools.archive.indexers import ArchiveIndexes
+        from tools.archive.scan import find_archives
+        
+        archives = find_archives('archives')
+        if archive not in archives:
+            print(f"❌ No data found for archive: {archive}")
+            return
+        root, layout = archives[archive]
+        
+        print(f"\n🗂️  Indexing {archive} ({root})\n")
+        start = time.time()
+        indexes = ArchiveIndexes(root)
+        try:
+            counts = indexes.refresh(layout, rebuild=rebuild, processes=processes)
+        finally:
+            indexes.close()
+        print(f"   Indexed: {counts['indexed']:,}")
+        print(f"   Removed: {counts['removed']:,}")
+        print(f"   Unchanged: {counts['unchanged']:,}")
+        print(f"\n✅ Indexes in {indexes.directory} up to date ({time.time() - start:.1f}s)")
+    
+    def search(self, query: str, archive: Optional[str] = None, group: Optional[str] = None,
+               limit: int = 10):
+        """Full-text search of indexed archives
+        
+        Args:
+            query: Words, "phrases", prefix* and -excluded terms
+            archive: Only search this archive
+            group: Only search this forum ID or item type
+            limit: Maximum hits per archive
+        """
+        from tools.archive.indexers import ArchiveIndexes
+        from tools.archive.scan import find_archives
+        from tools.archive.search import SearchIndex
+        from tools.archive.timestamps import format_timestamp, parse_timestamp
+        
+        archives = find_archives('archives')
+        if archive:
+            archives = {archive: archives[archive]} if archive in archives else {}
+        indexed = {name: ArchiveIndexes(root) for name, (root, _) in archives.items()}
+        indexed = {name: indexes for name, indexes in indexed.items() if indexes.enabled}
+        if not indexed:
+            print(f"❌ No search index for {archive or 'any archive'} - run: collectibles.py index <archive>")
+            return
+        
+        for name, indexes in indexed.items():
+            index = SearchIndex(indexes.directory)
+            try:
+                start = time.perf_counter()
+                hits = index.search(query, limit=limit, group=group)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
+            finally:
+                index.close()
+            
+            print(f"\n🔎 {name}: {len(hits)} hits ({elapsed_ms:.0f} ms)\n")
+            for hit in hits:
+                where = f"{hit.group}/{hit.item_id}" + (f"#{hit.post_id}" if hit.post_id else '')
+                # Raw dates come in every archived shape (ISO, 20070120, epochs)
+                epoch = parse_timestamp(hit.posted)
+                posted = format_timestamp(epoch)[:10] if epoch is not None else hit.posted
+                byline = ', '.join(part for part in (hit.author, posted) if part)
+                print(f"  {hit.score:6.2f}  {hit.title or '(untitled)'}  [{where}]")
+                if byline:
+                    print(f"          {byline}")
+                print(f"          {' '.join(hit.snippet.split())}")
+    
+    def show_timeline(self, archive: str, start: Optional[str] = None, end: Optional[str] = None,
+                      group: Optional[str] = None, title_prefixes: Optional[list] = None,
+                      limit: int = 50):
+        """List threads (or lots) started in a period, from the time index
+        
+        Args:
+            archive: Archive to query
+            start: First year, month or date of the period (YYYY[-MM[-DD]])
+            end: Last year, month or date of the period, inclusive
+            group: Only this forum ID or item type
+            title_prefixes: Only titles starting with one of these
+            limit: Maximum threads listed
+        """
+        from tools.archive.indexers import ArchiveIndexes
+        from tools.archive.scan import find_archives
+        from tools.archive.timeline import TimeIndex, period_end, period_start
+        from tools.archive.timestamps import format_timestamp
+        
+        archives = find_archives('archives')
+        if archive not in archives:
+            print(f"❌ No data found for archive: {archive}")
+            return
+        indexes = ArchiveIndexes(archives[archive][0])
+        if not indexes.enabled:
+            print(f"❌ No time index for {archive} - run: collectibles.py index {archive}")
+            return
+        
+        try:
+            start_epoch = period_start(start) if start else None
+            end_epoch = period_end(end) if end else None
+        except ValueError as e:
+            print(f"❌ Invalid period: {e}")
+            return
+        index = TimeIndex(indexes.directory)
+        try:
+            items = index.items(start_epoch, end_epoch, group=group,
+                                title_prefixes=title_prefixes or (), limit=None)
+            posts = index.count_posts(start_epoch, end_epoch, group=group)
+        finally:
+            index.close()
+        
+        period = f"{start or '…'} to {end or '…'}"
+        print(f"\n🗓️  {archive}, {period}: {len(items):,} threads started; {posts:,} posts in the period\n")
+        for item in items[:limit]:
+            print(f"  {format_timestamp(item.first_time)[:10]}  [{item.group}/{item.item_id}] "
+                  f"{item.title} ({item.post_count} posts)")
+        if len(items) > limit:
+            print(f"  … {len(items) - limit:,} more")
+    
+    def show_author(self, archive: str, author: str, limit: int = 20):
+        """Show a collector's posting history, from the author index
+        
+        Args:
+            archive: Archive to query
+            author: Author name (case-insensitive)
+            limit: Maximum recent posts listed
+        """
+        from tools.archive.authors import AuthorIndex
+        from tools.archive.indexers import ArchiveIndexes
+        from tools.archive.scan import find_archives
+        from tools.archive.timestamps import format_timestamp
+        
+        archives = find_archives('archives')
+        if archive not in archives:
+            print(f"❌ No data found for archive: {archive}")
+            return
+        indexes = ArchiveIndexes(archives[archive][0])
+        if not indexes.enabled:
+            print(f"❌ No author index for {archive} - run: collectibles.py index {archive}")
+            return
+        
+        index = AuthorIndex(indexes.directory)
+        try:
+            history = index.history(author, limit=limit)
+        finally:
+            index.close()
+        if history is None:
+            print(f"❌ No posts by {author} in {archive}")
+            return
+        
+        def day(epoch):
+            return format_timestamp(epoch)[:10] if epoch is not None else '?'
+        
+        print(f"\n👤 {history.author} in {archive}\n")
+        print(f"   Posts: {history.posts:,} in {history.threads:,} threads ({history.started:,} started)")
+        print(f"   Active: {day(history.first_time)} to {day(history.last_time)}")
+        print("   Forums: " + ', '.join(f"{group} ({count:,})" for group, count in history.groups.items()))
+        print("\n   Recent posts:")
+        for post in history.recent:
+            marker = '*' if post.started else ' '
+            print(f"  {marker}{day(post.time)}  [{post.group}/{post.item_id}#{post.post_id}] {post.title}")
+    
+    def show_tags(self, archive: str, entities: Optional[list] = None, any_of: bool = False,
+                  threads: bool = False, group: Optional[str] = None, kind: Optional[str] = None,
+                  limit: int = 20):
+        """List documents mentioning card entities, or the most mentioned entities
+        
+        Args:
+            archive: Archive to query
+            entities: Set, player, manufacturer or grader names (aliases work)
+            any_of: Match documents mentioning any of them rather than all
+            threads: Match whole threads rather than single posts
+            group: Only this forum ID or item type
+            kind: Without entities, only list entities of this kind
+            limit: Maximum documents or entities listed
+        """
+        from tools.archive.indexers import ArchiveIndexes
+        from tools.archive.scan import find_archives
+        from tools.archive.tags import EntityIndex
+        
+        archives = find_archives('archives')
+        if archive not in archives:
+            print(f"❌ No data found for archive: {archive}")
+            return
+        indexes = ArchiveIndexes(archives[archive][0])
+        if not indexes.enabled:
+            print(f"❌ No tag index for {archive} - run: collectibles.py index {archive}")
+            return
+        
+        index = EntityIndex(indexes.directory)
+        try:
+            if not entities:
+                print(f"\n🏷️  Most mentioned {kind or 'entities'} in {archive}\n")
+                for (entity_kind, name), documents, items in index.counts(kind, limit=limit):
+                    print(f"  {documents:>8,} posts  {items:>7,} threads  {name} ({entity_kind})")
+                return
+            start = time.perf_counter()
+            try:
+                hits = index.find(entities, any_of=any_of, items=threads, group=group)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        finally:
+            index.close()
+        
+        joined = ' or '.join(entities) if any_of else ' + '.join(entities)
+        print(f"\n🏷️  {joined}: {len(hits):,} {'threads' if threads else 'documents'} ({elapsed_ms:.0f} ms)\n")
+        for hit in hits[:limit]:
+            where = f"{hit.group}/{hit.item_id}" + (f"#{hit.post_id}" if hit.post_id else '')
+            print(f"  {hit.mentions:>4}  {hit.title or '(untitled)'}  [{where}]")
+        if len(hits) > limit:
+            print(f"  … {len(hits) - limit:,} more")
+    
+    def show_duplicates(self, archive: str, kind: str = 'post', threshold: float = 0.8,
+                        group: Optional[str] = None, limit: int = 10):
+        """List clusters of near-duplicate posts, threads or lots
+        
+        Args:
+            archive: Archive to query
+            kind: 'post', 'thread' or 'lot'
+            threshold: Minimum estimated similarity (Jaccard, 0-1) of duplicates
+            group: Only this forum ID or item type
+            limit: Maximum clusters listed
+        """
+        from tools.archive.duplicates import DuplicateIndex
+        from tools.archive.indexers import ArchiveIndexes
+        from tools.archive.scan import find_archives
+        
+        archives = find_archives('archives')
+        if archive not in archives:
+            print(f"❌ No data found for archive: {archive}")
+            return
+        indexes = ArchiveIndexes(archives[archive][0])
+        if not indexes.enabled:
+            print(f"❌ No duplicate index for {archive} - run: collectibles.py index {archive}")
+            return
+        
+        index = DuplicateIndex(indexes.directory)
+        try:
+            start = time.perf_counter()
+            clusters = index.clusters(kind, threshold=threshold, group=group)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            exact_docs, exact_chars = index.redundancy(kind)
+        finally:
+            index.close()
+        
+        duplicates = sum(len(cluster.documents) - 1 for cluster in clusters)
+        print(f"\n🧬 {archive}: {len(clusters):,} clusters of near-duplicate {kind}s "
+              f"(each ≥ {threshold:.0%} similar to its first), {duplicates:,} duplicates ({elapsed_ms:.0f} ms)")
+        print(f"   Exact repeats: {exact_docs:,} {kind}s, {exact_chars / 1024:,.0f} KB of text\n")
+        for cluster in clusters[:limit]:
+            first = cluster.documents[0]
+            spread = f" in {cluster.items:,} threads" if kind == 'post' else ''
+            print(f"  {len(cluster.documents):>4} {kind}s{spread} ({cluster.exact:,} exact): "
+                  f"{first.title or '(untitled)'}")
+            for document in cluster.documents[:5]:
+                where = f"{document.group}/{document.item_id}" + (f"#{document.post_id}" if document.post_id else '')
+                by = f" by {document.author}" if document.author else ''
+                print(f"       {document.similarity:4.0%}  [{where}]{by}  {document.title}")
+            if len(cluster.documents) > 5:
+                print(f"       … {len(cluster.documents) - 5:,} more")
+        if len(clusters) > limit:
+            print(f"  … {len(clusters) - limit:,} more clusters")
+    
+    def show_comps(self, archive: str, card: Optional[str] = None, window: float = 1.0,
+                   grader: Optional[str] = None, since: Optional[str] = None, limit: int = 20):
+        """Show comparable sales of a card: realized prices within a grade window
+        
+        Args:
+            archive: Archive to query (e.g., heritage)
+            card: The card, written like a lot title (``1952 Topps Mantle PSA 7``);
+                without one, the most sold cards are listed
+            window: Grades either side of the card's grade
+            grader: Only slabs of this grading company
+            since: Only sales from this year, month or date on (YYYY[-MM[-DD]])
+            limit: Maximum sales listed
+        """
+        from tools.archive.comps import ComparablesIndex, card_identity
+        from tools.archive.indexers import ArchiveIndexes
+        from tools.archive.scan import find_archives
+        from tools.archive.timeline import period_start
+        from tools.archive.timestamps import format_timestamp
+        
+        archives = find_archives('archives')
+        if archive not in archives:
+            print(f"❌ No data found for archive: {archive}")
+            return
+        indexes = ArchiveIndexes(archives[archive][0])
+        if not indexes.enabled:
+            print(f"❌ No comparables index for {archive} - run: collectibles.py index {archive}")
+            return
+        try:
+            since_epoch = period_start(since) if since else None
+        except ValueError as e:
+            print(f"❌ Invalid date: {e}")
+            return
+        
+        index = ComparablesIndex(indexes.directory)
+        try:
+            if not card:
+                print(f"\n💲 Most sold cards in {archive}\n")
+                for title, sold, median in index.cards(limit=limit):
+                    print(f"  {sold:>6,} sales  median ${median:>12,.2f}  {title}")
+                return
+            identity = card_identity(card)
+            if identity.key is None:
+                print(f"❌ Cannot tell the card from: {card} (name a set and a player or #number)")
+                return
+            sales = index.sales(identity, window=window, grader=grader, since=since_epoch)
+            # Load the price arrays first so the timing below is of the statistics alone
+            index.load_vectors()
+            start = time.perf_counter()
+            summary = index.summary(identity, window=window, since=since_epoch)
+            elapsed_us = (time.perf_counter() - start) * 1e6
+        finally:
+            index.close()
+        
+        grades = f" ± {window:g} grade" if identity.grade is not None else ''
+        print(f"\n💲 {identity}{grades}: {len(sales):,} sales\n")
+        if summary is not None and not grader:
+            quartiles = ', '.join(f"p{q} ${price:,.0f}" for q, price in summary.percentiles.items())
+            trend = f"{summary.trend:+.1%}/year" if summary.trend is not None else 'n/a'
+            print(f"   Median ${summary.median:,.2f} ({quartiles}); trend {trend} ({elapsed_us:.0f} µs)\n")
+        for sale in sales[-limit:]:
+            grade = f"{sale.grader or ''} {'' if sale.grade is None else f'{sale.grade:g}'}".strip()
+            print(f"  {format_timestamp(sale.time)[:10]}  ${sale.price:>12,.2f}  {grade:<8} "
+                  f"[{sale.group}/{sale.item_id}] {sale.title}")
+        if len(sales) > limit:
+            print(f"  … {len(sales) - limit:,} earlier")
+    
+    def show_price_history(self, archive: str, auction: Optional[str] = None, lot: Optional[str] = None,
+                           start: Optional[str] = None, end: Optional[str] = None, limit: int = 20):
+        """Show the bid history of an auction's lots, or of one lot
+        
+        Args:
+            archive: Archive to query (e.g., heritage)
+            auction: Auction ID; without one, the auctions with a history are listed
+            lot: Lot ID; without one, the auction's per-lot rollup is shown
+            start: First year, month or date shown (YYYY[-MM[-DD]])
+            end: Last year, month or date shown, inclusive
+            limit: Maximum lots or observations listed
+        """
+        from tools.archive.pricehistory import HISTORY_DIR, PriceHistory
+        from tools.archive.scan import find_archives
+        from tools.archive.timeline import period_end, period_start
+        from tools.archive.timestamps import format_timestamp
+        
+        archives = find_archives('archives')
+        if archive not in archives:
+            print(f"❌ No data found for archive: {archive}")
+            return
+        history = PriceHistory(archives[archive][0] / HISTORY_DIR)
+        if not auction:
+            auctions = history.auctions()
+            if not auctions:
+                print(f"❌ No price history for {archive} (recorded while scraping with track_prices)")
+                return
+            print(f"\n📈 Auctions with a price history in {archive}: {', '.join(auctions)}")
+            return
+        try:
+            start_epoch = period_start(start) if start else None
+            end_epoch = period_end(end) if end else None
+        except ValueError as e:
+            print(f"❌ Invalid period: {e}")
+            return
+        
+        def money(value):
+            return '—' if value is None or value != value else f"${value:,.2f}"
+        
+        if lot:
+            observed = history.observations(auction, lot, start_epoch, end_epoch)
+            if not len(observed):
+                print(f"❌ No price history for lot {lot} of auction {auction}")
+                return
+            print(f"\n📈 Lot {lot} of auction {auction}: {len(observed):,} observations\n")
+            for when, bid, count, realized in list(zip(observed.time.tolist(), observed.current_bid.tolist(),
+                                                       observed.bid_count.tolist(),
+                                                       observed.realized_price.tolist()))[-limit:]:
+                bids = f"{count} bids" if count >= 0 else ''
+                sold = f"  realized {money(realized)}" if realized == realized else ''
+                print(f"  {format_timestamp(when)[:16]}  {money(bid):>14}  {bids:<9}{sold}")
+            return
+        
+        rollup = history.rollup(auction)
+        if not rollup.lots:
+            print(f"❌ No price history for auction {auction}")
+            return
+        print(f"\n📈 Auction {auction}: {len(rollup.lots):,} lots, {rollup.observations:,} observations, "
+              f"{format_timestamp(rollup.first_time)[:10]} to {format_timestamp(rollup.last_time)[:10]}")
+        print(f"   Current bids {money(rollup.total_bids)}; realized {money(rollup.total_realized)} "
+              f"({rollup.sold:,} lots sold)\n")
+        for lot_rollup in sorted(rollup.lots, key=lambda r: -(r.final_bid or 0))[:limit]:
+            bids = f"{lot_rollup.bid_count} bids" if lot_rollup.bid_count is not None else ''
+            print(f"  {lot_rollup.lot_id:>10}  {money(lot_rollup.opening_bid):>12} → {money(lot_rollup.final_bid):<12} "
+                  f"{bids:<9} realized {money(lot_rollup.realized_price)} ({lot_rollup.observations} obs.)")
+        if len(rollup.lots) > limit:
+            print(f"  … {len(rollup.lots) - limit:,} more lots")
+    
+    def export_parquet(self, archive: str, output_path: Optional[str] = None,
+                       processes: Optional[int] = None):
+        """Export an archive's threads, posts and lots as partitioned Parquet
+        
+        Args:
+            archive: Archive to export
+            output_path: Export directory (default: exports/parquet)
+            processes: Worker processes reading the archive
+        """
+        from tools.archive.columnar import export_parquet
+        from tools.archive.scan import find_archives
+        
+        archives = find_archives('archives')
+        if archive not in archives:
+            print(f"❌ No data found for archive: {archive}")
+            return
+        root, layout = archives[archive]
+        out_dir = Path(output_path or 'exports/parquet')
+        
+        print(f"\n📦 Exporting {archive} ({root}) to {out_dir}\n")
+        start = time.time()
+        try:
+            counts = export_parquet(root, out_dir, archive, layout, processes=processes)
+        except ImportError as e:
+            print(f"❌ {e}")
+            return
+        for table, rows in counts.items():
+            if rows:
+                print(f"   {table}: {rows:,} rows")
+        print(f"\n✅ Exported in {time.time() - start:.1f}s")
+    
+    def extract_offers(self, archive: str, forums: Optional[list] = None,
+                       output_path: Optional[str] = None, processes: Optional[int] = None):
+        """Extract priced offers from for-sale forums into a Parquet table
+        
+        Args:
+            archive: Archive to extract from
+            forums: Forum IDs (default: Net54's for-sale forum, 13)
+            output_path: Export directory (default: exports/parquet)
+            processes: Worker processes reading and extracting
+        """
+        from tools.archive.offers import FOR_SALE_FORUMS, TABLE, export_offers
+        from tools.archive.scan import find_archives
+        
+        archives = find_archives('archives')
+        if archive not in archives:
+            print(f"❌ No data found for archive: {archive}")
+            return
+        root, layout = archives[archive]
+        out_dir = Path(output_path or 'exports/parquet')
+        forums = forums or FOR_SALE_FORUMS
+        
+        print(f"\n💲 Extracting offers from {archive} forums {', '.join(forums)} to {out_dir / TABLE}\n")
+        start = time.time()
+        try:
+            counts = export_offers(root, out_dir, archive, forums, layout, processes=processes)
+        except ImportError as e:
+            print(f"❌ {e}")
+            return
+        print(f"   Threads read: {counts['threads']:,}")
+        print(f"   Threads with offers: {counts['with_offers']:,}")
+        print(f"   Offers: {counts['offers']:,}")
+        print(f"\n✅ Extracted in {time.time() - start:.1f}s")
+    
     def export_metadata(self, archive: str, output_path: Optional[str] = None):
         """Export metadata for an archive
         
@@ -160,6 +736,8 @@ class CollectiblesCLI:
             archive: Archive to export
             output_path: Optional output path
         """
+        from tools.scrapers.base.storage import MultiArchiveStorage
+        
         try:
             storage = MultiArchiveStorage(archive, 'archives')
             output_file = storage.export_metadata(
@@ -205,8 +783,21 @@ Examples:
   collectibles.py list                    # List all archives
   collectibles.py scrape net54 --forum 39 # Scrape Net54 forum
   collectibles.py scrape heritage         # Scrape Heritage auctions
+  collectibles.py scrape-all --max-minutes 330  # All archives at once, with a deadline
   collectibles.py stats                   # Show all statistics
   collectibles.py stats net54            # Show Net54 statistics
+  collectibles.py stats net54 --deep     # Rebuild Net54 statistics from disk
+  collectibles.py reconcile net54         # Rebuild progress, flag broken threads
+  collectibles.py index net54             # Build/catch up the Net54 indexes (search, time, authors, tags, ...)
+  collectibles.py search '"old judge"' cobb  # Full-text search (phrases, prefix*, -word)
+  collectibles.py timeline net54 --from 2009 --to 2009 --title-prefix FS  # For-sale threads of 2009
+  collectibles.py author net54 "Leon"     # A collector's posting history
+  collectibles.py tags net54 T206 Mantle  # Posts mentioning both (sets, players, makers, graders)
+  collectibles.py duplicates net54 --threshold 0.9  # Reposted for-sale text, across threads and forums
+  collectibles.py comps heritage "1952 Topps Mantle PSA 7"  # Realized prices within a grade, by date
+  collectibles.py prices heritage 7001    # Bid history of an auction's lots (track_prices)
+  collectibles.py export net54 --format parquet  # Columnar export for analytics
+  collectibles.py offers net54 --processes 4  # Prices and grades from for-sale posts
   collectibles.py verify                  # Verify setup
         """
     )
@@ -226,14 +817,150 @@ Examples:
     scrape_parser.add_argument('--limit', type=int,
                               help='Limit number of items to scrape')
     
+    # Scrape-all command
+    scrape_all_parser = subparsers.add_parser(
+        'scrape-all', help='Scrape several archives concurrently in one process')
+    scrape_all_parser.add_argument('archives', nargs='*',
+                                   help='Archives to scrape (default: all configured)')
+    scrape_all_parser.add_argument('--limit', type=int,
+                                   help='Limit number of items per archive')
+    scrape_all_parser.add_argument('--workers', type=int,
+                                   help='Host lanes to run at once (default: one per host)')
+    scrape_all_parser.add_argument('--max-minutes', type=float,
+                                   help='Stop all scrapers cleanly after this many minutes')
+    scrape_all_parser.add_argument('--progress-interval', type=float, default=30.0,
+                                   help='Seconds between progress lines (default: 30)')
+    
     # Stats command
     stats_parser = subparsers.add_parser('stats', help='Show archive statistics')
     stats_parser.add_argument('archive', nargs='?', help='Specific archive (optional)')
+    stats_parser.add_argument('--deep', action='store_true',
+                              help='Rebuild statistics by scanning all archived files')
+    
+    # Reconcile command
+    reconcile_parser = subparsers.add_parser(
+        'reconcile', help='Rebuild progress from archived files and flag threads to refetch')
+    reconcile_parser.add_argument('archive', help='Archive to reconcile (e.g., net54)')
+    reconcile_parser.add_argument('--processes', type=int,
+                                  help='Worker processes for the scan (default: CPU count)')
+    reconcile_parser.add_argument('--post-limit', type=int, default=50,
+                                  help='Posts per topic fetched by the scraper (default: 50)')
+    reconcile_parser.add_argument('--dry-run', action='store_true',
+                                  help='Report only, do not write any files')
+    
+    # Index command
+    index_parser = subparsers.add_parser(
+        'index', help='Build or catch up the search, time, author, tag, duplicate and comps indexes of an archive')
+    index_parser.add_argument('archive', help='Archive to index (e.g., net54)')
+    index_parser.add_argument('--rebuild', action='store_true',
+                              help='Reindex every item, not just changed ones')
+    index_parser.add_argument('--processes', type=int,
+                              help='Worker processes reading changed item files')
+    
+    # Search command
+    search_parser = subparsers.add_parser('search', help='Full-text search of indexed archives')
+    search_parser.add_argument('query', nargs='+',
+                               help='Words, "quoted phrases", prefix* and -excluded words '
+                                    '(after --, e.g. search -- cobb -reprint)')
+    search_parser.add_argument('--archive', help='Only search this archive')
+    search_parser.add_argument('--forum', '--type', dest='group',
+                               help='Only search this forum ID or item type')
+    search_parser.add_argument('--limit', type=int, default=10,
+                               help='Maximum hits per archive (default: 10)')
+    
+    # Timeline command
+    timeline_parser = subparsers.add_parser(
+        'timeline', help='List threads started in a period (needs: collectibles.py index)')
+    timeline_parser.add_argument('archive', help='Archive to query (e.g., net54)')
+    timeline_parser.add_argument('--from', dest='start', help='First year/month/date, e.g. 2009 or 2009-04')
+    timeline_parser.add_argument('--to', dest='end', help='Last year/month/date, inclusive')
+    timeline_parser.add_argument('--forum', '--type', dest='group',
+                                 help='Only this forum ID or item type')
+    timeline_parser.add_argument('--title-prefix', action='append', dest='title_prefixes',
+                                 help='Only titles starting with this (repeatable), e.g. FS')
+    timeline_parser.add_argument('--limit', type=int, default=50,
+                                 help='Maximum threads listed (default: 50)')
+    
+    # Author command
+    author_parser = subparsers.add_parser(
+        'author', help="Show a collector's posting history (needs: collectibles.py index)")
+    author_parser.add_argument('archive', help='Archive to query (e.g., net54)')
+    author_parser.add_argument('author', help='Author name (case-insensitive)')
+    author_parser.add_argument('--limit', type=int, default=20,
+                               help='Maximum recent posts listed (default: 20)')
+    
+    # Tags command
+    tags_parser = subparsers.add_parser(
+        'tags', help='Find posts by set, player, manufacturer or grader (needs: collectibles.py index)')
+    tags_parser.add_argument('archive', help='Archive to query (e.g., net54)')
+    tags_parser.add_argument('entities', nargs='*',
+                             help='Entity names, e.g. T206 "1952 Topps" Mantle; none lists the most mentioned')
+    tags_parser.add_argument('--any', action='store_true', dest='any_of',
+                             help='Match any of the entities rather than all')
+    tags_parser.add_argument('--threads', action='store_true',
+                             help='Match whole threads rather than single posts')
+    tags_parser.add_argument('--forum', '--type', dest='group', help='Only this forum ID or item type')
+    tags_parser.add_argument('--kind', choices=['set', 'player', 'manufacturer', 'grader'],
+                             help='With no entities, only list this kind')
+    tags_parser.add_argument('--limit', type=int, default=20,
+                             help='Maximum documents listed (default: 20)')
+    
+    # Duplicates command
+    duplicates_parser = subparsers.add_parser(
+        'duplicates', help='Report clusters of near-duplicate posts, threads or lots (needs: collectibles.py index)')
+    duplicates_parser.add_argument('archive', help='Archive to query (e.g., net54)')
+    duplicates_parser.add_argument('--kind', choices=['post', 'thread', 'lot'], default='post',
+                                   help='Documents compared (default: post)')
+    duplicates_parser.add_argument('--threshold', type=float, default=0.8,
+                                   help='Minimum estimated similarity, 0-1 (default: 0.8)')
+    duplicates_parser.add_argument('--forum', '--type', dest='group', help='Only this forum ID or item type')
+    duplicates_parser.add_argument('--limit', type=int, default=10,
+                                   help='Maximum clusters listed (default: 10)')
+    
+    # Comps command
+    comps_parser = subparsers.add_parser(
+        'comps', help='Comparable sales of a card within a grade window (needs: collectibles.py index)')
+    comps_parser.add_argument('archive', help='Archive to query (e.g., heritage)')
+    comps_parser.add_argument('card', nargs='*',
+                              help='The card, like a lot title: 1952 Topps Mantle #311 PSA 7; '
+                                   'none lists the most sold cards')
+    comps_parser.add_argument('--window', type=float, default=1.0,
+                              help='Grades either side of the card\'s grade (default: 1)')
+    comps_parser.add_argument('--grader', help='Only slabs of this grading company (e.g., PSA)')
+    comps_parser.add_argument('--since', help='Only sales from this date on (YYYY[-MM[-DD]])')
+    comps_parser.add_argument('--limit', type=int, default=20,
+                              help='Maximum sales listed (default: 20)')
+    
+    # Prices command
+    prices_parser = subparsers.add_parser(
+        'prices', help="Show the bid history of an auction's lots (recorded with track_prices)")
+    prices_parser.add_argument('archive', help='Archive to query (e.g., heritage)')
+    prices_parser.add_argument('auction', nargs='?', help='Auction ID; none lists the auctions')
+    prices_parser.add_argument('lot', nargs='?', help="Lot ID; none shows the auction's rollup")
+    prices_parser.add_argument('--from', dest='start', help='First year, month or date (YYYY[-MM[-DD]])')
+    prices_parser.add_argument('--to', dest='end', help='Last year, month or date, inclusive')
+    prices_parser.add_argument('--limit', type=int, default=20,
+                               help='Maximum lots or observations listed (default: 20)')
     
     # Export command
     export_parser = subparsers.add_parser('export', help='Export archive metadata')
     export_parser.add_argument('archive', help='Archive to export')
-    export_parser.add_argument('--output', '-o', help='Output file path')
+    export_parser.add_argument('--output', '-o', help='Output file path (directory for parquet)')
+    export_parser.add_argument('--format', choices=['json', 'parquet'], default='json',
+                               help='json: progress metadata; parquet: threads, posts and lots '
+                                    '(default: json)')
+    export_parser.add_argument('--processes', type=int,
+                               help='Worker processes reading the archive (parquet)')
+    
+    # Offers command
+    offers_parser = subparsers.add_parser(
+        'offers', help='Extract card, grade and price offers from for-sale forums (Parquet)')
+    offers_parser.add_argument('archive', help='Archive to extract from (e.g., net54)')
+    offers_parser.add_argument('--forum', action='append', dest='forums',
+                               help='Forum ID to extract from (repeatable; default: 13)')
+    offers_parser.add_argument('--output', '-o', help='Export directory (default: exports/parquet)')
+    offers_parser.add_argument('--processes', type=int,
+                               help='Worker processes reading and extracting')
     
     # Verify command
     subparsers.add_parser('verify', help='Verify collectibles setup')
@@ -253,10 +980,48 @@ Examples:
             auction_id=getattr(args, 'auction_id', None),
             limit=getattr(args, 'limit', None)
         )
+    elif args.command == 'scrape-all':
+        cli.scrape_all(
+            args.archives,
+            limit=args.limit,
+            workers=args.workers,
+            max_minutes=args.max_minutes,
+            progress_interval=args.progress_interval
+        )
     elif args.command == 'stats':
-        cli.show_stats(args.archive)
+        cli.show_stats(args.archive, deep=args.deep)
+    elif args.command == 'reconcile':
+        cli.reconcile_archive(args.archive, processes=args.processes,
+                              post_limit=args.post_limit, dry_run=args.dry_run)
+    elif args.command == 'index':
+        cli.build_index(args.archive, rebuild=args.rebuild, processes=args.processes)
+    elif args.command == 'search':
+        cli.search(' '.join(args.query), archive=args.archive, group=args.group, limit=args.limit)
+    elif args.command == 'timeline':
+        cli.show_timeline(args.archive, args.start, args.end, group=args.group,
+                          title_prefixes=args.title_prefixes, limit=args.limit)
+    elif args.command == 'author':
+        cli.show_author(args.archive, args.author, limit=args.limit)
+    elif args.command == 'tags':
+        cli.show_tags(args.archive, args.entities, any_of=args.any_of, threads=args.threads,
+                      group=args.group, kind=args.kind, limit=args.limit)
+    elif args.command == 'duplicates':
+        cli.show_duplicates(args.archive, kind=args.kind, threshold=args.threshold,
+                            group=args.group, limit=args.limit)
+    elif args.command == 'comps':
+        cli.show_comps(args.archive, ' '.join(args.card), window=args.window, grader=args.grader,
+                       since=args.since, limit=args.limit)
+    elif args.command == 'prices':
+        cli.show_price_history(args.archive, args.auction, args.lot, start=args.start, end=args.end,
+                               limit=args.limit)
     elif args.command == 'export':
-        cli.export_metadata(args.archive, args.output)
+        if args.format == 'parquet':
+            cli.export_parquet(args.archive, args.output, processes=args.processes)
+        else:
+            cli.export_metadata(args.archive, args.output)
+    elif args.command == 'offers':
+        cli.extract_offers(args.archive, forums=args.forums, output_path=args.output,
+                           processes=args.processes)
     elif args.command == 'verify':
         cli.verify_setup()
     else:
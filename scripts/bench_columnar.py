@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Analytical queries over the Parquet export vs a JSON re-scan
+
+Exports an archive (tools/archive/columnar.py) into a temporary directory,
+then answers the same questions from the Parquet dataset and by streaming
+the thread files (tools/archive/reader.py): posts per year in one forum,
+and the most active authors overall. Checks that both answers agree.
+"""
+
+import argparse
+import collections
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+from tools.archive.columnar import export_parquet, record_year
+from tools.archive.reader import ArchiveReader
+
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data-dir', default=str(PROJECT_ROOT / 'data/forums/net54baseball.com'))
+    parser.add_argument('--forum', default='39')
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix='bench_columnar_'))
+    try:
+        counts, export_s = timed(lambda: export_parquet(args.data_dir, work, 'net54'))
+        size_mb = sum(f.stat().st_size for f in work.rglob('*.parquet')) / 2 ** 20
+        json_mb = sum(f.stat().st_size for f in Path(args.data_dir).glob('forum_*/thread_*.json')) / 2 ** 20
+        print(f"exported {counts['threads']:,} threads, {counts['posts']:,} posts in {export_s:.1f} s: "
+              f"{size_mb:.1f} MB Parquet vs {json_mb:.0f} MB JSON")
+
+        posts = ds.dataset(work / 'posts', format='parquet', partitioning='hive')
+
+        def parquet_per_year():
+            table = posts.to_table(columns=['year'], filter=pc.field('forum') == int(args.forum))
+            rows = table.group_by('year').aggregate([('year', 'count')]).to_pylist()
+            return {str(row['year']): row['year_count'] for row in rows}
+
+        def parquet_top_authors():
+            table = posts.to_table(columns=['author'])
+            counts = pc.value_counts(table['author'].combine_chunks().dictionary_decode())
+            pairs = sorted(((item['counts'], item['values']) for item in counts.to_pylist()), reverse=True)
+            return [(author, count) for count, author in pairs[:10]]
+
+        reader = ArchiveReader(args.data_dir)
+
+        def json_per_year():
+            years = collections.Counter(record_year(post.timestamp, post.posted)
+                                        for post in reader.iter_posts(forum=args.forum))
+            return dict(years)
+
+        def json_top_authors():
+            authors = collections.Counter(post.author for post in reader.iter_posts())
+            pairs = sorted(((count, author) for author, count in authors.items()), reverse=True)
+            return [(author, count) for count, author in pairs[:10]]
+
+        print(f"\n{'query':<32}{'parquet':>10}{'json scan':>12}")
+        ok = True
+        for label, columnar, scan in (
+            (f'posts per year, forum {args.forum}', parquet_per_year, json_per_year),
+            ('top 10 authors', parquet_top_authors, json_top_authors),
+        ):
+            columnar_result, columnar_s = timed(columnar)
+            scan_result, scan_s = timed(scan)
+            print(f"{label:<32}{columnar_s * 1000:>8.0f}ms{scan_s * 1000:>10.0f}ms")
+            ok = ok and columnar_result == scan_result
+    finally:
+        shutil.rmtree(work)
+
+    print("\n✅ Parquet and JSON answers agree" if ok else "\n❌ MISMATCH")
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
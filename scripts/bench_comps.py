@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Comparable sales (tools/archive/comps.py): query and statistics latency
+
+No Heritage lots ship with the repository, so this builds a comparables
+index in a temporary directory from --lots synthetic sold lots (titles
+like "1952 Topps Mickey Mantle #311 PSA NM 7" over the dictionary's sets
+and players), checks that titles map back to their cards, then times the
+"± one grade, by date" SQL query and the NumPy summary per card, and
+checks the summary's median against the queried prices.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+from tools.archive.comps import ComparablesIndex, card_identity
+from tools.archive.entities import PLAYERS, SETS
+from tools.archive.records import Lot
+
+CONDITION = {1: 'PR', 2: 'GD', 3: 'VG', 4: 'VG-EX', 5: 'EX', 6: 'EX-MT', 7: 'NM', 8: 'NM-MT', 9: 'MINT'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lots', type=int, default=50000)
+    parser.add_argument('--cards', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    sets = [name for name in SETS if name[:4].isdigit()]
+    players = list(PLAYERS)
+    cards = {(sets[rng.integers(len(sets))], players[rng.integers(len(players))]) for _ in range(args.cards)}
+    cards = sorted(cards)
+    base = {card: float(rng.uniform(20, 5000)) for card in cards}
+    start_time = 1_262_304_000  # 2010-01-01
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = ComparablesIndex(Path(directory))
+        stat = os.stat(directory)
+        start = time.perf_counter()
+        with index.batch():
+            for lot_id in range(args.lots):
+                set_name, player = cards[rng.integers(len(cards))]
+                grade = int(rng.integers(1, 10))
+                sold = start_time + int(rng.integers(0, 15 * 365 * 86400))
+                price = round(base[(set_name, player)] * 1.35 ** grade * float(rng.lognormal(0, 0.2)), 2)
+                title = f"{set_name} {player} #{lot_id % 400 + 1} PSA {CONDITION[grade]} {grade}"
+                lot = Lot(str(lot_id), 'a1', title, realized_price=price,
+                          details={'Date Sold': time.strftime('%Y-%m-%d', time.gmtime(sold))})
+                index.index_item('lots', str(lot_id), lot, stat)
+        build_s = time.perf_counter() - start
+        known = index.conn.execute('SELECT COUNT(*) FROM sales').fetchone()[0]
+        assert known == args.lots, f"only {known:,} of {args.lots:,} lots recognized"
+        for set_name, player in cards[:200]:
+            key = card_identity(f"{set_name} {player} #12 SGC 84 NM 7").key
+            assert key == f"{set_name}|{player}".casefold(), (set_name, player, key)
+        print(f"{args.lots:,} lots of {len(cards):,} cards indexed in {build_s:.1f} s "
+              f"({args.lots / build_s:,.0f} lots/s), every title recognized")
+
+        start = time.perf_counter()
+        vectors = index.vectors
+        print(f"price vectors of {len(vectors.prices):,} sales, {len(vectors.cards):,} cards "
+              f"loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        queries = [card_identity(f"{set_name} {player} PSA {int(rng.integers(1, 10))}")
+                   for set_name, player in (cards[rng.integers(len(cards))] for _ in range(args.queries))]
+        start = time.perf_counter()
+        results = [index.sales(identity) for identity in queries]
+        query_s = time.perf_counter() - start
+        start = time.perf_counter()
+        summaries = [index.summary(identity) for identity in queries]
+        summary_s = time.perf_counter() - start
+
+        for sales, summary in zip(results, summaries):
+            assert (summary is None) == (not sales)
+            if sales:
+                assert summary.count == len(sales)
+                expected = np.percentile([sale.price for sale in sales], list(summary.percentiles))
+                assert np.allclose(list(summary.percentiles.values()), expected)
+                assert all(a.time <= b.time for a, b in zip(sales, sales[1:]))
+        mean_sales = sum(map(len, results)) / len(results)
+        print(f"✓ percentiles agree with np.percentile of the queried sales ({mean_sales:.0f} sales per query)")
+        print(f"sales ± 1 grade, by date: {query_s / len(queries) * 1e6:8.0f} µs per card")
+        print(f"median/percentiles/trend: {summary_s / len(queries) * 1e6:8.0f} µs per card")
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
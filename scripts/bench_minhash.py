@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Near-duplicate detection (tools/archive/duplicates.py): LSH banding vs all pairs
+
+MinHashes the posts of the first --threads threads of an archive, checks
+the signatures against exact Jaccard similarities, then finds the pairs at
+or above --threshold twice: by comparing every pair of signatures, and
+with LSH banding. Reports the time of each and the share of the
+all-pairs matches banding found.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+from tools.archive.duplicates import (MIN_SHINGLES, PERM_A, PERM_B, agreement, candidate_pairs,
+                                      components, shingles, signatures)
+from tools.archive.reader import ArchiveReader
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--archive', default='net54')
+    parser.add_argument('--threads', type=int, default=3000)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    args = parser.parse_args()
+
+    texts = []
+    for count, thread in enumerate(ArchiveReader.open(args.archive).iter_threads()):
+        if count >= args.threads:
+            break
+        texts.extend(post.content for post in thread.posts)
+    start = time.perf_counter()
+    sets = [hashed for hashed in map(shingles, texts) if len(hashed) >= MIN_SHINGLES]
+    matrix = signatures(sets)
+    hash_s = time.perf_counter() - start
+    print(f"{len(sets):,} posts of {len(texts):,} long enough; shingled and hashed in "
+          f"{hash_s * 1000:.0f} ms ({len(sets) / hash_s:,.0f} posts/s)")
+
+    # Blocked hashing agrees with hashing each set on its own
+    for index in range(0, len(sets), max(1, len(sets) // 50)):
+        expected = ((PERM_A * sets[index] + PERM_B) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+        assert np.array_equal(matrix[index], expected), index
+    # Signature agreement estimates Jaccard similarity
+    rng = np.random.default_rng(0)
+    errors = []
+    for left, right in rng.integers(0, len(sets), size=(2000, 2)):
+        a, b = set(sets[left].tolist()), set(sets[right].tolist())
+        errors.append(abs(len(a & b) / len(a | b) - (matrix[left] == matrix[right]).mean()))
+    print(f"✓ signatures match per-set hashing; |estimate - Jaccard| mean {np.mean(errors):.3f}, "
+          f"max {np.max(errors):.3f}")
+
+    start = time.perf_counter()
+    expected = set()
+    for left in range(len(matrix) - 1):
+        scores = (matrix[left + 1:] == matrix[left]).mean(axis=1)
+        expected.update((left, left + 1 + right) for right in np.flatnonzero(scores >= args.threshold).tolist())
+    brute_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pairs = candidate_pairs(matrix)
+    pairs = pairs[agreement(matrix, pairs) >= args.threshold]
+    lsh_s = time.perf_counter() - start
+    found = set(map(tuple, pairs.tolist()))
+    assert found <= expected
+
+    # Banding pairs each bucket with its first member only, so a match it
+    # does not list itself still counts as found when both ends land in one
+    # cluster of its pairs
+    labels = components(len(matrix), pairs)
+    clustered = sum(labels[left] == labels[right] for left, right in expected)
+    pairs_total = len(matrix) * (len(matrix) - 1) // 2
+    print(f"all pairs:   {brute_s * 1000:8.1f} ms  ({pairs_total:,} comparisons, {len(expected):,} matches)")
+    print(f"lsh banding: {lsh_s * 1000:8.1f} ms  ({len(found):,} verified pairs)")
+    print(f"recall: {clustered / max(len(expected), 1):.1%} of matches clustered together; "
+          f"speedup {brute_s / lsh_s:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Offer extraction throughput (tools/archive/offers.py)
+
+Checks a few known lines, then times parse_line over the priced lines of
+a forum's seller posts, and the whole extraction (reading, normalizing and
+extracting) over the forum's thread files, serially and with a process
+pool.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+from tools.archive.offers import parse_line, thread_offers
+from tools.archive.reader import ArchiveReader, read_items
+
+KNOWN = {
+    'GANDIL SGC 40--$115': [('GANDIL', 'SGC', '40', 115.0)],
+    'Frank Lang, PSA5, PB - $70 **SOLD** Thanks Cy': [('Frank Lang, PB', 'PSA', '5', 70.0)],
+    'Baker $155 Griffith SL $100': [('Baker', None, None, 155.0), ('Griffith SL', None, None, 100.0)],
+    "I'm asking [STRIKE]$25 $20[/STRIKE] $16 per card, delivered!": [('', None, None, 16.0)],
+    '1912 C-46 77 McGinnity HOF PSA 3 $300 (VCP $316.13 from 2010)':
+        [('1912 C-46 77 McGinnity HOF', 'PSA', '3', 300.0)],
+    'Please add $5 shipping (USPS Priority)': [],
+    'I would knock $75 off final price if purchased together.': [],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--archive', default='net54')
+    parser.add_argument('--forum', default='13')
+    parser.add_argument('--threads', type=int, default=5000)
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    for line, expected in KNOWN.items():
+        got = [(offer['card'], offer['grader'], offer['grade'], offer['price']) for offer in parse_line(line)]
+        assert got == expected, (line, got)
+    print(f"✓ {len(KNOWN)} known lines parsed as expected")
+
+    reader = ArchiveReader.open(args.archive)
+    tasks = list(reader._files(args.forum, None))[:args.threads]
+    lines = []
+    for _, thread in read_items(tasks):
+        seller = thread.posts[0].author if thread and thread.posts else None
+        lines.extend(line for post in (thread.posts if thread else ()) if post.author == seller
+                     for line in post.content.splitlines() if '$' in line)
+    print(f"{len(lines):,} priced lines in {len(tasks):,} threads of forum {args.forum}")
+
+    start = time.perf_counter()
+    offers = sum(len(parse_line(line)) for line in lines)
+    parse_s = time.perf_counter() - start
+    print(f"parse_line:          {parse_s * 1000:8.1f} ms  ({len(lines) / parse_s:,.0f} lines/s, {offers:,} offers)")
+
+    for processes in (None, args.processes):
+        start = time.perf_counter()
+        rows = sum(len(result or ()) for _, result in
+                   read_items(tasks, processes=processes, transform=thread_offers))
+        elapsed = time.perf_counter() - start
+        print(f"extract, {processes or 1} process(es): {elapsed * 1000:8.1f} ms  "
+              f"({len(tasks) / elapsed:,.0f} threads/s, {rows:,} offers)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Lot price history (tools/archive/pricehistory.py): size and speed
+
+Simulates --lots lots of one auction re-scraped --scrapes times each (bids
+rising, a realized price at the end), appending every observation to a
+price history in a temporary directory. Compares its size with keeping a
+JSON copy of every re-scraped lot, checks reads return what was appended,
+and times appends, a one-lot range read and the auction rollup.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+from tools.archive.pricehistory import PriceHistory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lots', type=int, default=2000)
+    parser.add_argument('--scrapes', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    bids = rng.uniform(10, 500, args.lots).round(2)
+    counts = np.zeros(args.lots, dtype=np.int64)
+    start_time = 1_717_200_000
+    with tempfile.TemporaryDirectory() as directory:
+        history = PriceHistory(Path(directory) / 'price_history')
+        copies_bytes = 0
+        expected = {}
+        start = time.perf_counter()
+        for scrape in range(args.scrapes):
+            last = scrape == args.scrapes - 1
+            raised = rng.random(args.lots) < 0.3
+            bids = np.where(raised, (bids * rng.uniform(1.05, 1.2, args.lots)).round(2), bids)
+            counts += raised
+            for lot in range(args.lots):
+                when = start_time + scrape * 3600 + lot
+                realized = round(float(bids[lot]) * 1.2, 2) if last else None
+                lot_data = {'id': str(lot), 'auction_id': '7001', 'title': f'Lot {lot} ' + 'x' * 60,
+                            'description': 'y' * 400, 'scraped_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(when)),
+                            'current_bid': float(bids[lot]), 'bid_count': int(counts[lot]),
+                            'realized_price': realized}
+                history.record(lot_data)
+                copies_bytes += len(json.dumps(lot_data, indent=2))
+                expected.setdefault(str(lot), []).append((when, float(bids[lot])))
+        append_s = time.perf_counter() - start
+        observations = args.lots * args.scrapes
+        history_bytes = sum(path.stat().st_size for path in Path(directory).rglob('*') if path.is_file())
+        chunks = len(list(Path(directory).rglob('*.phc')))
+        print(f"{observations:,} observations appended in {append_s:.1f} s "
+              f"({observations / append_s:,.0f}/s), {chunks} chunks sealed")
+        print(f"price history: {history_bytes / 1024:9,.0f} KB ({history_bytes / observations:.1f} bytes/observation)")
+        print(f"JSON copies:   {copies_bytes / 1024:9,.0f} KB ({copies_bytes / history_bytes:.0f}x larger)")
+
+        sample = [str(lot) for lot in rng.integers(0, args.lots, 200)]
+        start = time.perf_counter()
+        series = [history.observations('7001', lot) for lot in sample]
+        read_ms = (time.perf_counter() - start) * 1000 / len(sample)
+        for lot, observed in zip(sample, series):
+            times, prices = zip(*expected[lot])
+            assert observed.time.tolist() == list(times)
+            assert np.allclose(observed.current_bid, prices)
+        window_start, window_end = start_time + 10 * 3600, start_time + 20 * 3600
+        ranged = history.observations('7001', sample[0], window_start, window_end)
+        assert len(ranged) == sum(window_start <= when <= window_end for when, _ in expected[sample[0]])
+        print("✓ reads return every appended observation in order")
+        print(f"one lot's series:  {read_ms:8.1f} ms")
+
+        start = time.perf_counter()
+        rollup = history.rollup('7001')
+        rollup_ms = (time.perf_counter() - start) * 1000
+        assert rollup.sold == args.lots and rollup.observations == observations
+        assert np.isclose(rollup.total_bids, float(bids.sum()))
+        print(f"auction rollup:    {rollup_ms:8.1f} ms  ({len(rollup.lots):,} lots)")
+
+
+if __name__ == '__main__':
+    main()
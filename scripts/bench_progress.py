@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Startup time and memory of JSON vs snapshot progress partitions
+
+Builds a lots partition of --items entries (Heritage-style: saved_at and
+size_bytes) in a temporary directory, once as the plain JSON partition file
+and once compacted into a snapshot, then measures opening the partitions,
+is_item_scraped-style lookups and the memory held (tracemalloc). Also checks
+that both layouts return the same entries, including after updates that
+land in the JSON overlay on top of a snapshot.
+"""
+
+import argparse
+import gc
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+from tools.archive.partitions import ProgressPartitions, atomic_write_json
+
+
+def make_entries(count, seed=54):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    ids = rng.sample(range(10_000_000, 90_000_000), count)
+    return {
+        str(lot_id): {
+            'saved_at': (start + timedelta(seconds=i * 7)).isoformat(),
+            'size_bytes': rng.randint(2_000, 40_000),
+        }
+        for i, lot_id in enumerate(ids)
+    }
+
+
+def open_and_probe(directory, probes):
+    """Open the partitions and look up every probe key
+
+    Timed without tracing and with gc off as in timeit, then repeated under
+    tracemalloc for the memory held; a snapshot's mapped pages are page
+    cache and not counted.
+    """
+    def run():
+        partitions = ProgressPartitions(directory)
+        entries = partitions.partitions['lots']['entries']
+        return partitions, sum(1 for key in probes if key in entries)
+
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.enable()
+    gc.collect()
+    tracemalloc.start()
+    partitions, found = run()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, held, found, partitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1_000_000)
+    parser.add_argument('--probes', type=int, default=10_000)
+    args = parser.parse_args()
+
+    entries = make_entries(args.items)
+    rng = random.Random(7)
+    keys = list(entries)
+    probes = rng.sample(keys, args.probes // 2) + [str(k) for k in range(args.probes // 2)]
+
+    work = Path(tempfile.mkdtemp(prefix='bench_progress_'))
+    try:
+        json_dir = work / 'json'
+        json_dir.mkdir()
+        atomic_write_json(json_dir / 'lots.json', {'meta': {}, 'entries': entries, 'updated_at': None})
+
+        snap_dir = work / 'snapshot'
+        shutil.copytree(json_dir, snap_dir)
+        start = time.perf_counter()
+        ProgressPartitions(snap_dir).compact()
+        compact_s = time.perf_counter() - start
+
+        sizes = {name: sum(f.stat().st_size for f in (work / name).iterdir())
+                 for name in ('json', 'snapshot')}
+        print(f"{args.items:,} entries: JSON {sizes['json'] / 2**20:.1f} MB, "
+              f"snapshot {sizes['snapshot'] / 2**20:.1f} MB (compacted in {compact_s:.1f} s)")
+
+        # Snapshot first: right after the JSON run the heap it left behind
+        # slows whatever comes next
+        snap_s, snap_mem, snap_found, snap_parts = open_and_probe(snap_dir, probes)
+        json_s, json_mem, json_found, json_parts = open_and_probe(json_dir, probes)
+        print(f"\n{'layout':<12}{'open + lookups':>16}{'memory held':>14}")
+        print(f"{'JSON':<12}{json_s * 1000:>14.0f}ms{json_mem / 2**20:>12.1f}MB")
+        print(f"{'snapshot':<12}{snap_s * 1000:>14.1f}ms{snap_mem / 2**20:>12.1f}MB")
+
+        json_entries = json_parts.partitions['lots']['entries']
+        snap_entries = snap_parts.partitions['lots']['entries']
+        ok = json_found == snap_found == args.probes // 2
+        ok = ok and len(snap_entries) == len(json_entries)
+        ok = ok and all(snap_entries[key] == json_entries[key] for key in keys[:2000])
+        ok = ok and snap_entries.total('size_bytes') == sum(e['size_bytes'] for e in entries.values())
+
+        # Updates and new entries go to the JSON overlay and win over the snapshot
+        writer = ProgressPartitions(snap_dir)
+        writer.set_entry('lots', keys[0], size_bytes=1)
+        writer.set_entry('lots', 'preview-1', size_bytes=2)
+        writer.flush()
+        reread = ProgressPartitions(snap_dir).partitions['lots']['entries']
+        ok = ok and reread[keys[0]] == dict(entries[keys[0]], size_bytes=1)
+        ok = ok and reread['preview-1'] == {'size_bytes': 2} and len(reread) == args.items + 1
+        ok = ok and sorted(reread) == sorted(keys + ['preview-1'])
+
+        # ...until the next compaction merges them in
+        writer.compact()
+        merged = ProgressPartitions(snap_dir).partitions['lots']['entries']
+        ok = ok and list(merged.overlay) == ['preview-1'] and merged[keys[0]]['size_bytes'] == 1
+    finally:
+        shutil.rmtree(work)
+
+    print("\n✅ snapshot and JSON agree" if ok else "\n❌ MISMATCH")
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Compare stored post dicts with tools/archive/records.py on archived threads
+
+Loads a sample of thread files, then measures per-post memory (tracemalloc)
+and JSON encode/decode throughput for the stored dicts, for Post.to_dict
+and for the compact Post.to_row form. Also checks that both forum sources
+normalize to the same schema and that the codecs round-trip.
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+from tools.archive.records import Post, dumps_row, loads_row, normalize_post, normalize_thread
+
+
+def load_posts(data_dir, limit):
+    posts = []
+    for path in itertools.islice(Path(data_dir).glob('forum_*/thread_*.json'), limit):
+        with open(path) as f:
+            thread = json.load(f)
+        posts.extend((post, thread['id']) for post in thread.get('posts') or ())
+    return posts
+
+
+def traced(build):
+    """Memory held by what build() returns"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def best_time(func, runs=5):
+    best = None
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data-dir', default=str(PROJECT_ROOT / 'data/forums/net54baseball.com'))
+    parser.add_argument('--threads', type=int, default=5000)
+    args = parser.parse_args()
+
+    sample = load_posts(args.data_dir, args.threads)
+    if not sample:
+        print(f"❌ No thread files under {args.data_dir}")
+        return False
+    lines = [json.dumps(post) for post, _ in sample]
+    count = len(lines)
+    print(f"{count} posts from up to {args.threads} threads")
+
+    # Memory: the decoded post dicts vs the same posts as records. Strings
+    # are shared by neither side, so both are built from the JSON text
+    dict_bytes, dicts = traced(lambda: [json.loads(line) for line in lines])
+    record_bytes, records = traced(lambda: [normalize_post(json.loads(line), thread_id)
+                                            for line, (_, thread_id) in zip(lines, sample)])
+    print(f"\nmemory per post: dict {dict_bytes / count:.0f} B, "
+          f"Post {record_bytes / count:.0f} B ({dict_bytes / record_bytes:.2f}x smaller)")
+
+    dict_lines = [json.dumps(record.to_dict()) for record in records]
+    row_lines = [dumps_row(record) for record in records]
+    print(f"JSON per post: dict {sum(map(len, dict_lines)) / count:.0f} chars, "
+          f"row {sum(map(len, row_lines)) / count:.0f} chars")
+
+    print(f"\n{'codec':<22}{'encode':>14}{'decode':>14}")
+    for label, encode, decode in (
+        ('stored dict', lambda: [json.dumps(post) for post in dicts],
+         lambda: [json.loads(line) for line in lines]),
+        ('Post.to_dict', lambda: [json.dumps(r.to_dict()) for r in records],
+         lambda: [Post.from_dict(json.loads(line)) for line in dict_lines]),
+        ('Post.to_row', lambda: [dumps_row(r) for r in records],
+         lambda: [loads_row(Post, line) for line in row_lines]),
+    ):
+        print(f"{label:<22}{count / best_time(encode):>12.0f}/s{count / best_time(decode):>12.0f}/s")
+
+    ok = all(loads_row(Post, line) == record for line, record in zip(row_lines, records))
+    ok = ok and all(Post.from_dict(json.loads(line)) == record
+                    for line, record in zip(dict_lines, records))
+
+    # Both forum scrapers' shapes land on the same record
+    tapatalk = {'post_id': '1', 'post_title': 'Re: T206', 'post_author_name': 'collector',
+                'post_content': 'Nice card', 'post_time': '20090426T15:49:00-06:00',
+                'timestamp': '1240782540'}
+    html = {'id': '1', 'thread_id': '7', 'author': 'collector', 'timestamp': '1240782540',
+            'content': 'Nice card', 'attachments': []}
+    same = normalize_post(tapatalk, '7')
+    same.title = same.posted = None
+    other = normalize_post(html)
+    other.title = None
+    ok = ok and same == other
+    thread = normalize_thread({'id': '7', 'posts': [tapatalk]})
+    ok = ok and thread.posts[0].thread_id == '7'
+
+    print("\n✅ round-trips and normalization agree" if ok else "\n❌ MISMATCH")
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
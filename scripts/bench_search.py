@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Query latency of the full-text search index (tools/archive/search.py)
+
+Indexes a copy of an archive's thread files (or, with --synthetic, generated
+posts) in a temporary directory, then times word, phrase, prefix, OR,
+exclusion and per-forum queries, and checks phrase and exclusion hits
+against a scan of the indexed text.
+"""
+
+import argparse
+import itertools
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+from tools.archive.records import Post, Thread
+from tools.archive.reader import read_item
+from tools.archive.scan import iter_groups, iter_item_files
+from tools.archive.search import SearchIndex
+
+QUERIES = [
+    't206', 'cobb', 'wagner OR plank', '"old judge"', '"sweet caporal"', 'mathew*',
+    'psa 8', 'cobb -reprint', '"piedmont 350" cobb', 'goudey ruth',
+]
+
+WORDS = ('t206 cobb wagner plank ruth gehrig mathewson goudey piedmont sweet caporal old judge '
+         'psa sgc graded raw card cards trade sale sold wanted price back front corner centering '
+         'reprint original auction lot collection set 350 150 460 1909 1933 the a of and for').split()
+
+
+def synthetic_threads(count, seed=54):
+    """Threads of Zipf-distributed words: 20,000 fillers, the card words every 25th rank from 10"""
+    rng = random.Random(seed)
+    vocabulary = [f'w{n}' for n in range(20_000)]
+    for rank, word in enumerate(WORDS):
+        vocabulary.insert(10 + 25 * rank, word)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    for thread_id in range(1, count + 1):
+        posts = [Post(id=f'{thread_id}{n}', thread_id=str(thread_id), author=f'user{rng.randrange(500)}',
+                      content=' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(8, 60))))
+                 for n in range(rng.randint(1, 8))]
+        title = ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=6))
+        yield str(rng.choice((4, 13, 39))), str(thread_id), Thread(id=str(thread_id), title=title, posts=posts)
+
+
+def archive_threads(data_dir, limit):
+    count = 0
+    for group, group_dir in iter_groups(Path(data_dir), 'forums'):
+        for entry in iter_item_files(group_dir, 'forums'):
+            if count == limit:
+                return
+            record = read_item(entry.path)
+            if record is not None:
+                count += 1
+                yield group, entry.name[len('thread_'):-len('.json')], record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data-dir', default=str(PROJECT_ROOT / 'data/forums/net54baseball.com'))
+    parser.add_argument('--threads', type=int, help='Index at most this many threads')
+    parser.add_argument('--synthetic', type=int, metavar='THREADS',
+                        help='Index this many generated threads instead of the archive')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    items = (synthetic_threads(args.synthetic) if args.synthetic
+             else archive_threads(args.data_dir, args.threads))
+    with tempfile.TemporaryDirectory(prefix='bench_search_') as work:
+        index = SearchIndex(Path(work))
+        stat = os.stat(work)
+        texts = {}
+        start = time.perf_counter()
+        with index.batch():
+            for group, item_id, record in items:
+                index.index_item(group, item_id, record, stat)
+                # The documents index_item wrote, to check hits against
+                for title, content, post_id, *_ in index._documents(record):
+                    texts[(group, item_id, post_id)] = ' '.join(re.findall(r'\w+', f'{title} {content}'.lower()))
+        index.optimize()
+        build_s = time.perf_counter() - start
+        counts = index.counts()
+        size_mb = sum(f.stat().st_size for f in Path(work).iterdir()) / 2 ** 20
+        print(f"{counts['items']:,} threads, {counts['documents']:,} posts indexed in {build_s:.1f} s "
+              f"({size_mb:.0f} MB)")
+
+        print(f"\n{'query':<26}{'hits':>6}{'median':>10}{'p95':>10}")
+        worst = 0.0
+        for query in QUERIES + ['cobb --forum 39']:
+            text, group = (query.split(' --forum ') + [None])[:2]
+            times = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                hits = index.search(text, limit=10, group=group)
+                times.append((time.perf_counter() - start) * 1000)
+            times.sort()
+            p95 = times[int(len(times) * 0.95) - 1]
+            worst = max(worst, p95)
+            print(f"{query:<26}{len(hits):>6}{statistics.median(times):>8.1f}ms{p95:>8.1f}ms")
+
+        # Phrase hits hold the words in order; excluded words never appear
+        ok = True
+        for hit in index.search('"old judge"', limit=50) + index.search('"sweet caporal"', limit=50):
+            body = f" {texts[(hit.group, hit.item_id, hit.post_id)]} "
+            ok = ok and (' old judge ' in body or ' sweet caporal ' in body)
+        for hit in index.search('cobb -reprint', limit=50):
+            ok = ok and 'reprint' not in texts[(hit.group, hit.item_id, hit.post_id)].split()
+        ok = ok and all(hit.group == '39' for hit in index.search('cobb', limit=50, group='39'))
+        index.close()
+
+    print(f"\nworst p95: {worst:.1f} ms")
+    print("✅ phrase, exclusion and forum filters hold" if ok else "❌ MISMATCH")
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
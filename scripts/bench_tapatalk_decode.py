@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Benchmark Tapatalk field decoding on realistic get_thread responses
+
+Compares the previous speculative decoder (try base64 on every value, check
+the first characters for printability, fall back) with the schema-driven
+decoder in tapatalk_decode.py, on the three shapes servers send text fields
+in: <base64>, base64 inside <string>, and plain <string>. Timed once for the
+decoding stage alone and once from the response body (incl. unmarshalling).
+"""
+
+import base64
+import gc
+import random
+import sys
+import time
+import xmlrpc.client
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from tapatalk_decode import decode_response
+
+POSTS_PER_PAGE = 20
+PAGES = 50
+
+WORDS = ['T206', 'Cobb', 'Wagner', 'PSA', 'SGC', 'centering', 'corners', 'reverse',
+         'Sweet Caporal', 'Piedmont', 'auction', 'grade', 'crease', 'vintage', 'nice',
+         'card', 'the', 'and', 'of', 'I', 'think', 'price', 'was', 'Ruth', '“wow”', '1933 Goudey']
+
+
+def legacy_decode(value):
+    """The decoder tapatalk_scraper.py used before the schema"""
+    if isinstance(value, xmlrpc.client.Binary):
+        return value.data.decode('utf-8', errors='ignore')
+    elif isinstance(value, bytes):
+        try:
+            decoded = base64.b64decode(value).decode('utf-8', errors='ignore')
+            if decoded and not all(ord(c) < 32 or ord(c) > 126 for c in decoded[:10]):
+                return decoded
+        except:
+            pass
+        return value.decode('utf-8', errors='ignore')
+    elif isinstance(value, str) and value:
+        try:
+            decoded = base64.b64decode(value).decode('utf-8', errors='ignore')
+            if decoded and not all(ord(c) < 32 or ord(c) > 126 for c in decoded[:10]):
+                return decoded
+        except:
+            pass
+    return value
+
+
+def post_body(rng):
+    """A forum post of a few hundred words with a quote and images"""
+    text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(60, 400)))
+    quote = ' '.join(rng.choice(WORDS) for _ in range(30))
+    images = ''.join(f'[IMG]https://i.imgur.com/{rng.getrandbits(40):x}.jpg[/IMG]\n'
+                     for _ in range(rng.randint(0, 4)))
+    return f'[QUOTE=collector{rng.randint(1, 999)}]{quote}[/QUOTE]\n{text}\n{images}'
+
+
+def make_pages(shape, seed=54):
+    """get_thread response bodies with text fields in the given shape"""
+    rng = random.Random(seed)
+
+    def text(value):
+        if shape == 'binary':
+            return xmlrpc.client.Binary(value.encode('utf-8'))
+        if shape == 'base64-string':
+            return base64.b64encode(value.encode('utf-8')).decode('ascii')
+        return value
+
+    pages = []
+    for page in range(PAGES):
+        posts = [{
+            'post_id': str(page * POSTS_PER_PAGE + i),
+            'post_title': text(f'Re: {rng.choice(WORDS)} {rng.choice(WORDS)}'),
+            'post_author_name': text(f'collector{rng.randint(1, 999)}'),
+            'post_content': text(post_body(rng)),
+            'post_time': xmlrpc.client.DateTime('20200101T10:00:00'),
+            'timestamp': str(1577872800 + i),
+        } for i in range(POSTS_PER_PAGE)]
+        xml = xmlrpc.client.dumps(({'topic_title': text('T206 Cobb'), 'posts': posts},),
+                                  methodresponse=True)
+        pages.append(xml)
+    return pages
+
+
+def legacy_parse_posts(response):
+    """TapatalkScraper.parse_posts before the schema"""
+    return [{
+        'post_id': str(post.get('post_id', '')),
+        'post_title': legacy_decode(post.get('post_title', '')),
+        'post_author_name': legacy_decode(post.get('post_author_name', '')),
+        'post_content': legacy_decode(post.get('post_content', '')),
+        'post_time': str(post.get('post_time', '')) if post.get('post_time') else '',
+        'timestamp': str(post.get('timestamp', '')) if post.get('timestamp') else ''
+    } for post in response['posts']]
+
+
+def schema_parse_posts(response):
+    """TapatalkScraper.parse_posts on a decode_response()d response"""
+    return [{
+        'post_id': str(post.get('post_id', '')),
+        'post_title': post.get('post_title', ''),
+        'post_author_name': post.get('post_author_name', ''),
+        'post_content': post.get('post_content', ''),
+        'post_time': str(post.get('post_time', '')) if post.get('post_time') else '',
+        'timestamp': str(post.get('timestamp', '')) if post.get('timestamp') else ''
+    } for post in response['posts']]
+
+
+def unmarshal(xml):
+    return xmlrpc.client.loads(xml)[0][0]
+
+
+def decode_legacy(responses):
+    return [legacy_parse_posts(response) for response in responses]
+
+
+def decode_schema(responses):
+    return [schema_parse_posts(decode_response('get_thread', response)) for response in responses]
+
+
+def full_legacy(pages):
+    return decode_legacy([unmarshal(xml) for xml in pages])
+
+
+def full_schema(pages):
+    return decode_schema([unmarshal(xml) for xml in pages])
+
+
+def best_time(func, make_input, runs=15):
+    """Best wall time of func over fresh inputs, with gc off as in timeit
+
+    The inputs are released inside the timed section, as the scraper drops a
+    response once it is parsed; otherwise whichever side frees the decoded
+    values first would be charged for it.
+    """
+    best = None
+    result = None
+    for _ in range(runs):
+        data = [make_input()]
+        result = None
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = func(data.pop())
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def report(label, posts, legacy, schema):
+    (legacy_s, legacy_out), (schema_s, schema_out) = legacy, schema
+    same = legacy_out == schema_out
+    print(f"{label:<16}{posts / legacy_s:>9.0f}/s {posts / schema_s:>9.0f}/s "
+          f"{legacy_s / schema_s:>9.1f}x  {'identical' if same else 'differ'}")
+    return same
+
+
+def main():
+    posts = PAGES * POSTS_PER_PAGE
+    body_bytes = sum(len(p['post_content'].encode('utf-8'))
+                     for page in full_schema(make_pages('plain')) for p in page)
+    print(f"{posts} posts, {body_bytes / posts:.0f} bytes per body on average")
+
+    ok = True
+    for title, legacy, schema, prepare in (
+        ('Field decoding + parse_posts', decode_legacy, decode_schema,
+         lambda pages: [unmarshal(xml) for xml in pages]),
+        ('Response body to posts (incl. unmarshalling)', full_legacy, full_schema,
+         lambda pages: pages),
+    ):
+        print(f"\n{title}")
+        print(f"{'shape':<16}{'legacy':>12}{'schema':>12}{'speedup':>10}  outputs")
+        for shape in ('binary', 'base64-string', 'plain'):
+            pages = make_pages(shape)
+            same = report(shape, posts,
+                          best_time(legacy, lambda: prepare(pages)),
+                          best_time(schema, lambda: prepare(pages)))
+            ok = ok and (same or shape == 'plain')
+
+    # Plain text is where the speculative decoder goes wrong: anything that
+    # happens to be valid base64 (short names, for example) turns into garbage
+    print("\n(on plain text the legacy decoder base64-decodes values that are not encoded)")
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Measure peak memory of parsing large get_thread pages
+
+Compares the previous path (whole body as one string, stock unmarshaller,
+then parse_posts copying the posts) with tapatalk_stream.py (body fed to
+expat in chunks, posts parsed one at a time) on pages of growing size with
+inline images. Peak memory is traced with tracemalloc; the body's bytes, as
+they would sit in the HTTP response, are not counted for either path.
+"""
+
+import base64
+import random
+import sys
+import time
+import tracemalloc
+import xmlrpc.client
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from tapatalk_decode import decode_response
+from tapatalk_stream import CHUNK_SIZE, ResponseStream
+
+POSTS_PER_PAGE = 20
+
+
+def parse_post(post):
+    """TapatalkScraper.parse_post"""
+    return {
+        'post_id': str(post.get('post_id', '')),
+        'post_title': post.get('post_title', ''),
+        'post_author_name': post.get('post_author_name', ''),
+        'post_content': post.get('post_content', ''),
+        'post_time': str(post.get('post_time', '')) if post.get('post_time') else '',
+        'timestamp': str(post.get('timestamp', '')) if post.get('timestamp') else ''
+    }
+
+
+def make_page(image_kb, seed=54):
+    """A get_thread response body whose posts each carry an inline image"""
+    rng = random.Random(seed)
+    posts = []
+    for i in range(POSTS_PER_PAGE):
+        image = base64.b64encode(rng.randbytes(image_kb * 1024)).decode('ascii')
+        content = f'Front and back scans:\n<img src="data:image/jpeg;base64,{image}">\nThoughts?'
+        posts.append({
+            'post_id': str(i),
+            'post_title': xmlrpc.client.Binary(f'Re: T206 scan {i}'.encode('utf-8')),
+            'post_author_name': xmlrpc.client.Binary(f'collector{i}'.encode('utf-8')),
+            'post_content': xmlrpc.client.Binary(content.encode('utf-8')),
+            'post_time': xmlrpc.client.DateTime('20200101T10:00:00'),
+        })
+    response = {'result': True, 'topic_title': xmlrpc.client.Binary(b'Scans'), 'posts': posts}
+    return xmlrpc.client.dumps((response,), methodresponse=True).encode('utf-8')
+
+
+def whole_body(body):
+    """The previous transport: response.text, loads, then parse_posts"""
+    text = body.decode('utf-8')
+    response = decode_response('get_thread', xmlrpc.client.loads(text)[0][0])
+    del text
+    return [parse_post(post) for post in response['posts']]
+
+
+def streamed(body):
+    """tapatalk_stream: chunks as iter_content would deliver them"""
+    chunks = (body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+    return [parse_post(post) for post in ResponseStream('get_thread').parse(chunks)]
+
+
+def measure(func, body):
+    """Peak traced memory above the baseline, and wall time"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    posts = func(body)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed, posts
+
+
+def main():
+    print(f"{'page':>10}{'whole body':>14}{'streamed':>12}{'kept posts':>13}{'overhead':>11}   time (whole/streamed)")
+    ok = True
+    for image_kb in (8, 64, 256):
+        body = make_page(image_kb)
+        whole_peak, whole_s, whole_posts = measure(whole_body, body)
+        stream_peak, stream_s, stream_posts = measure(streamed, body)
+        kept = sum(len(post['post_content']) for post in stream_posts)
+        ok = ok and whole_posts == stream_posts
+        print(f"{len(body) / 2**20:>8.1f}MB{whole_peak / 2**20:>12.1f}MB{stream_peak / 2**20:>10.1f}MB"
+              f"{kept / 2**20:>11.1f}MB{(stream_peak - kept) / 2**20:>9.1f}MB"
+              f"   {whole_s * 1000:.0f} / {stream_s * 1000:.0f} ms")
+    print("\n'kept posts' is the parsed output itself, which both paths must hold;")
+    print("'overhead' is the streamed peak above it (one chunk and the post being parsed)")
+    print("identical output" if ok else "OUTPUT DIFFERS")
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
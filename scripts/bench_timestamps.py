@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Bulk timestamp normalization (tools/archive/timestamps.py) vs per-value parsing
+
+Generates --count dates in the archived shapes (epoch digit strings,
+Tapatalk ISO basic with offsets, naive ISO from the storages), parses them
+with parse_timestamps and with a plain strptime/fromisoformat loop, and
+checks that both give the same epoch seconds. Also checks the free-text
+and invalid shapes.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+from tools.archive.timestamps import MISSING, parse_timestamps
+
+import numpy as np
+
+
+def make_values(count, seed=54):
+    rng = random.Random(seed)
+    values = []
+    for i in range(count):
+        epoch = rng.randrange(946684800, 1_750_000_000)
+        offset = timezone(timedelta(hours=rng.choice((-7, -6, -5, 0, 1))))
+        moment = datetime.fromtimestamp(epoch, offset)
+        shape = i % 3
+        if shape == 0:
+            values.append(str(epoch))
+        elif shape == 1:
+            values.append(moment.strftime('%Y%m%dT%H:%M:%S') + moment.strftime('%z')[:3] + ':00')
+        else:
+            values.append(datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat())
+    return values
+
+
+def parse_one(value):
+    if value.isdigit():
+        return int(value)
+    if value[8] == 'T':
+        return int(datetime.strptime(value, '%Y%m%dT%H:%M:%S%z').timestamp())
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    values = make_values(args.count)
+    start = time.perf_counter()
+    bulk = parse_timestamps(values)
+    bulk_s = time.perf_counter() - start
+    start = time.perf_counter()
+    loop = np.array([parse_one(value) for value in values])
+    loop_s = time.perf_counter() - start
+    print(f"{args.count:,} dates: parse_timestamps {bulk_s:.2f} s, per-value loop {loop_s:.2f} s "
+          f"({loop_s / bulk_s:.1f}x)")
+
+    ok = bool((bulk == loop).all())
+    reference = datetime(2024, 5, 1, 12, 0)
+    special = {
+        '04-26-2009, 03:49 PM': 1240760940,
+        'Yesterday, 09:12 PM': int(datetime(2024, 4, 30, 21, 12, tzinfo=timezone.utc).timestamp()),
+        '2000-02-29T12:00:00': 951825600,
+        '1900-02-29T00:00:00': None,
+        '20091340T10:00:00-06:00': None,
+        'not a date': None,
+        None: None,
+    }
+    parsed = parse_timestamps(list(special), reference)
+    for (value, expected), got in zip(special.items(), parsed):
+        got = None if got == MISSING else int(got)
+        if got != expected:
+            print(f"   {value!r}: expected {expected}, got {got}")
+            ok = False
+
+    print("\n✅ bulk and per-value parsing agree" if ok else "\n❌ MISMATCH")
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -1,13 +1,22 @@
 #!/usr/bin/env python3
 """
-Helper script to commit data periodically during long-running scrapes
+Helper script to commit scraped data after (or alongside) a scrape
+
+Stages only the files the storage layer recorded in the archive's change
+journal (see tools/archive/commits.py). The scrapers commit by themselves
+with --commit-every; this makes the final commit of whatever is left.
 """
-import os
+import argparse
 import subprocess
 import sys
-from datetime import datetime
 from pathlib import Path
 
+from utils import PROJECT_ROOT
+from tools.archive.commits import GitError, IncrementalCommitter
+from tools.archive.journal import ChangeJournal, JOURNAL_NAME
+
+DEFAULT_DATA_DIR = 'data/forums/net54baseball.com'
+
 def run_command(cmd):
     """Run a shell command and return success status"""
     try:
@@ -16,49 +25,43 @@ def run_command(cmd):
     except Exception as e:
         return False, "", str(e)
 
-def commit_data():
+def commit_data(data_dir=DEFAULT_DATA_DIR, message='Add scraped data', push=True, stage_all=False):
     """Commit any new scraped data"""
     # Configure git
     run_command("git config --global user.name 'GitHub Action'")
     run_command("git config --global user.email 'action@github.com'")
-    
-    # Add data files
-    success, _, _ = run_command("git add data/forums/net54baseball.com/")
-    if not success:
-        print("No data/forums/net54baseball.com directory to add")
-    
-    # Check if there are changes to commit
-    success, output, _ = run_command("git diff --staged --quiet")
-    if success:
-        print("No changes to commit")
+
+    data_dir = Path(PROJECT_ROOT) / data_dir
+    if not data_dir.exists():
+        print(f"No {data_dir} directory to commit")
         return True
-    
-    # Get stats for commit message (count thread files, excluding metadata.json)
-    all_files = list(Path("data/forums/net54baseball.com").rglob("*.json")) if Path("data/forums/net54baseball.com").exists() else []
-    thread_files = [f for f in all_files if f.name.startswith("thread_")]
-    thread_count = len(thread_files)
-    
-    # Commit with descriptive message
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-    commit_msg = f"Add scraped data: {thread_count} threads ({timestamp}) [skip ci]"
-    
-    success, output, error = run_command(f'git commit -m "{commit_msg}"')
-    if success:
-        print(f"Committed: {commit_msg}")
-        
-        # Push to remote
-        success, output, error = run_command("git push")
-        if success:
-            print("Successfully pushed to remote")
-            return True
-        else:
-            print(f"Failed to push: {error}")
-            return False
-    else:
-        print(f"Failed to commit: {error}")
+
+    if stage_all:
+        # Files written before the archive kept a journal
+        run_command(f"git add '{data_dir}'")
+
+    committer = IncrementalCommitter(ChangeJournal(data_dir / JOURNAL_NAME), data_dir,
+                                     push=push, message=message)
+    try:
+        commit_id = committer.commit()
+    except GitError as e:
+        print(f"Failed to commit: {e}")
         return False
 
+    if commit_id is None:
+        print("No changes to commit")
+    else:
+        print(f"Committed {commit_id[:8]}")
+    return True
+
 if __name__ == "__main__":
-    # This can be called periodically during scraping
-    success = commit_data()
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Commit the files a scrape wrote')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='Archive directory holding the journal')
+    parser.add_argument('--message', default='Add scraped data', help='Commit message prefix')
+    parser.add_argument('--no-push', action='store_true', help='Commit without pushing')
+    parser.add_argument('--all', action='store_true',
+                        help='Also stage everything under the archive directory (slow)')
+    args = parser.parse_args()
+
+    success = commit_data(args.data_dir, args.message, push=not args.no_push, stage_all=args.all)
+    sys.exit(0 if success else 1)
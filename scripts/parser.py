@@ -1,7 +1,7 @@
 from bs4 import BeautifulSoup
 import re
 from datetime import datetime
-from utils import setup_logging
+from utils import setup_logging, sampled
 
 logger = setup_logging('parser')
 
@@ -127,7 +127,7 @@ class Net54Parser:
                 if not next_page.startswith('http'):
                     next_page = f"{self.base_url}/{next_page}"
         
-        logger.info(f"Parsed {len(threads)} threads from forum {forum_id}")
+        logger.info(f"Parsed {len(threads)} threads from forum {forum_id}", extra=sampled('parse_forum_page'))
         return threads, next_page
     
     def parse_thread_page(self, html, thread_id):
@@ -191,5 +191,5 @@ class Net54Parser:
                 if not next_page.startswith('http'):
                     next_page = f"{self.base_url}/{next_page}"
         
-        logger.info(f"Parsed {len(posts)} posts from thread {thread_id}")
+        logger.info(f"Parsed {len(posts)} posts from thread {thread_id}", extra=sampled('parse_thread_page'))
         return posts, next_page
\ No newline at end of file
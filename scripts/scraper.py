@@ -1,27 +1,63 @@
 #!/usr/bin/env python3
 import os
 import sys
-import requests
+import threading
+import time
+from urllib.parse import urlparse
 from tqdm import tqdm
-from utils import setup_logging, rate_limit, fetch_page
+from utils import setup_logging, fetch_page, get_client, sampled
 from storage import DataStorage
 from parser import Net54Parser
+from tools.archive.commits import GitError, IncrementalCommitter
+from tools.archive.stats import rebuild_stats
+from tools.scrapers.base.frontier import Frontier
+from tools.scrapers.base.politeness import HostBudget, budget_path
+from tools.scrapers.base.deadline import RunDeadline, install_sigterm_handler
 
 logger = setup_logging('scraper')
 
+# vBulletin's default posts per thread page, used to estimate fetch cost
+THREAD_PAGE_SIZE = 15
+
 class Net54Scraper:
     def __init__(self):
         self.base_url = os.getenv('BASE_URL', 'https://www.net54baseball.com')
-        self.session = requests.Session()
+        # Rate limiting, shared by every process and scraper hitting the host
+        self.delay = float(os.getenv('DELAY_SECONDS', 1.5))
+        self.budget = HostBudget(budget_path(), urlparse(self.base_url).netloc, self.delay)
+        # Pooled client; pace() runs before every attempt, retries included
+        self.client = get_client(pace=self.pace)
         self.parser = Net54Parser()
         self.storage = DataStorage()
+        self.frontier = Frontier(self.storage.base_dir / 'frontier.db')
+        # Polled between pages and threads; an orchestrator sets (or replaces) it to stop a run early
+        self.stop_event = threading.Event()
+        self.should_stop = self.stop_event.is_set
+        
+        # Run time budget (unbounded unless a deadline is configured)
+        self.checkpoint_file = self.storage.base_dir / 'checkpoint.json'
+        self.deadline = RunDeadline(seconds_per_unit=self.delay)
+        self.deadline_reached = False
+        self.interrupted = False
+        
+        # In-process git commits of the journaled files (off unless enabled)
+        self.committer = None
+        
+    def pace(self):
+        """Wait for the next request slot of the host's shared budget.
         
+        A stop request ends the wait as an interrupt, which the scrape loops
+        already handle by releasing the thread and checkpointing.
+        """
+        if self.budget.wait(self.delay, stop=self.stop_event):
+            raise KeyboardInterrupt('stop requested')
+    
     def scrape_forums(self):
         """Scrape the main forum list."""
         logger.info("Starting forum list scrape...")
         
         try:
-            response = fetch_page(self.base_url, self.session)
+            response = fetch_page(self.base_url, self.client)
             forums = self.parser.parse_forum_list(response.text)
             
             for forum in forums:
@@ -35,7 +71,12 @@ class Net54Scraper:
             raise
     
     def scrape_forum_threads(self, forum_id, limit=None):
-        """Scrape all threads from a specific forum."""
+        """List a forum's threads and queue the unseen ones in the frontier.
+        
+        The URL of the next listing page is checkpointed after every page, so
+        an interrupted listing resumes instead of re-paging from the start.
+        Returns the newly queued threads.
+        """
         # Don't skip forums - continue where we left off
         # if self.storage.is_forum_scraped(forum_id):
         #     logger.info(f"Forum {forum_id} already scraped, skipping...")
@@ -43,53 +84,159 @@ class Net54Scraper:
         
         logger.info(f"Scraping threads from forum {forum_id}...")
         all_threads = []
-        page_url = f"{self.base_url}/forumdisplay.php?f={forum_id}"
+        first_page = f"{self.base_url}/forumdisplay.php?f={forum_id}"
+        cursor_name = f'html_listing:{forum_id}'
+        page_url = self.frontier.get_cursor(cursor_name) or first_page
+        if page_url != first_page:
+            logger.info(f"Resuming listing of forum {forum_id} at {page_url}")
         page_count = 0
         
-        while page_url:
+        while page_url and not self.should_stop() and not self.deadline.expired():
             page_count += 1
-            logger.info(f"Scraping forum {forum_id} page {page_count}")
+            logger.info(f"Scraping forum {forum_id} page {page_count}", extra=sampled('forum_page'))
             
-            rate_limit()
-            response = fetch_page(page_url, self.session)
+            response = fetch_page(page_url, self.client)
             threads, next_page = self.parser.parse_forum_page(response.text, forum_id)
             
-            # Save threads (skip already scraped ones)
+            # Queue threads (skip already scraped or queued ones)
             new_threads = []
             for thread in threads:
-                if not self.storage.is_thread_scraped(forum_id, thread['id']):
-                    self.storage.save_thread(thread)
+                if self.storage.is_thread_scraped(forum_id, thread['id']):
+                    logger.debug(f"Thread {thread['id']} already scraped, skipping...")
+                    continue
+                key = Frontier.make_key('thread', forum_id, thread['id'])
+                if self.frontier.add('thread', key, thread, priority=thread.get('reply_count', 0),
+                                     group=str(forum_id), cost=self.thread_cost(thread)):
                     new_threads.append(thread)
                     all_threads.append(thread)  # Only add NEW threads to all_threads
-                else:
-                    logger.debug(f"Thread {thread['id']} already scraped, skipping...")
             
             # If this page had no threads at all, we're done
             if not threads:
                 logger.info(f"No threads found on page {page_count}, reached end of forum")
-                break
+                next_page = None
                 
             # If we found some new threads on this page, continue
             if new_threads:
-                logger.info(f"Found {len(new_threads)} new threads on page {page_count}")
+                logger.info(f"Found {len(new_threads)} new threads on page {page_count}", extra=sampled('forum_page_new'))
             
             page_url = next_page
+            self.frontier.set_cursor(cursor_name, page_url)
             
             # Check limit (only count NEW threads)
             if limit and len(all_threads) >= limit:
                 logger.info(f"Reached thread limit of {limit}")
                 break
         
-        logger.info(f"Scraped {len(all_threads)} threads from forum {forum_id}")
+        logger.info(f"Queued {len(all_threads)} threads from forum {forum_id}")
         return all_threads
     
-    def scrape_thread_posts(self, thread_id, forum_id):
-        """Scrape all posts from a specific thread."""
-        if self.storage.is_thread_scraped(forum_id, thread_id):
+    def process_frontier(self, forum_id, limit=None):
+        """Fetch posts for a forum's queued threads, highest priority first.
+        
+        Failed threads go back to the frontier with a backoff instead of
+        being lost, and are retried on a later pass or run.
+        """
+        pending = self.frontier.pending_count('thread', forum_id)
+        total = min(pending, limit) if limit else pending
+        processed = 0
+        
+        with tqdm(total=total, desc="Scraping posts from threads") as progress:
+            while (not limit or processed < limit) and not self.should_stop():
+                # Under a deadline, take the cheapest threads once the
+                # remaining work no longer fits, to finish as many as possible
+                order = 'priority'
+                if self.deadline.bounded:
+                    order = self.deadline.order(self.frontier.pending_cost('thread', forum_id))
+                item = self.frontier.pop('thread', forum_id, order=order)
+                if item is None:
+                    break
+                if not self.deadline.can_start(item.cost):
+                    self.frontier.release(item.key)
+                    self.deadline_reached = True
+                    logger.info(f"Stopping before the deadline, {self.deadline.remaining():.0f}s of fetch time left")
+                    break
+                processed += 1
+                started = time.time()
+                thread = item.payload
+                try:
+                    self.storage.save_thread(dict(thread))
+                    self.scrape_thread_posts(thread['id'], forum_id, force=True)
+                    self.frontier.done(item.key)
+                    self.deadline.record(item.cost, time.time() - started)
+                except KeyboardInterrupt:
+                    self.frontier.release(item.key)
+                    raise
+                except Exception as e:
+                    state = self.frontier.fail(item.key, repr(e))
+                    logger.error(f"Error scraping thread {thread['id']}: {e} (retry state: {state})")
+                progress.update(1)
+                
+                # Thread boundary: the archive is consistent, commit if one is due
+                self.commit_data()
+        
+        return processed
+    
+    @staticmethod
+    def thread_cost(thread):
+        """Pages to fetch for a thread, from its reply count"""
+        try:
+            replies = int(thread.get('reply_count') or 0)
+        except (TypeError, ValueError):
+            replies = 0
+        return replies // THREAD_PAGE_SIZE + 1
+    
+    def write_checkpoint(self, reason):
+        """Record how this run ended; the frontier holds the work to resume"""
+        if reason == 'complete' and self.interrupted:
+            reason = 'interrupted'
+        elif reason == 'complete' and self.deadline_reached:
+            reason = 'deadline'
+        self.deadline.write_checkpoint(
+            self.checkpoint_file,
+            reason,
+            frontier=self.frontier.counts(),
+            pending_cost=self.frontier.pending_cost('thread'),
+            http=self.client.metrics.snapshot()
+        )
+    
+    def enable_commits(self, minutes, push=False):
+        """Commit the files this run writes every `minutes`, from inside the run."""
+        self.committer = IncrementalCommitter(self.storage.journal, self.storage.base_dir,
+                                              interval=minutes * 60, push=push)
+    
+    def prepare_commit(self):
+        """Bring the frontier and progress files to a committable state."""
+        self.frontier.checkpoint()
+        self.storage.journal.record_many([self.frontier.path, self.checkpoint_file])
+        self.storage.save_progress()
+    
+    def commit_data(self, force=False):
+        """Commit journaled changes if commits are enabled and one is due (or forced)."""
+        if self.committer is None:
+            return
+        try:
+            if force:
+                commit_id = self.committer.commit(self.prepare_commit)
+            else:
+                commit_id = self.committer.maybe_commit(self.prepare_commit)
+        except GitError as e:
+            # The journal keeps the paths, so the next commit picks them up
+            logger.error(f"Commit failed: {e}")
+            return
+        if commit_id:
+            logger.info(f"Committed scraped data ({commit_id[:8]})")
+    
+    def scrape_thread_posts(self, thread_id, forum_id, force=False):
+        """Scrape all posts from a specific thread.
+        
+        Threads already in progress are skipped unless force is set, which is
+        how freshly listed and repair-listed threads get their posts.
+        """
+        if not force and self.storage.is_thread_scraped(forum_id, thread_id):
             logger.info(f"Thread {thread_id} already scraped, skipping...")
             return
         
-        logger.info(f"Scraping posts from thread {thread_id}...")
+        logger.info(f"Scraping posts from thread {thread_id}...", extra=sampled('thread_posts'))
         all_posts = []
         page_url = f"{self.base_url}/showthread.php?t={thread_id}"
         page_count = 0
@@ -98,8 +245,7 @@ class Net54Scraper:
             page_count += 1
             logger.debug(f"Scraping thread {thread_id} page {page_count}")
             
-            rate_limit()
-            response = fetch_page(page_url, self.session)
+            response = fetch_page(page_url, self.client)
             posts, next_page = self.parser.parse_thread_page(response.text, thread_id)
             
             all_posts.extend(posts)
@@ -108,7 +254,7 @@ class Net54Scraper:
         # Save all posts for this thread
         self.storage.save_posts(thread_id, all_posts, forum_id)
         
-        logger.info(f"Scraped {len(all_posts)} posts from thread {thread_id}")
+        logger.info(f"Scraped {len(all_posts)} posts from thread {thread_id}", extra=sampled('thread_posts_done'))
         return all_posts
     
     def scrape_entire_forum(self, forum_id=None, thread_limit=None):
@@ -126,28 +272,31 @@ class Net54Scraper:
             
             # Process each forum
             for forum in forums:
+                if self.should_stop() or self.deadline_reached or self.deadline.expired():
+                    logger.info("Stop requested, leaving the remaining forums for the next run")
+                    break
                 logger.info(f"\n{'='*60}")
                 logger.info(f"Processing forum: {forum['name']} (ID: {forum['id']})")
                 logger.info(f"Expected threads: {forum['thread_count']}")
                 logger.info(f"{'='*60}\n")
                 
-                # Get NEW threads only
-                threads = self.scrape_forum_threads(forum['id'], limit=thread_limit)
+                # Queue NEW threads, unless enough are already pending from a previous run
+                pending = self.frontier.pending_count('thread', forum['id'])
+                if not thread_limit or pending < thread_limit:
+                    self.scrape_forum_threads(
+                        forum['id'],
+                        limit=thread_limit - pending if thread_limit else None
+                    )
                 
-                if threads:
-                    # Process each NEW thread for posts
-                    for i, thread in enumerate(tqdm(threads, desc="Scraping posts from threads")):
-                        try:
-                            self.scrape_thread_posts(thread['id'], forum['id'])
-                        except Exception as e:
-                            logger.error(f"Error scraping thread {thread['id']}: {e}")
-                            continue
+                # Fetch posts for queued threads
+                self.process_frontier(forum['id'], limit=thread_limit)
                 
                 # Show progress
                 stats = self.storage.get_stats()
                 logger.info(f"\nProgress: {stats['threads_scraped']} threads scraped")
         
         except KeyboardInterrupt:
+            self.interrupted = True
             logger.info("\nScraping interrupted by user")
             stats = self.storage.get_stats()
             logger.info(f"Final stats: {stats}")
@@ -156,6 +305,29 @@ class Net54Scraper:
             logger.error(f"Fatal error during scraping: {e}")
             raise
 
+    def repair_threads(self, forum_id=None):
+        """Refetch exactly the threads listed in the archive's repair list."""
+        repair_list = self.storage.get_repair_list()
+        entries = repair_list.threads(forum_id)
+        logger.info(f"Repairing {len(entries)} threads")
+        
+        for entry in entries:
+            thread_id, entry_forum = entry['thread_id'], entry['forum_id']
+            try:
+                if entry['reason'] == 'unparseable':
+                    self.storage.save_thread({
+                        'id': thread_id,
+                        'forum_id': entry_forum,
+                        'title': entry.get('title') or f'Thread {thread_id}'
+                    })
+                posts = self.scrape_thread_posts(thread_id, entry_forum, force=True)
+                if posts:
+                    repair_list.mark_done(entry_forum, thread_id)
+            except Exception as e:
+                logger.error(f"Error repairing thread {thread_id}: {e}")
+        
+        logger.info(f"Repair complete, {len(repair_list)} threads still pending")
+
 def main():
     """Main entry point."""
     import argparse
@@ -164,23 +336,58 @@ def main():
     parser.add_argument('--forum', type=int, help='Specific forum ID to scrape')
     parser.add_argument('--thread-limit', type=int, help='Limit number of threads per forum')
     parser.add_argument('--stats', action='store_true', help='Show scraping statistics')
+    parser.add_argument('--repair', action='store_true',
+                        help='Only refetch threads on the repair list (see collectibles.py reconcile)')
+    parser.add_argument('--deep', action='store_true',
+                        help='With --stats: rebuild statistics by scanning every thread file')
+    parser.add_argument('--deadline-minutes', type=float,
+                        help='Stop cleanly and checkpoint before this many minutes '
+                             '(default: $RUN_DEADLINE epoch seconds, if set)')
+    parser.add_argument('--commit-every', type=float, metavar='MINUTES',
+                        help='Git-commit the scraped files every this many minutes, and at the end')
+    parser.add_argument('--push', action='store_true', help='Push after every commit')
     
     args = parser.parse_args()
     
     scraper = Net54Scraper()
     
     if args.stats:
+        if args.deep:
+            scraper.storage.stats = rebuild_stats(scraper.storage.base_dir)
         stats = scraper.storage.get_stats()
         print(f"\nScraping Statistics:")
         print(f"Forums scraped: {stats['forums_scraped']}")
         print(f"Threads scraped: {stats['threads_scraped']}")
+        print(f"Posts archived: {stats['posts_archived']}")
+        print(f"Archive size: {stats['size_mb']} MB")
+        print(f"Distinct authors: {stats['distinct_authors']}")
+        print(f"Post dates: {stats['first_post']} to {stats['last_post']}")
         print(f"Last update: {stats['last_update']}")
         sys.exit(0)  # Exit successfully after showing stats
+    elif args.repair:
+        scraper.repair_threads(forum_id=args.forum)
     else:
-        scraper.scrape_entire_forum(
-            forum_id=args.forum,
-            thread_limit=args.thread_limit
+        install_sigterm_handler()
+        scraper.deadline = RunDeadline.from_options(
+            args.deadline_minutes,
+            checkpoint_path=scraper.checkpoint_file,
+            seconds_per_unit=scraper.deadline.seconds_per_unit
         )
+        if args.commit_every:
+            scraper.enable_commits(args.commit_every, push=args.push)
+        reason = 'error'
+        try:
+            scraper.scrape_entire_forum(
+                forum_id=args.forum,
+                thread_limit=args.thread_limit
+            )
+            reason = 'complete'
+        finally:
+            scraper.write_checkpoint(reason)
+            logger.info(f"HTTP: {scraper.client.metrics.summary()}")
+            scraper.commit_data(force=True)
+            scraper.frontier.close()
+            scraper.budget.close()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
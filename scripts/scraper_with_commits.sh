@@ -1,37 +1,26 @@
 #!/bin/bash
-# Wrapper script to run scraper with periodic commits
+# Wrapper script to run the Tapatalk scraper with periodic commits
+#
+# The scraper commits the files it wrote every COMMIT_MINUTES by itself, at
+# topic boundaries (--commit-every). This wrapper records the exit code and
+# commits whatever is left when the scraper ends or is killed.
 
-# Start time tracking
-START_TIME=$(date +%s)
-COMMIT_INTERVAL=3600  # Commit every hour (3600 seconds)
-LAST_COMMIT_TIME=$START_TIME
-
-# Function to check if it's time to commit
-should_commit() {
-    CURRENT_TIME=$(date +%s)
-    ELAPSED=$((CURRENT_TIME - LAST_COMMIT_TIME))
-    if [ $ELAPSED -ge $COMMIT_INTERVAL ]; then
-        return 0  # True, should commit
-    else
-        return 1  # False, not time yet
-    fi
-}
+COMMIT_MINUTES=${COMMIT_MINUTES:-60}
 
 # Function to commit data
 commit_data() {
     echo "=== Committing data at $(date) ==="
     python scripts/commit_helper.py
     if [ $? -eq 0 ]; then
-        LAST_COMMIT_TIME=$(date +%s)
         echo "=== Commit successful ==="
     else
-        echo "=== Commit failed, continuing scrape ==="
+        echo "=== Commit failed ==="
     fi
 }
 
 # Trap to ensure we commit on exit
 cleanup() {
-    echo "=== Scraper interrupted, committing final data ==="
+    echo "=== Scraper finished or interrupted, committing final data ==="
     # Save timeout exit code if scraper is still running
     if kill -0 $SCRAPER_PID 2>/dev/null; then
         echo "124" > scraper_exit_code.txt  # 124 = timeout exit code
@@ -46,17 +35,9 @@ echo "1" > scraper_exit_code.txt
 
 # Start the scraper in background
 echo "=== Starting scraper at $(date) ==="
-python scripts/tapatalk_scraper.py "$@" &
+python scripts/tapatalk_scraper.py --commit-every $COMMIT_MINUTES --push "$@" &
 SCRAPER_PID=$!
 
-# Monitor scraper and commit periodically
-while kill -0 $SCRAPER_PID 2>/dev/null; do
-    if should_commit; then
-        commit_data
-    fi
-    sleep 60  # Check every minute
-done
-
 # Wait for scraper to finish
 wait $SCRAPER_PID
 SCRAPER_EXIT_CODE=$?
@@ -67,4 +48,4 @@ echo "=== Scraper finished with exit code $SCRAPER_EXIT_CODE ==="
 echo $SCRAPER_EXIT_CODE > scraper_exit_code.txt
 
 # Always exit 0 to allow commits, but preserve actual exit code in file
-exit 0
\ No newline at end of file
+exit 0
@@ -2,7 +2,12 @@ import json
 import os
 from datetime import datetime
 from pathlib import Path
-from utils import setup_logging, get_safe_filename
+from utils import setup_logging, get_safe_filename, sampled
+from tools.archive.stats import ArchiveStats
+from tools.archive.reconcile import RepairList
+from tools.archive.partitions import ProgressPartitions, atomic_write_json, locked, read_json
+from tools.archive.journal import ChangeJournal, JOURNAL_NAME
+from tools.archive.indexers import ArchiveIndexes
 
 logger = setup_logging('storage')
 
@@ -13,27 +18,57 @@ class DataStorage:
         # Create base directory
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
-        # Progress tracking at site level
+        # Progress tracking, one partition file per forum so that several
+        # scraper processes can write to the archive at once
         self.progress_file = self.base_dir / 'progress.json'
-        self.progress = self.load_progress()
+        self.partitions = ProgressPartitions(self.base_dir / 'progress')
+        self.load_progress()
+        
+        # Materialized per-forum aggregates, updated on every save
+        self.stats = ArchiveStats(self.base_dir / 'stats.json')
+        
+        # Files written since the last commit (see tools/archive/commits.py)
+        self.journal = ChangeJournal(self.base_dir / JOURNAL_NAME)
+        
+        # Search and other indexes, kept current once `collectibles.py index` created them
+        self.indexes = ArchiveIndexes(self.base_dir)
     
     def load_progress(self):
-        """Load scraping progress from file."""
-        if self.progress_file.exists():
-            with open(self.progress_file, 'r') as f:
-                return json.load(f)
+        """Load scraping progress, migrating a single progress.json if needed."""
+        if not self.partitions.exists() and self.progress_file.exists():
+            with locked(self.progress_file):
+                if not self.partitions.exists():
+                    self.migrate_progress_file()
+        self.partitions.load()
+        return self.progress
+    
+    def migrate_progress_file(self):
+        """Split a legacy progress.json into per-forum partitions."""
+        legacy = read_json(self.progress_file, {})
+        forums = legacy.get('forums', {})
+        threads = legacy.get('threads', {})
+        for forum_id in set(forums) | set(threads):
+            self.partitions.replace(forum_id, forums.get(forum_id, {}), threads.get(forum_id, {}))
+        os.replace(self.progress_file, self.progress_file.with_name('progress.json.migrated'))
+        logger.info(f"Migrated progress.json into {len(forums)} forum partitions")
+    
+    @property
+    def progress(self):
+        """Merged view of all partitions, in the old progress.json layout."""
+        partitions = self.partitions.partitions
         return {
-            'forums': {},
-            'threads': {},
-            'last_update': None
+            'forums': {fid: p['meta'] for fid, p in partitions.items() if p['meta']},
+            'threads': {fid: p['entries'] for fid, p in partitions.items()},
+            'last_update': self.partitions.last_update()
         }
     
     def save_progress(self):
-        """Save current progress to file."""
-        self.progress['last_update'] = datetime.now().isoformat()
-        with open(self.progress_file, 'w') as f:
-            json.dump(self.progress, f, indent=2)
-        logger.debug(f"Progress saved at {self.progress['last_update']}")
+        """Merge this process's progress and stats changes into the files."""
+        self.journal.record_many(self.partitions.flush())
+        if self.stats.save():
+            self.journal.record(self.stats.path)
+        self.journal.flush()
+        logger.debug(f"Progress saved at {self.partitions.last_update()}")
     
     def save_forum(self, forum_data):
         """Save forum metadata."""
@@ -43,15 +78,16 @@ class DataStorage:
         forum_dir.mkdir(parents=True, exist_ok=True)
         filename = forum_dir / 'metadata.json'
         
-        with open(filename, 'w') as f:
-            json.dump(forum_data, f, indent=2)
+        atomic_write_json(filename, forum_data, indent=2)
+        self.journal.record(filename)
         
         # Update progress
-        self.progress['forums'][forum_id] = {
-            'name': forum_data['name'],
-            'scraped_at': datetime.now().isoformat(),
-            'thread_count': forum_data.get('thread_count', 0)
-        }
+        self.partitions.set_meta(
+            forum_id,
+            name=forum_data['name'],
+            scraped_at=datetime.now().isoformat(),
+            thread_count=forum_data.get('thread_count', 0)
+        )
         self.save_progress()
         
         logger.info(f"Saved forum: {forum_data['name']} (ID: {forum_id})")
@@ -66,25 +102,41 @@ class DataStorage:
         forum_dir.mkdir(parents=True, exist_ok=True)
         
         filename = forum_dir / f'thread_{thread_id}.json'
+        existed = filename.exists()
+        old_size, old_post_count = 0, 0
+        if existed:
+            # Re-saving replaces the posts too, so take them out of the stats
+            old_size = filename.stat().st_size
+            try:
+                with open(filename, 'r') as f:
+                    old_post_count = len(json.load(f).get('posts') or [])
+            except ValueError:
+                pass  # Unreadable file being replaced by a repair
         
         # Initialize with thread metadata and empty posts array
         thread_data['posts'] = []
         
-        with open(filename, 'w') as f:
-            json.dump(thread_data, f, indent=2)
+        atomic_write_json(filename, thread_data, indent=2)
+        self.journal.record(filename)
         
-        # Update progress
-        if forum_id not in self.progress['threads']:
-            self.progress['threads'][forum_id] = {}
+        self.stats.record(
+            forum_id,
+            new_item=not existed,
+            bytes_delta=filename.stat().st_size - old_size,
+            posts_delta=-old_post_count
+        )
         
-        self.progress['threads'][forum_id][thread_id] = {
-            'title': thread_data['title'],
-            'scraped_at': datetime.now().isoformat(),
-            'post_count': thread_data.get('post_count', 0)
-        }
+        # Update progress
+        self.partitions.set_entry(
+            forum_id, thread_id,
+            title=thread_data['title'],
+            scraped_at=datetime.now().isoformat(),
+            post_count=thread_data.get('post_count', 0)
+        )
         self.save_progress()
+        self.indexes.update(forum_id, thread_id, thread_data, filename)
         
-        logger.info(f"Saved thread: {thread_data['title'][:50]}... (ID: {thread_id})")
+        logger.info(f"Saved thread: {thread_data['title'][:50]}... (ID: {thread_id})", extra=sampled('save_thread'))
     
     def save_posts(self, thread_id, posts, forum_id):
         """Add posts to existing thread file."""
@@ -96,37 +148,60 @@ class DataStorage:
         filename = forum_dir / f'thread_{thread_id}.json'
         
         if filename.exists():
+            old_size = filename.stat().st_size
             with open(filename, 'r') as f:
                 thread_data = json.load(f)
+            old_post_count = len(thread_data.get('posts') or [])
             
             # Add posts to thread data
             thread_data['posts'] = posts
             
-            with open(filename, 'w') as f:
-                json.dump(thread_data, f, indent=2)
+            atomic_write_json(filename, thread_data, indent=2)
+            self.journal.record(filename)
             
-            logger.info(f"Added {len(posts)} posts to thread {thread_id}")
+            self.stats.record(
+                forum_id,
+                bytes_delta=filename.stat().st_size - old_size,
+                posts_delta=len(posts) - old_post_count,
+                posts=posts
+            )
+            if thread_id in self.partitions.get(forum_id)['entries']:
+                self.partitions.set_entry(forum_id, thread_id, post_count=len(posts))
+            self.save_progress()
+            self.indexes.update(forum_id, thread_id, thread_data, filename)
+            
+            logger.info(f"Added {len(posts)} posts to thread {thread_id}", extra=sampled('save_posts'))
         else:
             logger.error(f"Thread file not found for {thread_id} - save thread first!")
     
+    def get_repair_list(self):
+        """Threads flagged for refetching by `collectibles.py reconcile`."""
+        return RepairList(self.base_dir / 'repair.json')
+    
     def is_forum_scraped(self, forum_id):
         """Check if forum has already been scraped."""
-        return str(forum_id) in self.progress['forums']
+        partition = self.partitions.partitions.get(str(forum_id))
+        return bool(partition and partition['meta'])
     
     def is_thread_scraped(self, forum_id, thread_id):
-        """Check if thread has already been scraped."""
-        forum_id = str(forum_id)
-        thread_id = str(thread_id)
-        return (forum_id in self.progress['threads'] and 
-                thread_id in self.progress['threads'][forum_id])
+        """Check if thread has already been scraped (by any writer, as of the last flush)."""
+        partition = self.partitions.partitions.get(str(forum_id))
+        return bool(partition) and str(thread_id) in partition['entries']
     
     def get_stats(self):
         """Get scraping statistics."""
         total_forums = len(self.progress['forums'])
         total_threads = sum(len(threads) for threads in self.progress['threads'].values())
         
+        summary = self.stats.summary()
+        
         return {
             'forums_scraped': total_forums,
             'threads_scraped': total_threads,
-            'last_update': self.progress['last_update']
+            'last_update': self.progress['last_update'],
+            'posts_archived': summary['total_posts'],
+            'size_mb': summary['total_size_mb'],
+            'distinct_authors': summary['distinct_authors'],
+            'first_post': summary['first_post'],
+            'last_post': summary['last_post']
         }
\ No newline at end of file
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Schema-driven decoding of Tapatalk XML-RPC responses
+
+Tapatalk sends user-visible text (titles, author names, post bodies, error
+messages) as XML-RPC <base64> values. The xmlrpc unmarshaller has already
+base64-decoded those into xmlrpc.client.Binary (or bytes), so each one only
+needs a single UTF-8 decode. The schemas below list which fields of which
+method carry such text; every other field is left alone and nothing is
+decoded twice.
+"""
+import binascii
+import xmlrpc.client
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional
+
+@dataclass(frozen=True)
+class MethodSchema:
+    """Base64 text fields of one Tapatalk method's response"""
+    fields: FrozenSet[str] = frozenset()
+    items: Optional[str] = None
+    item_fields: FrozenSet[str] = frozenset()
+    children: Optional[str] = None
+
+RESULT_FIELDS = frozenset({'result_text'})
+
+TOPIC_FIELDS = frozenset({
+    'topic_title', 'topic_author_name', 'last_reply_author_name',
+    'short_content', 'forum_name', 'prefix'
+})
+
+POST_FIELDS = frozenset({'post_title', 'post_author_name', 'post_content'})
+
+FORUM_FIELDS = frozenset({'forum_name', 'description'})
+
+SCHEMAS = {
+    'get_topic': MethodSchema(RESULT_FIELDS | {'forum_name'}, 'topics', TOPIC_FIELDS),
+    'get_thread': MethodSchema(RESULT_FIELDS | {'forum_name', 'topic_title'}, 'posts', POST_FIELDS),
+    # get_forum returns a list of forums, each with its sub-forums under 'child'
+    'get_forum': MethodSchema(RESULT_FIELDS, None, FORUM_FIELDS, children='child'),
+}
+
+def decode_text(value):
+    """Decode one base64 text field to str, exactly once"""
+    if isinstance(value, xmlrpc.client.Binary):
+        return value.data.decode('utf-8', errors='ignore')
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='ignore')
+    if isinstance(value, str):
+        # Some servers send base64 fields as <string>; only well-formed
+        # base64 of valid UTF-8 is taken as encoded, anything else is text
+        if value and len(value) % 4 == 0 and value.isascii():
+            try:
+                return binascii.a2b_base64(value, strict_mode=True).decode('utf-8')
+            except (binascii.Error, UnicodeDecodeError):
+                pass
+        return value
+    return '' if value is None else value
+
+def _decode_fields(record: Dict[str, Any], fields: FrozenSet[str]):
+    for name in fields:
+        value = record.get(name)
+        if value is None:
+            continue
+        if value.__class__ is xmlrpc.client.Binary:
+            # The common case, inlined
+            record[name] = value.data.decode('utf-8', errors='ignore')
+        else:
+            record[name] = decode_text(value)
+
+def _decode_items(items, schema: MethodSchema):
+    for item in items:
+        if isinstance(item, dict):
+            _decode_fields(item, schema.item_fields)
+            if schema.children and isinstance(item.get(schema.children), list):
+                _decode_items(item[schema.children], schema)
+
+def decode_response(method, response):
+    """Decode the base64 text fields of a response in place
+
+    Args:
+        method: Tapatalk method name, e.g. 'get_thread'
+        response: Unmarshalled response (a struct, or a list of records)
+
+    Returns:
+        The same response, with its text fields as str
+    """
+    schema = SCHEMAS.get(method)
+    if schema is None:
+        return response
+    if isinstance(response, list):
+        _decode_items(response, schema)
+    elif isinstance(response, dict):
+        _decode_fields(response, schema.fields)
+        if schema.items and isinstance(response.get(schema.items), list):
+            _decode_items(response[schema.items], schema)
+    return response
+
+def decode_record(method, record):
+    """Decode the text fields of one record of a method's item array in place"""
+    schema = SCHEMAS.get(method)
+    if schema is not None and isinstance(record, dict):
+        _decode_items((record,), schema)
+    return record
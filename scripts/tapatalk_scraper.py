@@ -6,47 +6,51 @@ Uses XML-RPC protocol to fetch forum data
 import os
 import sys
 import time
-import base64
 import xmlrpc.client
-import requests
+import socket
+import multiprocessing
 from datetime import datetime
+from urllib.parse import urlparse
 from pathlib import Path
 import xml.etree.ElementTree as ET
-from utils import setup_logging, rate_limit, get_safe_filename
+from utils import setup_logging, rate_limit, get_client, get_safe_filename, sampled
 from storage import DataStorage
+from tapatalk_decode import decode_response
+from tapatalk_stream import CHUNK_SIZE, ResponseStream
+from tools.archive.commits import GitError, IncrementalCommitter
+from tools.archive.reconcile import DEFAULT_POST_LIMIT
+from tools.logging_setup import shutdown_logging
+from tools.scrapers.base.frontier import Frontier
+from tools.scrapers.base.leases import LeaseTable, Heartbeat
+from tools.scrapers.base.politeness import HostBudget, budget_path
+from tools.scrapers.base.deadline import DEADLINE_ENV, RunDeadline, install_sigterm_handler
 
 logger = setup_logging('tapatalk_scraper')
 
 class TapatalkTransport(xmlrpc.client.Transport):
     """Custom transport to handle Tapatalk responses"""
-    def __init__(self, use_datetime=False, use_builtin_types=False):
+    def __init__(self, use_datetime=False, use_builtin_types=False, pace=None):
         super().__init__(use_datetime, use_builtin_types)
         self._use_builtin_types = use_builtin_types
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Shared client layer; `pace` runs before every attempt, retries included
+        self.client = get_client(headers={
             'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15',
             'Accept': 'text/xml',
             'Content-Type': 'text/xml'
-        })
+        }, pace=pace)
     
     def request(self, host, handler, request_body, verbose=False):
         """Make request using requests library to handle redirects"""
         url = f"https://{host}{handler}"
         
         try:
-            response = self.session.post(
-                url, 
-                data=request_body,
-                allow_redirects=True,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            # Parse the XML response
-            p, u = self.getparser()
-            p.feed(response.text)
-            p.close()
-            return u.close()
+            with self.client.post(url, data=request_body, stream=True) as response:
+                # Parse the XML response as it arrives
+                p, u = self.getparser()
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    p.feed(chunk)
+                p.close()
+                return u.close()
             
         except Exception as e:
             raise xmlrpc.client.ProtocolError(
@@ -56,44 +60,45 @@ class TapatalkTransport(xmlrpc.client.Transport):
                 {}
             )
 
+    def stream(self, url, response_stream, params):
+        """Call `response_stream.method` and yield its records while the body arrives
+        
+        The response header (result, result_text, ...) is in
+        `response_stream.header` once the records are exhausted.
+        """
+        request_body = xmlrpc.client.dumps(tuple(params), response_stream.method).encode('utf-8', 'xmlcharrefreplace')
+        with self.client.post(url, data=request_body, stream=True) as response:
+            yield from response_stream.parse(response.iter_content(CHUNK_SIZE))
+
 class TapatalkScraper:
     def __init__(self):
         self.base_url = os.getenv('BASE_URL', 'https://www.net54baseball.com')
         self.api_url = f"{self.base_url}/mobiquo/mobiquo.php"
         self.storage = DataStorage()
         
-        # Setup XML-RPC client
-        transport = TapatalkTransport()
-        self.proxy = xmlrpc.client.ServerProxy(self.api_url, transport=transport)
+        # Persistent work queue of topics still to fetch (see tools/scrapers/base/frontier.py)
+        self.coordination_db = self.storage.base_dir / 'frontier.db'
+        self.frontier = Frontier(self.coordination_db)
         
-        # Rate limiting
+        # Rate limiting, shared by every process and scraper hitting the host
         self.delay = float(os.getenv('DELAY_SECONDS', 5.0))  # Conservative 5 seconds
+        self.budget = HostBudget(budget_path(), urlparse(self.base_url).netloc, self.delay)
         
-    def decode_base64_field(self, value):
-        """Decode base64 encoded fields from Tapatalk"""
-        if isinstance(value, xmlrpc.client.Binary):
-            # Handle XML-RPC Binary objects
-            return value.data.decode('utf-8', errors='ignore')
-        elif isinstance(value, bytes):
-            # Try base64 decode first, then regular decode
-            try:
-                decoded = base64.b64decode(value).decode('utf-8', errors='ignore')
-                # Simple check if decode worked (should have readable text)
-                if decoded and not all(ord(c) < 32 or ord(c) > 126 for c in decoded[:10]):
-                    return decoded
-            except:
-                pass
-            # Fall back to regular decode
-            return value.decode('utf-8', errors='ignore')
-        elif isinstance(value, str) and value:
-            # Try base64 decode for strings too
-            try:
-                decoded = base64.b64decode(value).decode('utf-8', errors='ignore')
-                if decoded and not all(ord(c) < 32 or ord(c) > 126 for c in decoded[:10]):
-                    return decoded
-            except:
-                pass
-        return value
+        # Setup XML-RPC client, paced by the host budget
+        self.transport = TapatalkTransport(pace=lambda: self.budget.wait(self.delay))
+        self.proxy = xmlrpc.client.ServerProxy(self.api_url, transport=self.transport)
+        
+        # Run time budget (unbounded unless a deadline is configured)
+        self.checkpoint_file = self.storage.base_dir / 'checkpoint.json'
+        self.deadline = RunDeadline(seconds_per_unit=self.delay)
+        self.deadline_reached = False
+        
+        # In-process git commits of the journaled files (off unless enabled)
+        self.committer = None
+        
+    def call(self, method, *params):
+        """Call a Tapatalk method and decode its text fields (see tapatalk_decode.py)"""
+        return decode_response(method, getattr(self.proxy, method)(*params))
     
     def parse_topic_list(self, response):
         """Parse topic list from get_topic response"""
@@ -111,8 +116,8 @@ class TapatalkScraper:
             parsed_topic = {
                 'topic_id': str(topic.get('topic_id', '')),
                 'forum_id': str(topic.get('forum_id', '')),
-                'topic_title': self.decode_base64_field(topic.get('topic_title', '')),
-                'topic_author_name': self.decode_base64_field(topic.get('topic_author_name', '')),
+                'topic_title': topic.get('topic_title', ''),
+                'topic_author_name': topic.get('topic_author_name', ''),
                 'reply_number': int(topic.get('reply_number', 0)) if topic.get('reply_number') else 0,
                 'view_number': int(topic.get('view_number', 0)) if topic.get('view_number') else 0,
                 'post_time': topic.get('post_time', ''),
@@ -135,38 +140,40 @@ class TapatalkScraper:
             return posts
         
         for post in post_list:
-            parsed_post = {
-                'post_id': str(post.get('post_id', '')),
-                'post_title': self.decode_base64_field(post.get('post_title', '')),
-                'post_author_name': self.decode_base64_field(post.get('post_author_name', '')),
-                'post_content': self.decode_base64_field(post.get('post_content', '')),
-                'post_time': str(post.get('post_time', '')) if post.get('post_time') else '',
-                'timestamp': str(post.get('timestamp', '')) if post.get('timestamp') else ''
-            }
-            posts.append(parsed_post)
+            posts.append(self.parse_post(post))
         
         return posts
     
+    @staticmethod
+    def parse_post(post):
+        """Keep the fields we store from one decoded get_thread post"""
+        return {
+            'post_id': str(post.get('post_id', '')),
+            'post_title': post.get('post_title', ''),
+            'post_author_name': post.get('post_author_name', ''),
+            'post_content': post.get('post_content', ''),
+            'post_time': str(post.get('post_time', '')) if post.get('post_time') else '',
+            'timestamp': str(post.get('timestamp', '')) if post.get('timestamp') else ''
+        }
+    
     def get_forum_topics(self, forum_id, start=0, limit=20):
         """Get topics from a specific forum"""
-        logger.info(f"Fetching topics from forum {forum_id} (start: {start}, limit: {limit})")
+        logger.info(f"Fetching topics from forum {forum_id} (start: {start}, limit: {limit})", extra=sampled('get_topic'))
         
         try:
-            time.sleep(self.delay)  # Rate limiting
-            
             # Call get_topic method
-            response = self.proxy.get_topic(str(forum_id), start, start + limit - 1)
+            response = self.call('get_topic', str(forum_id), start, start + limit - 1)
             
             # Check for error response
             if isinstance(response, dict) and response.get('result') == False:
-                error_msg = self.decode_base64_field(response.get('result_text', ''))
+                error_msg = response.get('result_text', '')
                 logger.error(f"API error for forum {forum_id}: {error_msg}")
                 if 'permission' in error_msg.lower() or 'access' in error_msg.lower():
                     logger.error(f"Forum {forum_id} appears to have access restrictions")
                 return []
             
             topics = self.parse_topic_list(response)
-            logger.info(f"Found {len(topics)} topics")
+            logger.info(f"Found {len(topics)} topics", extra=sampled('get_topic_done'))
             return topics
             
         except Exception as e:
@@ -175,22 +182,25 @@ class TapatalkScraper:
     
     def get_thread_posts(self, topic_id, start=0, limit=20):
         """Get posts from a specific thread"""
-        logger.info(f"Fetching posts from thread {topic_id}")
+        logger.info(f"Fetching posts from thread {topic_id}", extra=sampled('get_thread'))
         
         try:
-            time.sleep(self.delay)  # Rate limiting
-            
-            # Call get_thread method
-            response = self.proxy.get_thread(str(topic_id), start, start + limit - 1)
+            # Call get_thread, parsing each post as soon as it has arrived
+            # so a large page is never held in memory as a whole
+            stream = ResponseStream('get_thread')
+            params = (str(topic_id), start, start + limit - 1)
+            posts = [self.parse_post(post) for post in self.transport.stream(self.api_url, stream, params)]
+            response = stream.header
             
             # Check for error response
             if isinstance(response, dict) and response.get('result') == False:
-                error_msg = self.decode_base64_field(response.get('result_text', ''))
+                error_msg = response.get('result_text', '')
                 logger.error(f"API error: {error_msg}")
                 return []
-            
-            posts = self.parse_posts(response)
-            logger.info(f"Found {len(posts)} posts")
+            if isinstance(response, list):
+                # A bare list of posts instead of the usual struct
+                posts = self.parse_posts(response)
+            logger.info(f"Found {len(posts)} posts", extra=sampled('get_thread_done'))
             return posts
             
         except Exception as e:
@@ -209,40 +219,18 @@ class TapatalkScraper:
         }
         self.storage.save_forum(forum_data)
         
-        # Get topics in batches
-        all_topics = []
-        batch_size = 50
-        start = 0
+        # Resume pending work first; only list more topics if the frontier
+        # does not already hold enough of them
+        pending = self.frontier.pending_count('thread', forum_id)
+        if pending:
+            logger.info(f"Resuming {pending} pending topics from the frontier")
+        if not topic_limit or pending < topic_limit:
+            self.discover_topics(forum_id, topic_limit - pending if topic_limit else None)
         
-        while True:
-            topics = self.get_forum_topics(forum_id, start, batch_size)
-            if not topics:
-                break
-                
-            # Only add topics that haven't been scraped yet
-            for topic in topics:
-                topic_id = str(topic.get('topic_id'))
-                if not self.storage.is_thread_scraped(forum_id, topic_id):
-                    all_topics.append(topic)
-                    
-                    # Stop immediately when we reach the limit
-                    if topic_limit and len(all_topics) >= topic_limit:
-                        break
-            
-            # Check if we've hit the limit of NEW topics
-            if topic_limit and len(all_topics) >= topic_limit:
-                break
-            
-            # If we got less than batch_size, we're at the end
-            if len(topics) < batch_size:
-                break
-                
-            start += batch_size
-            logger.info(f"Fetched {len(all_topics)} new topics so far...")
+        pending = self.frontier.pending_count('thread', forum_id)
+        logger.info(f"Total topics to process: {pending}")
         
-        logger.info(f"Total topics to process: {len(all_topics)}")
-        
-        if not all_topics:
+        if not pending:
             logger.warning(f"No new topics found in forum {forum_id}")
             logger.info("This could mean:")
             logger.info("1. All topics have already been scraped")
@@ -250,71 +238,488 @@ class TapatalkScraper:
             logger.info("3. There's an API access issue")
             return
         
-        # Process each topic
-        for i, topic in enumerate(all_topics):
-            topic_title = topic.get('topic_title', 'Unknown')
+        self.process_topics(forum_id, topic_limit, post_limit_per_topic)
+        
+        stats = self.storage.get_stats()
+        logger.info(f"Scraping complete. Total threads: {stats['threads_scraped']}")
+    
+    def process_topics(self, group, limit=None, post_limit_per_topic=50, should_stop=None):
+        """Fetch queued topics of one frontier group in priority order
+        
+        Args:
+            group: Frontier group (a forum ID, or a shard ID in worker mode)
+            limit: Maximum topics to process
+            post_limit_per_topic: Maximum posts per topic
+            should_stop: Optional callable; processing stops when it returns True
+            
+        Returns:
+            Number of topics processed
+        """
+        pending = self.frontier.pending_count('thread', group)
+        processed = 0
+        while not limit or processed < limit:
+            if should_stop and should_stop():
+                break
+            # Under a deadline, switch to the cheapest topics once the
+            # remaining work no longer fits, to finish as many as possible
+            order = 'priority'
+            if self.deadline.bounded:
+                order = self.deadline.order(self.frontier.pending_cost('thread', group))
+            item = self.frontier.pop('thread', group, order=order)
+            if item is None:
+                break
+            if not self.deadline.can_start(item.cost):
+                self.frontier.release(item.key)
+                self.deadline_reached = True
+                logger.info(f"Stopping before the deadline, {self.deadline.remaining():.0f}s of fetch time left")
+                break
+            processed += 1
+            started = time.time()
+            thread_data = item.payload
+            forum_id = thread_data['forum_id']
+            
+            topic_title = thread_data.get('title') or 'Unknown'
             if len(topic_title) > 50:
                 topic_title = topic_title[:50] + "..."
-            logger.info(f"Processing topic {i+1}/{len(all_topics)}: {topic_title}")
+            logger.info(f"Processing topic {processed} ({pending} queued): {topic_title}", extra=sampled('process_topic'))
             
-            # Save thread metadata
-            thread_data = {
-                'id': str(topic['topic_id']),
-                'forum_id': str(forum_id),
-                'title': topic['topic_title'],
-                'author': topic['topic_author_name'],
-                'reply_count': topic['reply_number'],
-                'view_count': topic['view_number'],
-                'created_date': str(topic['post_time']) if topic['post_time'] else None,
-                'last_reply': str(topic['last_reply_time']) if topic['last_reply_time'] else None
-            }
-            self.storage.save_thread(thread_data)
-            
-            # Get posts for this thread
-            posts = []
-            post_start = 0
+            try:
+                # Save thread metadata
+                self.storage.save_thread(dict(thread_data))
+                
+                # Get posts for this thread
+                posts = self.fetch_thread_posts(thread_data['id'], post_limit_per_topic)
+                
+                # Save posts
+                if posts:
+                    self.storage.save_posts(thread_data['id'], posts, forum_id)
+                    self.frontier.done(item.key)
+                    self.deadline.record(item.cost, time.time() - started)
+                else:
+                    state = self.frontier.fail(item.key, 'no posts returned')
+                    logger.warning(f"No posts for thread {thread_data['id']}, retry state: {state}")
+            except KeyboardInterrupt:
+                self.frontier.release(item.key)
+                raise
+            except Exception as e:
+                state = self.frontier.fail(item.key, repr(e))
+                logger.error(f"Error scraping thread {thread_data['id']}: {e} (retry state: {state})")
             
+            # Topic boundary: the archive is consistent, commit if one is due
+            self.commit_data()
+        
+        return processed
+    
+    def get_topic_count(self, forum_id):
+        """Total number of topics in a forum, from the get_topic header"""
+        response = self.call('get_topic', str(forum_id), 0, 0)
+        if isinstance(response, dict):
+            return int(response.get('total_topic_num') or 0)
+        return 0
+    
+    def plan_shards(self, forum_ids, shard_size=500):
+        """Partition each forum's topic listing into index-range shards
+        
+        Listing order shifts as topics get new replies, so ranges are only
+        approximate partitions; the frontier's key dedup keeps a topic that
+        moves between shards from being fetched twice.
+        
+        Returns:
+            Number of newly registered shards
+        """
+        shards = []
+        for forum_id in forum_ids:
+            total = self.get_topic_count(forum_id)
+            logger.info(f"Forum {forum_id}: {total} topics, {-(-total // shard_size)} shards")
+            for start in range(0, total, shard_size):
+                shard_id = f'{forum_id}:{start}'
+                shards.append((shard_id, {
+                    'forum_id': str(forum_id),
+                    'start': start,
+                    'end': min(start + shard_size, total)
+                }))
+        
+        leases = LeaseTable(self.coordination_db)
+        try:
+            return leases.create_shards(shards)
+        finally:
+            leases.close()
+    
+    def scrape_shard(self, shard, post_limit_per_topic=50, should_stop=None, batch_size=50):
+        """List one shard's topic range into the frontier and fetch those topics"""
+        params = shard.params
+        forum_id = params['forum_id']
+        logger.info(f"Worker {shard.owner} scraping forum {forum_id} topics {params['start']}-{params['end']}")
+        
+        cursor_name = f'shard_listing:{shard.shard_id}'
+        start = self.frontier.get_cursor(cursor_name, params['start'])
+        while start < params['end']:
+            if (should_stop and should_stop()) or self.deadline.expired():
+                return False
+            end = min(start + batch_size, params['end'])
+            topics = self.get_forum_topics(forum_id, start, end - start)
+            if not topics:
+                break  # API error, or the listing shrank; leave the cursor for a later claim
+            self.queue_topics(topics, forum_id, group=shard.shard_id)
+            # A short page means the listing ends inside this shard
+            start = end if len(topics) == end - start else params['end']
+            self.frontier.set_cursor(cursor_name, start)
+        
+        self.process_topics(shard.shard_id, post_limit_per_topic=post_limit_per_topic,
+                            should_stop=should_stop)
+        listed = self.frontier.get_cursor(cursor_name, params['start']) >= params['end']
+        return listed and self.frontier.pending_count('thread', shard.shard_id) == 0
+    
+    def run_worker(self, owner=None, post_limit_per_topic=50, lease_seconds=600):
+        """Claim shards one after another until none are left
+        
+        A heartbeat thread renews the lease; if it is lost (e.g. this process
+        stalled past the lease and another worker took over) the shard is
+        abandoned at the next topic boundary.
+        
+        Returns:
+            Number of shards completed
+        """
+        owner = owner or f'{socket.gethostname()}:{os.getpid()}'
+        leases = LeaseTable(self.coordination_db, lease_seconds)
+        completed = 0
+        released = set()
+        try:
             while True:
-                batch_posts = self.get_thread_posts(topic['topic_id'], post_start, 20)
-                if not batch_posts:
+                if self.deadline_reached or self.deadline.expired():
                     break
-                    
-                posts.extend(batch_posts)
-                
-                # Limit posts per topic
-                if len(posts) >= post_limit_per_topic:
-                    posts = posts[:post_limit_per_topic]
+                shard = leases.claim(owner)
+                if shard is None:
                     break
-                
-                if len(batch_posts) < 20:  # Got all posts
+                if shard.shard_id in released:
+                    # Only shards this worker already gave up on are left
+                    leases.release(shard)
                     break
-                    
-                post_start += 20
+                with Heartbeat(self.coordination_db, shard, lease_seconds) as heartbeat:
+                    finished = self.scrape_shard(shard, post_limit_per_topic,
+                                                 should_stop=heartbeat.lost.is_set)
+                if heartbeat.lost.is_set():
+                    logger.warning(f"Lost lease on shard {shard.shard_id}, moving on")
+                elif finished:
+                    leases.complete(shard)
+                    completed += 1
+                else:
+                    # Listing failed or topics wait for a retry backoff; a later claim finishes it
+                    leases.release(shard)
+                    released.add(shard.shard_id)
+        finally:
+            leases.close()
+            self.frontier.checkpoint()
+        
+        logger.info(f"Worker {owner} done, {completed} shards completed")
+        return completed
+    
+    def queue_topics(self, topics, forum_id, group=None):
+        """Queue unscraped topics from a get_topic page in the frontier
+        
+        Returns:
+            Number of topics newly added
+        """
+        new_items = []
+        for topic in topics:
+            topic_id = str(topic.get('topic_id'))
+            if self.storage.is_thread_scraped(forum_id, topic_id):
+                continue
+            new_items.append((
+                'thread',
+                Frontier.make_key('thread', forum_id, topic_id),
+                self.topic_to_thread(topic, forum_id),
+                self.topic_priority(topic),
+                str(group if group is not None else forum_id),
+                self.topic_cost(topic)
+            ))
+        return self.frontier.add_many(new_items)
+    
+    def discover_topics(self, forum_id, limit=None, batch_size=50):
+        """Page through a forum's topic list, queueing unseen topics in the frontier
+        
+        The listing offset is checkpointed after every page, so an interrupted
+        listing picks up where it stopped instead of starting from the top.
+        
+        Returns:
+            Number of topics newly added to the frontier
+        """
+        cursor_name = f'listing:{forum_id}'
+        cursor = self.frontier.get_cursor(cursor_name, {'start': 0, 'complete': False})
+        start = 0 if cursor.get('complete') else cursor.get('start', 0)
+        if start:
+            logger.info(f"Resuming topic listing of forum {forum_id} at offset {start}")
+        
+        added = 0
+        while not self.deadline.expired():
+            topics = self.get_forum_topics(forum_id, start, batch_size)
+            if not topics:
+                break
+            
+            # Only queue topics that haven't been scraped yet
+            added += self.queue_topics(topics, forum_id)
+            
+            start += batch_size
+            complete = len(topics) < batch_size  # Got less than a full page: end of forum
+            self.frontier.set_cursor(cursor_name, {'start': 0 if complete else start, 'complete': complete})
+            
+            # Check if we've hit the limit of NEW topics
+            if complete or (limit and added >= limit):
+                break
             
-            # Save posts
+            logger.info(f"Queued {added} new topics so far...", extra=sampled('topic_batches'))
+        
+        return added
+    
+    @staticmethod
+    def topic_to_thread(topic, forum_id):
+        """Thread metadata record for a topic from get_topic"""
+        return {
+            'id': str(topic['topic_id']),
+            'forum_id': str(forum_id),
+            'title': topic['topic_title'],
+            'author': topic['topic_author_name'],
+            'reply_count': topic['reply_number'],
+            'view_count': topic['view_number'],
+            'created_date': str(topic['post_time']) if topic['post_time'] else None,
+            'last_reply': str(topic['last_reply_time']) if topic['last_reply_time'] else None
+        }
+    
+    @staticmethod
+    def topic_priority(topic):
+        """Frontier priority of a topic: most recently active first"""
+        last_reply = str(topic.get('last_reply_time') or topic.get('post_time') or '')
+        try:
+            return datetime.strptime(last_reply[:17], '%Y%m%dT%H:%M:%S').timestamp()
+        except ValueError:
+            return 0.0
+    
+    @staticmethod
+    def topic_cost(topic, post_limit_per_topic=DEFAULT_POST_LIMIT):
+        """Requests needed to fetch a topic's posts, 20 per get_thread call"""
+        posts = min(int(topic.get('reply_number') or 0) + 1, post_limit_per_topic)
+        return -(-posts // 20)
+    
+    def write_checkpoint(self, reason):
+        """Record how this run ended; the frontier holds the work to resume"""
+        if reason == 'complete' and self.deadline_reached:
+            reason = 'deadline'
+        checkpoint = self.deadline.write_checkpoint(
+            self.checkpoint_file,
+            reason,
+            frontier=self.frontier.counts(),
+            pending_cost=self.frontier.pending_cost('thread'),
+            http=self.transport.client.metrics.snapshot()
+        )
+        logger.info(f"Checkpoint ({reason}): {checkpoint['items_completed']} topics this run, "
+                    f"{checkpoint['seconds_per_unit']}s per request")
+    
+    def enable_commits(self, minutes, push=False):
+        """Commit the files this run writes every `minutes`, from inside the run"""
+        self.committer = IncrementalCommitter(self.storage.journal, self.storage.base_dir,
+                                              interval=minutes * 60, push=push)
+    
+    def prepare_commit(self):
+        """Bring the frontier and progress files to a committable state"""
+        self.frontier.checkpoint()
+        self.storage.journal.record_many([self.coordination_db, self.checkpoint_file])
+        self.storage.save_progress()
+    
+    def commit_data(self, force=False):
+        """Commit journaled changes if commits are enabled and one is due (or forced)"""
+        if self.committer is None:
+            return
+        try:
+            if force:
+                commit_id = self.committer.commit(self.prepare_commit)
+            else:
+                commit_id = self.committer.maybe_commit(self.prepare_commit)
+        except GitError as e:
+            # The journal keeps the paths, so the next commit picks them up
+            logger.error(f"Commit failed: {e}")
+            return
+        if commit_id:
+            logger.info(f"Committed scraped data ({commit_id[:8]})")
+    
+    def fetch_thread_posts(self, topic_id, post_limit_per_topic=50):
+        """Fetch up to post_limit_per_topic posts of a thread, 20 per request"""
+        posts = []
+        post_start = 0
+        
+        while True:
+            batch_posts = self.get_thread_posts(topic_id, post_start, 20)
+            if not batch_posts:
+                break
+                
+            posts.extend(batch_posts)
+            
+            # Limit posts per topic
+            if len(posts) >= post_limit_per_topic:
+                posts = posts[:post_limit_per_topic]
+                break
+            
+            if len(batch_posts) < 20:  # Got all posts
+                break
+                
+            post_start += 20
+        
+        return posts
+    
+    def repair_threads(self, forum_id=None, post_limit_per_topic=50):
+        """Refetch exactly the threads listed in the archive's repair list
+        
+        The list is produced by `collectibles.py reconcile`; threads are removed
+        from it as soon as their posts are saved.
+        """
+        repair_list = self.storage.get_repair_list()
+        entries = repair_list.threads(forum_id)
+        if not entries:
+            logger.info("No threads to repair")
+            return
+        
+        logger.info(f"Repairing {len(entries)} threads")
+        for entry in entries:
+            thread_id, entry_forum = entry['thread_id'], entry['forum_id']
+            logger.info(f"Repairing thread {thread_id} in forum {entry_forum} ({entry['reason']})",
+                        extra=sampled('repair_thread'))
+            
+            if entry['reason'] == 'unparseable':
+                # The file is unreadable, so start it over from minimal metadata
+                self.storage.save_thread({
+                    'id': thread_id,
+                    'forum_id': entry_forum,
+                    'title': entry.get('title') or f'Thread {thread_id}'
+                })
+            
+            posts = self.fetch_thread_posts(thread_id, post_limit_per_topic)
             if posts:
-                self.storage.save_posts(topic['topic_id'], posts, forum_id)
+                self.storage.save_posts(thread_id, posts, entry_forum)
+                repair_list.mark_done(entry_forum, thread_id)
+            else:
+                logger.warning(f"Still no posts for thread {thread_id}, keeping it on the repair list")
         
-        stats = self.storage.get_stats()
-        logger.info(f"Scraping complete. Total threads: {stats['threads_scraped']}")
+        logger.info(f"Repair complete, {len(repair_list)} threads still pending")
 
 def main():
     """Main entry point"""
     import argparse
     
     parser = argparse.ArgumentParser(description='Scrape Net54 forum using Tapatalk API')
-    parser.add_argument('--forum', type=int, required=True, help='Forum ID to scrape')
+    parser.add_argument('--forum', type=int, help='Forum ID to scrape')
     parser.add_argument('--topic-limit', type=int, help='Maximum topics to scrape')
     parser.add_argument('--post-limit', type=int, default=50, help='Maximum posts per topic')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='Give topics that exhausted their retries another round')
+    parser.add_argument('--repair', action='store_true',
+                        help='Only refetch threads on the repair list (see collectibles.py reconcile)')
+    
+    parser.add_argument('--plan-shards', type=int, nargs='+', metavar='FORUM',
+                        help='Split these forums into shards for --workers/--worker')
+    parser.add_argument('--shard-size', type=int, default=500, help='Topics per shard')
+    parser.add_argument('--workers', type=int,
+                        help='Run this many worker processes over the planned shards')
+    parser.add_argument('--worker', action='store_true',
+                        help='Run as a single shard worker (e.g. on another runner)')
+    parser.add_argument('--lease-seconds', type=int, default=600,
+                        help='Shard lease length; an expired lease is taken over by another worker')
+    parser.add_argument('--deadline-minutes', type=float,
+                        help='Stop cleanly and checkpoint before this many minutes '
+                             '(default: $RUN_DEADLINE epoch seconds, if set)')
+    parser.add_argument('--commit-every', type=float, metavar='MINUTES',
+                        help='Git-commit the scraped files every this many minutes, and at the end')
+    parser.add_argument('--push', action='store_true', help='Push after every commit')
     
     args = parser.parse_args()
+    sharded = args.plan_shards or args.workers or args.worker
+    if not args.forum and not args.repair and not sharded:
+        parser.error('--forum is required unless --repair or a shard option is given')
+    
+    install_sigterm_handler()
+    if args.deadline_minutes:
+        # Absolute, so worker processes started later share the same deadline
+        os.environ[DEADLINE_ENV] = str(time.time() + args.deadline_minutes * 60)
     
+    if sharded:
+        run_sharded(args)
+        return
+    
+    scraper = TapatalkScraper()
+    scraper.deadline = RunDeadline.from_options(checkpoint_path=scraper.checkpoint_file,
+                                                seconds_per_unit=scraper.delay)
+    if scraper.deadline.bounded:
+        logger.info(f"Run deadline in {scraper.deadline.remaining() / 60:.0f} minutes "
+                    f"(estimating {scraper.deadline.seconds_per_unit:.1f}s per request)")
+    if args.commit_every:
+        scraper.enable_commits(args.commit_every, push=args.push)
+    reason = 'error'
+    try:
+        if args.retry_failed:
+            logger.info(f"Re-queued {scraper.frontier.retry_failed('thread')} failed topics")
+        if args.repair:
+            scraper.repair_threads(forum_id=args.forum, post_limit_per_topic=args.post_limit)
+            return
+        scraper.scrape_forum(
+            forum_id=args.forum,
+            topic_limit=args.topic_limit,
+            post_limit_per_topic=args.post_limit
+        )
+        reason = 'complete'
+    except KeyboardInterrupt:
+        reason = 'interrupted'
+        logger.info("Interrupted, checkpointing")
+    finally:
+        if not args.repair:
+            scraper.write_checkpoint(reason)
+        logger.info(f"HTTP: {scraper.transport.client.metrics.summary()}")
+        scraper.commit_data(force=True)
+        scraper.frontier.close()
+        scraper.budget.close()
+
+def run_worker_process(post_limit, lease_seconds):
+    """Entry point of one spawned worker process"""
     scraper = TapatalkScraper()
-    scraper.scrape_forum(
-        forum_id=args.forum,
-        topic_limit=args.topic_limit,
-        post_limit_per_topic=args.post_limit
-    )
+    scraper.deadline = RunDeadline.from_options(checkpoint_path=scraper.checkpoint_file,
+                                                seconds_per_unit=scraper.delay)
+    try:
+        return scraper.run_worker(post_limit_per_topic=post_limit, lease_seconds=lease_seconds)
+    finally:
+        scraper.frontier.close()
+        scraper.budget.close()
+        # Pool workers exit without atexit handlers; write out queued log records
+        shutdown_logging()
+
+def run_sharded(args):
+    """Plan shards and/or work through them with one or more processes"""
+    if args.plan_shards:
+        scraper = TapatalkScraper()
+        try:
+            for forum_id in args.plan_shards:
+                scraper.storage.save_forum({
+                    'id': str(forum_id),
+                    'name': f'Forum {forum_id}',
+                    'scraped_at': datetime.now().isoformat()
+                })
+            added = scraper.plan_shards(args.plan_shards, args.shard_size)
+            leases = LeaseTable(scraper.coordination_db)
+            logger.info(f"Planned {added} new shards, status: {leases.status()}")
+            leases.close()
+        finally:
+            scraper.frontier.close()
+            scraper.budget.close()
+    
+    if args.worker:
+        run_worker_process(args.post_limit, args.lease_seconds)
+    elif args.workers:
+        # Each worker opens its own SQLite connections; they share the
+        # frontier, shard leases and host budget through the database files.
+        # Spawned workers import this module afresh and so set up their own
+        # logging; one task per process since run_worker_process shuts it down
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(args.workers, maxtasksperchild=1) as pool:
+            results = [pool.apply_async(run_worker_process, (args.post_limit, args.lease_seconds))
+                       for _ in range(args.workers)]
+            completed = sum(result.get() for result in results)
+        logger.info(f"All workers finished, {completed} shards completed")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Streaming XML-RPC parsing of Tapatalk responses
+
+A get_thread page with inline images can be megabytes of XML. The stock path
+holds the whole body as one string, builds the complete nested dict of posts
+from it, and then copies the posts once more. Here the body is fed chunk by
+chunk from the HTTP response into expat. Every record of the response's
+item array (the posts of get_thread, the topics of get_topic) is taken off
+the unmarshaller's stack as soon as its struct closes, decoded with the
+method's schema (tapatalk_decode.py) and handed to the caller. So at any
+time only one chunk and the record being parsed are held, plus whatever the
+caller keeps.
+"""
+import xmlrpc.client
+from collections import deque
+
+from tapatalk_decode import SCHEMAS, decode_record, decode_response
+
+# Bytes read from the HTTP response per parser feed
+CHUNK_SIZE = 64 * 1024
+
+class RecordUnmarshaller(xmlrpc.client.Unmarshaller):
+    """Unmarshaller that hands off the records of one top-level array"""
+
+    def __init__(self, items_key, on_record):
+        super().__init__()
+        self.items_key = items_key
+        self.on_record = on_record
+
+    def end_struct(self, data):
+        xmlrpc.client.Unmarshaller.end_struct(self, data)
+        # A record is a struct directly inside <response struct>[items_key],
+        # i.e. the marks left open are the response struct and the array,
+        # and the array's member name sits just below the array's mark
+        marks = self._marks
+        if len(marks) == 2 and marks[1] > 0 and self._stack[marks[1] - 1] == self.items_key:
+            self.on_record(self._stack.pop())
+
+    dispatch = dict(xmlrpc.client.Unmarshaller.dispatch)
+    dispatch['struct'] = end_struct
+
+class ResponseStream:
+    """Incremental parser of one Tapatalk response
+
+    Feed it the response body in chunks and iterate the records each feed
+    completes; once the body is closed, `header` holds the response struct
+    without its records (result, result_text, totals, ...).
+    """
+
+    def __init__(self, method):
+        schema = SCHEMAS.get(method)
+        self.method = method
+        self.items_key = schema.items if schema else None
+        self.header = None
+        self._records = deque()
+        self._unmarshaller = RecordUnmarshaller(self.items_key, self._records.append)
+        self._parser = xmlrpc.client.ExpatParser(self._unmarshaller)
+
+    def feed(self, chunk):
+        """Parse a chunk of the body and yield the records it completed"""
+        self._parser.feed(chunk)
+        yield from self._drain()
+
+    def _drain(self):
+        records = self._records
+        while records:
+            yield decode_record(self.method, records.popleft())
+
+    def close(self):
+        """Finish parsing; raises xmlrpc.client.Fault for a fault response
+
+        Returns:
+            The decoded response header (its item array is left empty)
+        """
+        self._parser.close()
+        self.header = decode_response(self.method, self._unmarshaller.close()[0])
+        return self.header
+
+    def parse(self, chunks):
+        """Yield the records of a whole body given as an iterable of chunks"""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        self.close()
+        yield from self._drain()
@@ -49,6 +49,7 @@ def test_forum_access():
     
     accessible = [f for f, s in results.items() if s == "ACCESSIBLE"]
     logger.info(f"\nAccessible forums: {accessible}")
+    logger.info(scraper.transport.client.metrics.summary())
 
 if __name__ == '__main__':
     test_forum_access()
\ No newline at end of file
@@ -3,12 +3,15 @@
 
 import xmlrpc.client
 import time
+from tapatalk_scraper import TapatalkTransport
+from tapatalk_decode import decode_response
 
 def test_forum_access():
     """Test access to various Net54 forums"""
     
-    # Connect to Tapatalk API
-    proxy = xmlrpc.client.ServerProxy('https://www.net54baseball.com/mobiquo/mobiquo.php')
+    # Connect to Tapatalk API through the shared client (1 second between requests)
+    transport = TapatalkTransport(pace=lambda: time.sleep(1))
+    proxy = xmlrpc.client.ServerProxy('https://www.net54baseball.com/mobiquo/mobiquo.php', transport=transport)
     
     # Common forum IDs to test
     forum_ids = [
@@ -25,14 +28,12 @@ def test_forum_access():
     for forum_id in forum_ids:
         print(f"Testing forum {forum_id}...", end=" ")
         try:
-            time.sleep(1)  # Rate limiting
-            
             # Try to get just 1 topic to test access
-            response = proxy.get_topic(str(forum_id), 0, 0)
+            response = decode_response('get_topic', proxy.get_topic(str(forum_id), 0, 0))
             
             # Check for error response
             if isinstance(response, dict) and response.get('result') == False:
-                error_msg = response.get('result_text', b'').decode('utf-8', errors='ignore')
+                error_msg = response.get('result_text', '')
                 print(f"✗ RESTRICTED - {error_msg}")
             elif response:
                 print(f"✓ ACCESSIBLE")
@@ -42,6 +43,7 @@ def test_forum_access():
         except Exception as e:
             print(f"✗ ERROR: {str(e)}")
     
+    print(f"\n{transport.client.metrics.summary()}")
     print("\nNote: Forum 14 is likely restricted via Tapatalk API.")
     print("Consider using HTML scraper for restricted forums.")
 
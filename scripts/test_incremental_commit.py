@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Check that periodic commits work where git has no identity configured
+
+Commits a journaled file in a scratch repository with empty global and system
+git configs, as on a fresh CI runner, and fails (exit code 1) unless the
+commit is made with the fallback identity.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from tools.archive.commits import FALLBACK_EMAIL, IncrementalCommitter
+from tools.archive.journal import ChangeJournal, JOURNAL_NAME
+
+# Hide every git identity the host may have
+BARE_ENV = {'GIT_CONFIG_GLOBAL': os.devnull, 'GIT_CONFIG_NOSYSTEM': '1'}
+IDENTITY_VARS = ['GIT_AUTHOR_NAME', 'GIT_AUTHOR_EMAIL', 'GIT_COMMITTER_NAME',
+                 'GIT_COMMITTER_EMAIL', 'EMAIL']
+
+
+def check():
+    """Commit one thread file with no identity configured
+
+    Returns:
+        Author email of the commit, or None if committing failed
+    """
+    saved = {name: os.environ.get(name) for name in [*BARE_ENV, *IDENTITY_VARS]}
+    os.environ.update(BARE_ENV)
+    for name in IDENTITY_VARS:
+        os.environ.pop(name, None)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            subprocess.run(['git', 'init', '-q', tmp], check=True)
+            data_dir = Path(tmp) / 'data'
+            data_dir.mkdir()
+            thread = data_dir / 'thread_1.json'
+            thread.write_text('{}')
+
+            journal = ChangeJournal(data_dir / JOURNAL_NAME)
+            journal.record(thread)
+            journal.flush()
+            try:
+                commit_id = IncrementalCommitter(journal, data_dir).commit()
+            except Exception as e:
+                print(f"✗ Commit failed: {e}")
+                return None
+            email = subprocess.run(['git', 'log', '-1', '--format=%ae', commit_id], cwd=tmp,
+                                   capture_output=True, text=True, check=True).stdout.strip()
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    print(f"✓ Committed as {email}")
+    return email
+
+
+def test_commit_without_identity():
+    """Test committing with an empty global git config"""
+    assert check() == FALLBACK_EMAIL
+
+
+if __name__ == '__main__':
+    sys.exit(0 if check() == FALLBACK_EMAIL else 1)
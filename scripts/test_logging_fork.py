@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Check that records logged by forked worker processes are written
+
+Configures logging in a fresh interpreter, logs a warning from a
+multiprocessing.Pool worker (fork start method) and fails (exit code 1)
+unless the warning reaches both the console and the JSON lines file.
+"""
+
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+MARKER = 'warning from a pool worker'
+
+PROBE = """
+import logging, multiprocessing, sys
+from tools.logging_setup import configure_logging
+
+def work(_):
+    logging.getLogger('worker').warning(%r)
+    return True
+
+configure_logging({'log_dir': sys.argv[1]})
+logging.getLogger('parent').info('pool starting')
+with multiprocessing.get_context('fork').Pool(2) as pool:
+    pool.map(work, range(2))
+""" % MARKER
+
+
+def check():
+    """Run the probe and look for the worker's warning
+
+    Returns:
+        (times seen on the console, times seen in the log file)
+    """
+    with tempfile.TemporaryDirectory() as log_dir:
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE, log_dir],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=60
+        )
+        console = result.stderr.count(MARKER)
+        logged = 0
+        for path in Path(log_dir).glob('*.jsonl'):
+            for line in path.read_text(encoding='utf-8').splitlines():
+                entry = json.loads(line)
+                if entry['message'] == MARKER and entry['logger'] == 'worker':
+                    logged += 1
+
+    print(f"worker warnings: {console} on the console, {logged} in the log file (expected 2)")
+    return console, logged
+
+
+def test_pool_worker_logging():
+    """Test that pool workers' records reach the console and the log file"""
+    console, logged = check()
+    assert console == 2, f"{console} of 2 worker warnings on the console"
+    assert logged == 2, f"{logged} of 2 worker warnings in the log file"
+
+
+if __name__ == '__main__':
+    sys.exit(0 if check() == (2, 2) else 1)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Check that collectibles.py starts fast and imports no scraper dependencies
+
+Runs `import collectibles` in a fresh interpreter and fails (exit code 1) if
+startup goes over the time budget or if any heavy module is imported before
+a command actually needs a scraper.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Wall-clock budget for `import collectibles`, excluding interpreter startup
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', 100))
+
+# Modules that must only be imported when a command needs a scraper
+HEAVY_MODULES = ['requests', 'bs4', 'lxml', 'yaml', 'dotenv', 'colorlog', 'tqdm',
+                 'scraper', 'parser', 'storage', 'utils']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import collectibles
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({'elapsed_ms': elapsed_ms, 'modules': sorted(sys.modules)}))
+"""
+
+
+def measure(runs=5):
+    """Return the best import time over several runs and the modules loaded"""
+    best = None
+    modules = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result['elapsed_ms'] < best:
+            best = result['elapsed_ms']
+        modules = result['modules']
+    return best, modules
+
+
+def check():
+    """Measure startup and print the verdict
+
+    Returns:
+        (elapsed_ms, heavy modules loaded at startup)
+    """
+    elapsed_ms, modules = measure()
+    loaded = [name for name in HEAVY_MODULES if name in modules]
+
+    print(f"import collectibles: {elapsed_ms:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    if elapsed_ms > IMPORT_BUDGET_MS:
+        print(f"✗ Startup over budget by {elapsed_ms - IMPORT_BUDGET_MS:.1f} ms")
+    if loaded:
+        print(f"✗ Heavy modules imported at startup: {', '.join(loaded)}")
+    if elapsed_ms <= IMPORT_BUDGET_MS and not loaded:
+        print("✓ Startup within budget, no heavy imports")
+    return elapsed_ms, loaded
+
+
+def test_startup_time():
+    """Test import time and eager imports of collectibles.py"""
+    elapsed_ms, loaded = check()
+    assert elapsed_ms <= IMPORT_BUDGET_MS, \
+        f"import collectibles took {elapsed_ms:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
+    assert not loaded, f"heavy modules imported at startup: {', '.join(loaded)}"
+
+
+if __name__ == '__main__':
+    elapsed_ms, loaded = check()
+    sys.exit(0 if elapsed_ms <= IMPORT_BUDGET_MS and not loaded else 1)
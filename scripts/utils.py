@@ -1,75 +1,63 @@
 import os
+import sys
 import logging
-import colorlog
-from datetime import datetime
+from pathlib import Path
 import time
-from retrying import retry
-import requests
 from dotenv import load_dotenv
 
+# Make the tools package importable when running the legacy scripts directly
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from tools.logging_setup import configure_logging, load_logging_settings, sampled
+
+__all__ = ['PROJECT_ROOT', 'setup_logging', 'sampled', 'rate_limit', 'get_client', 'fetch_page', 'get_safe_filename']
+
 # Load environment variables
 load_dotenv()
 
 def setup_logging(name):
-    """Set up colored logging with both file and console output."""
-    log_dir = os.getenv('LOG_DIR', './logs')
-    os.makedirs(log_dir, exist_ok=True)
-    
-    # Create logger
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-    
-    # File handler for detailed logs
-    today = datetime.now().strftime('%Y-%m-%d')
-    log_file = os.path.join(log_dir, f'{today}-{name}.log')
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    file_handler.setFormatter(file_formatter)
-    
-    # Console handler with colors
-    console_handler = colorlog.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = colorlog.ColoredFormatter(
-        '%(log_color)s%(levelname)-8s%(reset)s %(message)s',
-        log_colors={
-            'DEBUG': 'cyan',
-            'INFO': 'green',
-            'WARNING': 'yellow',
-            'ERROR': 'red',
-            'CRITICAL': 'red,bg_white',
-        }
-    )
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
+    """Get a logger wired into the shared queue-based logging pipeline.
+
+    The pipeline is configured once per process from the ``logging:`` section
+    of $LOGGING_CONFIG (default configs/net54.yaml); repeated calls never add
+    duplicate handlers.
+    """
+    config_path = os.getenv('LOGGING_CONFIG', str(PROJECT_ROOT / 'configs' / 'net54.yaml'))
+    configure_logging(load_logging_settings(config_path))
+    return logging.getLogger(name)
 
 def rate_limit():
     """Apply rate limiting between requests."""
     delay = float(os.getenv('DELAY_SECONDS', 1.5))
     time.sleep(delay)
 
-@retry(stop_max_attempt_number=3, wait_exponential_multiplier=1000)
-def fetch_page(url, session=None):
-    """Fetch a page with retry logic."""
-    if session is None:
-        session = requests.Session()
+_default_client = None
+
+def get_client(**kwargs):
+    """HTTP client configured from the environment (see tools/scrapers/base/http_client.py).
+
+    Without arguments the process-wide default client is returned, so every
+    caller shares its connection pool.
+    """
+    global _default_client
+    from tools.scrapers.base.http_client import HttpClient
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    options = {
+        'timeout': float(os.getenv('TIMEOUT_SECONDS', 30)),
+        'max_attempts': int(os.getenv('MAX_RETRIES', 3)),
     }
-    
-    timeout = int(os.getenv('TIMEOUT_SECONDS', 30))
-    response = session.get(url, headers=headers, timeout=timeout)
-    response.raise_for_status()
-    
-    return response
+    if kwargs:
+        options.update(kwargs)
+        return HttpClient(**options)
+    if _default_client is None:
+        _default_client = HttpClient(**options)
+    return _default_client
+
+def fetch_page(url, client=None):
+    """Fetch a page with retry logic."""
+    return (client or get_client()).get(url)
 
 def get_safe_filename(text, max_length=50):
     """Convert text to safe filename."""
@@ -0,0 +1,7 @@
+"""
+Archive-level data subsystems
+
+Modules here work on archived data rather than on live sites: materialized
+statistics, consistency checks, readers and indexes. They only depend on the
+standard library unless noted, so they stay cheap to import from the CLI.
+"""
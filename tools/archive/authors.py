@@ -0,0 +1,197 @@
+"""
+Author Index
+
+Who posted what, in ``<archive root>/index/authors.db``: one posting per
+post, keyed by the author's name folded to a lookup key, so a collector's
+whole history across every forum of an archive is one B-tree range read
+rather than a pass over the archive.
+
+Authors are the normalized ones (``records.py``), so posts migrated under
+``Archive`` are filed under their real poster. Registered in
+``indexers.py``, so it is updated on every save and caught up (with worker
+processes reading the files) by ``collectibles.py index``.
+"""
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .records import Lot, Thread
+from .timestamps import MISSING, parse_timestamps
+
+AUTHORS_DB = 'authors.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (group_key, item_id)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    author_key TEXT NOT NULL,
+    author TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    time INTEGER,
+    started INTEGER NOT NULL DEFAULT 0,
+    title TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS postings_author ON postings (author_key, time);
+CREATE INDEX IF NOT EXISTS postings_item ON postings (group_key, item_id);
+"""
+
+
+def author_key(name: str) -> str:
+    """Lookup key of an author name: case-folded, whitespace collapsed"""
+    return ' '.join(name.split()).casefold()
+
+
+@dataclass
+class AuthorPost:
+    """One post of an author"""
+    group: str
+    item_id: str
+    post_id: str
+    time: Optional[int]
+    started: bool       # the thread's first post
+    title: str
+
+
+@dataclass
+class AuthorHistory:
+    """An author's activity in one archive"""
+    author: str
+    posts: int
+    threads: int        # threads posted in
+    started: int        # threads started
+    first_time: Optional[int]
+    last_time: Optional[int]
+    groups: Dict[str, int]      # posts per forum
+    recent: List[AuthorPost]
+
+
+class AuthorIndex:
+    """Author posting index of one archive"""
+
+    def __init__(self, directory: Path):
+        """Open (creating if needed) the author index in ``directory``
+
+        Args:
+            directory: The archive's index directory
+        """
+        self.path = Path(directory) / AUTHORS_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._in_batch = False
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Run the updates made inside as one transaction"""
+        if self._in_batch:
+            yield
+            return
+        self.conn.execute('BEGIN IMMEDIATE')
+        self._in_batch = True
+        try:
+            yield
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        else:
+            self.conn.execute('COMMIT')
+        finally:
+            self._in_batch = False
+
+    def index_item(self, group: str, item_id: str, record, stat):
+        """Replace the postings of one item
+
+        Args:
+            group: Forum ID or item type
+            item_id: Thread or item ID
+            record: ``records.Thread`` or ``records.Lot``; lots have no
+                authors and are only recorded as indexed
+            stat: ``os.stat`` of the item's file, to detect later changes
+        """
+        postings: List[Tuple[str, str, str, str, str, Optional[int], int, str]] = []
+        if isinstance(record, Thread):
+            times = parse_timestamps([post.timestamp if post.timestamp is not None else post.posted
+                                      for post in record.posts])
+            for position, (time, post) in enumerate(zip(times, record.posts)):
+                key = author_key(post.author)
+                if key:
+                    postings.append((key, post.author, group, item_id, post.id,
+                                     None if time == MISSING else int(time),
+                                     int(position == 0), record.title))
+        elif not isinstance(record, Lot):
+            raise TypeError(f"Cannot index {type(record).__name__}")
+        with self.batch():
+            self.conn.execute('DELETE FROM postings WHERE group_key = ? AND item_id = ?', (group, item_id))
+            self.conn.executemany(
+                'INSERT INTO postings (author_key, author, group_key, item_id, post_id, time, '
+                'started, title) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', postings)
+            self.conn.execute(
+                'INSERT OR REPLACE INTO items (group_key, item_id, mtime_ns, size) VALUES (?, ?, ?, ?)',
+                (group, item_id, stat.st_mtime_ns, stat.st_size))
+
+    def remove_item(self, group: str, item_id: str):
+        """Drop an item and its postings"""
+        with self.batch():
+            self.conn.execute('DELETE FROM postings WHERE group_key = ? AND item_id = ?', (group, item_id))
+            self.conn.execute('DELETE FROM items WHERE group_key = ? AND item_id = ?', (group, item_id))
+
+    def item_state(self, group: str) -> Dict[str, Tuple[int, int]]:
+        """Item ID -> (mtime_ns, size) of the file each item was indexed from"""
+        rows = self.conn.execute('SELECT item_id, mtime_ns, size FROM items WHERE group_key = ?', (group,))
+        return {item_id: (mtime_ns, size) for item_id, mtime_ns, size in rows}
+
+    def history(self, author: str, limit: int = 20) -> Optional[AuthorHistory]:
+        """An author's post counts, active period and most recent posts
+
+        Args:
+            author: Author name, matched case-insensitively
+            limit: Maximum recent posts returned
+
+        Returns:
+            The history, or None if the author has no posts
+        """
+        key = author_key(author)
+        posts, threads, started, first_time, last_time = self.conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT group_key || '/' || item_id), SUM(started), "
+            'MIN(time), MAX(time) FROM postings WHERE author_key = ?', (key,)).fetchone()
+        if not posts:
+            return None
+        name = self.conn.execute(
+            'SELECT author FROM postings WHERE author_key = ? GROUP BY author '
+            'ORDER BY COUNT(*) DESC LIMIT 1', (key,)).fetchone()[0]
+        groups = dict(self.conn.execute(
+            'SELECT group_key, COUNT(*) FROM postings WHERE author_key = ? '
+            'GROUP BY group_key ORDER BY COUNT(*) DESC', (key,)))
+        recent = [AuthorPost(group, item_id, post_id, time, bool(first), title)
+                  for group, item_id, post_id, time, first, title in self.conn.execute(
+                      'SELECT group_key, item_id, post_id, time, started, title FROM postings '
+                      'WHERE author_key = ? ORDER BY time DESC LIMIT ?', (key, limit))]
+        return AuthorHistory(name, posts, threads, started or 0, first_time, last_time, groups, recent)
+
+    def posts(self, author: str) -> Iterator[AuthorPost]:
+        """Yield every post of an author, oldest first"""
+        rows = self.conn.execute(
+            'SELECT group_key, item_id, post_id, time, started, title FROM postings '
+            'WHERE author_key = ? ORDER BY time', (author_key(author),))
+        for group, item_id, post_id, time, first, title in rows:
+            yield AuthorPost(group, item_id, post_id, time, bool(first), title)
+
+    def top_authors(self, limit: int = 20) -> List[Tuple[str, int]]:
+        """(author, post count) of the most active authors"""
+        return self.conn.execute(
+            'SELECT MAX(author), COUNT(*) AS posts FROM postings GROUP BY author_key '
+            'ORDER BY posts DESC LIMIT ?', (limit,)).fetchall()
+
+    def close(self):
+        self.conn.close()
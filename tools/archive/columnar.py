@@ -0,0 +1,225 @@
+"""
+Columnar Export
+
+Streams an archive's threads, posts and lots into compressed Parquet files
+for analytics, laid out as Hive partitions that pandas, DuckDB and
+``pyarrow.dataset`` read directly::
+
+    <out>/posts/archive=net54/forum=39/year=2009/part-0.parquet
+    <out>/threads/archive=net54/forum=39/year=2009/part-0.parquet
+    <out>/lots/archive=heritage/year=2024/part-0.parquet
+
+A query over a year or a forum then only opens that partition's files, and
+only the columns it uses. Author and forum/auction columns are
+dictionary-encoded, since a few thousand names repeat across millions of
+rows.
+
+Records come from ``reader.ArchiveReader``. Rows are buffered per
+partition and written out as row groups of ``batch_rows``, with at most
+``MAX_BUFFERED_ROWS`` held in memory overall, so the export's memory is
+bounded whatever the archive's size.
+
+Needs pyarrow, which is imported only when exporting.
+"""
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .reader import ArchiveReader
+from .records import Lot, Thread
+from .timestamps import parse_timestamp
+
+TABLES = ('threads', 'posts', 'lots')
+
+# Rows per Parquet row group, and rows buffered across all partitions
+BATCH_ROWS = 64 * 1024
+MAX_BUFFERED_ROWS = 512 * 1024
+
+UNKNOWN_YEAR = 'unknown'
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow)") from None
+    return pyarrow, pyarrow.parquet
+
+
+def schemas(pa) -> Dict[str, Any]:
+    """Arrow schema of each exported table"""
+    label = pa.dictionary(pa.int32(), pa.string())
+    price = pa.float64()
+    return {
+        'threads': pa.schema([
+            ('forum_id', label), ('thread_id', pa.string()), ('title', pa.string()),
+            ('author', label), ('reply_count', pa.int64()), ('view_count', pa.int64()),
+            ('created', pa.string()), ('last_reply', pa.string()), ('url', pa.string()),
+            ('post_count', pa.int32()),
+        ]),
+        'posts': pa.schema([
+            ('forum_id', label), ('thread_id', pa.string()), ('post_id', pa.string()),
+            ('author', label), ('title', pa.string()), ('content', pa.string()),
+            ('posted', pa.string()), ('timestamp', pa.int64()),
+        ]),
+        'lots': pa.schema([
+            ('auction_id', label), ('lot_id', pa.string()), ('title', pa.string()),
+            ('description', pa.string()), ('scraped_at', pa.string()),
+            ('estimate_low', price), ('estimate_high', price), ('current_bid', price),
+            ('starting_bid', price), ('realized_price', price), ('images', pa.list_(pa.string())),
+        ]),
+    }
+
+
+def record_year(timestamp: Optional[int], text: Optional[str]) -> str:
+    """Partition year of a record, from its epoch timestamp or date text"""
+    if timestamp is not None:
+        try:
+            return str(datetime.fromtimestamp(timestamp, timezone.utc).year)
+        except (OverflowError, OSError, ValueError):
+            pass
+    # ISO and Tapatalk dates both start with the year
+    if text and text[:4].isdigit() and 1900 < int(text[:4]) < 2100:
+        return text[:4]
+    epoch = parse_timestamp(text) if text else None
+    return UNKNOWN_YEAR if epoch is None else record_year(epoch, None)
+
+
+class PartitionedWriter:
+    """Writes one table's rows into per-partition Parquet files"""
+
+    def __init__(self, directory: Path, schema, batch_rows: int = BATCH_ROWS,
+                 max_buffered_rows: int = MAX_BUFFERED_ROWS, compression: str = 'zstd'):
+        """
+        Args:
+            directory: Table directory; partitions become subdirectories
+            schema: Arrow schema of the rows
+            batch_rows: Rows per row group
+            max_buffered_rows: Rows held across all partitions before the
+                largest buffer is written out early
+            compression: Parquet compression codec
+        """
+        self.pa, self.pq = _pyarrow()
+        self.directory = Path(directory)
+        self.schema = schema
+        self.batch_rows = batch_rows
+        self.max_buffered_rows = max_buffered_rows
+        self.compression = compression
+        self.buffers: Dict[Tuple[Tuple[str, str], ...], List[tuple]] = {}
+        self.writers: Dict[Tuple[Tuple[str, str], ...], Any] = {}
+        self.buffered = 0
+        self.rows = 0
+
+    def add(self, partition: Tuple[Tuple[str, str], ...], row: tuple):
+        """Buffer a row for a partition, given as ((key, value), ...)"""
+        buffer = self.buffers.setdefault(partition, [])
+        buffer.append(row)
+        self.buffered += 1
+        if len(buffer) >= self.batch_rows:
+            self._flush(partition)
+        elif self.buffered >= self.max_buffered_rows:
+            self._flush(max(self.buffers, key=lambda key: len(self.buffers[key])))
+
+    def _flush(self, partition):
+        rows = self.buffers.pop(partition, None)
+        if not rows:
+            return
+        columns = [self.pa.array(column, type=field.type)
+                   for column, field in zip(zip(*rows), self.schema)]
+        writer = self.writers.get(partition)
+        if writer is None:
+            path = self.directory.joinpath(*(f'{key}={value}' for key, value in partition))
+            path.mkdir(parents=True, exist_ok=True)
+            writer = self.writers[partition] = self.pq.ParquetWriter(
+                str(path / 'part-0.parquet'), self.schema, compression=self.compression)
+        writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+        self.buffered -= len(rows)
+        self.rows += len(rows)
+
+    def close(self) -> int:
+        """Write what is buffered, close every file; returns rows written"""
+        for partition in list(self.buffers):
+            self._flush(partition)
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+        return self.rows
+
+
+def replace_partitions(staging: Path, out_dir: Path, tables, archive: str):
+    """Swap an archive's newly written partitions in for the old ones
+
+    Args:
+        staging: Directory the new tables were written to
+        out_dir: Export directory
+        tables: Table names (subdirectories) to swap
+        archive: Archive whose ``archive=`` partitions are replaced
+    """
+    for table in tables:
+        target = Path(out_dir) / table / f'archive={archive}'
+        shutil.rmtree(target, ignore_errors=True)
+        source = Path(staging) / table / f'archive={archive}'
+        if source.is_dir():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source, target)
+
+
+def export_parquet(root: Path, out_dir: Path, archive: str, layout: Optional[str] = None,
+                   processes: Optional[int] = None, batch_rows: int = BATCH_ROWS) -> Dict[str, int]:
+    """Export an archive's threads, posts and lots as partitioned Parquet
+
+    Replaces the archive's partitions from a previous export; other
+    archives' partitions in ``out_dir`` are kept.
+
+    Args:
+        root: Archive data root
+        out_dir: Export directory, one subdirectory per table
+        archive: Archive name, the top partition level
+        layout: 'forums' or 'items'; detected when omitted
+        processes: Worker processes reading the archive
+        batch_rows: Rows per row group
+
+    Returns:
+        Rows written per table
+    """
+    pa, _ = _pyarrow()
+    out_dir = Path(out_dir)
+    staging = out_dir / f'.export-{archive}-{os.getpid()}'
+    shutil.rmtree(staging, ignore_errors=True)
+    table_schemas = schemas(pa)
+    writers = {table: PartitionedWriter(staging / table / f'archive={archive}', table_schemas[table],
+                                        batch_rows=batch_rows)
+               for table in TABLES}
+
+    try:
+        for group, record in ArchiveReader(root, layout).iter_items(processes=processes):
+            if isinstance(record, Thread):
+                forum_id = record.forum_id or group
+                first = record.posts[0] if record.posts else None
+                year = record_year(first.timestamp if first else None,
+                                   record.created or (first.posted if first else None))
+                writers['threads'].add((('forum', forum_id), ('year', year)), (
+                    forum_id, record.id, record.title, record.author, record.reply_count,
+                    record.view_count, record.created, record.last_reply, record.url,
+                    len(record.posts)))
+                for post in record.posts:
+                    writers['posts'].add(
+                        (('forum', forum_id), ('year', record_year(post.timestamp, post.posted))),
+                        (forum_id, record.id, post.id, post.author, post.title, post.content,
+                         post.posted, post.timestamp))
+            elif isinstance(record, Lot):
+                writers['lots'].add((('year', record_year(None, record.scraped_at)),), (
+                    record.auction_id, record.id, record.title, record.description,
+                    record.scraped_at, record.estimate_low, record.estimate_high,
+                    record.current_bid, record.starting_bid, record.realized_price,
+                    list(record.images)))
+        counts = {table: writer.close() for table, writer in writers.items()}
+        replace_partitions(staging, out_dir, TABLES, archive)
+    finally:
+        for writer in writers.values():
+            writer.close()
+        shutil.rmtree(staging, ignore_errors=True)
+    return counts
@@ -0,0 +1,187 @@
+"""
+Incremental Git Commits
+
+Commits scraped data from the archive's change journal instead of running
+``git add`` over the whole data directory:
+
+* Exactly the journaled paths are staged through one
+  ``git update-index --add --remove --stdin`` process per commit.
+* Thread counts for the commit message come from the index
+  (``git ls-files`` / ``git diff --cached``), not from walking the files.
+* The commit is written with ``write-tree`` / ``commit-tree`` /
+  ``update-ref``, which never refresh the index against the working tree.
+
+Scrapers call ``maybe_commit`` at checkpoint boundaries, so data is committed
+from inside the scraping process on a fixed interval.
+"""
+import os
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .journal import ChangeJournal
+
+# Identity for commits made where git has none configured (e.g. a fresh CI runner)
+FALLBACK_NAME = 'GitHub Action'
+FALLBACK_EMAIL = 'action@github.com'
+
+
+class GitError(RuntimeError):
+    """A git command failed"""
+
+
+class IncrementalCommitter:
+    """Stage and commit the files recorded in a change journal"""
+
+    def __init__(self, journal: ChangeJournal, data_dir: Path, interval: float = 3600.0,
+                 push: bool = False, message: str = 'Add scraped data'):
+        """Set up committing for one archive
+
+        Args:
+            journal: The archive storage's change journal
+            data_dir: Archive directory, used to count threads in the index
+            interval: Minimum seconds between commits made by ``maybe_commit``
+            push: Push after every commit
+            message: Commit message prefix
+        """
+        self.journal = journal
+        self.data_dir = Path(data_dir).resolve()
+        self.interval = interval
+        self.push = push
+        self.message = message
+        self.repo_root = Path(self._git('rev-parse', '--show-toplevel', cwd=self.data_dir).strip())
+        self.last_commit_at = time.time()
+
+    def _git(self, *args: str, input: Optional[bytes] = None, cwd: Optional[Path] = None,
+             env: Optional[Dict[str, str]] = None) -> str:
+        result = subprocess.run(
+            ['git', *args],
+            cwd=str(cwd or self.repo_root),
+            input=input,
+            env=env,
+            capture_output=True
+        )
+        if result.returncode != 0:
+            raise GitError(f"git {args[0]} failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return result.stdout.decode('utf-8', 'replace')
+
+    def _head(self) -> Optional[str]:
+        """Current commit, or None in a repository without commits"""
+        result = subprocess.run(['git', 'rev-parse', '--verify', '-q', 'HEAD'],
+                                cwd=str(self.repo_root), capture_output=True)
+        return result.stdout.decode().strip() if result.returncode == 0 else None
+
+    def _identity_env(self) -> Optional[Dict[str, str]]:
+        """Environment supplying the fallback identity, or None if git has one"""
+        env = None
+        for role in ('AUTHOR', 'COMMITTER'):
+            result = subprocess.run(['git', 'var', f'GIT_{role}_IDENT'],
+                                    cwd=str(self.repo_root), capture_output=True)
+            if result.returncode != 0:
+                env = env or dict(os.environ)
+                env[f'GIT_{role}_NAME'] = FALLBACK_NAME
+                env[f'GIT_{role}_EMAIL'] = FALLBACK_EMAIL
+        return env
+
+    def due(self) -> bool:
+        return time.time() - self.last_commit_at >= self.interval
+
+    def maybe_commit(self, before_commit: Optional[Callable[[], None]] = None) -> Optional[str]:
+        """Commit if the interval has passed since the last commit
+
+        Args:
+            before_commit: Called first to bring files to a consistent state
+                (e.g. flush storage, checkpoint the frontier)
+
+        Returns:
+            The new commit ID, or None
+        """
+        if not self.due():
+            return None
+        return self.commit(before_commit)
+
+    def commit(self, before_commit: Optional[Callable[[], None]] = None) -> Optional[str]:
+        """Stage the journaled paths and commit them
+
+        Returns:
+            The new commit ID, or None if nothing changed
+        """
+        if before_commit:
+            before_commit()
+        self.last_commit_at = time.time()
+
+        paths = self.journal.drain()
+        if not paths:
+            return None
+        try:
+            self.stage(paths)
+            counts = self.index_counts()
+            if not counts['added'] and not counts['modified'] and not counts['deleted']:
+                return None
+            commit_id = self.write_commit(self.commit_message(counts))
+        except Exception:
+            # Keep the paths for the next attempt
+            self.journal.restore(paths)
+            raise
+
+        if self.push:
+            try:
+                self._git('push')
+            except GitError as e:
+                # The commit is kept locally and goes out with the next push
+                print(f"⚠️  {e}")
+        return commit_id
+
+    def stage(self, paths: List[str]):
+        """Add, update or remove exactly these paths in the index"""
+        relative = []
+        for path in paths:
+            try:
+                relative.append(os.path.relpath(path, self.repo_root))
+            except ValueError:
+                continue
+        relative = [p for p in relative if not p.startswith('..')]
+        if relative:
+            payload = ''.join(f'{p}\0' for p in relative).encode('utf-8')
+            self._git('update-index', '--add', '--remove', '-z', '--stdin', input=payload)
+
+    def index_counts(self) -> Dict[str, int]:
+        """Thread files staged for this commit and in the index overall"""
+        data_rel = os.path.relpath(self.data_dir, self.repo_root)
+        counts = {'added': 0, 'modified': 0, 'deleted': 0,
+                  'new_threads': 0, 'updated_threads': 0, 'total_threads': 0}
+
+        if self._head():
+            fields = self._git('diff', '--cached', '--name-status', '-z', '--no-renames').split('\0')
+            for status, path in zip(fields[0::2], fields[1::2]):
+                key = {'A': 'added', 'M': 'modified', 'D': 'deleted'}.get(status[:1], 'modified')
+                counts[key] += 1
+                if Path(path).name.startswith('thread_'):
+                    if key == 'added':
+                        counts['new_threads'] += 1
+                    elif key == 'modified':
+                        counts['updated_threads'] += 1
+        else:
+            counts['added'] = 1
+
+        for path in self._git('ls-files', '-z', '--', data_rel).split('\0'):
+            if Path(path).name.startswith('thread_'):
+                counts['total_threads'] += 1
+        return counts
+
+    def commit_message(self, counts: Dict[str, int]) -> str:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
+        return (f"{self.message}: {counts['total_threads']} threads "
+                f"(+{counts['new_threads']} new, {counts['updated_threads']} updated) ({timestamp}) [skip ci]")
+
+    def write_commit(self, message: str) -> str:
+        """Commit the index without refreshing it against the working tree"""
+        tree = self._git('write-tree').strip()
+        head = self._head()
+        parents = ['-p', head] if head else []
+        env = self._identity_env()
+        commit_id = self._git('commit-tree', tree, *parents, '-m', message, env=env).strip()
+        self._git('update-ref', '-m', f'commit: {message}', 'HEAD', commit_id, env=env)
+        return commit_id
@@ -0,0 +1,406 @@
+"""
+Comparable Sales
+
+Realized prices of auction lots by card, in ``<archive root>/index/comps.db``,
+so "every sale of a 1952 Topps Mantle #311 within a grade of PSA 7" is
+one index range read instead of a pass over every lot.
+
+A lot's card identity (year, set, player, number, grader, grade) comes
+from its ``details`` where Heritage labels them and from its title
+otherwise: sets, players and graders through the entity dictionary
+(``entities.py``), the year and the ``#number`` by pattern, and the grade
+on the 10-point scale (``offers.grade_value``, so SGC 84 is a 7). The
+grade is not part of the card key, so one key covers every grade of a
+card and the grade window is a range on the grade column.
+
+For statistics, ``PriceVectors`` loads every sale once into NumPy arrays
+ordered by card and date, with each card's slice found by a dict lookup;
+a card's median, percentiles and trend are then computed on an array view
+in microseconds, without touching SQLite.
+"""
+import re
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .entities import default_tagger
+from .offers import grade_value
+from .records import Lot
+from .timestamps import MISSING, parse_timestamps
+
+COMPS_DB = 'comps.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (group_key, item_id)
+);
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY,
+    card_key TEXT NOT NULL,
+    grade REAL,
+    time INTEGER NOT NULL,
+    price REAL NOT NULL,
+    grader TEXT,
+    year INTEGER,
+    set_name TEXT NOT NULL DEFAULT '',
+    player TEXT NOT NULL DEFAULT '',
+    number TEXT NOT NULL DEFAULT '',
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS sales_card ON sales (card_key, grade, time);
+CREATE INDEX IF NOT EXISTS sales_item ON sales (group_key, item_id);
+"""
+
+YEAR = re.compile(r'\b(18[6-9]\d|19\d\d|20[0-4]\d)\b')
+NUMBER = re.compile(r'(?:#|\bno\.\s?)\s?([a-z]{0,3}-?\d{1,4}[a-z]?)\b', re.I)
+# "PSA NM-MT 8", "SGC 84 NM 7", "BGS 8.5": the grader, any condition
+# words, and the first number
+GRADE = re.compile(r'\b(PSA|SGC|BGS|BVG|GAI|GMA|KSA|CSG|HGA)(?:/DNA)?\b[\s:]*'
+                   r'(?:(?:gem|mint|mt|nm|ex|vg|good|fair|poor|pr|fr|gd|[-+/])\s*){0,4}'
+                   r'(\d{1,3}(?:\.5)?)(?![\d.])', re.I)
+
+# Heritage's lot detail labels, lower case, by identity field
+DETAIL_LABELS = {
+    'year': ('year', 'season'),
+    'set': ('set', 'set name', 'series'),
+    'player': ('player', 'player name', 'subject'),
+    'number': ('card number', 'card #', 'card no', 'card no.', 'number'),
+    'grader': ('grading service', 'grading company', 'grader', 'certification'),
+    'grade': ('grade', 'numeric grade'),
+    'date': ('date sold', 'sale date', 'auction date', 'closing date', 'date'),
+}
+
+YEAR_SECONDS = 365.2425 * 86400
+PERCENTILES = (10, 25, 50, 75, 90)
+QUANTILES = np.array(PERCENTILES) / 100
+
+
+@dataclass(frozen=True)
+class CardIdentity:
+    """What a lot sold, as far as its title and details say"""
+    year: Optional[int]
+    set_name: str
+    player: str           # canonical names, '/'-joined for multi-player cards
+    number: str
+    grader: Optional[str]
+    grade: Optional[float]    # on the 10-point scale
+
+    @property
+    def key(self) -> Optional[str]:
+        """The card without its grading, or None if too little is known to compare it
+
+        The year is left out: set names either start with it (1952 Topps)
+        or are catalog codes that imply it (T206). So is the number when the
+        player is known, since a set has one card of most players and titles
+        often omit the number.
+        """
+        if not self.set_name or not (self.player or self.number):
+            return None
+        return f"{self.set_name}|{self.player or '#' + self.number}".casefold()
+
+    def __str__(self) -> str:
+        parts = [str(self.year) if self.year and not self.set_name.startswith(str(self.year)) else '',
+                 self.set_name, self.player, f'#{self.number}' if self.number else '']
+        if self.grader:
+            grade = '' if self.grade is None else f' {self.grade:g}'
+            parts.append(f'{self.grader}{grade}')
+        return ' '.join(part for part in parts if part)
+
+
+def _detail(details: Dict[str, str], field: str) -> str:
+    labels = DETAIL_LABELS[field]
+    for label, value in details.items():
+        if label.strip().rstrip(':').casefold() in labels and str(value).strip():
+            return str(value).strip()
+    return ''
+
+
+def card_identity(title: str, details: Optional[Dict[str, str]] = None) -> CardIdentity:
+    """Card identity of a lot (or of a query written like a lot title)
+
+    Args:
+        title: Lot title, e.g. ``1952 Topps Mickey Mantle #311 PSA NM 7``
+        details: The lot's labelled details; a labelled field wins over the title
+    """
+    details = details or {}
+    tagger = default_tagger()
+    found: Dict[str, List[Tuple[int, str]]] = {}
+    for text in (_detail(details, 'set'), _detail(details, 'player'), title):
+        for entity, mentions in tagger.tag(text).items():
+            kind, name = tagger.entities[entity]
+            found.setdefault(kind, []).append((-mentions, name))
+        if found.get('set') and found.get('player'):
+            break
+
+    year_text = _detail(details, 'year') or title
+    year_match = YEAR.search(year_text)
+    year = int(year_match.group(1)) if year_match else None
+
+    sets = [name for _, name in sorted(found.get('set', ()))]
+    # A set named by the year (1952 Topps) over one that is not (T206)
+    set_name = next((name for name in sets if year and name.startswith(str(year))), sets[0] if sets else '')
+    if not set_name and year and found.get('manufacturer'):
+        set_name = f"{year} {sorted(found['manufacturer'])[0][1]}"
+    if year is None and set_name[:4].isdigit():
+        year = int(set_name[:4])
+    player = '/'.join(sorted({name for _, name in found.get('player', ())}))
+
+    number = _detail(details, 'number').lstrip('#').strip()
+    if not number:
+        number_match = NUMBER.search(title)
+        number = number_match.group(1) if number_match else ''
+
+    grader = _detail(details, 'grader').upper() or None
+    grade_text = _detail(details, 'grade')
+    if not grader or not grade_text:
+        grade_match = GRADE.search(title)
+        if grade_match:
+            grader = grader or grade_match.group(1).upper()
+            grade_text = grade_text or grade_match.group(2)
+    grade = None
+    if grader and grade_text:
+        numbers = re.findall(r'\d{1,3}(?:\.5)?', grade_text)
+        grade = grade_value(grader, numbers[-1 if grader != 'SGC' else 0]) if numbers else None
+    return CardIdentity(year, set_name, player, number.upper(), grader, grade)
+
+
+@dataclass
+class Sale:
+    """One realized price"""
+    time: int             # epoch seconds of the sale (or of the scrape, when the lot gives no date)
+    price: float
+    grader: Optional[str]
+    grade: Optional[float]
+    group: str
+    item_id: str
+    title: str
+
+
+@dataclass
+class PriceSummary:
+    """Statistics of a card's realized prices"""
+    count: int
+    percentiles: Dict[int, float]     # PERCENTILES -> price
+    first_time: int
+    last_time: int
+    trend: Optional[float]            # yearly price change (0.1 is +10%), None under two dates
+
+    @property
+    def median(self) -> float:
+        return self.percentiles[50]
+
+
+class PriceVectors:
+    """Every sale of an index as NumPy arrays, ordered by card, then date"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        rows = conn.execute('SELECT card_key, time, price, grade, id FROM sales '
+                            'ORDER BY card_key, time, id').fetchall()
+        count = len(rows)
+        keys = [row[0] for row in rows]
+        self.times = np.fromiter((row[1] for row in rows), dtype=np.int64, count=count)
+        self.prices = np.fromiter((row[2] for row in rows), dtype=np.float64, count=count)
+        self.logs = np.log(self.prices)
+        self.grades = np.fromiter((np.nan if row[3] is None else row[3] for row in rows),
+                                  dtype=np.float64, count=count)
+        self.ids = np.fromiter((row[4] for row in rows), dtype=np.int64, count=count)
+        self.cards: Dict[str, Tuple[int, int]] = {}
+        start = 0
+        for end in range(1, count + 1):
+            if end == count or keys[end] != keys[start]:
+                self.cards[keys[start]] = (start, end)
+                start = end
+
+    def select(self, card_key: str, grade: Optional[float] = None, window: float = 1.0,
+               since: Optional[int] = None) -> np.ndarray:
+        """Positions of a card's sales within ``window`` of a grade, in date order"""
+        start, end = self.cards.get(card_key, (0, 0))
+        positions = np.arange(start, end)
+        if grade is not None:
+            grades = self.grades[start:end]
+            positions = positions[np.abs(grades - grade) <= window]
+        if since is not None:
+            positions = positions[self.times[positions] >= since]
+        return positions
+
+    def summary(self, positions: np.ndarray) -> Optional[PriceSummary]:
+        """Median, percentiles and trend of the sales at ``positions``"""
+        if not len(positions):
+            return None
+        prices = np.sort(self.prices[positions])
+        times = self.times[positions]
+        # Linear interpolation between ranks, as np.percentile does, without its overhead
+        ranks = QUANTILES * (len(prices) - 1)
+        below = ranks.astype(np.int64)
+        above = np.minimum(below + 1, len(prices) - 1)
+        values = prices[below] + (prices[above] - prices[below]) * (ranks - below)
+        percentiles = dict(zip(PERCENTILES, values.tolist()))
+        # Least-squares slope of log price over years
+        years = (times - times.mean()) / YEAR_SECONDS
+        spread = float(years @ years)
+        trend = None
+        if spread > 0:
+            logs = self.logs[positions]
+            trend = float(np.expm1((years @ (logs - logs.mean())) / spread))
+        return PriceSummary(len(prices), percentiles, int(times[0]), int(times[-1]), trend)
+
+
+class ComparablesIndex:
+    """Realized-price index of one archive's lots"""
+
+    def __init__(self, directory: Path):
+        """Open (creating if needed) the comparables index in ``directory``
+
+        Args:
+            directory: The archive's index directory
+        """
+        self.path = Path(directory) / COMPS_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._in_batch = False
+        self._vectors: Optional[PriceVectors] = None
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Run the updates made inside as one transaction"""
+        if self._in_batch:
+            yield
+            return
+        self.conn.execute('BEGIN IMMEDIATE')
+        self._in_batch = True
+        try:
+            yield
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        else:
+            self.conn.execute('COMMIT')
+        finally:
+            self._in_batch = False
+
+    @staticmethod
+    def analyze(record) -> Optional[Tuple[CardIdentity, int]]:
+        """Card identity and sale time of a sold lot; None for anything else"""
+        if not isinstance(record, Lot) or not record.realized_price:
+            return None
+        identity = card_identity(record.title, record.details)
+        if identity.key is None:
+            return None
+        sold, scraped = parse_timestamps([_detail(record.details, 'date') or None, record.scraped_at])
+        time = sold if sold != MISSING else scraped
+        return (identity, int(time)) if time != MISSING else None
+
+    def index_item(self, group: str, item_id: str, record, stat, analysis=None):
+        """Replace the sale of one item
+
+        Args:
+            group: Forum ID or item type
+            item_id: Thread or item ID
+            record: ``records.Thread`` or ``records.Lot``; only sold lots
+                with a recognizable card are kept
+            stat: ``os.stat`` of the item's file, to detect later changes
+            analysis: ``analyze(record)``, if already done
+        """
+        if analysis is None:
+            analysis = self.analyze(record)
+        with self.batch():
+            self.conn.execute('DELETE FROM sales WHERE group_key = ? AND item_id = ?', (group, item_id))
+            if analysis is not None:
+                identity, time = analysis
+                self.conn.execute(
+                    'INSERT INTO sales (card_key, grade, time, price, grader, year, set_name, player, '
+                    'number, group_key, item_id, title) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (identity.key, identity.grade, time, record.realized_price, identity.grader,
+                     identity.year, identity.set_name, identity.player, identity.number,
+                     group, item_id, record.title))
+            self.conn.execute(
+                'INSERT OR REPLACE INTO items (group_key, item_id, mtime_ns, size) VALUES (?, ?, ?, ?)',
+                (group, item_id, stat.st_mtime_ns, stat.st_size))
+        if analysis is not None:
+            self._vectors = None
+
+    def remove_item(self, group: str, item_id: str):
+        """Drop an item and its sale"""
+        with self.batch():
+            self.conn.execute('DELETE FROM sales WHERE group_key = ? AND item_id = ?', (group, item_id))
+            self.conn.execute('DELETE FROM items WHERE group_key = ? AND item_id = ?', (group, item_id))
+        self._vectors = None
+
+    def item_state(self, group: str) -> Dict[str, Tuple[int, int]]:
+        """Item ID -> (mtime_ns, size) of the file each item was indexed from"""
+        rows = self.conn.execute('SELECT item_id, mtime_ns, size FROM items WHERE group_key = ?', (group,))
+        return {item_id: (mtime_ns, size) for item_id, mtime_ns, size in rows}
+
+    def load_vectors(self) -> PriceVectors:
+        """Load the price arrays unless they are current, and return them"""
+        if self._vectors is None:
+            self._vectors = PriceVectors(self.conn)
+        return self._vectors
+
+    @property
+    def vectors(self) -> PriceVectors:
+        """The price arrays, loaded on first use and after the index changed"""
+        return self.load_vectors()
+
+    def sales(self, identity: CardIdentity, window: float = 1.0, grader: Optional[str] = None,
+              since: Optional[int] = None, limit: Optional[int] = None) -> List[Sale]:
+        """Realized prices of a card within ``window`` grades of the identity's, by date
+
+        Args:
+            identity: The card; every grade when its grade is unknown
+            window: Grades either side of the identity's grade
+            grader: Only slabs of this grading company
+            since: Only sales from this epoch time on
+            limit: The most recent ``limit`` sales
+        """
+        if identity.key is None:
+            return []
+        sql = ('SELECT time, price, grader, grade, group_key, item_id, title FROM sales '
+               'WHERE card_key = ?')
+        params: list = [identity.key]
+        if identity.grade is not None:
+            sql += ' AND grade BETWEEN ? AND ?'
+            params += [identity.grade - window, identity.grade + window]
+        if grader is not None:
+            sql += ' AND grader = ?'
+            params.append(grader.upper())
+        if since is not None:
+            sql += ' AND time >= ?'
+            params.append(since)
+        sql += ' ORDER BY time DESC, id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [Sale(*row) for row in reversed(self.conn.execute(sql, params).fetchall())]
+
+    def summary(self, identity: CardIdentity, window: float = 1.0,
+                since: Optional[int] = None) -> Optional[PriceSummary]:
+        """Price statistics of a card within ``window`` grades; None if it never sold"""
+        if identity.key is None:
+            return None
+        vectors = self.vectors
+        return vectors.summary(vectors.select(identity.key, identity.grade, window, since))
+
+    def cards(self, limit: int = 20) -> List[Tuple[str, int, float]]:
+        """(example title, sales, median price) of the most sold cards"""
+        rows = self.conn.execute('SELECT card_key, COUNT(*) AS sold, MIN(title) FROM sales '
+                                 'GROUP BY card_key ORDER BY sold DESC LIMIT ?', (limit,)).fetchall()
+        vectors = self.vectors
+        return [(title, sold, float(np.median(vectors.prices[slice(*vectors.cards[key])])))
+                for key, sold, title in rows]
+
+    def close(self):
+        self.conn.close()
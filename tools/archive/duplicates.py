@@ -0,0 +1,478 @@
+"""
+Near-Duplicate Index
+
+Dealers repost the same for-sale text across threads and forums, and
+migrated threads repeat content word for word, usually with a changed
+price or signature. ``<archive root>/index/dedup.db`` keeps a MinHash
+signature per document so such near-duplicates can be found across the
+whole archive without comparing every pair of documents.
+
+A document is a post, a whole thread (all its posts together) or a lot
+(title and description together). Its text is normalized like entity
+tagging does, quoted replies are dropped (they are duplicates of the post
+they quote), and it is cut into word 3-shingles. ``NUM_PERM`` hash
+functions of the form ``(a * x + b) >> 32`` map the shingles, and the
+minimum of each is the signature: two signatures agree in a position with
+probability equal to the Jaccard similarity of their shingle sets. All of
+a record's documents are hashed in one NumPy pass by ``analyze``, which
+``ArchiveIndexes.refresh`` runs in its reader worker processes.
+
+``clusters`` finds the duplicates with LSH banding: signatures are cut
+into ``BANDS`` bands of ``ROWS`` rows, documents sharing a band land in one
+bucket, and only bucket members are compared, by signature agreement.
+Buckets are found by sorting each band's keys, so a report is a few
+vectorized passes over the signatures rather than a comparison of every
+pair. Documents with fewer than ``MIN_SHINGLES`` shingles ("Bump", "PM
+sent") are not indexed: they are alike without being reposts.
+
+Each document also keeps a digest of its exact text, so the report can say
+how much of the archive is byte-for-byte repetition.
+"""
+import hashlib
+import re
+import sqlite3
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .entities import normalize
+from .records import Lot, Thread
+
+DEDUP_DB = 'dedup.db'
+
+SHINGLE = 3          # words per shingle
+NUM_PERM = 64        # hash functions, i.e. signature length
+BANDS = 16           # LSH bands of ROWS signature positions each
+ROWS = NUM_PERM // BANDS
+MIN_SHINGLES = 8     # shorter documents are not indexed
+SEED = 0x5EED
+
+# Parameters a stored signature depends on; an index built with others is
+# emptied when opened
+FINGERPRINT = f'minhash:{SHINGLE}:{NUM_PERM}:{SEED}'
+
+QUOTE = re.compile(r'\[quote[^\]]*\].*?\[/quote\]', re.IGNORECASE | re.DOTALL)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (group_key, item_id)
+);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    author TEXT NOT NULL DEFAULT '',
+    shingles INTEGER NOT NULL,
+    chars INTEGER NOT NULL,
+    digest INTEGER NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_item ON docs (group_key, item_id);
+CREATE INDEX IF NOT EXISTS docs_kind ON docs (kind);
+"""
+
+KINDS = ('post', 'thread', 'lot')
+
+_MASK = (1 << 64) - 1
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_MIX2 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX3 = np.uint64(0x94D049BB133111EB)
+
+
+def _splitmix64(state: int, count: int) -> List[int]:
+    """``count`` pseudo-random 64-bit integers, the same on every platform"""
+    values = []
+    for _ in range(count):
+        state = (state + 0x9E3779B97F4A7C15) & _MASK
+        z = state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+        values.append(z ^ (z >> 31))
+    return values
+
+
+_RANDOM = _splitmix64(SEED, 2 * NUM_PERM)
+# Multipliers odd, so every hash function is a bijection before the shift
+PERM_A = np.array([value | 1 for value in _RANDOM[:NUM_PERM]], dtype=np.uint64)[:, None]
+PERM_B = np.array(_RANDOM[NUM_PERM:], dtype=np.uint64)[:, None]
+
+# Shingles hashed per block, bounding the (permutations x shingles) matrix
+_BLOCK = 1 << 15
+
+# (post ID or '', kind, author, shingles, chars, digest, signature bytes) per document
+Document = Tuple[str, str, str, int, int, int, bytes]
+
+
+def shingles(text: str) -> np.ndarray:
+    """32-bit hashes of the word 3-shingles of a text, quotes removed
+
+    Words are hashed with CRC-32 and combined with 64-bit multiply-xor
+    mixing, so the hashes are the same in every process and Python
+    version (unlike ``hash``).
+    """
+    words = normalize(QUOTE.sub(' ', text)).split()
+    if len(words) < SHINGLE:
+        return np.empty(0, dtype=np.uint64)
+    hashed = np.fromiter((zlib.crc32(word.encode()) for word in words), dtype=np.uint64, count=len(words))
+    combined = hashed[:-2] * _MIX
+    combined = (combined ^ hashed[1:-1]) * _MIX2
+    combined = (combined ^ hashed[2:]) * _MIX3
+    return (combined ^ (combined >> np.uint64(31))) >> np.uint64(32)
+
+
+def signatures(shingle_sets: Sequence[np.ndarray]) -> np.ndarray:
+    """MinHash signatures of non-empty shingle sets, as a (sets, NUM_PERM) uint32 array
+
+    All sets are hashed together: the shingles are concatenated, every hash
+    function is applied to all of them at once, and ``np.minimum.reduceat``
+    takes each set's minimum.
+    """
+    if not shingle_sets:
+        return np.empty((0, NUM_PERM), dtype=np.uint32)
+    lengths = np.fromiter(map(len, shingle_sets), dtype=np.int64, count=len(shingle_sets))
+    values = np.concatenate(shingle_sets)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    result = np.full((NUM_PERM, len(shingle_sets)), np.iinfo(np.uint32).max, dtype=np.uint32)
+    for block_start in range(0, len(values), _BLOCK):
+        block_end = block_start + _BLOCK
+        # The sets overlapping this block, and where each starts within it
+        first = np.searchsorted(starts, block_start, side='right') - 1
+        last = np.searchsorted(starts, block_end, side='left')
+        offsets = np.maximum(starts[first:last], block_start) - block_start
+        hashed = (PERM_A * values[block_start:block_end] + PERM_B) >> np.uint64(32)
+        minima = np.minimum.reduceat(hashed, offsets, axis=1).astype(np.uint32)
+        np.minimum(result[:, first:last], minima, out=result[:, first:last])
+    return np.ascontiguousarray(result.T)
+
+
+def band_keys(signature_matrix: np.ndarray) -> np.ndarray:
+    """(documents, BANDS) uint64 keys, equal where two signatures share a band"""
+    rows = signature_matrix.reshape(len(signature_matrix), BANDS, ROWS).astype(np.uint64)
+    keys = np.zeros(rows.shape[:2], dtype=np.uint64)
+    for row in range(ROWS):
+        keys = (keys ^ rows[:, :, row]) * _MIX
+        keys ^= keys >> np.uint64(29)
+    return keys
+
+
+def candidate_pairs(signature_matrix: np.ndarray) -> np.ndarray:
+    """(pairs, 2) row indexes of documents sharing at least one band
+
+    In each band, every member of a bucket is paired with the bucket's
+    first member only, so a bucket of n documents gives n - 1 pairs, not
+    n * (n - 1) / 2; clustering the verified pairs still joins them all.
+    """
+    keys = band_keys(signature_matrix)
+    count = len(keys)
+    pairs = []
+    positions = np.arange(count)
+    for band in range(BANDS):
+        order = np.argsort(keys[:, band], kind='stable')
+        ordered = keys[order, band]
+        starts = np.ones(count, dtype=bool)
+        starts[1:] = ordered[1:] != ordered[:-1]
+        first = np.maximum.accumulate(np.where(starts, positions, 0))
+        members = ~starts
+        pairs.append(np.stack((order[first[members]], order[members]), axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.concatenate(pairs)
+    pairs.sort(axis=1)
+    return np.unique(pairs, axis=0)
+
+
+def agreement(signature_matrix: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of each pair: the share of equal signature positions"""
+    result = np.empty(len(pairs), dtype=np.float64)
+    for start in range(0, len(pairs), _BLOCK):
+        chunk = pairs[start:start + _BLOCK]
+        equal = signature_matrix[chunk[:, 0]] == signature_matrix[chunk[:, 1]]
+        result[start:start + _BLOCK] = equal.mean(axis=1)
+    return result
+
+
+def components(count: int, pairs: np.ndarray) -> np.ndarray:
+    """Connected component of each of ``count`` nodes: the smallest node in it
+
+    Label propagation with pointer jumping, every step vectorized over all
+    edges; converges in a few steps because candidate pairs are star-shaped.
+    """
+    labels = np.arange(count)
+    if not len(pairs):
+        return labels
+    left, right = pairs[:, 0], pairs[:, 1]
+    while True:
+        lowest = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, lowest)
+        np.minimum.at(updated, right, lowest)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def _digest(text: str) -> int:
+    """Signed 64-bit digest of a document's exact text"""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+@dataclass
+class DuplicateDocument:
+    """One document of a duplicate cluster"""
+    group: str
+    item_id: str
+    post_id: str        # '' for a whole thread or a lot
+    author: str
+    title: str
+    chars: int
+    similarity: float   # estimated, to the cluster's first document
+
+
+@dataclass
+class DuplicateCluster:
+    """Documents that are near-duplicates of one another"""
+    kind: str
+    documents: List[DuplicateDocument] = field(default_factory=list)
+    exact: int = 0      # documents repeating an earlier one byte for byte
+
+    @property
+    def items(self) -> int:
+        """Distinct threads or lots the documents are in"""
+        return len({(document.group, document.item_id) for document in self.documents})
+
+
+class DuplicateIndex:
+    """MinHash signature index of one archive"""
+
+    def __init__(self, directory: Path):
+        """Open (creating if needed) the duplicate index in ``directory``
+
+        Args:
+            directory: The archive's index directory
+        """
+        self.path = Path(directory) / DEDUP_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._in_batch = False
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'parameters'").fetchone()
+        if row is None or row[0] != FINGERPRINT:
+            with self.batch():
+                self.conn.execute('DELETE FROM docs')
+                self.conn.execute('DELETE FROM items')
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('parameters', ?)",
+                                  (FINGERPRINT,))
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Run the updates made inside as one transaction"""
+        if self._in_batch:
+            yield
+            return
+        self.conn.execute('BEGIN IMMEDIATE')
+        self._in_batch = True
+        try:
+            yield
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        else:
+            self.conn.execute('COMMIT')
+        finally:
+            self._in_batch = False
+
+    @staticmethod
+    def analyze(record) -> List[Document]:
+        """Shingle and MinHash every document of a record (the CPU-heavy part of indexing it)"""
+        if isinstance(record, Lot):
+            texts = [('', 'lot', '', f'{record.title}\n{record.description}')]
+        elif isinstance(record, Thread):
+            texts = [(post.id, 'post', post.author, post.content) for post in record.posts]
+        else:
+            raise TypeError(f"Cannot index {type(record).__name__}")
+        kept = []
+        for post_id, kind, author, text in texts:
+            hashed = shingles(text)
+            if len(hashed) >= MIN_SHINGLES:
+                kept.append((post_id, kind, author, text, hashed))
+        if not kept:
+            return []
+        matrix = signatures([hashed for *_, hashed in kept])
+        documents = [(post_id, kind, author, len(hashed), len(text), _digest(text), signature.tobytes())
+                     for (post_id, kind, author, text, hashed), signature in zip(kept, matrix)]
+        if isinstance(record, Thread):
+            # A thread's signature is that of the union of its posts' shingles
+            documents.append(('', 'thread', record.author, sum(len(hashed) for *_, hashed in kept),
+                              sum(len(text) for _, _, _, text, _ in kept),
+                              _digest('\x00'.join(text for _, _, _, text, _ in kept)),
+                              matrix.min(axis=0).tobytes()))
+        return documents
+
+    def index_item(self, group: str, item_id: str, record, stat, analysis: Optional[List[Document]] = None):
+        """Replace the signatures of one item
+
+        Args:
+            group: Forum ID or item type
+            item_id: Thread or item ID
+            record: ``records.Thread`` or ``records.Lot``
+            stat: ``os.stat`` of the item's file, to detect later changes
+            analysis: ``analyze(record)``, if already done
+        """
+        if analysis is None:
+            analysis = self.analyze(record)
+        rows = [(group, item_id, post_id, kind, author, count, chars, digest, signature)
+                for post_id, kind, author, count, chars, digest, signature in analysis]
+        with self.batch():
+            self.conn.execute('DELETE FROM docs WHERE group_key = ? AND item_id = ?', (group, item_id))
+            self.conn.executemany(
+                'INSERT INTO docs (group_key, item_id, post_id, kind, author, shingles, chars, digest, '
+                'signature) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self.conn.execute(
+                'INSERT OR REPLACE INTO items (group_key, item_id, title, mtime_ns, size) '
+                'VALUES (?, ?, ?, ?, ?)', (group, item_id, record.title, stat.st_mtime_ns, stat.st_size))
+
+    def remove_item(self, group: str, item_id: str):
+        """Drop an item and its signatures"""
+        with self.batch():
+            self.conn.execute('DELETE FROM docs WHERE group_key = ? AND item_id = ?', (group, item_id))
+            self.conn.execute('DELETE FROM items WHERE group_key = ? AND item_id = ?', (group, item_id))
+
+    def item_state(self, group: str) -> Dict[str, Tuple[int, int]]:
+        """Item ID -> (mtime_ns, size) of the file each item was indexed from"""
+        rows = self.conn.execute('SELECT item_id, mtime_ns, size FROM items WHERE group_key = ?', (group,))
+        return {item_id: (mtime_ns, size) for item_id, mtime_ns, size in rows}
+
+    def _load(self, kind: str, group: Optional[str]) -> Tuple[list, np.ndarray]:
+        """Rows and the (documents, NUM_PERM) signature matrix of one kind"""
+        sql = ("SELECT docs.group_key, docs.item_id, docs.post_id, docs.author, "
+               "COALESCE(items.title, ''), docs.chars, docs.digest, docs.signature FROM docs "
+               "LEFT JOIN items USING (group_key, item_id) WHERE docs.kind = ?")
+        params: list = [kind]
+        if group is not None:
+            sql += ' AND docs.group_key = ?'
+            params.append(str(group))
+        rows = self.conn.execute(sql + ' ORDER BY docs.id', params).fetchall()
+        matrix = np.frombuffer(b''.join(row[-1] for row in rows), dtype=np.uint32)
+        return rows, matrix.reshape(len(rows), NUM_PERM)
+
+    def clusters(self, kind: str = 'post', threshold: float = 0.8, group: Optional[str] = None,
+                 min_size: int = 2) -> List[DuplicateCluster]:
+        """Clusters of near-duplicate documents, largest first
+
+        Pairs at or above the threshold link documents into components, which
+        can chain through documents less alike end to end, so a component is
+        split around leaders: its earliest document takes every member at
+        least ``threshold`` similar to it, then the earliest one left does the
+        same. Similarities are reported against the cluster's first document.
+
+        Args:
+            kind: 'post', 'thread' or 'lot'
+            threshold: Minimum estimated Jaccard similarity to the cluster's first document
+            group: Only documents of this forum ID or item type
+            min_size: Smallest cluster reported
+
+        Raises:
+            ValueError: If kind is not one of ``KINDS``
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown document kind: {kind} (expected one of {', '.join(KINDS)})")
+        min_size = max(min_size, 2)
+        rows, matrix = self._load(kind, group)
+        pairs = candidate_pairs(matrix)
+        similar = agreement(matrix, pairs)
+        labels = components(len(rows), pairs[similar >= threshold])
+        sizes = np.bincount(labels, minlength=len(rows))
+        linked = np.flatnonzero(sizes[labels] >= min_size)
+        # Members of each component together, in document order
+        linked = linked[np.argsort(labels[linked], kind='stable')]
+        bounds = np.flatnonzero(np.diff(labels[linked])) + 1
+
+        result = []
+        for component in np.split(linked, bounds):
+            while len(component) >= min_size:
+                scores = (matrix[component] == matrix[component[0]]).mean(axis=1)
+                taken = scores >= threshold
+                if taken.sum() >= min_size:
+                    result.append(self._cluster(kind, rows, component[taken], scores[taken]))
+                component = component[~taken]
+        return sorted(result, key=lambda cluster: (-len(cluster.documents), cluster.documents[0].group,
+                                                   cluster.documents[0].item_id))
+
+    @staticmethod
+    def _cluster(kind: str, rows: list, members: np.ndarray, scores: np.ndarray) -> DuplicateCluster:
+        """A cluster of the given rows, with their similarity to the first"""
+        cluster = DuplicateCluster(kind)
+        seen = set()
+        for position, score in zip(members.tolist(), scores.tolist()):
+            group_key, item_id, post_id, author, title, chars, digest, _ = rows[position]
+            cluster.documents.append(DuplicateDocument(group_key, item_id, post_id, author, title,
+                                                       chars, score))
+            # Exact repeats: documents whose digest an earlier member has
+            if digest in seen:
+                cluster.exact += 1
+            seen.add(digest)
+        return cluster
+
+    def similar(self, group: str, item_id: str, post_id: str = '', threshold: float = 0.8,
+                limit: int = 20) -> List[DuplicateDocument]:
+        """Near-duplicates of one indexed document, most similar first
+
+        Compares its signature with every signature of its kind in one
+        vectorized pass.
+
+        Args:
+            group: Forum ID or item type of the document
+            item_id: Thread or item ID
+            post_id: Post ID, or '' for the whole thread or the lot
+            threshold: Minimum estimated Jaccard similarity
+            limit: Maximum documents
+
+        Raises:
+            KeyError: If the document is not indexed (too short, or not indexed yet)
+        """
+        row = self.conn.execute('SELECT kind, signature FROM docs WHERE group_key = ? AND item_id = ? '
+                                'AND post_id = ?', (str(group), str(item_id), str(post_id))).fetchone()
+        if row is None:
+            raise KeyError(f"{group}/{item_id}#{post_id}" if post_id else f"{group}/{item_id}")
+        kind, signature = row
+        rows, matrix = self._load(kind, None)
+        scores = (matrix == np.frombuffer(signature, dtype=np.uint32)).mean(axis=1)
+        hits = []
+        for position in np.argsort(-scores, kind='stable'):
+            if scores[position] < threshold or len(hits) >= limit:
+                break
+            group_key, hit_item, hit_post, author, title, chars, _, _ = rows[position]
+            if (group_key, hit_item, hit_post) == (str(group), str(item_id), str(post_id)):
+                continue
+            hits.append(DuplicateDocument(group_key, hit_item, hit_post, author, title, chars,
+                                          float(scores[position])))
+        return hits
+
+    def redundancy(self, kind: str = 'post') -> Tuple[int, int]:
+        """(documents, characters) repeating an earlier document of the kind byte for byte"""
+        row = self.conn.execute(
+            'SELECT COALESCE(SUM(copies - 1), 0), COALESCE(SUM((copies - 1) * chars), 0) FROM '
+            '(SELECT COUNT(*) AS copies, MAX(chars) AS chars FROM docs WHERE kind = ? GROUP BY digest)',
+            (kind,)).fetchone()
+        return row[0], row[1]
+
+    def close(self):
+        self.conn.close()
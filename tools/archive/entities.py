@@ -0,0 +1,409 @@
+"""
+Card Entity Tagging
+
+A dictionary of the sets, players, manufacturers and grading companies
+collectors talk about, and ``EntityTagger``, which finds all of them in a
+text in one pass: the dictionary's aliases are compiled into an
+Aho-Corasick automaton, so tagging costs one step per character of the
+text however many names the dictionary holds.
+
+Text and aliases are normalized alike (case-folded, every run of
+punctuation and spaces made one space), so ``T-206``, ``t206`` and
+``T 206`` all tag the T206 set, and a match counts only on word
+boundaries (``Ruth`` tags Babe Ruth, ``Truth`` does not). Overlapping
+names all count: ``1952 Topps Mickey Mantle`` is the 1952 Topps set, the
+Topps manufacturer and Mickey Mantle.
+
+The tag index (``tags.py``) stores a fingerprint of the dictionary, so
+editing it here makes ``collectibles.py index`` retag the archive.
+"""
+import hashlib
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+KINDS = ('set', 'player', 'manufacturer', 'grader')
+
+# Canonical name -> extra aliases; every canonical name is also its own alias
+GRADERS: Dict[str, Sequence[str]] = {
+    'PSA': ('PSA/DNA', 'Professional Sports Authenticator'),
+    'SGC': ('Sportscard Guaranty',),
+    'Beckett': ('BGS', 'BVG', 'Beckett Vintage', 'Beckett Grading'),
+    'GAI': ('Global Authentication',),
+    'GMA': (),
+    'KSA': (),
+    'CSG': ('Certified Sports Guaranty',),
+    'HGA': ('Hybrid Grading',),
+}
+
+MANUFACTURERS: Dict[str, Sequence[str]] = {
+    'Topps': (),
+    'Bowman': (),
+    'Goudey': ('Goudey Gum',),
+    'Fleer': (),
+    'Donruss': (),
+    'Upper Deck': (),
+    'Leaf': (),
+    'Gum Inc.': ('Gum Inc', 'Play Ball'),
+    'National Chicle': ('Diamond Stars',),
+    'Delong': (),
+    'Cracker Jack': ('Rueckheim',),
+    'American Caramel': (),
+    'American Tobacco Company': ('ATC', 'American Tobacco'),
+    'Goodwin & Co.': ('Goodwin', 'Old Judge', 'Gypsy Queen'),
+    'Allen & Ginter': ('Allen and Ginter', 'A&G'),
+    'Kimball': (),
+    'Mayo': ("Mayo's", 'Mayo Cut Plug'),
+    'Zeenut': ('Collins-McCarthy', 'Collins McCarthy'),
+    'Obak': (),
+    'Piedmont': (),
+    'Sweet Caporal': ('SC',),
+    'Polar Bear': (),
+    'Hassan': (),
+    'Old Mill': (),
+    'Sovereign': (),
+    'Tolstoi': (),
+    'Drum': (),
+    'Uzit': (),
+    'Lenox': (),
+    'Broad Leaf': ('Broadleaf',),
+    'Cycle': (),
+    'Carolina Brights': (),
+    'American Beauty': (),
+    'Hindu': (),
+    'Red Cross': (),
+    'El Principe de Gales': ('EPDG',),
+    'Fatima': (),
+    'Mecca': (),
+    'Turkey Red': (),
+    'Honest Long Cut': (),
+    'Exhibit Supply': ('Exhibit', 'Exhibits'),
+    'Red Man': (),
+    'Hostess': (),
+    "Kellogg's": ('Kelloggs',),
+    'Post Cereal': (),
+    'O-Pee-Chee': ('OPC',),
+    'Sporting News': ('The Sporting News',),
+    'Sport Kings': (),
+    'Berk Ross': (),
+    'Wheaties': (),
+}
+
+SETS: Dict[str, Sequence[str]] = {
+    'N28': ('Allen & Ginter World Champions',),
+    'N162': (),
+    'N167': ('Old Judge Cabinets',),
+    'N172': ('Old Judge',),
+    'N284': ('Buchner Gold Coin', 'Gold Coin'),
+    'N300': ('Mayo Cut Plug',),
+    'T3': ('Turkey Red Cabinets',),
+    'T200': ('Fatima Team Cards',),
+    'T201': ('Mecca Double Folders', 'Mecca Doubles'),
+    'T202': ('Hassan Triple Folders', 'Triple Folders'),
+    'T204': ('Ramly',),
+    'T205': ('Gold Border', 'Gold Borders'),
+    'T206': ('White Border',),
+    'T207': ('Brown Background',),
+    'T210': ('Old Mill Southern League',),
+    'T212': ('Obaks',),
+    'T213': ('Coupon Cigarettes',),
+    'T215': ('Red Cross Type 1', 'Red Cross Type 2'),
+    'T216': ('Peoples Tobacco', 'Kotton', 'Mino'),
+    'T227': ('Series of Champions',),
+    'E90-1': ('American Caramel E90',),
+    'E90-2': (),
+    'E90-3': (),
+    'E91': (),
+    'E92': ('Croft', 'Dockman', 'Nadja'),
+    'E93': ('Standard Caramel',),
+    'E94': (),
+    'E95': ('Philadelphia Caramel',),
+    'E96': (),
+    'E98': ('Set of 30',),
+    'E101': (),
+    'E102': (),
+    'E103': ('Williams Caramel',),
+    'E104': ('Nadja Caramel',),
+    'E105': ('Mello Mint',),
+    'E106': (),
+    'E107': ('Breisch Williams',),
+    'E121': ('American Caramel Series of 80', 'American Caramel Series of 120'),
+    'E135': ('Collins McCarthy E135',),
+    'E145': ('Cracker Jack E145',),
+    'E210': ('York Caramel',),
+    'M101-4': ('Sporting News M101-4',),
+    'M101-5': ('Sporting News M101-5',),
+    'M116': ('Sporting Life',),
+    'D303': ('General Baking',),
+    'D304': ('Brunners Bread', 'Butter Krust'),
+    'D311': ('Polo Grounds',),
+    'D322': ('Tip Top',),
+    'D329': ('Weil Baking',),
+    'D350': ('Standard Biscuit',),
+    'L1': ('Leathers',),
+    'S74': ('Silks',),
+    'S81': ('Large Silks',),
+    'W514': (),
+    'W515': (),
+    'R300': (),
+    'R303': ('Goudey Premiums',),
+    'R318': ('Batter Up',),
+    'R319': ('1933 Goudey',),
+    'R320': ('1934 Goudey',),
+    'R321': ('1938 Goudey', 'Heads-Up'),
+    'R327': ('Diamond Stars',),
+    'R334': ('1939 Play Ball',),
+    'R335': ('1940 Play Ball',),
+    'R336': ('1941 Play Ball',),
+    '1914 Cracker Jack': (),
+    '1915 Cracker Jack': (),
+    '1948 Leaf': (),
+    '1949 Leaf': (),
+    '1933 Delong': (),
+    '1935 National Chicle Football': (),
+    '1933 Sport Kings': (),
+    '1955 Bowman': (),
+}
+# Bowman and Topps flagships by year
+SETS.update({f'{year} Bowman': () for year in range(1948, 1956)})
+SETS.update({f'{year} Topps': () for year in range(1951, 1991)})
+
+# Surnames only where collectors use them alone, they name one player and
+# are not everyday words
+PLAYERS: Dict[str, Sequence[str]] = {
+    'Ty Cobb': ('Cobb',),
+    'Honus Wagner': ('Hans Wagner',),
+    'Christy Mathewson': ('Mathewson', 'Matty'),
+    'Cy Young': ('Denton Young',),
+    'Walter Johnson': ('Big Train',),
+    'Nap Lajoie': ('Lajoie', 'Napoleon Lajoie'),
+    'Eddie Plank': ('Plank',),
+    'Tris Speaker': (),
+    'Eddie Collins': (),
+    'Frank Chance': (),
+    'Johnny Evers': ('Evers',),
+    'Joe Tinker': ('Tinker',),
+    'Mordecai Brown': ('Three Finger Brown', 'Miner Brown'),
+    'Rube Waddell': ('Waddell',),
+    'Addie Joss': ('Joss',),
+    'Willie Keeler': ('Wee Willie Keeler', 'Keeler'),
+    'Chief Bender': ('Bender',),
+    'Hughie Jennings': (),
+    'John McGraw': ('McGraw',),
+    'Connie Mack': (),
+    'Cap Anson': ('Anson',),
+    'King Kelly': ('Mike Kelly',),
+    'Buck Ewing': (),
+    'Dan Brouthers': ('Brouthers',),
+    'Roger Bresnahan': ('Bresnahan',),
+    'Jimmy Collins': (),
+    'Hugh Duffy': (),
+    'Ed Delahanty': ('Delahanty',),
+    'Sam Crawford': ('Wahoo Sam',),
+    'Jack Chesbro': ('Chesbro',),
+    'Sherry Magee': ('Magee', 'Magie'),
+    'Joe Doyle': ('Slow Joe Doyle',),
+    'Eddie Cicotte': ('Cicotte',),
+    'Joe Jackson': ('Shoeless Joe', 'Shoeless Joe Jackson'),
+    'Jim Thorpe': ('Thorpe',),
+    'Harry Hooper': (),
+    'Rabbit Maranville': ('Maranville',),
+    'Zack Wheat': (),
+    'Frank Baker': ('Home Run Baker',),
+    'Grover Alexander': ('Pete Alexander', 'Grover Cleveland Alexander'),
+    'Babe Ruth': ('Ruth', 'George Herman Ruth', 'Bambino'),
+    'Lou Gehrig': ('Gehrig',),
+    'Rogers Hornsby': ('Hornsby',),
+    'George Sisler': ('Sisler',),
+    'Harry Heilmann': ('Heilmann',),
+    'Pie Traynor': ('Traynor',),
+    'Jimmie Foxx': ('Foxx', 'Jimmy Foxx'),
+    'Mel Ott': (),
+    'Mickey Cochrane': ('Cochrane',),
+    'Lefty Grove': (),
+    'Dizzy Dean': (),
+    'Paul Waner': (),
+    'Lloyd Waner': (),
+    'Bill Terry': (),
+    'Chuck Klein': (),
+    'Carl Hubbell': ('Hubbell',),
+    'Charlie Gehringer': ('Gehringer',),
+    'Joe Cronin': (),
+    'Luke Appling': ('Appling',),
+    'Hank Greenberg': ('Greenberg',),
+    'Joe DiMaggio': ('DiMaggio',),
+    'Ted Williams': (),
+    'Bob Feller': ('Feller',),
+    'Stan Musial': ('Musial',),
+    'Jackie Robinson': (),
+    'Satchel Paige': ('Paige',),
+    'Josh Gibson': (),
+    'Ralph Kiner': ('Kiner',),
+    'Yogi Berra': ('Berra',),
+    'Duke Snider': (),
+    'Warren Spahn': ('Spahn',),
+    'Whitey Ford': (),
+    'Mickey Mantle': ('Mantle',),
+    'Willie Mays': (),
+    'Hank Aaron': (),
+    'Ernie Banks': (),
+    'Roberto Clemente': ('Clemente',),
+    'Sandy Koufax': ('Koufax',),
+    'Roger Maris': ('Maris',),
+    'Bob Gibson': (),
+    'Frank Robinson': (),
+    'Brooks Robinson': (),
+    'Harmon Killebrew': ('Killebrew',),
+    'Al Kaline': ('Kaline',),
+    'Carl Yastrzemski': ('Yastrzemski', 'Yaz'),
+    'Pete Rose': (),
+    'Johnny Bench': (),
+    'Tom Seaver': ('Seaver',),
+    'Nolan Ryan': (),
+    'Reggie Jackson': (),
+    'Mike Schmidt': (),
+    'George Brett': (),
+    'Rickey Henderson': (),
+    'Cal Ripken': ('Ripken',),
+    'Ken Griffey Jr.': ('Ken Griffey Jr', 'Griffey Jr'),
+}
+
+DICTIONARY: Dict[str, Dict[str, Sequence[str]]] = {
+    'set': SETS,
+    'player': PLAYERS,
+    'manufacturer': MANUFACTURERS,
+    'grader': GRADERS,
+}
+
+_SEPARATORS = re.compile(r'[\W_]+')
+# A set code: letters then digits (T206, E90-1, M101-4)
+_SET_CODE = re.compile(r'\A([a-z]{1,2}) ?(\d.*)\Z')
+
+Entity = Tuple[str, str]    # (kind, canonical name)
+
+
+def normalize(text: str) -> str:
+    """Case-folded text with every run of punctuation and spaces made one space"""
+    return _SEPARATORS.sub(' ', text.casefold())
+
+
+def _variants(alias: str) -> List[str]:
+    """Normalized spellings of an alias: set codes with and without a space"""
+    text = normalize(alias).strip()
+    match = _SET_CODE.match(text)
+    if match is None:
+        return [text] if text else []
+    prefix, rest = match.groups()
+    return [f'{prefix}{rest}', f'{prefix} {rest}']
+
+
+class EntityTagger:
+    """Aho-Corasick automaton over a dictionary's aliases"""
+
+    def __init__(self, dictionary: Optional[Dict[str, Dict[str, Sequence[str]]]] = None):
+        """Compile a dictionary
+
+        Args:
+            dictionary: kind -> canonical name -> aliases (default: ``DICTIONARY``)
+        """
+        self.dictionary = DICTIONARY if dictionary is None else dictionary
+        self.entities: List[Entity] = []
+        aliases: Dict[str, set] = {}
+        for kind, names in self.dictionary.items():
+            for name, extra in names.items():
+                entity = len(self.entities)
+                self.entities.append((kind, name))
+                for alias in (name, *extra):
+                    for variant in _variants(alias):
+                        aliases.setdefault(variant, set()).add(entity)
+        self.ids = {entity: index for index, entity in enumerate(self.entities)}
+        self.aliases = aliases
+        self._build(aliases)
+
+    def _build(self, aliases: Dict[str, set]):
+        # Trie of the aliases
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[Tuple[int, int], ...]] = [()]
+        for alias, entities in aliases.items():
+            state = 0
+            for char in alias:
+                following = goto[state].get(char)
+                if following is None:
+                    following = len(goto)
+                    goto[state][char] = following
+                    goto.append({})
+                    outputs.append(())
+                state = following
+            outputs[state] += tuple((entity, len(alias)) for entity in sorted(entities))
+
+        # Breadth-first failure links, folded into full transition tables so
+        # matching takes exactly one dict lookup per character; a state's
+        # failure target is shallower, so its table is complete by then
+        delta: List[Dict[str, int]] = [{} for _ in goto]
+        fail = [0] * len(goto)
+        queue = [0]
+        for state in queue:
+            delta[state] = {**delta[fail[state]], **goto[state]} if state else dict(goto[0])
+            for char, following in goto[state].items():
+                fallback = delta[fail[state]].get(char, 0) if state else 0
+                fail[following] = fallback
+                outputs[following] += outputs[fallback]
+                queue.append(following)
+        self._delta = delta
+        self._outputs = outputs
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of the dictionary, to tell when tags made with it are stale"""
+        data = json.dumps({kind: {name: list(aliases) for name, aliases in names.items()}
+                           for kind, names in self.dictionary.items()}, sort_keys=True)
+        return hashlib.sha1(data.encode()).hexdigest()[:16]
+
+    def tag(self, text: str) -> Dict[int, int]:
+        """Entities mentioned in a text
+
+        Returns:
+            Entity index (into ``entities``) -> number of mentions
+        """
+        text = normalize(text)
+        length = len(text)
+        delta, outputs = self._delta, self._outputs
+        found: Dict[int, int] = {}
+        state = 0
+        for end, char in enumerate(text, 1):
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                # Whole words only: the match must start and end at a space
+                if end < length and text[end] != ' ':
+                    continue
+                for entity, size in outputs[state]:
+                    start = end - size
+                    if start == 0 or text[start - 1] == ' ':
+                        found[entity] = found.get(entity, 0) + 1
+        return found
+
+    def tag_many(self, texts: Iterable[str]) -> Dict[int, int]:
+        """Entities mentioned across several texts (e.g. a lot's title and description)"""
+        found: Dict[int, int] = {}
+        for text in texts:
+            for entity, count in self.tag(text).items():
+                found[entity] = found.get(entity, 0) + count
+        return found
+
+    def lookup(self, name: str) -> List[int]:
+        """Entities a name or alias refers to, e.g. ``'t-206'`` or ``'Mantle'``"""
+        for variant in _variants(name):
+            if variant in self.aliases:
+                return sorted(self.aliases[variant])
+        return []
+
+
+_default: Optional[EntityTagger] = None
+
+
+def default_tagger() -> EntityTagger:
+    """The tagger of ``DICTIONARY``, compiled once per process"""
+    global _default
+    if _default is None:
+        _default = EntityTagger()
+    return _default
@@ -0,0 +1,196 @@
+"""
+Archive Indexes
+
+Derived indexes (full-text search, dates, authors, entity tags,
+near-duplicates, comparable sales, ...) live in ``<archive root>/index/`` and are
+kept current from the storage save path: once an archive has an index
+directory, every saved thread or item is handed to each registered indexer.
+``collectibles.py index`` creates the directory and catches the indexes up
+with files written while they were not being maintained (e.g. by the CI
+scraper, whose runner does not keep them).
+
+Indexers are registered as ``"module:Class"`` strings, like scrapers, so an
+archive without an index never imports one. An indexer class is built with
+the index directory and provides:
+
+* ``index_item(group, item_id, record, stat)``: (re)index one item, given
+  as a ``records.Thread`` or ``records.Lot`` with its file's ``os.stat``;
+* ``remove_item(group, item_id)``;
+* ``item_state(group)``: item ID -> (mtime_ns, size) of what it indexed;
+* ``batch()``: context manager grouping many updates into one transaction;
+* ``close()``;
+* optionally ``optimize()``, called after a refresh changed the index;
+* optionally a static ``analyze(record)``: the CPU-heavy, index-independent
+  part of indexing a record, which ``refresh`` runs in its reader worker
+  processes and hands to ``index_item`` as ``analysis``.
+"""
+import importlib
+import logging
+import os
+import sqlite3
+from contextlib import ExitStack
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from .reader import read_items
+from .records import normalize_item
+from .scan import detect_layout, iter_groups, iter_item_files
+
+INDEX_DIR = 'index'
+
+INDEXERS: Dict[str, str] = {
+    'search': 'tools.archive.search:SearchIndex',
+    'time': 'tools.archive.timeline:TimeIndex',
+    'authors': 'tools.archive.authors:AuthorIndex',
+    'tags': 'tools.archive.tags:EntityIndex',
+    'duplicates': 'tools.archive.duplicates:DuplicateIndex',
+    'comps': 'tools.archive.comps:ComparablesIndex',
+}
+
+logger = logging.getLogger('archive_indexes')
+
+
+def register_indexer(name: str, target: str):
+    """Register an indexer
+
+    Args:
+        name: Indexer name
+        target: Import path of the indexer class, as ``"package.module:Class"``
+    """
+    if ':' not in target:
+        raise ValueError(f"Indexer target must look like 'module:Class', got {target!r}")
+    INDEXERS[name] = target
+
+
+def available_indexers() -> List[str]:
+    """Names of the registered indexers"""
+    return list(INDEXERS)
+
+
+def get_indexer_class(name: str) -> Type:
+    """Import and return the class of a registered indexer"""
+    module_name, class_name = INDEXERS[name].split(':', 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _analyze(names: Tuple[str, ...], record) -> Tuple[Any, Dict[str, Any]]:
+    """A record with the named indexers' analyses of it; runs in a reader worker"""
+    return record, {name: get_indexer_class(name).analyze(record) for name in names}
+
+
+class ArchiveIndexes:
+    """The indexes of one archive, opened on first use"""
+
+    def __init__(self, root: Path):
+        """
+        Args:
+            root: Archive data root (DataStorage base_dir, or the data dir
+                of a MultiArchiveStorage archive)
+        """
+        self.root = Path(root)
+        self.directory = self.root / INDEX_DIR
+        self._indexes: Optional[Dict[str, Any]] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether this archive keeps indexes (its index directory exists)"""
+        return self.directory.is_dir()
+
+    @property
+    def indexes(self) -> Dict[str, Any]:
+        if self._indexes is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._indexes = {name: get_indexer_class(name)(self.directory) for name in INDEXERS}
+        return self._indexes
+
+    def update(self, group: str, item_id: str, data: Dict[str, Any], path: Path):
+        """Index a just-saved item, if this archive keeps indexes
+
+        Index errors are logged, not raised: the item is saved either way,
+        and ``collectibles.py index`` picks it up later.
+        """
+        if not self.enabled:
+            return
+        record = normalize_item(data)
+        if record is None:
+            return
+        try:
+            stat = os.stat(path)
+            for index in self.indexes.values():
+                index.index_item(str(group), str(item_id), record, stat)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Could not index {group}/{item_id}: {e}")
+
+    def refresh(self, layout: Optional[str] = None, rebuild: bool = False,
+                processes: Optional[int] = None) -> Dict[str, int]:
+        """Bring every index up to date with the item files on disk
+
+        Items whose file changed (mtime or size) since they were indexed are
+        reindexed, and items whose file is gone are removed.
+
+        Args:
+            layout: 'forums' or 'items'; detected when omitted
+            rebuild: Reindex every item
+            processes: Read (and ``analyze``) changed files with this many
+                worker processes; writing stays in this process, the
+                indexes' only writer
+
+        Returns:
+            Counts of items 'indexed', 'removed' and 'unchanged'
+        """
+        layout = layout or detect_layout(self.root)
+        counts = {'indexed': 0, 'removed': 0, 'unchanged': 0}
+        indexes = self.indexes
+        for group, group_dir in iter_groups(self.root, layout):
+            with ExitStack() as batches:
+                for index in indexes.values():
+                    batches.enter_context(index.batch())
+                self._refresh_group(group, group_dir, layout, rebuild, processes, counts)
+        if counts['indexed'] or counts['removed']:
+            for index in indexes.values():
+                if hasattr(index, 'optimize'):
+                    index.optimize()
+        return counts
+
+    def _refresh_group(self, group: str, group_dir: Path, layout: str, rebuild: bool,
+                       processes: Optional[int], counts: Dict[str, int]):
+        indexes = self.indexes
+        prefix_len = len('thread_') if layout == 'forums' else 0
+        states = {name: index.item_state(group) for name, index in indexes.items()}
+        seen = set()
+        changed: Dict[str, Tuple[Any, List[str], str]] = {}
+        for entry in iter_item_files(group_dir, layout):
+            item_id = entry.name[prefix_len:-len('.json')]
+            seen.add(item_id)
+            stat = entry.stat()
+            state = (stat.st_mtime_ns, stat.st_size)
+            stale = [name for name in indexes if rebuild or states[name].get(item_id) != state]
+            if stale:
+                changed[item_id] = (stat, stale, entry.path)
+            else:
+                counts['unchanged'] += 1
+        analyzers = tuple(name for name, index in indexes.items() if hasattr(index, 'analyze'))
+        tasks = ((item_id, path) for item_id, (_, _, path) in changed.items())
+        for item_id, result in read_items(tasks, processes=processes,
+                                          transform=partial(_analyze, analyzers)):
+            if result is None:
+                continue
+            record, analyses = result
+            stat, stale, _ = changed[item_id]
+            for name in stale:
+                if name in analyses:
+                    indexes[name].index_item(group, item_id, record, stat, analysis=analyses[name])
+                else:
+                    indexes[name].index_item(group, item_id, record, stat)
+            counts['indexed'] += 1
+        gone = set().union(*states.values()) - seen
+        for item_id in gone:
+            for index in indexes.values():
+                index.remove_item(group, item_id)
+        counts['removed'] += len(gone)
+
+    def close(self):
+        for index in (self._indexes or {}).values():
+            index.close()
+        self._indexes = None
@@ -0,0 +1,84 @@
+"""
+Storage Change Journal
+
+Records which archive files were written, so that committing scraped data
+never has to scan the archive (``git add <dir>`` stats every file in it).
+
+Storage classes ``record`` paths as they write them and ``flush`` them to an
+append-only journal file with their progress. Several writer processes may
+append at once (each append holds a shared ``fcntl`` lock). A committer
+``drain``s the journal under an exclusive lock, which hands it every path
+changed since the previous drain and empties the file.
+"""
+import fcntl
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, List, Set
+
+JOURNAL_NAME = 'changes.journal'
+
+
+class ChangeJournal:
+    """Append-only list of changed file paths"""
+
+    def __init__(self, path: Path):
+        """Open the journal at ``path`` (created on first flush)
+
+        Args:
+            path: Journal file, normally ``<archive>/changes.journal``
+        """
+        self.path = Path(path)
+        self._pending: Set[str] = set()
+
+    def record(self, path: Path):
+        """Note a written (or deleted) file; written out on the next flush"""
+        self._pending.add(os.path.abspath(path))
+
+    def record_many(self, paths: Iterable[Path]):
+        for path in paths:
+            self.record(path)
+
+    def flush(self):
+        """Append the recorded paths to the journal file"""
+        if not self._pending:
+            return
+        data = ''.join(f'{path}\n' for path in sorted(self._pending)).encode('utf-8')
+        with self._locked(fcntl.LOCK_SH):
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        self._pending.clear()
+
+    def drain(self) -> List[str]:
+        """Take every journaled path (deduplicated) and empty the journal
+
+        Returns:
+            Absolute paths changed since the previous drain
+        """
+        self.flush()
+        with self._locked(fcntl.LOCK_EX):
+            try:
+                with open(self.path, 'r+', encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+                    f.truncate(0)
+            except FileNotFoundError:
+                return []
+        return sorted(set(line for line in lines if line))
+
+    def restore(self, paths: Iterable[str]):
+        """Put drained paths back, e.g. after a failed commit"""
+        self.record_many(paths)
+        self.flush()
+
+    @contextmanager
+    def _locked(self, mode: int) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
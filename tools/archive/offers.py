@@ -0,0 +1,330 @@
+"""
+For-Sale Offer Extraction
+
+Net54's for-sale forum (13) is mostly structured offers, one card per line::
+
+    Frank Lang, PSA5, PB - $70 **SOLD** Thanks Cy
+    GANDIL SGC 40--$115
+    TAKE THE WHOLE LOT FOR $390
+
+``thread_offers`` pulls (card, grading company, grade, price) out of a
+thread's seller posts, and ``export_offers`` runs it over whole forums and
+writes the results as a Parquet table next to the columnar export
+(``columnar.py``)::
+
+    <out>/offers/archive=net54/forum=13/year=2009/part-0.parquet
+
+so comparable-sales lookups read a few compact columns instead of
+rescanning the archive.
+
+Every line is scanned once by a single precompiled pattern whose
+alternatives tokenize prices, grades, sold marks, per-card/lot wording,
+links and BBCode; what is left between a price and the previous one is
+its card. Lines without a card of their own (``$25 delivered``, ``Price
+lowered to $36``) take the previous offer's or the thread title's. Prices
+next to shipping, discount or reference wording (``add $5 shipping``,
+``$75 off``, ``VCP $316``) and lines of wanted ads (``looking for``) are
+not offers. Only the thread starter's posts are read, so buyers'
+counter-offers stay out. Extraction runs in the reader's worker processes,
+which send back only the offer rows.
+"""
+import os
+import re
+import shutil
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .columnar import BATCH_ROWS, PartitionedWriter, _pyarrow, record_year, replace_partitions
+from .reader import read_items
+from .records import Thread
+from .scan import detect_layout, iter_groups, iter_item_files
+from .timestamps import MISSING, parse_timestamps
+
+# Net54's "Sell" forum
+FOR_SALE_FORUMS = ('13',)
+
+TABLE = 'offers'
+
+GRADERS = ('PSA', 'SGC', 'BVG', 'BGS', 'GAI', 'GMA', 'KSA', 'CSG', 'HGA')
+
+# SGC's old 100-point scale, on the 10-point scale everyone else uses
+SGC_100 = {100: 10.0, 98: 10.0, 96: 9.0, 92: 8.5, 88: 8.0, 86: 7.5, 84: 7.0, 80: 6.0,
+           70: 5.5, 60: 5.0, 55: 4.5, 50: 4.0, 45: 3.5, 40: 3.0, 35: 2.5, 30: 2.0,
+           20: 1.5, 10: 1.0}
+
+MIN_PRICE = 1.0
+MAX_PRICE = 10_000_000.0
+
+# Characters of a line kept with each offer, for checking the extraction
+TEXT_WIDTH = 200
+
+# Every token starts at "[", "$" or the start of a word; the leading
+# lookahead rejects all other positions before any alternative is tried
+TOKEN = re.compile(r"""
+  (?=[\[$]|\b\w)(?:
+    (?P<strike>\[strike\].*?\[/strike\])
+  | (?P<link>\[(?P<link_tag>url|img|email)[^\]]*\].*?\[/(?P=link_tag)\]|https?://\S+|\b[\w.+-]+@[\w-]+\.\w+)
+  | (?P<tag>\[/?[a-z*]+(?:=[^\]]*)?\])
+  | (?P<price>\$\s?(?P<amount>\d{1,3}(?:,\d{3})+|\d+)(?:\.(?P<cents>\d{1,2}))?(?P<thousands>k\b)?)
+  | (?P<sold>\$old\b|\$sold\b|\bsold\b)
+  | (?P<grade>\b(?P<grader>""" + '|'.join(GRADERS) + r""")[\s\-]*
+        (?P<value>(?:dna\s*)?(?:"?\d{1,3}(?:\.5)?"?|a(?:uthentic|uth|u)?)(?![\w.]))
+        (?:\s*\((?P<qualifier>mk|mc|oc|st|pd|of)\))?)
+  | (?P<each>\b(?:each|per\ card|apiece|ea)(?![\w]))
+  | (?P<lot>\b(?:(?:take\ )?(?:the\ )?(?:whole|entire)\ lot(?:\ for)?|for\ (?:the\ )?(?:lot|all|group)
+        |takes?\ (?:them\ )?all(?:\ for)?|as\ a\ (?:lot|group|set))\b)
+  | (?P<noise>\b(?:f/s|fs|f/t|ft|for\ sale|for\ trade|or\ trade|shipped|delivered|ppd|postpaid|obo
+        |or\ best\ offer|firm|asking|selling|price|reduced|was|now|ff|goods|shipping\ included|free\ shipping)\b)
+  )
+""", re.I | re.X)
+
+# Wording around a price that makes it a fee, a discount or a reference
+# price (``VCP $316``, ``was $500``), not an offer
+NOT_OFFER_BEFORE = re.compile(r'\b(?:add|plus|knock|extra|(?:shipping|postage)(?: is| of| cost)?|insurance|s/h'
+                              r'|vcp|smr|bv|was|paid|bought|retail|comps?|last sold)\W*\Z', re.I)
+NOT_OFFER_AFTER = re.compile(r'\A\W*(?:off\b|(?:for |in )?(?:shipping|s/h|postage|insurance)(?!\s+incl))', re.I)
+
+# A line asking for cards names prices a buyer would pay, not offers. Sellers
+# write "looking for" too: "looking for $350", "looking for offers", "looking
+# for a new home", "nice looking for the grade"
+WANTED = re.compile(r"""
+  \b(?:looking\ (?:for|to\ buy)|wanted|want\ to\ buy|wtb|in\ search\ of)\b
+  (?!\s+(?:(?:about\s+|around\s+|\[strike\])?\$|(?:the\s+|its\s+)?grade|(?:the\s+)?trades?
+        |(?:the\s+best\s+|best\s+|an?\s+)?offers?\b|(?:a\s+)?(?:new\s+|more\s+permanent\s+)?home))
+""", re.I | re.X)
+SENTENCE_END = re.compile(r'[.!?](?=\s)')
+
+SEPARATORS = re.compile(r'(?:\s+[-–—:=,;*|/.!~]+)+(?=\s|$)|[-–—:=;*|~]{2,}|\s{2,}')
+EDGES = ' \t-–—:=,;*|/.!~()"\''
+# A card names something: a letter next to another letter or digit (T206, Cobb)
+LETTERS = re.compile(r'[^\W\d_]\w|\w[^\W\d_]')
+WORDS = re.compile(r"[^\W_]+(?:'[^\W_]+)?")
+# Words left between prices that name no card on their own (``$500 or $450``,
+# ``dropped to $36``, ``all 3 for $90``); numbers count as filler too
+FILLER = frozenset("""
+    a all an and any at both but by call card cards deal do down drop dropped f final for friends from
+    good i in is it just last looking lot lower lowered me net new of on only or over paypal plus
+    reduction remain ship sold the this to under venmo very would
+    two three four five six seven eight nine ten
+""".split())
+
+
+@dataclass(slots=True)
+class Offer:
+    """One priced card (or lot) from a for-sale post"""
+    forum_id: str
+    thread_id: str
+    post_id: str
+    author: str
+    time: Optional[int]             # epoch seconds of the post
+    card: str                       # the line (or title) without price, grade and noise
+    grader: Optional[str]
+    grade: Optional[str]            # as written, e.g. '40', '5.5', 'A'
+    grade_value: Optional[float]    # on the 10-point scale
+    price: float
+    basis: str                      # 'each', 'lot' or ''
+    sold: bool
+    text: str                       # the source line
+
+
+def grade_value(grader: str, grade: str) -> Optional[float]:
+    """A grade on the 10-point scale; None for 'Authentic' or unknown grades"""
+    grade = grade.upper().replace('DNA', '').strip(' "')
+    try:
+        value = float(grade)
+    except ValueError:
+        return None
+    if grader.upper() == 'SGC' and value > 10:
+        return SGC_100.get(int(value)) if value.is_integer() else None
+    return value if 0 < value <= 10 else None
+
+
+def _card_text(line: str, cut: List[Tuple[int, int]], start: int, end: int) -> str:
+    """What is left of line[start:end] once the token spans are cut out"""
+    parts, position = [], start
+    for span_start, span_end in cut:
+        if span_end <= start or span_start >= end:
+            continue
+        parts.append(line[position:max(span_start, start)])
+        parts.append(' ')
+        position = min(span_end, end)
+    parts.append(line[position:end])
+    text = ' '.join(SEPARATORS.sub(' ', ''.join(parts)).split()).strip(EDGES)
+    if text.count('(') != text.count(')'):
+        text = ' '.join(text.replace('(', ' ').replace(')', ' ').split()).strip(EDGES)
+    if not LETTERS.search(text):
+        return ''
+    words = WORDS.findall(text.casefold())
+    return '' if all(word.isdigit() or word in FILLER for word in words) else text
+
+
+def _scan(line: str):
+    """Tokens of a line
+
+    Returns:
+        (spans to cut from the card, offer prices as (start, end, amount),
+        grades as (start, grader, grade), positions of sold marks, basis)
+    """
+    cut, prices, grades, sold = [], [], [], []
+    basis = ''
+    for match in TOKEN.finditer(line):
+        kind = match.lastgroup
+        start, end = match.span()
+        cut.append((start, end))
+        if kind == 'price':
+            if (NOT_OFFER_BEFORE.search(line, max(0, start - 24), start)
+                    or NOT_OFFER_AFTER.match(line[end:end + 24])):
+                continue
+            amount = float(match.group('amount').replace(',', ''))
+            if match.group('cents'):
+                amount += float('0.' + match.group('cents'))
+            if match.group('thousands'):
+                amount *= 1000
+            if MIN_PRICE <= amount <= MAX_PRICE:
+                prices.append((start, end, amount))
+        elif kind == 'grade':
+            grades.append((start, match.group('grader').upper(), match.group('value').strip('"').upper()))
+        elif kind == 'sold':
+            sold.append(start)
+        elif kind in ('each', 'lot'):
+            basis = kind
+    return cut, prices, grades, sold, basis
+
+
+def parse_title(title: str) -> Dict[str, Any]:
+    """Card, grader and grade named by a thread title"""
+    cut, _, grades, _, _ = _scan(title)
+    grader, grade = (grades[0][1], grades[0][2]) if grades else (None, None)
+    return {'card': _card_text(title, cut, 0, len(title)), 'grader': grader, 'grade': grade}
+
+
+def parse_line(line: str) -> List[Dict[str, Any]]:
+    """Offers made by one line of a post
+
+    Each price closes an offer whose card is named between it and the
+    previous price (``Titus $22---Sheckard $25``); a price with no card of
+    its own before it restates the previous one (``$5000 FF / $5150 goods``),
+    and the last one stands. A sold mark belongs to the offer whose price
+    it follows. From the sentence of a wanted ad on, the line has no offers.
+
+    Returns:
+        Dicts with 'card' ('' when the line names none), 'grader', 'grade',
+        'price', 'basis' and 'sold'
+    """
+    wanted = WANTED.search(line)
+    if wanted:
+        # Offers in sentences before the one asking for cards still stand
+        ends = [match.end() for match in SENTENCE_END.finditer(line, 0, wanted.start())]
+        line = line[:ends[-1]] if ends else ''
+    cut, prices, grades, sold, basis = _scan(line)
+    offers, previous_end = [], 0
+    for index, (start, end, amount) in enumerate(prices):
+        card = _card_text(line, cut, previous_end, start)
+        own = [grade for grade in grades if previous_end <= grade[0] < start]
+        if not (offers and not card and not own):
+            offers.append({'card': card, 'grader': own[0][1] if own else None,
+                           'grade': own[0][2] if own else None, 'price': amount,
+                           'basis': basis, 'sold': False})
+        next_start = prices[index + 1][0] if index + 1 < len(prices) else len(line)
+        offers[-1]['price'] = amount
+        offers[-1]['sold'] |= any(start <= mark < next_start or (index == 0 and mark < start)
+                                  for mark in sold)
+        previous_end = end
+    # One offer on the line: a grade anywhere on it is the card's
+    if len(offers) == 1 and offers[0]['grader'] is None and grades:
+        offers[0]['grader'], offers[0]['grade'] = grades[0][1], grades[0][2]
+    return offers
+
+
+def thread_offers(thread) -> List[tuple]:
+    """Offer rows (``Offer`` field order) of a thread's seller posts
+
+    A module-level function of one record, so it can run in the reader's
+    worker processes.
+    """
+    if not isinstance(thread, Thread) or not thread.posts:
+        return []
+    seller = thread.posts[0].author
+    posts = [post for post in thread.posts if post.author == seller]
+    times = parse_timestamps([post.timestamp if post.timestamp is not None else post.posted
+                              for post in posts])
+    title = parse_title(thread.title)
+    title_card = title['card'] or ' '.join(thread.title.split())
+    rows = []
+    for time, post in zip(times, posts):
+        for line in post.content.splitlines():
+            if '$' not in line:
+                continue
+            for offer in parse_line(line):
+                card, grader, grade = offer['card'], offer['grader'], offer['grade']
+                if not card:
+                    # "$25 delivered": the title names the card
+                    card = title_card
+                    if grader is None:
+                        grader, grade = title['grader'], title['grade']
+                rows.append(astuple(Offer(
+                    thread.forum_id, thread.id, post.id, post.author,
+                    None if time == MISSING else int(time), card, grader, grade,
+                    grade_value(grader, grade) if grader else None, offer['price'],
+                    offer['basis'], offer['sold'], ' '.join(line.split())[:TEXT_WIDTH])))
+    return rows
+
+
+def schema(pa):
+    """Arrow schema of the offers table"""
+    label = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('forum_id', label), ('thread_id', pa.string()), ('post_id', pa.string()),
+        ('author', label), ('time', pa.int64()), ('card', pa.string()),
+        ('grader', label), ('grade', label), ('grade_value', pa.float32()),
+        ('price', pa.float64()), ('basis', label), ('sold', pa.bool_()), ('text', pa.string()),
+    ])
+
+
+def export_offers(root: Path, out_dir: Path, archive: str, forums: Sequence[str] = FOR_SALE_FORUMS,
+                  layout: Optional[str] = None, processes: Optional[int] = None,
+                  batch_rows: int = BATCH_ROWS) -> Dict[str, int]:
+    """Extract the offers of an archive's for-sale forums into Parquet
+
+    Replaces the archive's offers from a previous run; other archives'
+    offers in ``out_dir`` are kept.
+
+    Args:
+        root: Archive data root
+        out_dir: Export directory; offers go to its ``offers`` table
+        archive: Archive name, the top partition level
+        forums: Forum IDs to extract from
+        layout: 'forums' or 'items'; detected when omitted
+        processes: Worker processes reading and extracting
+        batch_rows: Rows per row group
+
+    Returns:
+        Counts of 'threads' read, threads 'with_offers' and 'offers'
+    """
+    pa, _ = _pyarrow()
+    root, out_dir = Path(root), Path(out_dir)
+    layout = layout or detect_layout(root)
+    forums = {str(forum) for forum in forums}
+    tasks = ((group, entry.path)
+             for group, group_dir in iter_groups(root, layout) if group in forums
+             for entry in iter_item_files(group_dir, layout))
+
+    staging = out_dir / f'.offers-{archive}-{os.getpid()}'
+    shutil.rmtree(staging, ignore_errors=True)
+    writer = PartitionedWriter(staging / TABLE / f'archive={archive}', schema(pa), batch_rows=batch_rows)
+    counts = {'threads': 0, 'with_offers': 0, 'offers': 0}
+    try:
+        for group, rows in read_items(tasks, processes=processes, transform=thread_offers):
+            if rows is None:
+                continue
+            counts['threads'] += 1
+            counts['with_offers'] += bool(rows)
+            for row in rows:
+                writer.add((('forum', row[0] or group), ('year', record_year(row[4], None))), row)
+        counts['offers'] = writer.close()
+        replace_partitions(staging, out_dir, (TABLE,), archive)
+    finally:
+        writer.close()
+        shutil.rmtree(staging, ignore_errors=True)
+    return counts
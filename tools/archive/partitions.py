@@ -0,0 +1,340 @@
+"""
+Multi-writer Progress Partitions
+
+Lets several scraper processes on one machine write to the same archive,
+e.g. the HTML and Tapatalk scrapers, or one process per forum:
+
+* Progress is split into one small JSON file per partition (a forum ID or
+  an item type) instead of a single ``progress.json``, so writers on
+  different forums never touch the same file.
+* Writers remember what they changed since their last flush (their deltas)
+  and flush by taking an ``fcntl`` lock on the partition, re-reading it,
+  applying the deltas and replacing the file. Entries written by other
+  processes in the meantime are kept, and picked up in memory.
+* Every file is written to a temporary file and moved into place with
+  ``os.replace``, so a reader (or a crash) never sees half a file.
+* Once a partition's JSON file has grown past ``COMPACT_THRESHOLD`` entries
+  (or 1/``COMPACT_RATIO`` of its snapshot), its integer-keyed entries are
+  merged into a memory-mapped snapshot
+  (``snapshot.py``) next to it, so large archives neither parse nor hold
+  millions of entries as dicts. ``entries`` stays a mapping over both.
+
+No external database is involved; the lock files live next to the data.
+"""
+import fcntl
+import json
+import os
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .snapshot import SNAPSHOT_SUFFIX, ProgressSnapshot, int_key, write_snapshot
+
+PARTITION_SUFFIX = '.json'
+
+# Entries a partition's JSON file may hold before they are compacted, at
+# least, and as a fraction (1/COMPACT_RATIO) of those already compacted
+COMPACT_THRESHOLD = 4096
+COMPACT_RATIO = 64
+
+
+@contextmanager
+def locked(path: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock for ``path`` (on ``<path>.lock``)
+
+    Args:
+        path: File being protected; it need not exist yet
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def atomic_write_json(path: Path, data: Any, indent: Optional[int] = None):
+    """Write JSON to a process-private temp file and move it over ``path``"""
+    path = Path(path)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+def read_json(path: Path, default: Any = None) -> Any:
+    """Load a JSON file, or return ``default`` if it does not exist"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _empty_partition() -> Dict[str, Any]:
+    return {'meta': {}, 'entries': {}, 'updated_at': None}
+
+
+class PartitionEntries(Mapping):
+    """The entries of one partition: its JSON entries over its snapshot
+
+    A read-only mapping of key -> fields, plus ``setdefault`` and item
+    assignment, which go to the JSON entries (``overlay``). The snapshot is
+    only mapped when it is first needed.
+    """
+
+    def __init__(self, overlay: Dict[str, Any], snapshot_path: Path):
+        self.overlay = overlay
+        self.snapshot_path = Path(snapshot_path)
+        self._snapshot: Optional[ProgressSnapshot] = None
+        self._opened = False
+
+    @property
+    def snapshot(self) -> Optional[ProgressSnapshot]:
+        if not self._opened:
+            self._opened = True
+            try:
+                self._snapshot = ProgressSnapshot(self.snapshot_path)
+            except FileNotFoundError:
+                self._snapshot = None
+        return self._snapshot
+
+    def __contains__(self, key) -> bool:
+        if key in self.overlay:
+            return True
+        snapshot = self.snapshot
+        return snapshot is not None and key in snapshot
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        if key in self.overlay:
+            return self.overlay[key]
+        snapshot = self.snapshot
+        entry = snapshot.get(key) if snapshot is not None else None
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __setitem__(self, key: str, fields: Dict[str, Any]):
+        self.overlay[key] = fields
+
+    def setdefault(self, key: str, default: Dict[str, Any]) -> Dict[str, Any]:
+        """The entry for ``key``, moved into the overlay so it can be updated"""
+        if key not in self.overlay:
+            snapshot = self.snapshot
+            entry = snapshot.get(key) if snapshot is not None else None
+            self.overlay[key] = default if entry is None else entry
+        return self.overlay[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.overlay
+        snapshot = self.snapshot
+        if snapshot is not None:
+            overlay = self.overlay
+            for key in snapshot:
+                if key not in overlay:
+                    yield key
+
+    def __len__(self) -> int:
+        snapshot = self.snapshot
+        if snapshot is None:
+            return len(self.overlay)
+        return len(snapshot) + sum(1 for key in self.overlay if key not in snapshot)
+
+    def total(self, field: str) -> int:
+        """Sum of an integer field over all entries, without building them"""
+        snapshot = self.snapshot
+        total = sum(entry.get(field) or 0 for entry in self.overlay.values())
+        if snapshot is not None:
+            total += snapshot.total(field)
+            for key in self.overlay:
+                shadowed = snapshot.get(key)
+                if shadowed is not None:
+                    total -= shadowed.get(field) or 0
+        return total
+
+    def compact(self, path: Path, force: bool = False) -> bool:
+        """Move the integer-keyed entries into a new snapshot at ``path``
+
+        Unless forced, only done once the overlay holds ``COMPACT_THRESHOLD``
+        entries and 1/``COMPACT_RATIO`` of the snapshot's, so that rewriting
+        the snapshot stays rare as it grows.
+
+        Returns:
+            True if a snapshot was written
+        """
+        snapshot = self.snapshot
+        if not force:
+            threshold = max(COMPACT_THRESHOLD, len(snapshot) // COMPACT_RATIO if snapshot else 0)
+            if len(self.overlay) < threshold:
+                return False
+        movable = {key: self.overlay[key] for key in self.overlay if int_key(key) is not None}
+        if not movable:
+            return False
+        write_snapshot(path, movable, base=snapshot)
+        for key in movable:
+            del self.overlay[key]
+        self.snapshot_path = Path(path)
+        self._snapshot, self._opened = None, False
+        return True
+
+    def detach(self):
+        """Drop the snapshot from this view (it is about to be replaced)"""
+        self._snapshot, self._opened = None, True
+
+
+class ProgressPartitions:
+    """Progress entries stored as one JSON file per partition
+
+    Each partition file holds ``meta`` (e.g. the forum's name) and
+    ``entries`` (e.g. thread ID -> progress entry).
+    """
+
+    def __init__(self, directory: Path):
+        """Open the partitions stored in ``directory``
+
+        Args:
+            directory: Directory holding ``<partition>.json`` files
+        """
+        self.directory = Path(directory)
+        self.partitions: Dict[str, Dict[str, Any]] = {}
+        self._deltas: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def path(self, partition: str) -> Path:
+        return self.directory / f'{partition}{PARTITION_SUFFIX}'
+
+    def snapshot_path(self, partition: str) -> Path:
+        return self.directory / f'{partition}{SNAPSHOT_SUFFIX}'
+
+    def _open(self, partition: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Wrap a partition file's entries with its snapshot"""
+        data['entries'] = PartitionEntries(data['entries'], self.snapshot_path(partition))
+        return data
+
+    def _read(self, partition: str) -> Dict[str, Any]:
+        # The JSON file is read before the snapshot is mapped: a concurrent
+        # compaction replaces the snapshot first, so nothing can be missed
+        return self._open(partition, read_json(self.path(partition)) or _empty_partition())
+
+    def exists(self) -> bool:
+        return self.directory.is_dir()
+
+    def load(self):
+        """Read every partition from disk, keeping unflushed local changes"""
+        self.partitions = {}
+        if self.directory.is_dir():
+            for entry in os.scandir(self.directory):
+                for suffix in (PARTITION_SUFFIX, SNAPSHOT_SUFFIX):
+                    if entry.name.endswith(suffix):
+                        partition = entry.name[:-len(suffix)]
+                        if partition not in self.partitions:
+                            self.partitions[partition] = self._read(partition)
+        for partition, delta in self._deltas.items():
+            self._apply(self.get(partition), delta)
+
+    def get(self, partition: str) -> Dict[str, Any]:
+        """The in-memory partition, created empty if unknown"""
+        partition = str(partition)
+        if partition not in self.partitions:
+            self.partitions[partition] = self._open(partition, _empty_partition())
+        return self.partitions[partition]
+
+    def _delta(self, partition: str) -> Dict[str, Any]:
+        return self._deltas.setdefault(str(partition), {'meta': {}, 'entries': {}})
+
+    def set_meta(self, partition: str, **fields):
+        """Update fields of a partition's metadata"""
+        self.get(partition)['meta'].update(fields)
+        self._delta(partition)['meta'].update(fields)
+
+    def set_entry(self, partition: str, key: str, **fields):
+        """Create or update fields of one entry"""
+        key = str(key)
+        self.get(partition)['entries'].setdefault(key, {}).update(fields)
+        self._delta(partition)['entries'].setdefault(key, {}).update(fields)
+
+    @staticmethod
+    def _apply(target: Dict[str, Any], delta: Dict[str, Any]):
+        target['meta'].update(delta['meta'])
+        entries = target['entries']
+        for key, fields in delta['entries'].items():
+            entries.setdefault(key, {}).update(fields)
+
+    def _write(self, partition: str, data: Dict[str, Any], compact: bool = False) -> List[Path]:
+        """Write a partition (under its lock), compacting it if it has grown
+
+        The snapshot is replaced before the JSON file, so a reader sees each
+        entry in at least one of them at any time.
+        """
+        path = self.path(partition)
+        written = []
+        if data['entries'].compact(self.snapshot_path(partition), force=compact):
+            written.append(self.snapshot_path(partition))
+        atomic_write_json(path, dict(data, entries=data['entries'].overlay))
+        written.append(path)
+        return written
+
+    def flush(self) -> List[Path]:
+        """Merge local changes into the partition files
+
+        Each dirty partition is locked, re-read, patched with this process's
+        deltas and atomically replaced. The merged result (including other
+        writers' entries) becomes the in-memory partition.
+
+        Returns:
+            Paths of the partition files (and snapshots) written
+        """
+        written = []
+        for partition, delta in list(self._deltas.items()):
+            with locked(self.path(partition)):
+                current = self._read(partition)
+                self._apply(current, delta)
+                current['updated_at'] = datetime.now().isoformat()
+                written.extend(self._write(partition, current))
+            self.partitions[partition] = current
+            del self._deltas[partition]
+        return written
+
+    def compact(self) -> List[Path]:
+        """Flush, then move every partition's integer-keyed entries into its snapshot
+
+        Returns:
+            Paths of the partition files and snapshots written
+        """
+        written = self.flush()
+        for partition in list(self.partitions):
+            with locked(self.path(partition)):
+                current = self._read(partition)
+                if any(int_key(key) is not None for key in current['entries'].overlay):
+                    written.extend(self._write(partition, current, compact=True))
+            self.partitions[partition] = current
+        return written
+
+    def replace(self, partition: str, meta: Dict[str, Any], entries: Dict[str, Any]):
+        """Overwrite a partition wholesale (used when rebuilding from disk)"""
+        partition = str(partition)
+        path = self.path(partition)
+        snapshot_path = self.snapshot_path(partition)
+        data = self._open(partition, {'meta': meta, 'entries': dict(entries),
+                                      'updated_at': datetime.now().isoformat()})
+        data['entries'].detach()
+        with locked(path):
+            written = self._write(partition, data)
+            if snapshot_path not in written and snapshot_path.exists():
+                # Everything is in the JSON file now
+                os.unlink(snapshot_path)
+        self.partitions[partition] = data
+        self._deltas.pop(partition, None)
+
+    def last_update(self) -> Optional[str]:
+        stamps = [p['updated_at'] for p in self.partitions.values() if p.get('updated_at')]
+        return max(stamps) if stamps else None
@@ -0,0 +1,450 @@
+"""
+Lot Price History
+
+Re-scraping a live lot replaces its JSON file, so the bids it went through
+are lost. When ``track_prices`` is on, every save of a lot also appends an
+observation (time, current bid, bid count, realized price) to the lot's
+auction in ``<archive data>/price_history/<auction ID>/``:
+
+* Observations are appended to ``tail.log``, one JSON line each, under the
+  auction's ``fcntl`` lock, so a save costs one small append.
+* Once the tail reaches ``TAIL_BYTES`` it is sealed into a columnar
+  chunk, ``chunk-NNNNNN.phc``: rows sorted by lot and time, every column
+  delta-encoded and written as zigzag varints, behind a JSON header with
+  the chunk's lots, row counts and time range. Prices are kept in
+  cents, and a missing value is -1.
+* A tail is sealed by renaming it to ``tail.sealing``, writing the chunk
+  (recording the sealed file's digest) and removing the renamed tail, so a
+  crash at any point neither loses nor duplicates observations.
+
+Varints are encoded and decoded with NumPy for a whole column at a time.
+Reads skip chunks whose header shows neither the lot nor the time range
+asked for. An auction's rollup (per-lot opening and final bids, bid
+counts, realized prices, and auction totals) comes from one sorted pass
+over all of its observations.
+"""
+import hashlib
+import json
+import os
+import struct
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .partitions import locked
+from .timestamps import parse_timestamp
+
+HISTORY_DIR = 'price_history'
+TAIL_NAME = 'tail.log'
+SEALING_NAME = 'tail.sealing'
+CHUNK_SUFFIX = '.phc'
+MAGIC = b'PHC1'
+
+# Size a tail grows to before it is sealed into a chunk (some 6,000
+# observations of about 40 bytes)
+TAIL_BYTES = 1 << 18
+
+COLUMNS = ('time', 'current_bid', 'bid_count', 'realized_price')
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    """Signed to unsigned integers, small magnitudes staying small"""
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def _unzigzag(values: np.ndarray) -> np.ndarray:
+    return (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """LEB128 varints of unsigned 64-bit integers, all encoded at once"""
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        lengths += values >= np.uint64(1 << shift)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    out = np.zeros(int(ends[-1]) if len(values) else 0, dtype=np.uint8)
+    for byte in range(int(lengths.max()) if len(values) else 0):
+        present = lengths > byte
+        groups = (values[present] >> np.uint64(7 * byte)) & np.uint64(0x7F)
+        more = np.where(lengths[present] > byte + 1, 0x80, 0).astype(np.uint64)
+        out[starts[present] + byte] = (groups | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def decode_varints(data: bytes) -> np.ndarray:
+    """Unsigned 64-bit integers of a run of LEB128 varints"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.empty(0, dtype=np.uint64)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = (np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)) * 7
+    groups = (raw & 0x7F).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.bitwise_or.reduceat(groups, starts)
+
+
+def encode_column(values: np.ndarray) -> bytes:
+    """Delta, then zigzag varint encoding of an integer column"""
+    values = np.asarray(values, dtype=np.int64)
+    return encode_varints(_zigzag(np.diff(values, prepend=np.int64(0))))
+
+
+def decode_column(data: bytes) -> np.ndarray:
+    return np.cumsum(_unzigzag(decode_varints(data)))
+
+
+def _cents(price: Any) -> int:
+    """A price in cents; -1 when missing"""
+    if price is None:
+        return -1
+    try:
+        return int(round(float(price) * 100))
+    except (TypeError, ValueError):
+        return -1
+
+
+def _count(value: Any) -> int:
+    if value is None:
+        return -1
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+@dataclass
+class Observations:
+    """Observations of one or more lots, as parallel arrays sorted by lot, then time
+
+    Prices are in dollars (NaN where missing); bid counts are -1 where missing.
+    """
+    lots: np.ndarray          # lot IDs, str
+    time: np.ndarray          # epoch seconds, int64
+    current_bid: np.ndarray   # float64
+    bid_count: np.ndarray     # int64
+    realized_price: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+
+@dataclass
+class LotRollup:
+    """One lot's price history, summarized"""
+    lot_id: str
+    observations: int
+    first_time: int
+    last_time: int
+    opening_bid: Optional[float]
+    final_bid: Optional[float]
+    bid_count: Optional[int]
+    realized_price: Optional[float]
+
+
+@dataclass
+class AuctionRollup:
+    """An auction's price history, summarized per lot and in total"""
+    auction_id: str
+    lots: List[LotRollup]
+    observations: int
+    first_time: Optional[int]
+    last_time: Optional[int]
+    total_bids: float         # sum of the lots' final bids
+    total_realized: float     # sum of the realized prices known
+    sold: int                 # lots with a realized price
+
+
+class PriceHistory:
+    """Append-only price observations of one archive's lots, by auction"""
+
+    def __init__(self, directory: Path):
+        """
+        Args:
+            directory: The archive's price history directory
+                (``<archive data>/price_history``); created on first append
+        """
+        self.directory = Path(directory)
+        self._headers: Dict[Path, Tuple[int, Dict[str, Any]]] = {}
+
+    def _auction_dir(self, auction_id: str) -> Path:
+        name = str(auction_id)
+        if not name or '/' in name or name.startswith('.'):
+            raise ValueError(f"Invalid auction ID: {auction_id!r}")
+        return self.directory / name
+
+    def auctions(self) -> List[str]:
+        """IDs of the auctions with a price history"""
+        if not self.directory.is_dir():
+            return []
+        return sorted(entry.name for entry in os.scandir(self.directory) if entry.is_dir())
+
+    def append(self, auction_id: str, lot_id: str, time: int, current_bid: Optional[float] = None,
+               bid_count: Optional[int] = None, realized_price: Optional[float] = None) -> List[Path]:
+        """Record one observation of a lot
+
+        Returns:
+            Files written (the tail, and a chunk if the tail was sealed)
+        """
+        directory = self._auction_dir(auction_id)
+        row = [str(lot_id), int(time), _cents(current_bid), _count(bid_count), _cents(realized_price)]
+        tail = directory / TAIL_NAME
+        with locked(tail):
+            with open(tail, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(row) + '\n')
+                size = f.tell()
+            written = [tail]
+            if size >= TAIL_BYTES:
+                written += self._seal(directory)
+        return written
+
+    def record(self, lot: Dict[str, Any]) -> List[Path]:
+        """Record the prices of a just-saved lot dict (Heritage ``parse_lot_details`` output)
+
+        Returns:
+            Files written; none if the lot has no auction or lot ID
+        """
+        auction_id, lot_id = str(lot.get('auction_id') or ''), str(lot.get('id') or '')
+        if not auction_id or not lot_id or auction_id == 'unknown':
+            return []
+        observed = parse_timestamp(lot.get('scraped_at'))
+        if observed is None:
+            observed = int(time.time())
+        return self.append(auction_id, lot_id, observed, lot.get('current_bid'), lot.get('bid_count'),
+                           lot.get('realized_price'))
+
+    def seal(self, auction_id: str) -> List[Path]:
+        """Seal an auction's tail into a chunk now, whatever its size"""
+        directory = self._auction_dir(auction_id)
+        with locked(directory / TAIL_NAME):
+            return self._seal(directory)
+
+    def _seal(self, directory: Path) -> List[Path]:
+        """Move the tail into a new chunk; the caller holds the auction's lock"""
+        tail, sealing = directory / TAIL_NAME, directory / SEALING_NAME
+        written = self._finish_sealing(directory)
+        if tail.exists() and tail.stat().st_size:
+            os.replace(tail, sealing)
+            written += self._finish_sealing(directory)
+        return written
+
+    def _finish_sealing(self, directory: Path) -> List[Path]:
+        """Write the chunk of a renamed tail, unless a crash left it written already"""
+        sealing = directory / SEALING_NAME
+        if not sealing.exists():
+            return []
+        data = sealing.read_bytes()
+        source = hashlib.sha1(data).hexdigest()
+        chunks = self._chunks(directory)
+        written = []
+        if not chunks or self._header(chunks[-1]).get('source') != source:
+            rows = self._parse_tail(data)
+            number = int(chunks[-1].stem.split('-')[1]) + 1 if chunks else 1
+            path = directory / f'chunk-{number:06d}{CHUNK_SUFFIX}'
+            self._write_chunk(path, rows, source)
+            written.append(path)
+        sealing.unlink()
+        return written
+
+    @staticmethod
+    def _parse_tail(data: bytes) -> List[list]:
+        text = data.decode('utf-8').rstrip('\n')
+        if not text:
+            return []
+        try:
+            # All lines in one parse; line by line only if one is damaged
+            rows = json.loads('[' + text.replace('\n', ',') + ']')
+        except ValueError:
+            rows = []
+            for line in text.splitlines():
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue    # a line cut short by a crash mid-append
+        return [row for row in rows if isinstance(row, list) and len(row) == 5]
+
+    def _read_tail(self, path: Path) -> List[list]:
+        try:
+            return self._parse_tail(path.read_bytes())
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _chunks(directory: Path) -> List[Path]:
+        if not directory.is_dir():
+            return []
+        return sorted(directory / name for name in os.listdir(directory) if name.endswith(CHUNK_SUFFIX))
+
+    def _write_chunk(self, path: Path, rows: List[list], source: str):
+        """Write rows as a sorted, delta- and varint-encoded columnar chunk"""
+        lots = sorted({row[0] for row in rows})
+        lot_index = {lot: index for index, lot in enumerate(lots)}
+        table = np.array([[lot_index[row[0]]] + row[1:] for row in rows], dtype=np.int64).reshape(-1, 5)
+        table = table[np.lexsort((table[:, 1], table[:, 0]))]
+        columns = {'lot': encode_column(table[:, 0])}
+        for position, name in enumerate(COLUMNS, 1):
+            columns[name] = encode_column(table[:, position])
+        offsets, offset = {}, 0
+        for name, data in columns.items():
+            offsets[name] = [offset, len(data)]
+            offset += len(data)
+        header = json.dumps({
+            'rows': len(table), 'lots': lots,
+            'lot_rows': np.bincount(table[:, 0], minlength=len(lots)).tolist(),
+            'time_min': int(table[:, 1].min()) if len(table) else None,
+            'time_max': int(table[:, 1].max()) if len(table) else None,
+            'columns': offsets, 'source': source,
+        }).encode('utf-8')
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(MAGIC + struct.pack('<I', len(header)) + header)
+                for data in columns.values():
+                    f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
+
+    def _header(self, path: Path) -> Dict[str, Any]:
+        """A chunk's header (cached; chunks never change once written)"""
+        cached = self._headers.get(path)
+        if cached is None:
+            with open(path, 'rb') as f:
+                if f.read(4) != MAGIC:
+                    raise ValueError(f"Not a price history chunk: {path}")
+                length, = struct.unpack('<I', f.read(4))
+                header = json.loads(f.read(length))
+            cached = self._headers[path] = (8 + length, header)
+        return cached[1]
+
+    def _read_chunk(self, path: Path) -> Tuple[List[str], np.ndarray]:
+        """(lots, (rows, 5) int64 table of lot index and COLUMNS) of a chunk"""
+        header = self._header(path)
+        base = self._headers[path][0]
+        with open(path, 'rb') as f:
+            f.seek(base)
+            data = f.read()
+        table = np.empty((header['rows'], 5), dtype=np.int64)
+        for position, name in enumerate(('lot',) + COLUMNS):
+            offset, length = header['columns'][name]
+            table[:, position] = decode_column(data[offset:offset + length])
+        return header['lots'], table
+
+    def _rows(self, directory: Path, lot_id: Optional[str], start: Optional[int],
+              end: Optional[int]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """(lot IDs, (rows, 5) table) of the matching rows of each chunk and of the tail"""
+        sealing = directory / SEALING_NAME
+        chunks = self._chunks(directory)
+        for path in chunks:
+            header = self._header(path)
+            if header['rows'] and ((start is not None and header['time_max'] < start)
+                                   or (end is not None and header['time_min'] > end)):
+                continue
+            lots = header['lots']
+            if lot_id is None:
+                _, table = self._read_chunk(path)
+                yield np.array(lots, dtype=str)[table[:, 0]], table
+                continue
+            # Rows are sorted by lot, so a lot's rows are one slice of the chunk
+            position = bisect_left(lots, lot_id)
+            if position == len(lots) or lots[position] != lot_id:
+                continue
+            first = sum(header['lot_rows'][:position])
+            _, table = self._read_chunk(path)
+            table = table[first:first + header['lot_rows'][position]]
+            yield np.full(len(table), lot_id), table
+        tails = [directory / TAIL_NAME]
+        if sealing.exists():
+            # Sealing interrupted: its rows are in the last chunk only if that got written
+            data = sealing.read_bytes()
+            if not chunks or self._header(chunks[-1]).get('source') != hashlib.sha1(data).hexdigest():
+                tails.insert(0, sealing)
+        rows = [row for tail in tails for row in self._read_tail(tail)
+                if lot_id is None or row[0] == lot_id]
+        if rows:
+            yield (np.array([row[0] for row in rows], dtype=str),
+                   np.array([[0] + row[1:] for row in rows], dtype=np.int64))
+
+    def observations(self, auction_id: str, lot_id: Optional[str] = None, start: Optional[int] = None,
+                     end: Optional[int] = None) -> Observations:
+        """Observations of an auction (or one of its lots) in a time range, by lot and time
+
+        Args:
+            auction_id: Auction ID
+            lot_id: Only this lot
+            start: First epoch second, inclusive
+            end: Last epoch second, inclusive
+        """
+        lot_id = None if lot_id is None else str(lot_id)
+        directory = self._auction_dir(auction_id)
+        parts = []
+        if directory.is_dir():
+            # Under the lock, so a tail being sealed is read exactly once
+            with locked(directory / TAIL_NAME):
+                parts = list(self._rows(directory, lot_id, start, end))
+        if not parts:
+            return Observations(np.empty(0, dtype=str), np.empty(0, dtype=np.int64),
+                                np.empty(0), np.empty(0, dtype=np.int64), np.empty(0))
+        lots = np.concatenate([lots for lots, _ in parts])
+        table = np.concatenate([table for _, table in parts])
+        keep = np.ones(len(table), dtype=bool)
+        if start is not None:
+            keep &= table[:, 1] >= start
+        if end is not None:
+            keep &= table[:, 1] <= end
+        lots, table = lots[keep], table[keep]
+        order = np.lexsort((table[:, 1], lots))
+        lots, table = lots[order], table[order]
+
+        def dollars(cents):
+            return np.where(cents >= 0, cents / 100, np.nan)
+
+        return Observations(lots, table[:, 1], dollars(table[:, 2]), table[:, 3], dollars(table[:, 4]))
+
+    def rollup(self, auction_id: str) -> AuctionRollup:
+        """Per-lot and total summary of an auction's price history"""
+        observed = self.observations(auction_id)
+        if not len(observed):
+            return AuctionRollup(str(auction_id), [], 0, None, None, 0.0, 0.0, 0)
+        lots = observed.lots
+        starts = np.flatnonzero(np.concatenate(([True], lots[1:] != lots[:-1])))
+        ends = np.concatenate((starts[1:], [len(lots)])) - 1
+        # Last known value of a column in each lot: forward-fill, then take each lot's last row
+        positions = np.arange(len(lots))
+
+        def last_known(values, known):
+            filled = np.maximum.accumulate(np.where(known, positions, -1))
+            at = filled[ends]
+            valid = at >= starts
+            return np.where(valid, values[np.maximum(at, 0)], np.nan), valid
+
+        def first_known(values, known):
+            candidates = np.where(known, positions, len(lots))
+            at = np.minimum.reduceat(candidates, starts)
+            valid = at <= ends
+            return np.where(valid, values[np.minimum(at, len(lots) - 1)], np.nan), valid
+
+        bids_known = ~np.isnan(observed.current_bid)
+        opening, _ = first_known(observed.current_bid, bids_known)
+        final, _ = last_known(observed.current_bid, bids_known)
+        counts, counts_valid = last_known(observed.bid_count.astype(np.float64), observed.bid_count >= 0)
+        realized, realized_valid = last_known(observed.realized_price, ~np.isnan(observed.realized_price))
+
+        def optional(value):
+            return None if np.isnan(value) else float(value)
+
+        rollups = [LotRollup(str(lots[first]), int(last - first + 1), int(observed.time[first]),
+                             int(observed.time[last]), optional(opening[index]), optional(final[index]),
+                             int(counts[index]) if counts_valid[index] else None, optional(realized[index]))
+                   for index, (first, last) in enumerate(zip(starts.tolist(), ends.tolist()))]
+        return AuctionRollup(
+            str(auction_id), rollups, len(observed), int(observed.time.min()), int(observed.time.max()),
+            float(np.nansum(final)), float(realized[realized_valid].sum()), int(realized_valid.sum()))
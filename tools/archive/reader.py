@@ -0,0 +1,244 @@
+"""
+Archive Reader
+
+Read-only, streaming access to an archive's threads, posts and lots, in
+either storage layout (see ``scan.py``). Records are normalized
+(``records.py``) and yielded one item file at a time, so a pass over the
+whole archive holds one thread in memory, not the archive::
+
+    reader = ArchiveReader.open('net54')
+    for thread in reader.iter_threads(forum='39', fields=('title', 'reply_count')):
+        ...
+    for post in reader.iter_posts(since='2024-01-01', processes=4):
+        ...
+
+Reading only thread metadata is the common case for exports and listings,
+and posts are most of every thread file. When ``fields`` leaves out
+``posts``, only the file's other top-level keys are decoded, and large files
+are memory-mapped so the posts are never copied out of the page cache: storages write item files with ``indent=2``, so each top-level key
+starts a line with exactly two spaces of indentation, which nothing inside
+a value can (strings escape their newlines).
+
+With ``processes``, files are split into chunks that a process pool reads
+ahead, in order, while the caller consumes earlier chunks.
+"""
+import json
+import logging
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Collection, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .records import Lot, Post, Thread, normalize_item
+from .scan import detect_layout, find_archives, iter_groups, iter_item_files
+
+# Item files per task when reading with a process pool
+CHUNK_SIZE = 256
+
+# Files at least this large are memory-mapped rather than read
+MMAP_MIN_SIZE = 64 * 1024
+
+# Start of a top-level key in a file written with indent=2
+TOP_LEVEL_KEY = b'\n  "'
+POSTS_KEY = b'\n  "posts": '
+
+Since = Union[datetime, str, float, None]
+
+logger = logging.getLogger('archive_reader')
+
+
+def _head(path: str) -> Optional[Dict[str, Any]]:
+    """Top-level keys of an item file except ``posts``, or None to read it whole"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_MIN_SIZE:
+            return _decode_head(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return _decode_head(data)
+
+
+def _decode_head(data) -> Optional[Dict[str, Any]]:
+    """``_head`` of a file's bytes or mmap"""
+    posts_at = data.find(POSTS_KEY)
+    if posts_at < 0 or data[:2] != b'{\n':
+        return None
+    # Everything up to the posts key, plus any keys after the posts
+    parts = [data[1:posts_at].rstrip(b', \n')]
+    after = data.find(TOP_LEVEL_KEY, posts_at + len(POSTS_KEY))
+    if after >= 0:
+        parts.append(data[after:data.rfind(b'}')].rstrip(b', \n'))
+    raw = json.loads(b'{' + b','.join(part for part in parts if part) + b'}')
+    raw['posts'] = []
+    return raw
+
+
+def read_item(path: Union[str, Path], posts: bool = True):
+    """Read one item file as its record
+
+    Args:
+        path: Thread or lot JSON file
+        posts: Read a thread's posts; without them the thread's ``posts``
+            list is empty
+
+    Returns:
+        ``Thread``, ``Lot``, or None if the file is unreadable or neither
+    """
+    path = str(path)
+    try:
+        raw = None if posts else _head(path)
+        if raw is None:
+            with open(path, 'rb') as f:
+                raw = json.load(f)
+        return normalize_item(raw)
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Skipping unreadable item file {path}: {e}")
+        return None
+
+
+def _read_chunk(tasks: List[Tuple[Any, str]], posts: bool,
+                transform: Optional[Callable[[Any], Any]]) -> List[Tuple[Any, Any]]:
+    """Records (or their transforms) of a chunk of (key, path) tasks; runs in a worker process"""
+    results = []
+    for key, path in tasks:
+        record = read_item(path, posts)
+        results.append((key, transform(record) if transform and record is not None else record))
+    return results
+
+
+def read_items(tasks: Iterable[Tuple[Any, str]], posts: bool = True,
+               processes: Optional[int] = None,
+               transform: Optional[Callable[[Any], Any]] = None) -> Iterator[Tuple[Any, Any]]:
+    """Read many item files, in a process pool when asked
+
+    Args:
+        tasks: (key, path) pairs; keys are passed through to the results
+        posts: Read threads' posts
+        processes: Read ahead with this many worker processes
+        transform: Applied to each record where it is read (in the worker),
+            so only its result is sent back; must be a module-level function
+
+    Yields:
+        (key, record or transform(record)) in task order; None for
+        unreadable files
+    """
+    if not processes or processes <= 1:
+        for task in tasks:
+            yield from _read_chunk([task], posts, transform)
+        return
+
+    # Keep a bounded window of chunks in flight, consumed in order
+    tasks = iter(tasks)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        while chunk := list(islice(tasks, CHUNK_SIZE)):
+            pending.append(pool.submit(_read_chunk, chunk, posts, transform))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _epoch_seconds(since: Since) -> Optional[float]:
+    if since is None or isinstance(since, (int, float)):
+        return since
+    if isinstance(since, str):
+        since = datetime.fromisoformat(since)
+    return since.timestamp()
+
+
+class ArchiveReader:
+    """Streams the records of one archive"""
+
+    def __init__(self, root: Union[str, Path], layout: Optional[str] = None):
+        """
+        Args:
+            root: Archive data root (DataStorage base_dir, or the data dir
+                of a MultiArchiveStorage archive)
+            layout: 'forums' or 'items'; detected when omitted
+        """
+        self.root = Path(root)
+        self.layout = layout or detect_layout(self.root)
+
+    @classmethod
+    def open(cls, archive: str, base_dir: str = 'archives') -> 'ArchiveReader':
+        """Reader of an archive by name (e.g. 'net54', 'heritage')"""
+        archives = find_archives(base_dir)
+        if archive not in archives:
+            raise KeyError(f"No data found for archive: {archive}")
+        root, layout = archives[archive]
+        return cls(root, layout)
+
+    def groups(self) -> List[str]:
+        """Forum IDs or item types in the archive"""
+        return [group for group, _ in iter_groups(self.root, self.layout)]
+
+    def _files(self, group: Optional[str], since: Since) -> Iterator[Tuple[str, str]]:
+        """(group, item file path), skipping files not modified since ``since``"""
+        since = _epoch_seconds(since)
+        for name, group_dir in iter_groups(self.root, self.layout):
+            if group is not None and name != str(group):
+                continue
+            for entry in iter_item_files(group_dir, self.layout):
+                if since is None or entry.stat().st_mtime >= since:
+                    yield name, entry.path
+
+    def iter_items(self, group: Optional[str] = None, since: Since = None,
+                   posts: bool = True, processes: Optional[int] = None) -> Iterator[Tuple[str, Any]]:
+        """Yield (group, record) for every readable item file
+
+        Args:
+            group: Only this forum ID or item type
+            since: Only files modified at or after this time (datetime,
+                ISO string or epoch seconds)
+            posts: Read threads' posts
+            processes: Read ahead with this many worker processes
+        """
+        for name, record in read_items(self._files(group, since), posts, processes):
+            if record is not None:
+                yield name, record
+
+    def iter_threads(self, forum: Optional[str] = None, since: Since = None,
+                     fields: Optional[Collection[str]] = None,
+                     processes: Optional[int] = None) -> Iterator[Thread]:
+        """Yield every thread
+
+        Args:
+            forum: Only this forum ID (item type, for items archives)
+            since: Only threads whose file changed at or after this time
+            fields: ``Thread`` fields the caller uses; posts are only
+                decoded when 'posts' is among them (or fields is omitted)
+            processes: Read ahead with this many worker processes
+        """
+        posts = fields is None or 'posts' in fields
+        for _, record in self.iter_items(forum, since, posts, processes):
+            if isinstance(record, Thread):
+                yield record
+
+    def iter_posts(self, forum: Optional[str] = None, since: Since = None,
+                   processes: Optional[int] = None) -> Iterator[Post]:
+        """Yield every post, thread by thread
+
+        Args:
+            forum: Only this forum ID (item type, for items archives)
+            since: Only posts of threads whose file changed at or after this time
+            processes: Read ahead with this many worker processes
+        """
+        for thread in self.iter_threads(forum, since, processes=processes):
+            yield from thread.posts
+
+    def iter_lots(self, item_type: Optional[str] = None, since: Since = None,
+                  processes: Optional[int] = None) -> Iterator[Lot]:
+        """Yield every auction lot
+
+        Args:
+            item_type: Only this item type
+            since: Only lots whose file changed at or after this time
+            processes: Read ahead with this many worker processes
+        """
+        for _, record in self.iter_items(item_type, since, posts=False, processes=processes):
+            if isinstance(record, Lot):
+                yield record
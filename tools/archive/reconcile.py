@@ -0,0 +1,218 @@
+"""
+Archive Reconciliation
+
+Rebuilds a forum archive's bookkeeping from the thread files themselves and
+finds threads that need to be fetched again:
+
+* ``unparseable``: the file is not valid JSON (e.g. a write cut off mid-way)
+* ``empty``: thread metadata was saved but ``save_posts`` never ran
+* ``truncated``: fewer posts than the thread's reply count says it has,
+  capped at the per-topic post limit the scrapers use
+
+Forum directories are scanned in parallel. The result is written as fresh progress
+partitions and ``stats.json`` plus a ``repair.json`` work list that
+the scrapers consume with ``--repair``.
+"""
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .partitions import ProgressPartitions, atomic_write_json, locked, read_json
+from .scan import iter_groups, iter_item_files, map_groups
+from .stats import GroupAccumulator, write_stats
+
+# Posts per topic fetched by the Tapatalk scraper (its --post-limit default)
+DEFAULT_POST_LIMIT = 50
+
+
+def _expected_posts(thread: Dict[str, Any], post_limit: int) -> int:
+    try:
+        replies = int(thread.get('reply_count') or 0)
+    except (TypeError, ValueError):
+        replies = 0
+    return min(replies + 1, post_limit)
+
+
+def reconcile_forum(forum_id: str, forum_dir: str, post_limit: int = DEFAULT_POST_LIMIT) -> Dict[str, Any]:
+    """Check every thread file of one forum directory
+
+    Runs in a worker process.
+
+    Returns:
+        Dictionary with the forum's rebuilt progress entries, its metadata,
+        stats aggregates and the list of threads needing repair
+    """
+    threads = {}
+    repairs = []
+    accumulator = GroupAccumulator()
+
+    for entry in iter_item_files(Path(forum_dir), 'forums'):
+        thread_id = entry.name[len('thread_'):-len('.json')]
+        stat = entry.stat()
+        scraped_at = datetime.fromtimestamp(stat.st_mtime).isoformat()
+
+        try:
+            with open(entry.path, 'r', encoding='utf-8') as f:
+                thread = json.load(f)
+            posts = thread['posts']
+            if not isinstance(posts, list):
+                raise ValueError('posts is not a list')
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            accumulator.add(stat.st_size, counted=False)
+            threads[thread_id] = {'title': '', 'scraped_at': scraped_at, 'post_count': 0}
+            repairs.append({
+                'forum_id': forum_id,
+                'thread_id': thread_id,
+                'reason': 'unparseable',
+                'detail': str(e)[:200],
+            })
+            continue
+
+        accumulator.add(stat.st_size, posts)
+        threads[thread_id] = {
+            'title': thread.get('title', ''),
+            'scraped_at': scraped_at,
+            'post_count': len(posts),
+        }
+
+        expected = _expected_posts(thread, post_limit)
+        reason = None
+        if not posts:
+            reason = 'empty'
+        elif len(posts) < expected:
+            reason = 'truncated'
+        if reason:
+            repairs.append({
+                'forum_id': forum_id,
+                'thread_id': thread_id,
+                'reason': reason,
+                'title': thread.get('title', ''),
+                'post_count': len(posts),
+                'expected_posts': expected,
+            })
+
+    metadata = {}
+    metadata_file = Path(forum_dir) / 'metadata.json'
+    if metadata_file.exists():
+        try:
+            with open(metadata_file, 'r') as f:
+                metadata = json.load(f)
+        except ValueError:
+            pass
+
+    return {
+        'forum': {
+            'name': metadata.get('name', f'Forum {forum_id}'),
+            'scraped_at': metadata.get('scraped_at'),
+            'thread_count': len(threads),
+        },
+        'threads': threads,
+        'stats': accumulator.result(),
+        'repairs': sorted(repairs, key=lambda r: int(r['thread_id']) if r['thread_id'].isdigit() else 0),
+    }
+
+
+class RepairList:
+    """Threads that must be fetched again, stored as ``repair.json``"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.data = self.load()
+
+    def load(self) -> Dict[str, Any]:
+        return read_json(self.path) or {'created_at': None, 'threads': []}
+
+    def save(self):
+        """Write the list atomically; an empty list removes the file"""
+        if not self.data['threads']:
+            if self.path.exists():
+                self.path.unlink()
+            return
+        atomic_write_json(self.path, self.data, indent=2)
+
+    def threads(self, forum_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Pending repairs, optionally for one forum"""
+        entries = self.data['threads']
+        if forum_id is not None:
+            entries = [e for e in entries if e['forum_id'] == str(forum_id)]
+        return list(entries)
+
+    def mark_done(self, forum_id: str, thread_id: str):
+        """Drop a repaired thread from the list and persist it
+
+        The list is re-read under a lock, so repairs finished by other
+        processes are not brought back.
+        """
+        forum_id, thread_id = str(forum_id), str(thread_id)
+        with locked(self.path):
+            self.data = self.load()
+            self.data['threads'] = [
+                e for e in self.data['threads']
+                if not (e['forum_id'] == forum_id and e['thread_id'] == thread_id)
+            ]
+            self.save()
+
+    def __len__(self):
+        return len(self.data['threads'])
+
+
+def reconcile_archive(base_dir: Path, processes: Optional[int] = None,
+                      post_limit: int = DEFAULT_POST_LIMIT, dry_run: bool = False) -> Dict[str, Any]:
+    """Rebuild progress, stats and the repair list of a forum archive
+
+    Args:
+        base_dir: DataStorage base directory (e.g. data/forums/net54baseball.com)
+        processes: Worker processes (defaults to CPU count)
+        post_limit: Per-topic post cap used when judging truncation
+        dry_run: Only report, do not write any files
+
+    Returns:
+        Summary with per-forum counts and the repair entries
+    """
+    base_dir = Path(base_dir)
+    tasks = [(forum_id, str(path), post_limit) for forum_id, path in iter_groups(base_dir, 'forums')]
+    results = map_groups(reconcile_forum, tasks, processes)
+
+    progress = {'forums': {}, 'threads': {}}
+    groups = {}
+    repairs = []
+    for (forum_id, _, _), result in zip(tasks, results):
+        progress['forums'][forum_id] = result['forum']
+        progress['threads'][forum_id] = result['threads']
+        groups[forum_id] = result['stats']
+        repairs.extend(result['repairs'])
+
+    summary = {
+        'forums': {
+            forum_id: {
+                'threads': len(progress['threads'][forum_id]),
+                'repairs': sum(1 for r in repairs if r['forum_id'] == forum_id),
+            }
+            for forum_id in progress['forums']
+        },
+        'reasons': {},
+        'repairs': repairs,
+    }
+    for repair in repairs:
+        summary['reasons'][repair['reason']] = summary['reasons'].get(repair['reason'], 0) + 1
+
+    if dry_run:
+        return summary
+
+    partitions = ProgressPartitions(base_dir / 'progress')
+    for forum_id, forum in progress['forums'].items():
+        partitions.replace(forum_id, forum, progress['threads'][forum_id])
+    legacy_progress = base_dir / 'progress.json'
+    if legacy_progress.exists():
+        # Superseded by the partitions just written
+        os.replace(legacy_progress, legacy_progress.with_name('progress.json.migrated'))
+
+    write_stats(base_dir / 'stats.json', groups)
+
+    repair_list = RepairList(base_dir / 'repair.json')
+    repair_list.data = {'created_at': datetime.now().isoformat(), 'threads': repairs}
+    repair_list.save()
+
+    return summary
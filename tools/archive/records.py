@@ -0,0 +1,345 @@
+"""
+Typed Archive Records
+
+Compact record types for what the archives hold: forums, threads, posts and
+auction lots. Each is a ``__slots__`` dataclass, so a record carries no
+per-instance ``__dict__`` and costs a fraction of the equivalent dict.
+
+Scraped data reaches the archives in several dict shapes: the HTML parser
+writes ``id/author/timestamp/content`` posts, Tapatalk writes
+``post_id/post_author_name/post_content`` posts, and Heritage lots have their
+own keys. The ``normalize_*`` functions map all of them onto these types, so
+readers and indexes only deal with one schema. The files on disk keep their
+original shapes. Posts migrated from the old Net54 archive under the
+``Archive`` user get their real author back from their "Posted By:" line.
+
+Every type has two codecs:
+
+* ``to_dict`` / ``from_dict``: the record as a JSON object keyed by field.
+* ``to_row`` / ``from_row``: the record as a JSON array in field order,
+  which is smaller and faster to encode and decode; used for derived
+  data such as indexes, where the field order is fixed by this module.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Threads migrated from the old Net54 archive were posted as this user, with
+# the real poster on a "Posted By: <name>" first line of every post
+LEGACY_AUTHOR = 'Archive'
+POSTED_BY = re.compile(r'\A\s*Posted By:[ \t]*([^\n]*?)[ \t]*(?:\r?\n|\Z)')
+
+
+def _text(value: Any) -> str:
+    return '' if value is None else str(value)
+
+
+def _optional_text(value: Any) -> Optional[str]:
+    return str(value) if value else None
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _epoch(value: Any) -> Optional[int]:
+    """Epoch seconds from an int or a string of digits"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def _price(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+@dataclass(slots=True)
+class Post:
+    """One forum post"""
+    id: str
+    thread_id: str = ''
+    author: str = ''
+    title: str = ''
+    content: str = ''
+    posted: Optional[str] = None       # post date as the source gave it
+    timestamp: Optional[int] = None    # epoch seconds, if known
+    attachments: Tuple[str, ...] = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'thread_id': self.thread_id,
+            'author': self.author,
+            'title': self.title,
+            'content': self.content,
+            'posted': self.posted,
+            'timestamp': self.timestamp,
+            'attachments': list(self.attachments)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Post':
+        return cls(data['id'], data.get('thread_id', ''), data.get('author', ''),
+                   data.get('title', ''), data.get('content', ''), data.get('posted'),
+                   data.get('timestamp'), tuple(data.get('attachments') or ()))
+
+    def to_row(self) -> list:
+        return [self.id, self.thread_id, self.author, self.title, self.content,
+                self.posted, self.timestamp, list(self.attachments)]
+
+    @classmethod
+    def from_row(cls, row: list) -> 'Post':
+        return cls(row[0], row[1], row[2], row[3], row[4], row[5], row[6], tuple(row[7]))
+
+
+@dataclass(slots=True)
+class Thread:
+    """A forum thread and, once fetched, its posts"""
+    id: str
+    forum_id: str = ''
+    title: str = ''
+    author: str = ''
+    reply_count: int = 0
+    view_count: int = 0
+    created: Optional[str] = None
+    last_reply: Optional[str] = None
+    url: Optional[str] = None
+    posts: List[Post] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'forum_id': self.forum_id,
+            'title': self.title,
+            'author': self.author,
+            'reply_count': self.reply_count,
+            'view_count': self.view_count,
+            'created': self.created,
+            'last_reply': self.last_reply,
+            'url': self.url,
+            'posts': [post.to_dict() for post in self.posts]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Thread':
+        return cls(data['id'], data.get('forum_id', ''), data.get('title', ''),
+                   data.get('author', ''), data.get('reply_count', 0),
+                   data.get('view_count', 0), data.get('created'), data.get('last_reply'),
+                   data.get('url'), [Post.from_dict(post) for post in data.get('posts') or ()])
+
+    def to_row(self) -> list:
+        return [self.id, self.forum_id, self.title, self.author, self.reply_count,
+                self.view_count, self.created, self.last_reply, self.url,
+                [post.to_row() for post in self.posts]]
+
+    @classmethod
+    def from_row(cls, row: list) -> 'Thread':
+        return cls(row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7], row[8],
+                   [Post.from_row(post) for post in row[9]])
+
+
+@dataclass(slots=True)
+class Forum:
+    """A forum (board) of a forum archive"""
+    id: str
+    name: str = ''
+    description: str = ''
+    url: Optional[str] = None
+    thread_count: int = 0
+    post_count: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'url': self.url,
+            'thread_count': self.thread_count,
+            'post_count': self.post_count
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Forum':
+        return cls(data['id'], data.get('name', ''), data.get('description', ''),
+                   data.get('url'), data.get('thread_count', 0), data.get('post_count', 0))
+
+    def to_row(self) -> list:
+        return [self.id, self.name, self.description, self.url, self.thread_count, self.post_count]
+
+    @classmethod
+    def from_row(cls, row: list) -> 'Forum':
+        return cls(*row)
+
+
+@dataclass(slots=True)
+class Lot:
+    """An auction lot"""
+    id: str
+    auction_id: str = ''
+    title: str = ''
+    description: str = ''
+    scraped_at: Optional[str] = None
+    estimate_low: Optional[float] = None
+    estimate_high: Optional[float] = None
+    current_bid: Optional[float] = None
+    starting_bid: Optional[float] = None
+    realized_price: Optional[float] = None
+    images: Tuple[str, ...] = ()           # image URLs
+    details: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'auction_id': self.auction_id,
+            'title': self.title,
+            'description': self.description,
+            'scraped_at': self.scraped_at,
+            'estimate_low': self.estimate_low,
+            'estimate_high': self.estimate_high,
+            'current_bid': self.current_bid,
+            'starting_bid': self.starting_bid,
+            'realized_price': self.realized_price,
+            'images': list(self.images),
+            'details': self.details
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Lot':
+        return cls(data['id'], data.get('auction_id', ''), data.get('title', ''),
+                   data.get('description', ''), data.get('scraped_at'),
+                   data.get('estimate_low'), data.get('estimate_high'),
+                   data.get('current_bid'), data.get('starting_bid'),
+                   data.get('realized_price'), tuple(data.get('images') or ()),
+                   data.get('details') or {})
+
+    def to_row(self) -> list:
+        return [self.id, self.auction_id, self.title, self.description, self.scraped_at,
+                self.estimate_low, self.estimate_high, self.current_bid,
+                self.starting_bid, self.realized_price, list(self.images), self.details]
+
+    @classmethod
+    def from_row(cls, row: list) -> 'Lot':
+        return cls(row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7],
+                   row[8], row[9], tuple(row[10]), row[11])
+
+
+RECORD_TYPES = {'forum': Forum, 'thread': Thread, 'post': Post, 'lot': Lot}
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+_decoder = json.JSONDecoder()
+
+
+def dumps_row(record) -> str:
+    """One record as a compact JSON array (one line of a JSON-lines file)"""
+    return _encoder.encode(record.to_row())
+
+
+def loads_row(cls, line: str):
+    """Inverse of ``dumps_row`` for a record of type ``cls``"""
+    return cls.from_row(_decoder.decode(line))
+
+
+def recover_author(author: str, content: str) -> Tuple[str, str]:
+    """Real author and content of a post migrated under ``LEGACY_AUTHOR``
+
+    Returns:
+        (author, content) with the "Posted By:" line moved out of the
+        content; unchanged for any other post
+    """
+    if author != LEGACY_AUTHOR:
+        return author, content
+    match = POSTED_BY.match(content)
+    if match is None or not match.group(1):
+        return author, content
+    return match.group(1), content[match.end():]
+
+
+def normalize_post(raw: Dict[str, Any], thread_id: str = '') -> Post:
+    """Map a stored post of any known shape onto ``Post``
+
+    Args:
+        raw: Post dict from the Tapatalk scraper (``post_id``, ``post_*``),
+            the HTML parser (``id``, ``author``, date text in ``timestamp``)
+            or ``Post.to_dict``
+        thread_id: Thread the post belongs to, if the dict does not say
+
+    Returns:
+        The post as a record
+    """
+    if 'post_id' in raw:
+        # Tapatalk: post_time is the ISO-like date, timestamp epoch seconds
+        author, content = recover_author(_text(raw.get('post_author_name')),
+                                         _text(raw.get('post_content')))
+        return Post(
+            _text(raw['post_id']), thread_id, author, _text(raw.get('post_title')),
+            content, _optional_text(raw.get('post_time')), _epoch(raw.get('timestamp'))
+        )
+    if 'posted' in raw:
+        post = Post.from_dict(raw)
+        if thread_id and not post.thread_id:
+            post.thread_id = thread_id
+        return post
+    # HTML parser: 'timestamp' holds the date as shown on the page
+    timestamp = raw.get('timestamp')
+    epoch = _epoch(timestamp)
+    author, content = recover_author(_text(raw.get('author')), _text(raw.get('content')))
+    return Post(
+        _text(raw.get('id')), _text(raw.get('thread_id') or thread_id),
+        author, _text(raw.get('title')), content,
+        None if epoch is not None else _optional_text(timestamp), epoch,
+        tuple(raw.get('attachments') or ())
+    )
+
+
+def normalize_thread(raw: Dict[str, Any]) -> Thread:
+    """Map a stored thread file (either scraper) onto ``Thread`` with its posts
+
+    A migrated thread's starter is its first post's recovered author.
+    """
+    thread_id = _text(raw.get('id'))
+    posts = [normalize_post(post, thread_id) for post in raw.get('posts') or ()]
+    author = _text(raw.get('author'))
+    if author in ('', LEGACY_AUTHOR) and posts:
+        author = posts[0].author
+    return Thread(
+        thread_id, _text(raw.get('forum_id')), _text(raw.get('title')),
+        author, _int(raw.get('reply_count')), _int(raw.get('view_count')),
+        _optional_text(raw.get('created') or raw.get('created_date')),
+        _optional_text(raw.get('last_reply')), raw.get('url'), posts
+    )
+
+
+def normalize_forum(raw: Dict[str, Any]) -> Forum:
+    """Map a stored forum dict onto ``Forum``"""
+    return Forum(
+        _text(raw.get('id')), _text(raw.get('name')), _text(raw.get('description')),
+        raw.get('url'), _int(raw.get('thread_count')), _int(raw.get('post_count'))
+    )
+
+
+def normalize_lot(raw: Dict[str, Any]) -> Lot:
+    """Map a stored Heritage lot dict onto ``Lot``"""
+    images = tuple(image['url'] if isinstance(image, dict) else image
+                   for image in raw.get('images') or ())
+    return Lot(
+        _text(raw.get('id')), _text(raw.get('auction_id')), _text(raw.get('title')),
+        _text(raw.get('description')), raw.get('scraped_at'),
+        _price(raw.get('estimate_low')), _price(raw.get('estimate_high')),
+        _price(raw.get('current_bid')), _price(raw.get('starting_bid')),
+        _price(raw.get('realized_price')), images, dict(raw.get('details') or {})
+    )
+
+
+def normalize_item(raw: Dict[str, Any]):
+    """Map a stored item file onto its record: ``Thread``, ``Lot``, or None if neither"""
+    if 'posts' in raw:
+        return normalize_thread(raw)
+    if 'auction_id' in raw:
+        return normalize_lot(raw)
+    return None
@@ -0,0 +1,103 @@
+"""
+Archive Scanning
+
+Helpers shared by the full-archive passes (``stats --deep``, ``reconcile``,
+...). Archives come in two on-disk layouts:
+
+* ``forums``: the legacy DataStorage layout, ``<root>/forum_<id>/thread_<id>.json``
+* ``items``: the MultiArchiveStorage layout, ``<root>/processed/<type>/<id>.json``
+
+Each forum or item-type directory is a *group*; passes fan groups out over a
+process pool and scan each one with ``os.scandir``.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Legacy DataStorage roots, keyed by archive name
+LEGACY_ARCHIVES = {
+    'net54': Path('data/forums/net54baseball.com'),
+}
+
+ARCHIVE_TYPES = ['forums', 'auctions', 'content']
+
+
+def detect_layout(root: Path) -> str:
+    """Return 'forums' for DataStorage roots, 'items' for MultiArchiveStorage data dirs"""
+    return 'items' if (Path(root) / 'processed').is_dir() else 'forums'
+
+
+def find_archives(base_dir: str = 'archives') -> Dict[str, Tuple[Path, str]]:
+    """Locate every archive that has data on disk
+
+    Args:
+        base_dir: Base directory of MultiArchiveStorage archives
+
+    Returns:
+        Mapping of archive name to (data root, layout)
+    """
+    archives = {}
+    for name, root in LEGACY_ARCHIVES.items():
+        if root.is_dir():
+            archives[name] = (root, 'forums')
+
+    for archive_type in ARCHIVE_TYPES:
+        type_dir = Path(base_dir) / archive_type
+        if not type_dir.is_dir():
+            continue
+        for archive_dir in type_dir.iterdir():
+            data_dir = archive_dir / 'data'
+            if data_dir.is_dir():
+                archives.setdefault(archive_dir.name, (data_dir, 'items'))
+    return archives
+
+
+def iter_groups(root: Path, layout: Optional[str] = None) -> Iterator[Tuple[str, Path]]:
+    """Yield (group name, directory) for every forum or item-type directory
+
+    Args:
+        root: Archive data root
+        layout: 'forums' or 'items'; detected when omitted
+    """
+    root = Path(root)
+    layout = layout or detect_layout(root)
+    if layout == 'items':
+        parent, prefix = root / 'processed', ''
+    else:
+        parent, prefix = root, 'forum_'
+
+    if not parent.is_dir():
+        return
+    with os.scandir(parent) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            if entry.is_dir() and entry.name.startswith(prefix):
+                yield entry.name[len(prefix):], Path(entry.path)
+
+
+def iter_item_files(group_dir: Path, layout: str) -> Iterator[os.DirEntry]:
+    """Yield the DirEntry of every item JSON file in a group directory"""
+    prefix = 'thread_' if layout == 'forums' else ''
+    with os.scandir(group_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.endswith('.json') and name.startswith(prefix) and name != 'metadata.json':
+                yield entry
+
+
+def map_groups(func: Callable, tasks: List[tuple], processes: Optional[int] = None) -> list:
+    """Run ``func(*task)`` for every task, in a process pool when it helps
+
+    Args:
+        func: Module-level (picklable) function scanning one group
+        tasks: Argument tuples, one per group
+        processes: Pool size; defaults to the CPU count, 1 scans in-process
+
+    Returns:
+        Results in task order
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes <= 1 or len(tasks) <= 1:
+        return [func(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(processes, len(tasks))) as pool:
+        return list(pool.map(func, *zip(*tasks)))
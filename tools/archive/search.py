@@ -0,0 +1,244 @@
+"""
+Full-text Search Index
+
+An inverted index over thread titles, post content and lot descriptions,
+stored in SQLite's FTS5 (``<archive root>/index/search.db``). FTS5 keeps
+delta- and varint-compressed postings with token positions, which gives:
+
+* BM25 ranking, with title matches weighted above content matches;
+* phrase queries (``"sweet caporal 350"``) and prefix queries (``cobb*``);
+* incremental updates: an item's documents are replaced in one transaction
+  whenever it is saved (see ``indexers.py``), no rebuilds.
+
+Every post is one document; the thread title is indexed with a thread's
+first post, and a lot is one document of its title and description.
+"""
+import re
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .records import Lot, Thread
+
+SEARCH_DB = 'search.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (group_key, item_id)
+);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    post_id TEXT NOT NULL DEFAULT '',
+    author TEXT NOT NULL DEFAULT '',
+    posted TEXT
+);
+CREATE INDEX IF NOT EXISTS docs_item ON docs (group_key, item_id);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE text USING fts5(
+    title, content, tokenize = 'unicode61 remove_diacritics 2'
+);
+INSERT INTO text (text, rank) VALUES ('rank', 'bm25(4.0, 1.0)');
+"""
+
+QUERY_TOKEN = re.compile(r'(-?)"([^"]*)"?|(-?)(\S+)')
+
+
+def _quoted(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def match_expression(query: str) -> str:
+    """Translate a user query into an FTS5 MATCH expression
+
+    Words must all match (``OR`` between two words allows either),
+    ``"..."`` is a phrase, ``word*`` a prefix and ``-word`` or
+    ``-"..."`` excludes. Everything else is taken literally, so no user
+    input is an FTS5 syntax error.
+
+    Raises:
+        ValueError: If the query has nothing to search for
+    """
+    required, excluded = [], []
+    for match in QUERY_TOKEN.finditer(query):
+        phrase = match.group(2) is not None
+        if phrase:
+            term, negated = match.group(2), bool(match.group(1))
+        else:
+            term, negated = match.group(4), bool(match.group(3))
+        if not negated and not phrase and term == 'OR':
+            if required and required[-1] != 'OR':
+                required.append('OR')
+            continue
+        prefix = term.endswith('*') and not phrase
+        term = term.rstrip('*') if prefix else term
+        if not re.search(r'\w', term):
+            continue
+        (excluded if negated else required).append(_quoted(term) + ('*' if prefix else ''))
+    while required and required[-1] == 'OR':
+        required.pop()
+    if not required:
+        raise ValueError(f"Nothing to search for in {query!r}")
+    expression = ' '.join(required)
+    for term in excluded:
+        expression = f'({expression}) NOT {term}'
+    return expression
+
+
+@dataclass
+class SearchHit:
+    """One matching post (or lot)"""
+    score: float
+    group: str
+    item_id: str
+    post_id: str
+    author: str
+    posted: Optional[str]
+    title: str
+    snippet: str
+
+
+class SearchIndex:
+    """FTS5 index of one archive"""
+
+    def __init__(self, directory: Path):
+        """Open (creating if needed) the search index in ``directory``
+
+        Args:
+            directory: The archive's index directory
+        """
+        self.path = Path(directory) / SEARCH_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'text'").fetchone():
+            self.conn.executescript(FTS_SCHEMA)
+        self._in_batch = False
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Run the updates made inside as one transaction"""
+        if self._in_batch:
+            yield
+            return
+        self.conn.execute('BEGIN IMMEDIATE')
+        self._in_batch = True
+        try:
+            yield
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        else:
+            self.conn.execute('COMMIT')
+        finally:
+            self._in_batch = False
+
+    def _documents(self, record) -> List[Tuple[str, str, str, str, Optional[str]]]:
+        """(title, content, post ID, author, posted) for each document of a record"""
+        if isinstance(record, Lot):
+            return [(record.title, record.description, '', '', record.scraped_at)]
+        if isinstance(record, Thread):
+            if not record.posts:
+                return [(record.title, '', '', record.author, record.created)]
+            return [(record.title if i == 0 else '', post.content, post.id, post.author, post.posted)
+                    for i, post in enumerate(record.posts)]
+        raise TypeError(f"Cannot index {type(record).__name__}")
+
+    def _delete(self, group: str, item_id: str):
+        self.conn.execute(
+            'DELETE FROM text WHERE rowid IN (SELECT id FROM docs WHERE group_key = ? AND item_id = ?)',
+            (group, item_id))
+        self.conn.execute('DELETE FROM docs WHERE group_key = ? AND item_id = ?', (group, item_id))
+
+    def index_item(self, group: str, item_id: str, record, stat):
+        """Replace the documents of one item
+
+        Args:
+            group: Forum ID or item type
+            item_id: Thread or item ID
+            record: ``records.Thread`` or ``records.Lot``
+            stat: ``os.stat`` of the item's file, to detect later changes
+        """
+        with self.batch():
+            self._delete(group, item_id)
+            for title, content, post_id, author, posted in self._documents(record):
+                cursor = self.conn.execute(
+                    'INSERT INTO docs (group_key, item_id, post_id, author, posted) VALUES (?, ?, ?, ?, ?)',
+                    (group, item_id, post_id, author, posted))
+                self.conn.execute('INSERT INTO text (rowid, title, content) VALUES (?, ?, ?)',
+                                  (cursor.lastrowid, title, content))
+            self.conn.execute(
+                'INSERT OR REPLACE INTO items (group_key, item_id, title, mtime_ns, size) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (group, item_id, record.title, stat.st_mtime_ns, stat.st_size))
+
+    def remove_item(self, group: str, item_id: str):
+        """Drop an item's documents"""
+        with self.batch():
+            self._delete(group, item_id)
+            self.conn.execute('DELETE FROM items WHERE group_key = ? AND item_id = ?', (group, item_id))
+
+    def item_state(self, group: str) -> Dict[str, Tuple[int, int]]:
+        """Item ID -> (mtime_ns, size) of the file each item was indexed from"""
+        rows = self.conn.execute('SELECT item_id, mtime_ns, size FROM items WHERE group_key = ?', (group,))
+        return {item_id: (mtime_ns, size) for item_id, mtime_ns, size in rows}
+
+    def optimize(self):
+        """Merge the index's segments into one, for the fastest queries"""
+        self.conn.execute("INSERT INTO text (text) VALUES ('optimize')")
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            'items': self.conn.execute('SELECT COUNT(*) FROM items').fetchone()[0],
+            'documents': self.conn.execute('SELECT COUNT(*) FROM docs').fetchone()[0],
+        }
+
+    def search(self, query: str, limit: int = 10, group: Optional[str] = None) -> List[SearchHit]:
+        """Best matches for a query, by BM25
+
+        Args:
+            query: Words, "phrases", prefix* and -excluded terms
+            limit: Maximum number of hits
+            group: Only search this forum or item type
+
+        Raises:
+            ValueError: If the query has nothing to search for
+        """
+        expression = match_expression(query)
+        source, where, params = 'text', 'text MATCH ?', [expression]
+        if group is not None:
+            # CROSS JOIN keeps the match outermost; otherwise SQLite may scan
+            # the group's documents and run the match once per document
+            source = 'text CROSS JOIN docs ON docs.id = text.rowid'
+            where += ' AND docs.group_key = ?'
+            params.append(str(group))
+        params.append(limit)
+        rows = self.conn.execute(f"""
+            WITH hits AS (
+                SELECT text.rowid AS id, text.rank AS rank,
+                       snippet(text, -1, '[', ']', '…', 16) AS snippet
+                FROM {source} WHERE {where} ORDER BY text.rank LIMIT ?
+            )
+            SELECT hits.rank, d.group_key, d.item_id, d.post_id, d.author, d.posted,
+                   COALESCE(i.title, ''), hits.snippet
+            FROM hits
+            JOIN docs d ON d.id = hits.id
+            LEFT JOIN items i ON i.group_key = d.group_key AND i.item_id = d.item_id
+            ORDER BY hits.rank
+        """, params)
+        return [SearchHit(-rank, *rest) for rank, *rest in rows]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,332 @@
+"""
+Compact Progress Snapshots
+
+Progress partitions of large archives (millions of Heritage lots, hundreds
+of thousands of threads) are too big to keep as JSON: every entry becomes a
+dict of strings when the file is parsed, at hundreds of bytes each, and the
+whole file is parsed at startup. A snapshot stores the same entries as
+columns in one binary file that is memory-mapped, so opening it costs
+nothing and lookups only touch the pages they need:
+
+* entry keys as a sorted int64 array, found with a binary search;
+* integer fields as int64 columns;
+* ISO date-times as int64 epoch seconds;
+* other strings (titles) as int32 indexes into an interned string table;
+* anything else as JSON text in the string table.
+
+Only entries with integer keys are compacted; ``partitions.py`` keeps other
+entries, and everything written since the last compaction, in the partition's
+JSON file, which takes precedence over the snapshot.
+
+File layout: 8-byte magic, uint64 header length, a JSON header describing
+the columns, then the arrays, each padded to 8 bytes.
+"""
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+SNAPSHOT_SUFFIX = '.snapshot'
+MAGIC = b'CPSNAP01'
+
+# Missing value in int64 (int/time) and int32 (string index) columns
+NULL_INT = -2 ** 63
+NULL_INDEX = -1
+
+INT64_MIN, INT64_MAX = -2 ** 63 + 1, 2 ** 63 - 1
+
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+
+def int_key(key: str) -> Optional[int]:
+    """The integer a key stands for, if it is a canonical integer string"""
+    if key.isdigit() and (key == '0' or key[0] != '0'):
+        value = int(key)
+        if value <= INT64_MAX:
+            return value
+    return None
+
+
+def _epoch(value: str) -> Optional[int]:
+    """Epoch seconds of a naive ISO date-time, or None if it is not one"""
+    if len(value) < 19 or value[10] != 'T':
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        return None
+    # Wall-clock seconds, so values read back exactly whatever the local zone
+    return (parsed - EPOCH) // SECOND
+
+
+def _merge_kinds(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    if a is None or a == b:
+        return b
+    if b is None:
+        return a
+    return 'str' if {a, b} == {'time', 'str'} else 'json'
+
+
+def _column_kind(values) -> Optional[str]:
+    """Narrowest column kind holding all values (None if all are missing)"""
+    kind = None
+    for value in values:
+        if value is None:
+            continue
+        if type(value) is int and INT64_MIN <= value <= INT64_MAX:
+            value_kind = 'int'
+        elif isinstance(value, str):
+            value_kind = 'time' if kind in (None, 'time') and _epoch(value) is not None else 'str'
+        else:
+            return 'json'
+        kind = _merge_kinds(kind, value_kind)
+        if kind == 'json':
+            break
+    return kind
+
+
+def _padded(data: bytes, fill: bytes = b'\0') -> bytes:
+    return data + fill * (-len(data) % 8)
+
+
+class _StringTable:
+    """Strings of a snapshot being written: the base's, then new interned ones"""
+
+    def __init__(self, base: Optional['ProgressSnapshot']):
+        self.base = base
+        self.first = len(base.string_offsets) - 1 if base is not None else 0
+        self.index: Dict[str, int] = {}
+
+    def intern(self, text: str) -> int:
+        index = self.index.get(text)
+        if index is None:
+            index = self.index[text] = self.first + len(self.index)
+        return index
+
+    def blocks(self) -> List[bytes]:
+        """The offsets array and the UTF-8 blob"""
+        offsets, blob = array('q', [0]), []
+        if self.base is not None:
+            offsets = array('q', self.base.string_offsets)
+            blob.append(self.base.blob[:offsets[-1]].tobytes())
+        for text in self.index:
+            data = text.encode('utf-8')
+            offsets.append(offsets[-1] + len(data))
+            blob.append(data)
+        return [offsets.tobytes(), _padded(b''.join(blob))]
+
+
+def _packer(kind: str, strings: _StringTable):
+    """Function turning one field value into its column code"""
+    if kind == 'int':
+        return lambda v: NULL_INT if v is None else v
+    if kind == 'time':
+        return lambda v: NULL_INT if v is None else _epoch(v)
+    if kind == 'str':
+        return lambda v: NULL_INDEX if v is None else strings.intern(v)
+    return lambda v: NULL_INDEX if v is None else strings.intern(json.dumps(v))
+
+
+def write_snapshot(path: Path, entries: Dict[str, Dict[str, Any]],
+                   base: Optional['ProgressSnapshot'] = None):
+    """Write integer-keyed entries as a snapshot file, atomically
+
+    With a ``base``, the result holds the base's entries too (``entries``
+    win on equal keys). The base's rows are copied as runs of bytes between
+    the new keys, so adding a few thousand entries to a snapshot of millions
+    costs little more than copying the file.
+
+    Args:
+        path: Snapshot file to (re)place
+        entries: Entry key -> fields; every key must pass ``int_key``
+        base: Snapshot to merge the entries into
+    """
+    path = Path(path)
+    new = sorted(((int_key(key), fields) for key, fields in entries.items()), key=lambda e: e[0])
+    base_count = len(base) if base is not None else 0
+    base_columns = base.columns if base is not None else {}
+
+    # Runs of base rows to keep between the new rows; a new row whose key
+    # is in the base replaces that base row
+    runs: List[Tuple[int, int]] = []
+    replaced: List[int] = []
+    position = 0
+    for key, _ in new:
+        at = bisect_left(base.keys, key, position) if base_count else 0
+        runs.append((position, at))
+        position = at
+        if at < base_count and base.keys[at] == key:
+            replaced.append(at)
+            position += 1
+    runs.append((position, base_count))
+
+    def merged(code: str, base_rows, new_values) -> bytes:
+        parts = []
+        pending = array(code)
+        for (start, end), value in zip(runs, new_values):
+            if start < end:
+                parts.append(pending.tobytes())
+                parts.append(base_rows(start, end))
+                pending = array(code)
+            pending.append(value)
+        parts.append(pending.tobytes())
+        if runs[-1][0] < runs[-1][1]:
+            parts.append(base_rows(*runs[-1]))
+        return b''.join(parts)
+
+    strings = _StringTable(base)
+    blocks = [merged('q', lambda s, e: base.keys[s:e].tobytes(), [key for key, _ in new])]
+    columns = []
+    names = sorted(set(base_columns) | {name for _, fields in new for name in fields})
+    for name in names:
+        values = [fields.get(name) for _, fields in new]
+        base_kind, base_nulls, base_values = base_columns.get(name, (None, 0, None))
+        kind = _merge_kinds(base_kind, _column_kind(values)) or 'int'
+        code, null = ('q', NULL_INT) if kind in ('int', 'time') else ('i', NULL_INDEX)
+        pack = _packer(kind, strings)
+        if base_kind is None:
+            null_row = array(code, [null]).tobytes()
+            base_rows = lambda s, e, null_row=null_row: null_row * (e - s)
+            kept_nulls = base_count - len(replaced)
+        else:
+            if base_kind == kind:
+                base_rows = lambda s, e, column=base_values: column[s:e].tobytes()
+            else:
+                # The column's kind widened: re-encode the base's values
+                base_rows = lambda s, e, name=name, pack=pack, code=code: array(
+                    code, [pack(base.value(name, row)) for row in range(s, e)]).tobytes()
+            base_null = base.nulls[name]
+            kept_nulls = base_nulls - sum(1 for row in replaced if base_values[row] == base_null)
+        column = merged(code, base_rows, [pack(value) for value in values])
+        columns.append([name, kind, kept_nulls + values.count(None)])
+        blocks.append(_padded(column))
+    blocks.extend(strings.blocks())
+
+    # Offsets are relative to the start of the data section
+    offset = 0
+    offsets = []
+    for block in blocks:
+        offsets.append(offset)
+        offset += len(block)
+    for column, column_offset in zip(columns, offsets[1:]):
+        column.append(column_offset)
+    header = _padded(json.dumps({
+        'count': base_count - len(replaced) + len(new),
+        'columns': columns,
+        'strings': [strings.first + len(strings.index), offsets[-2], offsets[-1]],
+    }).encode('utf-8'), b' ')
+
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            for block in blocks:
+                f.write(block)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+class ProgressSnapshot:
+    """Read-only, memory-mapped view of a snapshot file
+
+    Maps entry keys (str) to field dicts, which are built on access.
+    """
+
+    def __init__(self, path: Path):
+        """Map the snapshot at ``path``
+
+        Args:
+            path: Snapshot file written by ``write_snapshot``
+        """
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if bytes(view[:8]) != MAGIC:
+            raise ValueError(f"Not a progress snapshot: {self.path}")
+        header_len, = struct.unpack('<Q', view[8:16])
+        header = json.loads(bytes(view[16:16 + header_len]))
+        data = view[16 + header_len:]
+
+        self.count = count = header['count']
+        self.keys = data[:8 * count].cast('q')
+        self.columns: Dict[str, Tuple[str, int, memoryview]] = {}
+        self.nulls: Dict[str, int] = {}
+        for name, kind, nulls, offset in header['columns']:
+            width, code, null = (8, 'q', NULL_INT) if kind in ('int', 'time') else (4, 'i', NULL_INDEX)
+            self.columns[name] = (kind, nulls, data[offset:offset + width * count].cast(code))
+            self.nulls[name] = null
+        string_count, offsets_at, blob_at = header['strings']
+        self.string_offsets = data[offsets_at:offsets_at + 8 * (string_count + 1)].cast('q')
+        self.blob = data[blob_at:]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _position(self, key: str) -> Optional[int]:
+        value = int_key(key)
+        if value is None:
+            return None
+        position = bisect_left(self.keys, value)
+        if position < self.count and self.keys[position] == value:
+            return position
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return self._position(key) is not None
+
+    def value(self, name: str, row: int) -> Any:
+        """One field of the entry in a row (None if it has none)"""
+        kind, _, column = self.columns[name]
+        code = column[row]
+        if code == self.nulls[name]:
+            return None
+        if kind == 'int':
+            return code
+        if kind == 'time':
+            return (EPOCH + code * SECOND).isoformat()
+        text = str(self.blob[self.string_offsets[code]:self.string_offsets[code + 1]], 'utf-8')
+        return text if kind == 'str' else json.loads(text)
+
+    def _entry(self, row: int) -> Dict[str, Any]:
+        entry = {}
+        for name in self.columns:
+            value = self.value(name, row)
+            if value is not None:
+                entry[name] = value
+        return entry
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Fields of one entry, or None if the key is not in the snapshot"""
+        row = self._position(key)
+        return None if row is None else self._entry(row)
+
+    def __iter__(self) -> Iterator[str]:
+        return map(str, self.keys)
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for row in range(self.count):
+            yield str(self.keys[row]), self._entry(row)
+
+    def total(self, name: str) -> int:
+        """Sum of an integer field over all entries (missing values count 0)"""
+        if name not in self.columns:
+            return 0
+        kind, nulls, column = self.columns[name]
+        if kind != 'int':
+            return sum(value for row in range(self.count)
+                       if isinstance(value := self.value(name, row), int))
+        return sum(column) - nulls * NULL_INT
@@ -0,0 +1,300 @@
+"""
+Archive Statistics
+
+A materialized view of per-group aggregates (item count, post count, bytes,
+distinct authors and post date range), stored as ``stats.json`` next to the
+archive's progress file. The storage classes update it incrementally on every
+save, so ``stats`` answers from one small file instead of reading the archive.
+``rebuild_stats`` recomputes the view from disk with a parallel scan.
+
+Several processes may update one view: each keeps the deltas it recorded
+since its last save and merges them into the file under a lock (see
+``partitions.py``).
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from .partitions import atomic_write_json, locked, read_json
+from .records import LEGACY_AUTHOR, recover_author
+from .scan import detect_layout, iter_groups, iter_item_files, map_groups
+
+STATS_VERSION = 1
+
+
+def _empty_group() -> Dict[str, Any]:
+    return {
+        'items': 0,
+        'posts': 0,
+        'bytes': 0,
+        'authors': [],
+        'first_post': None,
+        'last_post': None,
+    }
+
+
+def post_epoch(post: Dict[str, Any]) -> Optional[int]:
+    """Epoch seconds of a post, if it carries a numeric timestamp"""
+    value = post.get('timestamp')
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def post_author(post: Dict[str, Any]) -> Optional[str]:
+    """Author name of a post in either the Tapatalk or HTML schema"""
+    author = post.get('post_author_name') or post.get('author') or None
+    if author == LEGACY_AUTHOR:
+        author, _ = recover_author(author, post.get('post_content') or post.get('content') or '')
+    return author
+
+
+class ArchiveStats:
+    """Incrementally maintained aggregates for one archive"""
+
+    def __init__(self, path: Path):
+        """Open (lazily) the stats view stored at ``path``
+
+        Args:
+            path: Location of stats.json
+        """
+        self.path = Path(path)
+        self._data: Optional[Dict[str, Any]] = None
+        self._authors: Dict[str, set] = {}
+        self._deltas: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = self.load()
+        return self._data
+
+    def load(self) -> Dict[str, Any]:
+        """Load the view from disk, or start an empty one"""
+        data = read_json(self.path)
+        if data and data.get('version') == STATS_VERSION:
+            return data
+        return {'version': STATS_VERSION, 'updated_at': None, 'groups': {}}
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _group(self, group: str) -> Dict[str, Any]:
+        groups = self.data['groups']
+        if group not in groups:
+            groups[group] = _empty_group()
+        return groups[group]
+
+    def record(self, group: str, new_item: bool = False, bytes_delta: int = 0,
+               posts_delta: int = 0, posts: Iterable[Dict[str, Any]] = ()):
+        """Apply the effect of one save to the aggregates
+
+        Args:
+            group: Forum ID or item type
+            new_item: True the first time an item is saved
+            bytes_delta: Change in the item's file size
+            posts_delta: Change in the item's post count
+            posts: Newly saved posts, for authors and date range
+        """
+        group = str(group)
+        delta = self._deltas.get(group)
+        if delta is None:
+            delta = self._deltas[group] = _empty_group()
+            delta['authors'] = set()
+        change = _empty_group()
+        change['authors'] = set()
+        for post in posts:
+            author = post_author(post)
+            if author:
+                change['authors'].add(author)
+            epoch = post_epoch(post)
+            if epoch is not None:
+                _extend_range(change, epoch, epoch)
+
+        delta['items'] += int(new_item)
+        delta['bytes'] += bytes_delta
+        delta['posts'] += posts_delta
+        delta['authors'].update(change['authors'])
+        _extend_range(delta, change['first_post'], change['last_post'])
+
+        self._apply(group, int(new_item), bytes_delta, posts_delta,
+                    change['authors'], change['first_post'], change['last_post'])
+        self.dirty = True
+
+    def _apply(self, group: str, items: int, bytes_delta: int, posts_delta: int,
+               authors: Iterable[str], first_post: Optional[int], last_post: Optional[int]):
+        stats = self._group(group)
+        stats['items'] += items
+        stats['bytes'] += bytes_delta
+        stats['posts'] += posts_delta
+        _extend_range(stats, first_post, last_post)
+
+        known = self._authors.get(group)
+        if known is None:
+            known = self._authors[group] = set(stats['authors'])
+        size_before = len(known)
+        known.update(authors)
+        if len(known) != size_before:
+            stats['authors'] = sorted(known)
+
+    def save(self) -> bool:
+        """Merge this process's changes into the file, if there are any
+
+        The file is locked and re-read, so aggregates recorded by other
+        processes since this one loaded the view are kept.
+
+        Returns:
+            True if the file was written
+        """
+        if not self.dirty:
+            return False
+        with locked(self.path):
+            deltas, self._deltas = self._deltas, {}
+            self._data = self.load()
+            self._authors = {}
+            for group, delta in deltas.items():
+                self._apply(group, delta['items'], delta['bytes'], delta['posts'],
+                            delta['authors'], delta['first_post'], delta['last_post'])
+            self._data['updated_at'] = datetime.now().isoformat()
+            atomic_write_json(self.path, self._data)
+        self.dirty = False
+        return True
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals across groups plus per-group figures, ready for display"""
+        groups = self.data['groups']
+        authors = set()
+        firsts = [g['first_post'] for g in groups.values() if g['first_post'] is not None]
+        lasts = [g['last_post'] for g in groups.values() if g['last_post'] is not None]
+        for stats in groups.values():
+            authors.update(stats['authors'])
+
+        return {
+            'updated_at': self.data['updated_at'],
+            'total_items': sum(g['items'] for g in groups.values()),
+            'total_posts': sum(g['posts'] for g in groups.values()),
+            'total_size_mb': round(sum(g['bytes'] for g in groups.values()) / (1024 * 1024), 2),
+            'distinct_authors': len(authors),
+            'first_post': _iso(min(firsts)) if firsts else None,
+            'last_post': _iso(max(lasts)) if lasts else None,
+            'groups': {
+                name: {
+                    'items': g['items'],
+                    'posts': g['posts'],
+                    'size_mb': round(g['bytes'] / (1024 * 1024), 2),
+                    'authors': len(g['authors']),
+                    'first_post': _iso(g['first_post']),
+                    'last_post': _iso(g['last_post']),
+                }
+                for name, g in sorted(groups.items())
+            },
+        }
+
+
+def _extend_range(stats: Dict[str, Any], first: Optional[int], last: Optional[int]):
+    if first is not None and (stats['first_post'] is None or first < stats['first_post']):
+        stats['first_post'] = first
+    if last is not None and (stats['last_post'] is None or last > stats['last_post']):
+        stats['last_post'] = last
+
+
+def _iso(epoch: Optional[int]) -> Optional[str]:
+    return datetime.fromtimestamp(epoch).isoformat() if epoch is not None else None
+
+
+class GroupAccumulator:
+    """Collects the aggregates of one group while its files are scanned"""
+
+    def __init__(self):
+        self.stats = _empty_group()
+        self.authors = set()
+        self.epochs = []
+
+    def add(self, size: int, posts: Iterable[Dict[str, Any]] = (), counted: bool = True):
+        """Account for one item file
+
+        Args:
+            size: File size in bytes
+            posts: Posts stored in the file
+            counted: False if the file could not be read (size only)
+        """
+        self.stats['items'] += 1
+        self.stats['bytes'] += size
+        if not counted:
+            return
+        for post in posts:
+            self.stats['posts'] += 1
+            author = post_author(post)
+            if author:
+                self.authors.add(author)
+            epoch = post_epoch(post)
+            if epoch is not None:
+                self.epochs.append(epoch)
+
+    def result(self) -> Dict[str, Any]:
+        self.stats['authors'] = sorted(self.authors)
+        self.stats['first_post'] = min(self.epochs) if self.epochs else None
+        self.stats['last_post'] = max(self.epochs) if self.epochs else None
+        return self.stats
+
+
+def scan_group(group: str, group_dir: str, layout: str) -> Dict[str, Any]:
+    """Compute the aggregates of one group directory from its files
+
+    Runs in a worker process during ``rebuild_stats``.
+    """
+    accumulator = GroupAccumulator()
+    for entry in iter_item_files(Path(group_dir), layout):
+        size = entry.stat().st_size
+        try:
+            with open(entry.path, 'r') as f:
+                posts = json.load(f).get('posts') or []
+        except (OSError, ValueError):
+            accumulator.add(size, counted=False)
+            continue
+        accumulator.add(size, posts)
+    return accumulator.result()
+
+
+def write_stats(stats_path: Path, groups: Dict[str, Dict[str, Any]]) -> 'ArchiveStats':
+    """Replace the stats view with freshly computed group aggregates"""
+    view = ArchiveStats(stats_path)
+    view._data = {'version': STATS_VERSION, 'updated_at': datetime.now().isoformat(), 'groups': groups}
+    with locked(view.path):
+        atomic_write_json(view.path, view._data)
+    return view
+
+
+def rebuild_stats(root: Path, stats_path: Optional[Path] = None,
+                  processes: Optional[int] = None) -> ArchiveStats:
+    """Recompute the stats view by scanning every item file in parallel
+
+    Args:
+        root: Archive data root (DataStorage base dir or MultiArchiveStorage data dir)
+        stats_path: Where to write the view; defaults to the storage's location
+        processes: Worker processes (defaults to CPU count)
+
+    Returns:
+        The rebuilt, saved ArchiveStats
+    """
+    root = Path(root)
+    layout = detect_layout(root)
+    if stats_path is None:
+        stats_path = stats_path_for(root, layout)
+
+    tasks = [(group, str(path), layout) for group, path in iter_groups(root, layout)]
+    results = map_groups(scan_group, tasks, processes)
+
+    return write_stats(stats_path, {task[0]: result for task, result in zip(tasks, results)})
+
+
+def stats_path_for(root: Path, layout: Optional[str] = None) -> Path:
+    """Default stats.json location for an archive data root"""
+    root = Path(root)
+    if (layout or detect_layout(root)) == 'items':
+        return root / 'metadata' / 'stats.json'
+    return root / 'stats.json'
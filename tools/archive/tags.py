@@ -0,0 +1,236 @@
+"""
+Entity Tag Index
+
+Which documents mention which card entities (``entities.py``), in
+``<archive root>/index/tags.db``: a posting list per entity of the
+documents that mention it, so "every T206 Mantle post" is an intersection
+of two posting lists instead of a regex pass over every post.
+
+A document is a thread title, a post, or a lot (title and description
+together). Tagging is done by ``analyze``, which ``ArchiveIndexes.refresh``
+runs in its reader worker processes; saves tag in the saving process.
+The index records the dictionary's fingerprint, and an index tagged with
+another dictionary is emptied when opened, so the next
+``collectibles.py index`` retags every item.
+"""
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .entities import Entity, default_tagger
+from .records import Lot, Thread
+
+TAGS_DB = 'tags.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (kind, name)
+);
+CREATE TABLE IF NOT EXISTS items (
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (group_key, item_id)
+);
+CREATE TABLE IF NOT EXISTS tags (
+    entity_id INTEGER NOT NULL,
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    mentions INTEGER NOT NULL,
+    PRIMARY KEY (entity_id, group_key, item_id, post_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_item ON tags (group_key, item_id);
+"""
+
+# (post ID or '' for a title/lot, {entity index: mentions}) per document
+Analysis = List[Tuple[str, Dict[int, int]]]
+
+
+@dataclass
+class TaggedDocument:
+    """A document mentioning the entities asked for"""
+    group: str
+    item_id: str
+    post_id: str        # '' for a thread title or a lot
+    title: str
+    mentions: int       # of those entities, together
+
+
+class EntityIndex:
+    """Entity posting index of one archive"""
+
+    def __init__(self, directory: Path):
+        """Open (creating if needed) the tag index in ``directory``
+
+        Args:
+            directory: The archive's index directory
+        """
+        self.tagger = default_tagger()
+        self.path = Path(directory) / TAGS_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._in_batch = False
+        self._entity_ids = self._sync_dictionary()
+
+    def _sync_dictionary(self) -> List[int]:
+        """Row IDs of the tagger's entities, emptying tags of another dictionary"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'dictionary'").fetchone()
+        with self.batch():
+            if row is None or row[0] != self.tagger.fingerprint:
+                self.conn.execute('DELETE FROM tags')
+                self.conn.execute('DELETE FROM items')
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dictionary', ?)",
+                                  (self.tagger.fingerprint,))
+            self.conn.executemany('INSERT OR IGNORE INTO entities (kind, name) VALUES (?, ?)',
+                                  self.tagger.entities)
+        ids = dict(((kind, name), entity_id) for entity_id, kind, name
+                   in self.conn.execute('SELECT id, kind, name FROM entities'))
+        return [ids[entity] for entity in self.tagger.entities]
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Run the updates made inside as one transaction"""
+        if self._in_batch:
+            yield
+            return
+        self.conn.execute('BEGIN IMMEDIATE')
+        self._in_batch = True
+        try:
+            yield
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        else:
+            self.conn.execute('COMMIT')
+        finally:
+            self._in_batch = False
+
+    @staticmethod
+    def analyze(record) -> Analysis:
+        """Tag every document of a record (the CPU-heavy part of indexing it)"""
+        tagger = default_tagger()
+        if isinstance(record, Lot):
+            return [('', tagger.tag_many((record.title, record.description)))]
+        if isinstance(record, Thread):
+            return [('', tagger.tag(record.title))] + [(post.id, tagger.tag(post.content))
+                                                       for post in record.posts]
+        raise TypeError(f"Cannot index {type(record).__name__}")
+
+    def index_item(self, group: str, item_id: str, record, stat, analysis: Optional[Analysis] = None):
+        """Replace the tags of one item
+
+        Args:
+            group: Forum ID or item type
+            item_id: Thread or item ID
+            record: ``records.Thread`` or ``records.Lot``
+            stat: ``os.stat`` of the item's file, to detect later changes
+            analysis: ``analyze(record)``, if already done
+        """
+        if analysis is None:
+            analysis = self.analyze(record)
+        entity_ids = self._entity_ids
+        rows = [(entity_ids[entity], group, item_id, post_id, mentions)
+                for post_id, found in analysis for entity, mentions in found.items()]
+        with self.batch():
+            self.conn.execute('DELETE FROM tags WHERE group_key = ? AND item_id = ?', (group, item_id))
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO tags (entity_id, group_key, item_id, post_id, mentions) '
+                'VALUES (?, ?, ?, ?, ?)', rows)
+            self.conn.execute(
+                'INSERT OR REPLACE INTO items (group_key, item_id, title, mtime_ns, size) '
+                'VALUES (?, ?, ?, ?, ?)', (group, item_id, record.title, stat.st_mtime_ns, stat.st_size))
+
+    def remove_item(self, group: str, item_id: str):
+        """Drop an item and its tags"""
+        with self.batch():
+            self.conn.execute('DELETE FROM tags WHERE group_key = ? AND item_id = ?', (group, item_id))
+            self.conn.execute('DELETE FROM items WHERE group_key = ? AND item_id = ?', (group, item_id))
+
+    def item_state(self, group: str) -> Dict[str, Tuple[int, int]]:
+        """Item ID -> (mtime_ns, size) of the file each item was indexed from"""
+        rows = self.conn.execute('SELECT item_id, mtime_ns, size FROM items WHERE group_key = ?', (group,))
+        return {item_id: (mtime_ns, size) for item_id, mtime_ns, size in rows}
+
+    def resolve(self, names: Sequence[str]) -> List[List[int]]:
+        """Entity row IDs each name or alias refers to
+
+        Raises:
+            ValueError: If a name is not in the dictionary
+        """
+        resolved = []
+        for name in names:
+            entities = self.tagger.lookup(name)
+            if not entities:
+                raise ValueError(f"Unknown entity: {name}")
+            resolved.append([self._entity_ids[entity] for entity in entities])
+        return resolved
+
+    def find(self, names: Sequence[str], any_of: bool = False, items: bool = False,
+             group: Optional[str] = None, limit: Optional[int] = None) -> List[TaggedDocument]:
+        """Documents mentioning entities, most mentions first
+
+        Args:
+            names: Entity names or aliases, e.g. ``('T206', 'Mantle')``
+            any_of: Documents mentioning any of them, rather than all
+            items: Match whole threads (title and posts) rather than single
+                documents; hits then have post_id ''
+            group: Only this forum ID or item type
+            limit: Maximum documents
+
+        Raises:
+            ValueError: If a name is not in the dictionary
+        """
+        resolved = self.resolve(names)
+        # An alias naming several entities matches any of them
+        cases = ' '.join(f'WHEN {entity_id} THEN {position}'
+                         for position, entity_ids in enumerate(resolved) for entity_id in entity_ids)
+        entity_ids = sorted({entity_id for entity_ids in resolved for entity_id in entity_ids})
+        keys = 'group_key, item_id' if items else 'group_key, item_id, post_id'
+        where = f"entity_id IN ({', '.join('?' * len(entity_ids))})"
+        params: list = list(entity_ids)
+        if group is not None:
+            where += ' AND group_key = ?'
+            params.append(str(group))
+        having = '' if any_of else f'HAVING COUNT(DISTINCT CASE entity_id {cases} END) = {len(resolved)}'
+        post_id = "''" if items else 'hits.post_id'
+        sql = (f"SELECT hits.group_key, hits.item_id, {post_id}, "
+               f"COALESCE(items.title, ''), hits.mentions FROM ("
+               f"SELECT {keys}, SUM(mentions) AS mentions FROM tags WHERE {where} "
+               f"GROUP BY {keys} {having}) AS hits "
+               f"LEFT JOIN items USING (group_key, item_id) ORDER BY hits.mentions DESC, hits.group_key, hits.item_id")
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [TaggedDocument(*row) for row in self.conn.execute(sql, params)]
+
+    def counts(self, kind: Optional[str] = None, limit: int = 20) -> List[Tuple[Entity, int, int]]:
+        """((kind, name), documents, items) of the most mentioned entities"""
+        sql = ('SELECT entities.kind, entities.name, COUNT(*) AS documents, '
+               "COUNT(DISTINCT tags.group_key || '/' || tags.item_id) FROM tags "
+               'JOIN entities ON entities.id = tags.entity_id')
+        params: list = []
+        if kind is not None:
+            sql += ' WHERE entities.kind = ?'
+            params.append(kind)
+        sql += ' GROUP BY tags.entity_id ORDER BY documents DESC LIMIT ?'
+        params.append(limit)
+        return [((entity_kind, name), documents, items)
+                for entity_kind, name, documents, items in self.conn.execute(sql, params)]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,234 @@
+"""
+Time Index
+
+Threads, posts and lots by date, in ``<archive root>/index/time.db``: every
+item and post with its normalized epoch time (``timestamps.py``), kept in
+SQLite B-tree indexes on the time columns, so a range query such as "for-sale
+threads started in 2009" reads just the matching slice of the index.
+
+A thread's time is its first post's (or its ``created`` date when it has
+no posts), a post's is its ``post_time``/``timestamp``, and a lot's is when
+it was scraped. Registered in ``indexers.py``, so it is updated on every
+save and caught up by ``collectibles.py index``.
+"""
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .records import Lot, Thread
+from .timestamps import MISSING, parse_timestamps
+
+TIME_DB = 'time.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    first_time INTEGER,
+    last_time INTEGER,
+    post_count INTEGER NOT NULL DEFAULT 0,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (group_key, item_id)
+);
+CREATE INDEX IF NOT EXISTS items_first_time ON items (first_time);
+CREATE TABLE IF NOT EXISTS posts (
+    time INTEGER NOT NULL,
+    group_key TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    author TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS posts_time ON posts (time);
+CREATE INDEX IF NOT EXISTS posts_item ON posts (group_key, item_id);
+"""
+
+
+def period_start(text: str) -> int:
+    """Epoch seconds (UTC) at which a ``YYYY``, ``YYYY-MM`` or ISO date starts"""
+    parts = text.split('-')
+    if len(parts) <= 2 and all(part.isdigit() for part in parts):
+        return int(datetime(int(parts[0]), int(parts[1]) if len(parts) > 1 else 1, 1,
+                            tzinfo=timezone.utc).timestamp())
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def period_end(text: str) -> int:
+    """Epoch seconds (UTC) at which a ``YYYY``, ``YYYY-MM`` or date ends (exclusive)"""
+    parts = text.split('-')
+    if len(parts) == 1 and text.isdigit():
+        return period_start(str(int(text) + 1))
+    if len(parts) == 2 and all(part.isdigit() for part in parts):
+        year, month = int(parts[0]), int(parts[1])
+        return period_start(f'{year + month // 12}-{month % 12 + 1}')
+    if len(text) == 10:
+        return period_start(text) + 86400
+    return period_start(text)
+
+
+@dataclass
+class TimedItem:
+    """A thread (or lot) with its time span"""
+    group: str
+    item_id: str
+    title: str
+    first_time: Optional[int]
+    last_time: Optional[int]
+    post_count: int
+
+
+def _like_prefix(prefix: str) -> str:
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped + '%'
+
+
+class TimeIndex:
+    """Date index of one archive"""
+
+    def __init__(self, directory: Path):
+        """Open (creating if needed) the time index in ``directory``
+
+        Args:
+            directory: The archive's index directory
+        """
+        self.path = Path(directory) / TIME_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._in_batch = False
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Run the updates made inside as one transaction"""
+        if self._in_batch:
+            yield
+            return
+        self.conn.execute('BEGIN IMMEDIATE')
+        self._in_batch = True
+        try:
+            yield
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        else:
+            self.conn.execute('COMMIT')
+        finally:
+            self._in_batch = False
+
+    def index_item(self, group: str, item_id: str, record, stat):
+        """Replace the times of one item
+
+        Args:
+            group: Forum ID or item type
+            item_id: Thread or item ID
+            record: ``records.Thread`` or ``records.Lot``
+            stat: ``os.stat`` of the item's file, to detect later changes
+        """
+        posts: List[Tuple[int, str, str, str, str]] = []
+        if isinstance(record, Lot):
+            first = last = parse_timestamps([record.scraped_at])[0]
+        elif isinstance(record, Thread):
+            # A post's numeric timestamp wins over its date text
+            times = parse_timestamps([post.timestamp if post.timestamp is not None else post.posted
+                                      for post in record.posts] + [record.created])
+            known = times[times != MISSING]
+            first, last = (known.min(), known.max()) if known.size else (MISSING, MISSING)
+            posts = [(int(time), group, item_id, post.id, post.author)
+                     for time, post in zip(times, record.posts) if time != MISSING]
+        else:
+            raise TypeError(f"Cannot index {type(record).__name__}")
+        with self.batch():
+            self.conn.execute('DELETE FROM posts WHERE group_key = ? AND item_id = ?', (group, item_id))
+            self.conn.executemany(
+                'INSERT INTO posts (time, group_key, item_id, post_id, author) VALUES (?, ?, ?, ?, ?)',
+                posts)
+            self.conn.execute(
+                'INSERT OR REPLACE INTO items (group_key, item_id, title, first_time, last_time, '
+                'post_count, mtime_ns, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (group, item_id, record.title,
+                 None if first == MISSING else int(first), None if last == MISSING else int(last),
+                 len(record.posts) if isinstance(record, Thread) else 0,
+                 stat.st_mtime_ns, stat.st_size))
+
+    def remove_item(self, group: str, item_id: str):
+        """Drop an item and its posts"""
+        with self.batch():
+            self.conn.execute('DELETE FROM posts WHERE group_key = ? AND item_id = ?', (group, item_id))
+            self.conn.execute('DELETE FROM items WHERE group_key = ? AND item_id = ?', (group, item_id))
+
+    def item_state(self, group: str) -> Dict[str, Tuple[int, int]]:
+        """Item ID -> (mtime_ns, size) of the file each item was indexed from"""
+        rows = self.conn.execute('SELECT item_id, mtime_ns, size FROM items WHERE group_key = ?', (group,))
+        return {item_id: (mtime_ns, size) for item_id, mtime_ns, size in rows}
+
+    def items(self, start: Optional[int] = None, end: Optional[int] = None,
+              group: Optional[str] = None, title_prefixes: Sequence[str] = (),
+              limit: Optional[int] = None) -> List[TimedItem]:
+        """Threads (or lots) whose time falls in [start, end), oldest first
+
+        Args:
+            start: Epoch seconds, inclusive; unbounded when omitted
+            end: Epoch seconds, exclusive; unbounded when omitted
+            group: Only this forum ID or item type
+            title_prefixes: Only titles starting with one of these
+                (case-insensitive), e.g. ``('FS', 'For Sale')``
+            limit: Maximum number of items
+        """
+        where, params = ['first_time IS NOT NULL'], []
+        if start is not None:
+            where.append('first_time >= ?')
+            params.append(start)
+        if end is not None:
+            where.append('first_time < ?')
+            params.append(end)
+        if group is not None:
+            where.append('group_key = ?')
+            params.append(str(group))
+        if title_prefixes:
+            where.append('(' + ' OR '.join(["title LIKE ? ESCAPE '\\'"] * len(title_prefixes)) + ')')
+            params.extend(_like_prefix(prefix) for prefix in title_prefixes)
+        sql = (f"SELECT group_key, item_id, title, first_time, last_time, post_count FROM items "
+               f"WHERE {' AND '.join(where)} ORDER BY first_time")
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [TimedItem(*row) for row in self.conn.execute(sql, params)]
+
+    def posts(self, start: Optional[int] = None, end: Optional[int] = None,
+              group: Optional[str] = None) -> Iterator[Tuple[int, str, str, str, str]]:
+        """Yield (time, group, item ID, post ID, author) of posts in [start, end), oldest first"""
+        where, params = ['1'], []
+        if start is not None:
+            where.append('time >= ?')
+            params.append(start)
+        if end is not None:
+            where.append('time < ?')
+            params.append(end)
+        if group is not None:
+            where.append('group_key = ?')
+            params.append(str(group))
+        yield from self.conn.execute(
+            f"SELECT time, group_key, item_id, post_id, author FROM posts "
+            f"WHERE {' AND '.join(where)} ORDER BY time", params)
+
+    def count_posts(self, start: Optional[int] = None, end: Optional[int] = None,
+                    group: Optional[str] = None) -> int:
+        """Number of posts in [start, end), in one forum or item type if given"""
+        sql = 'SELECT COUNT(*) FROM posts WHERE time >= ? AND time < ?'
+        params = [start if start is not None else MISSING, end if end is not None else 2 ** 63 - 1]
+        if group is not None:
+            sql += ' AND group_key = ?'
+            params.append(str(group))
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,210 @@
+"""
+Timestamp Normalization
+
+Archived dates come in several shapes:
+
+* Tapatalk ``post_time`` / ``last_reply``: ISO basic with an offset,
+  ``20090426T15:49:00-06:00``;
+* epoch seconds as digit strings (Tapatalk ``timestamp``);
+* ISO date-times written by the storages (``scraped_at``, ``saved_at``),
+  naive or with an offset;
+* free text from the HTML parser's ``div.date``, e.g. ``04-26-2009, 03:49 PM``
+  or ``Yesterday, 09:12 PM``;
+* None, for the many threads without a ``created_date``.
+
+``parse_timestamps`` turns a batch of them into an int64 array of epoch
+seconds in one pass: values are laid out as a fixed-width character
+matrix, classified by where their separators are, and the ISO and epoch
+shapes are converted with array arithmetic. Only the free-text shapes
+fall back to ``strptime``, once per distinct string. Naive values are
+taken as UTC, so they convert the same wherever the archive is read.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+# Marks values that are missing or could not be parsed
+MISSING = np.iinfo(np.int64).min
+
+# Characters of each value looked at; longer values are free text
+WIDTH = 32
+
+TEXT_FORMATS = (
+    '%m-%d-%Y, %I:%M %p',
+    '%m-%d-%Y %I:%M %p',
+    '%m-%d-%Y, %H:%M',
+    '%m-%d-%Y',
+    '%m/%d/%Y %I:%M %p',
+    '%m/%d/%Y',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%B %d, %Y, %I:%M %p',
+    '%B %d, %Y %I:%M %p',
+    '%B %d, %Y',
+    '%b %d, %Y',
+    '%d %B %Y',
+)
+
+RELATIVE_DAYS = {'today': 0, 'yesterday': 1}
+
+DAY = 86400
+
+MONTH_DAYS = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _days_from_civil(year, month, day):
+    """Days since 1970-01-01 of proleptic Gregorian dates, element-wise"""
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _number(digits, start: int, width: int):
+    """Integer value of the digit columns [start, start + width)"""
+    value = np.zeros(len(digits), dtype=np.int64)
+    for column in range(start, start + width):
+        value = value * 10 + digits[:, column]
+    return value
+
+
+def _all(flags, columns) -> np.ndarray:
+    """Rows where every one of the given columns is set"""
+    result = flags[:, columns[0]].copy()
+    for column in columns[1:]:
+        result &= flags[:, column]
+    return result
+
+
+def _date_time(digits, date_at, time_at):
+    """Epoch seconds and validity of rows holding YYYY?MM?DD and HH:MM:SS"""
+    year = _number(digits, date_at[0], 4)
+    month = _number(digits, date_at[1], 2)
+    day = _number(digits, date_at[2], 2)
+    hour = _number(digits, time_at, 2)
+    minute = _number(digits, time_at + 3, 2)
+    second = _number(digits, time_at + 6, 2)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = MONTH_DAYS[np.clip(month, 0, 12)] + ((month == 2) & leap)
+    valid = ((month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+             & (hour < 24) & (minute < 60) & (second < 61))
+    epoch = _days_from_civil(year, month, day) * DAY + hour * 3600 + minute * 60 + second
+    return epoch, valid
+
+
+def _utc_offsets(chars, digits, at):
+    """Seconds east of UTC of ``±HH:MM`` at per-row column ``at``; 0 where absent"""
+    rows = np.arange(len(chars))
+    at = np.clip(at, 0, WIDTH - 6)
+    sign = chars[rows, at]
+    present = ((sign == ord('+')) | (sign == ord('-'))) & (chars[rows, at + 3] == ord(':'))
+    hours = digits[rows, at + 1] * 10 + digits[rows, at + 2]
+    minutes = digits[rows, at + 4] * 10 + digits[rows, at + 5]
+    offset = (hours * 3600 + minutes * 60) * np.where(sign == ord('-'), -1, 1)
+    return np.where(present, offset, 0)
+
+
+def parse_text(value: str, reference: Optional[datetime] = None) -> Optional[int]:
+    """Epoch seconds of one free-text date, or None
+
+    Args:
+        value: Date text, e.g. ``04-26-2009, 03:49 PM`` or ``Today, 10:12 AM``
+        reference: When the text was scraped, for ``Today``/``Yesterday``
+    """
+    text = ' '.join(value.replace('\xa0', ' ').split())
+    head, _, rest = text.partition(',')
+    if head.lower() in RELATIVE_DAYS:
+        if reference is None:
+            return None
+        day = (reference - timedelta(days=RELATIVE_DAYS[head.lower()])).strftime('%m-%d-%Y')
+        text = f'{day},{rest}' if rest else day
+    for fmt in TEXT_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def parse_timestamps(values: Iterable[Any], reference: Optional[datetime] = None) -> np.ndarray:
+    """Epoch seconds of a batch of dates in any archived shape
+
+    Args:
+        values: Date strings, epoch ints or None
+        reference: When free-text dates were scraped, for ``Today`` and
+            ``Yesterday``; those stay missing without it
+
+    Returns:
+        int64 array, ``MISSING`` where a value is absent or unparseable
+    """
+    values = ['' if value is None else str(value) for value in values]
+    result = np.full(len(values), MISSING, dtype=np.int64)
+    if not values:
+        return result
+    strings = np.array(values, dtype=str)
+    lengths = np.char.str_len(strings)
+    fits = lengths <= WIDTH
+    strings = strings.astype(f'<U{WIDTH}')
+    chars = strings.view(np.int32).reshape(len(values), WIDTH)
+    digits = chars - ord('0')
+    is_digit = digits.view(np.uint32) < 10
+
+    def at(column, char):
+        return chars[:, column] == ord(char)
+
+    # Epoch seconds: 9 to 12 digits and nothing else
+    epoch_rows = (lengths >= 9) & (lengths <= 12) & np.char.isdigit(strings)
+    result[epoch_rows] = strings[epoch_rows].astype(np.int64)
+
+    # ISO basic, Tapatalk: YYYYMMDDTHH:MM:SS[±HH:MM]
+    basic = (fits & ~epoch_rows & (lengths >= 17) & at(8, 'T') & at(11, ':') & at(14, ':')
+             & _all(is_digit, [0, 1, 2, 3, 4, 5, 6, 7, 9, 10, 12, 13, 15, 16]))
+    if basic.any():
+        epoch, valid = _date_time(digits[basic], (0, 4, 6), 9)
+        offset = _utc_offsets(chars[basic], digits[basic], np.full(valid.size, 17))
+        result[basic] = np.where(valid, epoch - offset, MISSING)
+
+    # ISO extended: YYYY-MM-DD[T ]HH:MM:SS[.ffffff][±HH:MM|Z]
+    extended = (fits & ~epoch_rows & (lengths >= 19) & at(4, '-') & at(7, '-')
+                & (at(10, 'T') | at(10, ' ')) & at(13, ':') & at(16, ':')
+                & _all(is_digit, [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]))
+    if extended.any():
+        epoch, valid = _date_time(digits[extended], (0, 5, 8), 11)
+        offset = _utc_offsets(chars[extended], digits[extended], lengths[extended] - 6)
+        result[extended] = np.where(valid, epoch - offset, MISSING)
+
+    # Everything else: free text, parsed once per distinct value
+    rest = np.flatnonzero(~(epoch_rows | basic | extended) & (lengths > 0))
+    parsed = {}
+    for row in rest:
+        value = values[row]
+        if value not in parsed:
+            parsed[value] = parse_text(value, reference)
+        if parsed[value] is not None:
+            result[row] = parsed[value]
+    return result
+
+
+def parse_timestamp(value: Any, reference: Optional[datetime] = None) -> Optional[int]:
+    """Epoch seconds of one date in any archived shape, or None"""
+    if isinstance(value, int):
+        return value
+    epoch = parse_timestamps([value], reference)[0]
+    return None if epoch == MISSING else int(epoch)
+
+
+def format_timestamp(epoch: Optional[int]) -> Optional[str]:
+    """UTC ISO date-time of epoch seconds"""
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat()
@@ -0,0 +1,301 @@
+"""
+Shared logging pipeline
+
+All scrapers (the legacy scripts and the tools scrapers) log through a single
+QueueHandler on the root logger. A background QueueListener thread does the
+actual console and file I/O, so a slow disk or terminal never stalls a scrape.
+The log file is written as structured JSON lines, and per-item messages from
+hot loops can be rate-limited with ``sampled()``. A forked child (e.g. a
+multiprocessing worker) has no listener thread, so it writes to the same
+handlers directly.
+
+Configuration comes from the ``logging:`` section of an archive YAML config:
+
+    logging:
+      level: INFO            # console level
+      file_level: DEBUG      # log file level
+      format: '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+      json: true             # JSON lines file (false = plain text using format)
+      log_dir: ./logs        # defaults to $LOG_DIR or ./logs
+      sampling:
+        burst: 20            # per-item messages allowed per key...
+        interval_seconds: 60 # ...in each window
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+DEFAULT_SETTINGS = {
+    'level': 'INFO',
+    'file_level': 'DEBUG',
+    'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    'json': True,
+    'log_dir': None,
+    'sampling': {
+        'burst': 20,
+        'interval_seconds': 60,
+    },
+}
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['RecordQueueHandler'] = None
+_sampler: Optional['SamplingFilter'] = None
+_handlers: Dict[str, logging.Handler] = {}
+
+
+def sampled(key: str) -> Dict[str, str]:
+    """Mark a log call as a per-item message subject to rate limiting
+
+    Usage: ``logger.info(f"Saved thread {tid}", extra=sampled('save_thread'))``
+
+    Args:
+        key: Sampling bucket; messages sharing a key share one budget
+
+    Returns:
+        Dictionary to pass as the ``extra`` argument of a logging call
+    """
+    return {'sample_key': key}
+
+
+class SamplingFilter(logging.Filter):
+    """Rate-limit records tagged with ``sample_key``
+
+    Each key may emit ``burst`` records per ``interval`` seconds. Records
+    dropped in a window are counted and reported as ``suppressed`` on the
+    next record that gets through. Warnings and errors are never dropped.
+    """
+
+    def __init__(self, burst: int = 20, interval: float = 60.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, 'sample_key', None)
+        if key is None or record.levelno >= logging.WARNING or self.burst <= 0:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for attr, value in record.__dict__.items():
+            if attr not in _RESERVED_ATTRS and not attr.startswith('_'):
+                entry[attr] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves tracebacks to the listener's formatters
+
+    The stock ``prepare`` folds the traceback into the message and drops
+    ``exc_info``; the queue never leaves the process, so records keep it and
+    the JSON file gets the traceback as its own field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+def _console_handler(level: int) -> logging.Handler:
+    """Colored console handler, plain if colorlog is unavailable"""
+    try:
+        import colorlog
+    except ImportError:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(levelname)-8s %(message)s'))
+    else:
+        handler = colorlog.StreamHandler()
+        handler.setFormatter(colorlog.ColoredFormatter(
+            '%(log_color)s%(levelname)-8s%(reset)s %(message)s',
+            log_colors={
+                'DEBUG': 'cyan',
+                'INFO': 'green',
+                'WARNING': 'yellow',
+                'ERROR': 'red',
+                'CRITICAL': 'red,bg_white',
+            }
+        ))
+    handler.setLevel(level)
+    return handler
+
+
+def _file_handler(settings: Dict[str, Any]) -> logging.Handler:
+    """File handler writing JSON lines (or plain text) to the log directory"""
+    log_dir = Path(settings.get('log_dir') or os.getenv('LOG_DIR', './logs'))
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    today = datetime.now().strftime('%Y-%m-%d')
+    if settings.get('json', True):
+        handler = logging.FileHandler(log_dir / f'{today}-collectibles.jsonl', encoding='utf-8')
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler = logging.FileHandler(log_dir / f'{today}-collectibles.log', encoding='utf-8')
+        handler.setFormatter(logging.Formatter(settings['format']))
+    handler.setLevel(logging.getLevelName(str(settings['file_level']).upper()))
+    return handler
+
+
+def _merge_settings(settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    merged = dict(DEFAULT_SETTINGS)
+    merged['sampling'] = dict(DEFAULT_SETTINGS['sampling'])
+    for key, value in (settings or {}).items():
+        if key == 'sampling' and isinstance(value, dict):
+            merged['sampling'].update(value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_logging_settings(config_path: str) -> Dict[str, Any]:
+    """Read the ``logging:`` section from a YAML config file
+
+    Args:
+        config_path: Path to an archive YAML configuration
+
+    Returns:
+        Logging settings, empty if the file or section is missing
+    """
+    path = Path(config_path)
+    if not path.exists():
+        return {}
+    import yaml
+    with open(path, 'r') as f:
+        config = yaml.safe_load(f) or {}
+    return config.get('logging') or {}
+
+
+def configure_logging(settings: Optional[Dict[str, Any]] = None) -> None:
+    """Install the queue-based logging pipeline on the root logger
+
+    Safe to call any number of times: the first call creates the handlers
+    and starts the listener thread, later calls only adjust levels and
+    sampling so handlers are never duplicated.
+
+    Args:
+        settings: Contents of a config's ``logging:`` section
+    """
+    global _listener, _queue_handler, _sampler
+
+    merged = _merge_settings(settings)
+    console_level = logging.getLevelName(str(merged['level']).upper())
+    sampling = merged['sampling']
+
+    with _lock:
+        if _handlers:
+            _handlers['console'].setLevel(console_level)
+            _sampler.burst = int(sampling['burst'])
+            _sampler.interval = float(sampling['interval_seconds'])
+            return
+
+        _handlers['console'] = _console_handler(console_level)
+        _handlers['file'] = _file_handler(merged)
+
+        _sampler = SamplingFilter(int(sampling['burst']), float(sampling['interval_seconds']))
+        _queue_handler = RecordQueueHandler(queue.SimpleQueue())
+        _queue_handler.addFilter(_sampler)
+
+        _listener = logging.handlers.QueueListener(
+            _queue_handler.queue,
+            *_handlers.values(),
+            respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(logging.DEBUG)
+        # Keep connection-pool chatter out of the debug log
+        logging.getLogger('urllib3').setLevel(logging.WARNING)
+
+
+def shutdown_logging() -> None:
+    """Drain the queue and stop the listener thread"""
+    global _listener, _queue_handler
+
+    with _lock:
+        if not _handlers:
+            return
+        root = logging.getLogger()
+        if _listener is not None:
+            root.removeHandler(_queue_handler)
+            _listener.stop()
+        for handler in _handlers.values():
+            # Installed on the root logger itself in forked children
+            root.removeHandler(handler)
+            handler.close()
+        _handlers.clear()
+        _listener = None
+        _queue_handler = None
+
+
+def _after_fork_in_child() -> None:
+    """Rebuild the pipeline in a forked child, where the listener thread does not exist
+
+    Without this the child's records would pile up in a queue nobody drains.
+    The child logs through the inherited handlers directly instead of starting
+    a listener of its own: worker processes usually leave through ``os._exit``
+    or get terminated, which would lose whatever was still queued.
+    """
+    global _lock, _listener, _queue_handler, _sampler
+
+    # Another thread may have held the lock at fork time
+    _lock = threading.Lock()
+    if _listener is None:
+        return
+
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
+    _sampler = SamplingFilter(_sampler.burst, _sampler.interval)
+    for handler in _handlers.values():
+        handler.addFilter(_sampler)
+        root.addHandler(handler)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -1,3 +1,9 @@
-from .heritage_scraper import HeritageScraper
+__all__ = ['HeritageScraper']
 
-__all__ = ['HeritageScraper']
\ No newline at end of file
+
+def __getattr__(name):
+    # Imported lazily; see tools.scrapers.registry
+    if name == 'HeritageScraper':
+        from .heritage_scraper import HeritageScraper
+        return HeritageScraper
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
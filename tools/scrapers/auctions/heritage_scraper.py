@@ -6,12 +6,19 @@ Focuses on sports collectibles and trading cards
 """
 import re
 import json
+import time
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from bs4 import BeautifulSoup
 
-from ..base.base_scraper import BaseScraper
+from ..base.base_scraper import BaseScraper, ScrapeStopped
 from ..base.storage import MultiArchiveStorage
+from ..base.frontier import Frontier
+from ...archive.timestamps import parse_timestamp
+
+# End dates rarely carry a time of day, so an auction counts as live until
+# a day after its end date
+LIVE_GRACE_SECONDS = 24 * 3600
 
 
 class HeritageScraper(BaseScraper):
@@ -24,13 +31,18 @@ class HeritageScraper(BaseScraper):
             config_path: Path to YAML configuration file
         """
         super().__init__(config_path)
-        self.storage = MultiArchiveStorage('heritage', 'archives')
         
         # Heritage-specific settings
         self.categories = self.config.get('categories', [])
         self.download_images = self.config['features'].get('download_images', False)
         self.track_prices = self.config['features'].get('track_prices', True)
         
+        # With track_prices, every lot save also extends the lot's bid history
+        self.storage = MultiArchiveStorage('heritage', 'archives', track_prices=self.track_prices)
+        self.frontier = Frontier(self.storage.metadata_dir / 'frontier.db')
+        # Auctions visited this run (an auction can be listed in several categories)
+        self.visited_auctions = set()
+        
     def scrape(self, auction_id: Optional[str] = None, lot_limit: Optional[int] = None):
         """Main scraping method
         
@@ -39,15 +51,35 @@ class HeritageScraper(BaseScraper):
             lot_limit: Maximum number of lots to scrape (optional)
         """
         self.logger.info(f"Starting Heritage scraper...")
+        checkpoint_file = self.storage.metadata_dir / 'checkpoint.json'
+        self.deadline.seed_from(checkpoint_file)
+        self.deadline_reached = False
+        self.visited_auctions.clear()
+        reason = 'error'
         
-        if auction_id:
-            # Scrape specific auction
-            self.scrape_auction(auction_id, lot_limit)
-        else:
-            # Scrape recent auctions from categories
-            for category in self.categories:
-                self.logger.info(f"Scraping category: {category}")
-                self.scrape_category(category, lot_limit)
+        try:
+            if auction_id:
+                # Scrape specific auction
+                self.scrape_auction(auction_id, lot_limit)
+            else:
+                # Scrape recent auctions from categories
+                for category in self.categories:
+                    if self.stopping():
+                        break
+                    self.logger.info(f"Scraping category: {category}")
+                    self.scrape_category(category, lot_limit)
+            reason = 'deadline' if self.deadline_reached else 'complete'
+        except (ScrapeStopped, KeyboardInterrupt):
+            reason = 'interrupted'
+            raise
+        finally:
+            self.deadline.write_checkpoint(
+                checkpoint_file, reason,
+                frontier=self.frontier.counts(),
+                pending_cost=self.frontier.pending_cost('lot'),
+                http=self.client.metrics.snapshot()
+            )
+            self.frontier.checkpoint()
     
     def scrape_category(self, category: str, lot_limit: Optional[int] = None):
         """Scrape auctions from a specific category
@@ -70,7 +102,17 @@ class HeritageScraper(BaseScraper):
         auctions = self.parse_auction_list(soup)
         
         for auction in auctions:
-            if not self.storage.is_item_scraped('auctions', auction['id']):
+            if self.stopping():
+                break
+            if auction['id'] in self.visited_auctions:
+                continue
+            # An auction's metadata is saved before its lots, so one interrupted
+            # mid-auction still has lots pending in the frontier; live auctions
+            # are revisited on every run to observe their bids again (track_prices)
+            if (not self.storage.is_item_scraped('auctions', auction['id'])
+                    or self.frontier.pending_count('lot', auction['id'])
+                    or (self.track_prices
+                        and self.is_auction_live(self.storage.get_item('auctions', auction['id'])))):
                 self.logger.info(f"Scraping auction: {auction['title']}")
                 self.scrape_auction(auction['id'], lot_limit)
     
@@ -81,6 +123,8 @@ class HeritageScraper(BaseScraper):
             auction_id: Heritage auction ID
             lot_limit: Maximum number of lots to scrape
         """
+        self.visited_auctions.add(auction_id)
+        
         # Get auction details
         auction_url = f"{self.base_url}/c/auction-home.zx?saleNo={auction_id}"
         response = self.make_request(auction_url)
@@ -95,14 +139,68 @@ class HeritageScraper(BaseScraper):
         # Save auction metadata
         self.storage.save_item('auctions', auction_id, auction_data)
         
-        # Get lot listings
-        lots_scraped = 0
-        page = 1
+        # Queue lot listings, unless enough lots are already pending
+        pending = self.frontier.pending_count('lot', auction_id)
+        if not lot_limit or pending < lot_limit:
+            self.queue_auction_lots(auction_id, lot_limit - pending if lot_limit else None,
+                                    live=self.track_prices and self.is_auction_live(auction_data))
         
-        while True:
-            if lot_limit and lots_scraped >= lot_limit:
+        # Scrape queued lots, highest priority first
+        lots_scraped = 0
+        while not lot_limit or lots_scraped < lot_limit:
+            if self.stopping():
                 break
-                
+            order = 'priority'
+            if self.deadline.bounded:
+                order = self.deadline.order(self.frontier.pending_cost('lot', auction_id))
+            item = self.frontier.pop('lot', auction_id, order=order)
+            if item is None:
+                break
+            if not self.deadline.can_start(item.cost):
+                self.frontier.release(item.key)
+                self.deadline_reached = True
+                self.logger.info("Stopping before the deadline")
+                break
+            lots_scraped += 1
+            started = time.time()
+            
+            try:
+                if self.scrape_lot(item.payload['id'], auction_id):
+                    self.frontier.done(item.key)
+                    self.deadline.record(item.cost, time.time() - started)
+                else:
+                    self.frontier.fail(item.key, 'fetch failed')
+            except (ScrapeStopped, KeyboardInterrupt):
+                # Not the lot's fault; leave it for the next run
+                self.frontier.release(item.key)
+                raise
+            except Exception as e:
+                state = self.frontier.fail(item.key, repr(e))
+                self.logger.error(f"Error scraping lot {item.payload['id']}: {e} (retry state: {state})")
+        
+        self.logger.info(f"Scraped {lots_scraped} lots from auction {auction_id}")
+    
+    def queue_auction_lots(self, auction_id: str, limit: Optional[int] = None, live: bool = False) -> int:
+        """Page through an auction's lot list and queue unseen lots in the frontier
+        
+        The listing page is checkpointed, so an interrupted listing resumes.
+        In a live auction, lots already saved but not yet sold are queued
+        again, so each run adds an observation to their price history.
+        
+        Args:
+            auction_id: Heritage auction ID
+            limit: Stop after queueing this many new lots
+            live: The auction is still taking bids
+            
+        Returns:
+            Number of newly queued lots
+        """
+        cursor_name = f'lot_listing:{auction_id}'
+        cursor = self.frontier.get_cursor(cursor_name, {'page': 1, 'complete': False})
+        page = 1 if cursor['complete'] else cursor['page']
+        queued = 0
+        
+        while not limit or queued < limit:
             lots_url = f"{self.base_url}/c/search.zx?saleNo={auction_id}&pg={page}"
             response = self.make_request(lots_url)
             
@@ -113,33 +211,41 @@ class HeritageScraper(BaseScraper):
             lots = self.parse_lot_list(soup)
             
             if not lots:
+                self.frontier.set_cursor(cursor_name, {'page': 1, 'complete': True})
                 break
             
             for lot in lots:
-                if lot_limit and lots_scraped >= lot_limit:
-                    break
-                    
-                if not self.storage.is_item_scraped('lots', lot['id']):
-                    self.scrape_lot(lot['id'], auction_id)
-                    lots_scraped += 1
+                key = Frontier.make_key('lot', auction_id, lot['id'])
+                priority = lot.get('current_bid') or 0
+                if self.storage.is_item_scraped('lots', lot['id']):
+                    if live and self.is_lot_open(lot['id']) and self.frontier.requeue(
+                            'lot', key, lot, priority=priority, group=auction_id):
+                        queued += 1
+                    continue
+                if self.frontier.add('lot', key, lot, priority=priority, group=auction_id):
+                    queued += 1
             
             page += 1
+            self.frontier.set_cursor(cursor_name, {'page': page, 'complete': False})
         
-        self.logger.info(f"Scraped {lots_scraped} lots from auction {auction_id}")
+        return queued
     
-    def scrape_lot(self, lot_id: str, auction_id: str):
+    def scrape_lot(self, lot_id: str, auction_id: str) -> Optional[Dict[str, Any]]:
         """Scrape individual lot details
         
         Args:
             lot_id: Heritage lot ID
             auction_id: Parent auction ID
+            
+        Returns:
+            Saved lot data, or None if the lot could not be fetched
         """
         lot_url = f"{self.base_url}/c/item.zx?saleNo={auction_id}&lotNo={lot_id}"
         response = self.make_request(lot_url)
         
         if not response:
             self.logger.error(f"Failed to fetch lot: {lot_id}")
-            return
+            return None
         
         # Save raw HTML if configured
         if self.config['features'].get('save_raw_html', True):
@@ -154,6 +260,23 @@ class HeritageScraper(BaseScraper):
         
         # Save lot data
         self.storage.save_item('lots', lot_id, lot_data)
+        return lot_data
+    
+    def is_auction_live(self, auction_data: Optional[Dict[str, Any]]) -> bool:
+        """Whether an auction is still taking bids, judging by its end date
+        
+        An end date that cannot be parsed counts as live; its lots stop being
+        revisited once they have a realized price.
+        """
+        if not auction_data:
+            return False
+        end = parse_timestamp(auction_data.get('end_date'))
+        return end is None or end + LIVE_GRACE_SECONDS > time.time()
+    
+    def is_lot_open(self, lot_id: str) -> bool:
+        """Whether a saved lot has no realized price yet"""
+        lot = self.storage.get_item('lots', lot_id)
+        return bool(lot) and lot.get('realized_price') is None
     
     def parse_item(self, html: str) -> Dict[str, Any]:
         """Parse HTML content (implements abstract method)
@@ -265,7 +388,9 @@ class HeritageScraper(BaseScraper):
                 'estimate_high': self.extract_price(soup.find('span', class_='estimate-high')),
                 'current_bid': self.extract_price(soup.find('span', class_='current-bid')),
                 'starting_bid': self.extract_price(soup.find('span', class_='starting-bid')),
-                'realized_price': self.extract_price(soup.find('span', class_='realized-price'))
+                'realized_price': self.extract_price(soup.find('span', class_='realized-price')),
+                'bid_count': self.extract_number(soup.find('span', class_='bid-count').text)
+                if soup.find('span', class_='bid-count') else None
             })
         
         # Extract images
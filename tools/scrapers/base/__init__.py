@@ -1,3 +1,10 @@
-from .base_scraper import BaseScraper
+__all__ = ['BaseScraper', 'ScrapeStopped']
 
-__all__ = ['BaseScraper']
\ No newline at end of file
+
+def __getattr__(name):
+    # Imported lazily so that using the storage layer alone does not pull in
+    # requests and yaml through base_scraper
+    if name in __all__:
+        from . import base_scraper
+        return getattr(base_scraper, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
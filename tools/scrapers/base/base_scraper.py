@@ -2,9 +2,19 @@ from abc import ABC, abstractmethod
 import requests
 from pathlib import Path
 import yaml
-import time
 import logging
+import threading
 from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+
+from ...logging_setup import configure_logging
+from .deadline import RunDeadline
+from .http_client import HttpClient
+from .politeness import HostBudget, budget_path
+
+
+class ScrapeStopped(Exception):
+    """Raised inside a scrape once its stop event is set (e.g. a deadline passed)"""
 
 
 class BaseScraper(ABC):
@@ -17,19 +27,37 @@ class BaseScraper(ABC):
             config_path: Path to YAML configuration file
         """
         self.config = self.load_config(config_path)
-        self.session = requests.Session()
         self.archive_name = self.config['archive']['name']
         self.archive_type = self.config['archive']['type']
         self.base_url = self.config['archive']['base_url']
         
-        # Set up session headers
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # Requests to the host are spaced by a budget shared with every other
+        # process and scraper hitting it (see politeness.py)
+        self.budget = HostBudget(budget_path(), urlparse(self.base_url).netloc,
+                                 self.config['scraping'].get('delay_seconds', 2))
+        
+        # Shared client layer: pooled keep-alive session, retries with backoff
+        # paced by rate_limit, process-wide retry budget and metrics
+        self.client = HttpClient(
+            timeout=self.config['scraping'].get('timeout_seconds', 30),
+            max_attempts=self.config['scraping'].get('max_retries', 3),
+            pace=self.rate_limit,
+            sleep=self.backoff_wait
+        )
+        self.session = self.client.session
         
-        # Configure logging
+        # Configure logging (shared queue-based pipeline, set up once per process)
+        configure_logging(self.config.get('logging'))
         self.logger = logging.getLogger(f"{self.archive_name}_scraper")
         
+        # Set by an orchestrator to stop the scrape cooperatively
+        self.stop_event = threading.Event()
+        
+        # Run time budget from $RUN_DEADLINE (unbounded if unset)
+        self.deadline = RunDeadline.from_options(
+            seconds_per_unit=self.config['scraping'].get('delay_seconds', 2)
+        )
+        
     def load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from YAML file
         
@@ -42,13 +70,30 @@ class BaseScraper(ABC):
         with open(config_path, 'r') as f:
             return yaml.safe_load(f)
     
+    def stopping(self) -> bool:
+        """Whether the scrape has been asked to stop"""
+        return self.stop_event.is_set()
+    
     def rate_limit(self):
-        """Apply rate limiting based on configuration"""
-        delay = self.config['scraping'].get('delay_seconds', 2)
-        time.sleep(delay)
+        """Wait for the next request slot of the host's shared budget
+        
+        Raises:
+            ScrapeStopped: If the stop event is set before or during the wait
+        """
+        if self.budget.wait(stop=self.stop_event):
+            raise ScrapeStopped(self.archive_name)
+    
+    def backoff_wait(self, seconds: float):
+        """Wait between retries, unless the scrape is asked to stop
+        
+        Raises:
+            ScrapeStopped: If the stop event is set before or during the wait
+        """
+        if self.stop_event.wait(seconds):
+            raise ScrapeStopped(self.archive_name)
     
     def make_request(self, url: str, **kwargs) -> Optional[requests.Response]:
-        """Make HTTP request with retry logic
+        """Make HTTP request with retry logic (see http_client.HttpClient)
         
         Args:
             url: URL to request
@@ -57,21 +102,11 @@ class BaseScraper(ABC):
         Returns:
             Response object or None if failed
         """
-        max_retries = self.config['scraping'].get('max_retries', 3)
-        timeout = self.config['scraping'].get('timeout_seconds', 30)
-        
-        for attempt in range(max_retries):
-            try:
-                self.rate_limit()
-                response = self.session.get(url, timeout=timeout, **kwargs)
-                response.raise_for_status()
-                return response
-            except requests.exceptions.RequestException as e:
-                self.logger.warning(f"Request failed (attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
-        
-        return None
+        try:
+            return self.client.get(url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self.logger.warning(f"Request failed: {e}")
+            return None
     
     @abstractmethod
     def scrape(self):
@@ -90,6 +125,11 @@ class BaseScraper(ABC):
         """
         pass
     
+    def frontier_path(self) -> Optional[Path]:
+        """Location of the scraper's crawl frontier database, if it has one"""
+        frontier = getattr(self, 'frontier', None)
+        return frontier.path if frontier is not None else None
+    
     def get_storage_path(self, item_type: str) -> Path:
         """Get storage path for a specific item type
         
@@ -0,0 +1,159 @@
+"""
+Run Deadline
+
+Lets a scrape end cleanly before a hard time limit (the GitHub workflow is
+killed after 6 hours) instead of being killed mid-write:
+
+* The cost of a unit of work (one HTTP request) is measured live as an
+  exponentially weighted average of seconds per request, seeded from the
+  previous run's checkpoint.
+* ``can_start`` refuses an item whose estimated duration would run into the
+  flush reserve kept at the end of the budget.
+* ``order`` tells the caller to switch from priority order to cheapest-first
+  once the pending work no longer fits, which maximizes the number of
+  threads or lots completed before the deadline.
+* ``write_checkpoint`` records where the run stopped and what it measured.
+  The work itself stays in the crawl frontier, so the next run resumes there.
+
+The deadline comes from ``--deadline-minutes`` or the ``RUN_DEADLINE``
+environment variable (epoch seconds), which a CI job can set once at start.
+"""
+import os
+import signal
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ...archive.partitions import atomic_write_json, read_json
+
+DEADLINE_ENV = 'RUN_DEADLINE'
+
+# Time kept free at the end for flushing storage and checkpointing
+DEFAULT_FLUSH_RESERVE = 120.0
+
+# Weight of the newest measurement in the seconds-per-unit average
+SMOOTHING = 0.2
+
+
+class RunDeadline:
+    """Time budget of one scrape run with live per-request cost estimates"""
+
+    def __init__(self, deadline: Optional[float] = None, flush_reserve: float = DEFAULT_FLUSH_RESERVE,
+                 seconds_per_unit: float = 5.0):
+        """Create a budget
+
+        Args:
+            deadline: Epoch time the run must be finished by (None = unbounded)
+            flush_reserve: Seconds kept free for flushing and checkpointing
+            seconds_per_unit: Initial guess of the cost of one request
+        """
+        self.deadline = deadline
+        self.flush_reserve = flush_reserve
+        self.seconds_per_unit = seconds_per_unit
+        self.started_at = time.time()
+        self.items_completed = 0
+        self.units_completed = 0.0
+        self.samples = 0
+
+    @classmethod
+    def from_options(cls, minutes: Optional[float] = None, checkpoint_path: Optional[Path] = None,
+                     seconds_per_unit: float = 5.0, **kwargs) -> 'RunDeadline':
+        """Build a budget from a minutes option, falling back to $RUN_DEADLINE
+
+        A previous run's checkpoint, if given and present, seeds the cost
+        estimate with what that run measured.
+        """
+        deadline = None
+        if minutes:
+            deadline = time.time() + minutes * 60
+        elif os.getenv(DEADLINE_ENV):
+            deadline = float(os.environ[DEADLINE_ENV])
+
+        budget = cls(deadline, seconds_per_unit=seconds_per_unit, **kwargs)
+        if checkpoint_path is not None:
+            budget.seed_from(checkpoint_path)
+        return budget
+
+    def seed_from(self, checkpoint_path: Path):
+        """Start from the cost a previous run measured, until this run has its own"""
+        previous = read_json(Path(checkpoint_path)) or {}
+        if previous.get('seconds_per_unit') and not self.samples:
+            self.seconds_per_unit = previous['seconds_per_unit']
+
+    @property
+    def bounded(self) -> bool:
+        return self.deadline is not None
+
+    def remaining(self) -> float:
+        """Seconds left for fetching, after the flush reserve"""
+        if self.deadline is None:
+            return float('inf')
+        # Short budgets (tests, manual runs) keep at most a tenth in reserve
+        reserve = min(self.flush_reserve, 0.1 * max(self.deadline - self.started_at, 0))
+        return self.deadline - reserve - time.time()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def estimate(self, units: float = 1.0) -> float:
+        """Estimated seconds for work of the given cost"""
+        return units * self.seconds_per_unit
+
+    def can_start(self, units: float = 1.0) -> bool:
+        """Whether an item of the given cost is expected to finish in time"""
+        return self.estimate(units) <= self.remaining()
+
+    def record(self, units: float, seconds: float):
+        """Feed the measured duration of a completed item into the estimate"""
+        self.items_completed += 1
+        self.units_completed += units
+        if units <= 0:
+            return
+        observed = seconds / units
+        if self.samples == 0:
+            self.seconds_per_unit = observed
+        else:
+            self.seconds_per_unit += SMOOTHING * (observed - self.seconds_per_unit)
+        self.samples += 1
+
+    def order(self, pending_units: float) -> str:
+        """Frontier order to use: 'priority', or 'cheapest' when time is short"""
+        return 'cheapest' if self.estimate(pending_units) > self.remaining() else 'priority'
+
+    def write_checkpoint(self, path: Path, reason: str, **state: Any) -> Dict[str, Any]:
+        """Record where and why the run stopped
+
+        Args:
+            path: checkpoint.json location (next to the archive's progress)
+            reason: 'complete', 'deadline', 'interrupted' or 'error'
+            **state: Extra fields, e.g. frontier counts
+
+        Returns:
+            The checkpoint written
+        """
+        checkpoint = {
+            'stopped_at': datetime.now().isoformat(),
+            'reason': reason,
+            'deadline': datetime.fromtimestamp(self.deadline).isoformat() if self.deadline else None,
+            'elapsed_seconds': round(time.time() - self.started_at, 1),
+            'items_completed': self.items_completed,
+            'units_completed': self.units_completed,
+            'seconds_per_unit': round(self.seconds_per_unit, 3),
+        }
+        checkpoint.update(state)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_json(path, checkpoint, indent=2)
+        return checkpoint
+
+
+def install_sigterm_handler():
+    """Turn SIGTERM (a CI job being cancelled or timing out) into KeyboardInterrupt
+
+    The scrapers already treat KeyboardInterrupt as "stop and checkpoint", and
+    storage writes are atomic, so a kill then never loses saved data.
+    """
+    def _handler(signum, frame):
+        raise KeyboardInterrupt(f'signal {signum}')
+    signal.signal(signal.SIGTERM, _handler)
@@ -0,0 +1,316 @@
+"""
+Crawl Frontier
+
+A disk-backed work queue shared by all scrapers, stored in SQLite next to the
+archive's progress file. It replaces the in-memory work lists so that a killed
+run resumes where it stopped:
+
+* Items are deduplicated by key; finished items stay recorded as ``done``.
+* ``pop`` hands out the highest-priority pending item whose retry time has
+  come (or the cheapest one, when a run is short on time), and claims it. A claim that is not resolved within ``claim_timeout``
+  (the process died) makes the item available again.
+* ``fail`` schedules a retry with exponential backoff until ``max_attempts``
+  is reached, after which the item is parked as ``failed``.
+* Small named cursors (e.g. how far a forum listing got) live in the same
+  database.
+"""
+import json
+import random
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    group_key TEXT NOT NULL DEFAULT '',
+    payload TEXT NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 1,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    claimed_at REAL,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frontier_ready
+    ON frontier (kind, group_key, state, priority DESC);
+CREATE INDEX IF NOT EXISTS frontier_cheapest
+    ON frontier (kind, group_key, state, cost);
+CREATE TABLE IF NOT EXISTS cursors (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+PENDING = 'pending'
+IN_PROGRESS = 'in_progress'
+DONE = 'done'
+FAILED = 'failed'
+
+
+@dataclass
+class FrontierItem:
+    """A claimed unit of work"""
+    key: str
+    kind: str
+    group: str
+    payload: Dict[str, Any]
+    priority: float
+    attempts: int
+    cost: float = 1
+
+
+class Frontier:
+    """Persistent, prioritized, deduplicating work queue"""
+
+    def __init__(self, path: Path, max_attempts: int = 5, base_backoff: float = 60.0,
+                 max_backoff: float = 6 * 3600, claim_timeout: float = 1800.0):
+        """Open (creating if needed) the frontier database
+
+        Args:
+            path: SQLite database file
+            max_attempts: Failures after which an item is parked as failed
+            base_backoff: Delay before the first retry, in seconds
+            max_backoff: Upper bound on the retry delay
+            claim_timeout: Seconds after which an unresolved claim expires
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.claim_timeout = claim_timeout
+
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(frontier)')}
+        if columns and 'cost' not in columns:
+            # Databases created before items carried a cost estimate
+            self.conn.execute('ALTER TABLE frontier ADD COLUMN cost REAL NOT NULL DEFAULT 1')
+        self.conn.executescript(SCHEMA)
+
+    @staticmethod
+    def make_key(kind: str, *parts) -> str:
+        """Build a frontier key such as ``thread:13:111631``"""
+        return ':'.join([kind, *map(str, parts)])
+
+    def add(self, kind: str, key: str, payload: Dict[str, Any], priority: float = 0,
+            group: str = '', cost: float = 1) -> bool:
+        """Add an item unless its key is already known
+
+        Args:
+            cost: Estimated work, in requests, used for cheapest-first order
+
+        Returns:
+            True if the item was new
+        """
+        cursor = self.conn.execute(
+            'INSERT OR IGNORE INTO frontier (key, kind, group_key, payload, priority, cost, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (key, kind, str(group), json.dumps(payload), priority, cost, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def add_many(self, items: Iterable[Tuple]) -> int:
+        """Add (kind, key, payload, priority, group[, cost]) tuples in one transaction
+
+        Returns:
+            Number of new items
+        """
+        now = time.time()
+        rows = []
+        for kind, key, payload, priority, group, *rest in items:
+            rows.append((key, kind, str(group), json.dumps(payload), priority, rest[0] if rest else 1, now))
+        with self._transaction():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO frontier (key, kind, group_key, payload, priority, cost, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            return self.conn.total_changes - before
+
+    def requeue(self, kind: str, key: str, payload: Dict[str, Any], priority: float = 0,
+                group: str = '', cost: float = 1) -> bool:
+        """Queue an item again once it is done (adding it if unknown), to observe it anew
+
+        Items still pending, in progress or failed are left as they are.
+
+        Returns:
+            True if the item was added or re-queued
+        """
+        cursor = self.conn.execute(
+            'INSERT INTO frontier (key, kind, group_key, payload, priority, cost, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET state = ?, attempts = 0, next_attempt_at = 0, '
+            'claimed_at = NULL, payload = excluded.payload, priority = excluded.priority, '
+            'updated_at = excluded.updated_at WHERE state = ?',
+            (key, kind, str(group), json.dumps(payload), priority, cost, time.time(), PENDING, DONE)
+        )
+        return cursor.rowcount == 1
+
+    def contains(self, key: str) -> bool:
+        return self.conn.execute('SELECT 1 FROM frontier WHERE key = ?', (key,)).fetchone() is not None
+
+    def pop(self, kind: str, group: Optional[str] = None, order: str = 'priority') -> Optional[FrontierItem]:
+        """Claim the highest-priority item that is ready to run
+
+        Args:
+            kind: Item kind (e.g. 'thread', 'lot')
+            group: Restrict to one group (e.g. a forum ID)
+            order: 'priority', or 'cheapest' to take the lowest-cost item first
+
+        Returns:
+            The claimed item, or None if nothing is ready
+        """
+        now = time.time()
+        query = (
+            'SELECT key, kind, group_key, payload, priority, attempts, cost FROM frontier '
+            'WHERE kind = ? AND ((state = ? AND next_attempt_at <= ?) '
+            'OR (state = ? AND claimed_at < ?))'
+        )
+        params = [kind, PENDING, now, IN_PROGRESS, now - self.claim_timeout]
+        if group is not None:
+            query += ' AND group_key = ?'
+            params.append(str(group))
+        if order == 'cheapest':
+            query += ' ORDER BY cost, priority DESC, key LIMIT 1'
+        else:
+            query += ' ORDER BY priority DESC, key LIMIT 1'
+
+        with self._transaction(immediate=True):
+            row = self.conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                'UPDATE frontier SET state = ?, claimed_at = ?, updated_at = ? WHERE key = ?',
+                (IN_PROGRESS, now, now, row[0])
+            )
+        return FrontierItem(row[0], row[1], row[2], json.loads(row[3]), row[4], row[5], row[6])
+
+    def done(self, key: str):
+        """Mark an item as finished"""
+        now = time.time()
+        self.conn.execute(
+            'UPDATE frontier SET state = ?, claimed_at = NULL, last_error = NULL, updated_at = ? '
+            'WHERE key = ?',
+            (DONE, now, key)
+        )
+
+    def fail(self, key: str, error: str = '') -> str:
+        """Record a failed attempt and schedule a retry with backoff
+
+        Returns:
+            The item's new state ('pending' or 'failed')
+        """
+        now = time.time()
+        with self._transaction(immediate=True):
+            row = self.conn.execute('SELECT attempts FROM frontier WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return FAILED
+            attempts = row[0] + 1
+            if attempts >= self.max_attempts:
+                state, next_attempt = FAILED, now
+            else:
+                delay = min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+                state, next_attempt = PENDING, now + delay * random.uniform(0.8, 1.2)
+            self.conn.execute(
+                'UPDATE frontier SET state = ?, attempts = ?, next_attempt_at = ?, claimed_at = NULL, '
+                'last_error = ?, updated_at = ? WHERE key = ?',
+                (state, attempts, next_attempt, str(error)[:500], now, key)
+            )
+        return state
+
+    def release(self, key: str):
+        """Return a claimed item to the queue without counting an attempt"""
+        self.conn.execute(
+            'UPDATE frontier SET state = ?, claimed_at = NULL, updated_at = ? WHERE key = ? AND state = ?',
+            (PENDING, time.time(), key, IN_PROGRESS)
+        )
+
+    def retry_failed(self, kind: Optional[str] = None) -> int:
+        """Give parked failures a fresh set of attempts
+
+        Returns:
+            Number of items re-queued
+        """
+        query = 'UPDATE frontier SET state = ?, attempts = 0, next_attempt_at = 0 WHERE state = ?'
+        params = [PENDING, FAILED]
+        if kind:
+            query += ' AND kind = ?'
+            params.append(kind)
+        return self.conn.execute(query, params).rowcount
+
+    def pending_count(self, kind: str, group: Optional[str] = None) -> int:
+        """Items not yet done or failed (including ones waiting for a retry)"""
+        query = 'SELECT COUNT(*) FROM frontier WHERE kind = ? AND state IN (?, ?)'
+        params = [kind, PENDING, IN_PROGRESS]
+        if group is not None:
+            query += ' AND group_key = ?'
+            params.append(str(group))
+        return self.conn.execute(query, params).fetchone()[0]
+
+    def pending_cost(self, kind: str, group: Optional[str] = None) -> float:
+        """Summed cost of the items still to do"""
+        query = 'SELECT COALESCE(SUM(cost), 0) FROM frontier WHERE kind = ? AND state IN (?, ?)'
+        params = [kind, PENDING, IN_PROGRESS]
+        if group is not None:
+            query += ' AND group_key = ?'
+            params.append(str(group))
+        return self.conn.execute(query, params).fetchone()[0]
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Item counts by kind and state"""
+        counts: Dict[str, Dict[str, int]] = {}
+        for kind, state, count in self.conn.execute(
+                'SELECT kind, state, COUNT(*) FROM frontier GROUP BY kind, state'):
+            counts.setdefault(kind, {})[state] = count
+        return counts
+
+    def get_cursor(self, name: str, default: Any = None) -> Any:
+        row = self.conn.execute('SELECT value FROM cursors WHERE name = ?', (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_cursor(self, name: str, value: Any):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO cursors (name, value, updated_at) VALUES (?, ?, ?)',
+            (name, json.dumps(value), time.time())
+        )
+
+    def checkpoint(self):
+        """Fold the write-ahead log back into the database file
+
+        After this the .db file alone is complete, so it can be committed.
+        """
+        self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def close(self):
+        """Checkpoint and close the database"""
+        self.checkpoint()
+        self.conn.close()
+
+    def _transaction(self, immediate: bool = False):
+        return _Transaction(self.conn, immediate)
+
+
+class _Transaction:
+    """BEGIN/COMMIT context for an autocommit connection"""
+
+    def __init__(self, conn: sqlite3.Connection, immediate: bool):
+        self.conn = conn
+        self.immediate = immediate
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE' if self.immediate else 'BEGIN')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
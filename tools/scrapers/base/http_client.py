@@ -0,0 +1,387 @@
+"""
+Shared HTTP Client
+
+One client layer behind every scraper's requests (BaseScraper.make_request,
+scripts/utils.fetch_page, the Tapatalk transport and the access probes):
+
+* Each client owns one pooled ``requests.Session``: connections are kept
+  alive and reused, the pool holds as many connections per host as the
+  client may use at once, and headers are set once instead of per call.
+* Compression is negotiated with every decoder urllib3 has available
+  (gzip and deflate, plus brotli or zstd when installed).
+* Connection errors, timeouts, 429 and 5xx responses are retried with
+  exponential backoff and jitter, honouring ``Retry-After``. All clients in
+  a process draw retries from one budget, so a failing host cannot multiply
+  the request volume.
+* A per-host limit caps concurrent requests to one host. Pacing between
+  requests stays with the caller, through the ``pace`` hook (e.g. a
+  ``HostBudget`` or the scraper's rate limiter), which runs before every
+  attempt including retries.
+* Every request is counted per host in one process-wide ``RequestMetrics``.
+
+``AsyncHttpClient`` offers the same behaviour on asyncio when aiohttp is
+installed.
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Statuses worth retrying; other errors are returned to the caller at once
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Host pools kept by one client, and connections (and concurrent requests) per host
+DEFAULT_POOL_HOSTS = 10
+DEFAULT_PER_HOST = 2
+
+
+class RetryBudget:
+    """Process-wide allowance of retries
+
+    Every request deposits ``ratio`` of a retry, every retry withdraws one;
+    the balance is capped at ``reserve``. In steady state retries stay below
+    ``ratio`` of all requests, while short bursts can use the reserve.
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 10.0):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._balance = min(self._balance + self.ratio, self.reserve)
+
+    def withdraw(self) -> bool:
+        """Take one retry from the budget, if there is one"""
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+@dataclass
+class HostStats:
+    """Request counters of one host"""
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    exhausted: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+
+class RequestMetrics:
+    """Per-host request counters shared by all clients of a process"""
+
+    def __init__(self):
+        self.hosts: Dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, host: str, status: Optional[int] = None, seconds: float = 0.0,
+               size: int = 0, retry: bool = False, failure: bool = False, exhausted: bool = False):
+        with self._lock:
+            stats = self.hosts.setdefault(host, HostStats())
+            stats.requests += 1
+            stats.seconds += seconds
+            stats.bytes += size
+            stats.retries += retry
+            stats.failures += failure
+            stats.exhausted += exhausted
+            if status is not None:
+                key = f'{status // 100}xx'
+                stats.statuses[key] = stats.statuses.get(key, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Counters per host, e.g. for a run checkpoint"""
+        with self._lock:
+            return {host: {
+                'requests': stats.requests,
+                'retries': stats.retries,
+                'failures': stats.failures,
+                'retry_budget_exhausted': stats.exhausted,
+                'bytes': stats.bytes,
+                'avg_seconds': round(stats.seconds / stats.requests, 3) if stats.requests else 0.0,
+                'statuses': dict(stats.statuses),
+            } for host, stats in self.hosts.items()}
+
+    def summary(self) -> str:
+        """One line per host"""
+        lines = []
+        for host, stats in self.snapshot().items():
+            statuses = ', '.join(f'{k} {v}' for k, v in sorted(stats['statuses'].items()))
+            lines.append(f"{host}: {stats['requests']} requests ({statuses or 'no responses'}), "
+                         f"{stats['retries']} retries, {stats['failures']} failures, "
+                         f"{stats['bytes'] / 2**20:.1f} MB, {stats['avg_seconds']}s avg")
+        return '\n'.join(lines) or 'no requests'
+
+
+# Shared by every client unless one is given its own
+RETRY_BUDGET = RetryBudget()
+METRICS = RequestMetrics()
+
+
+def accept_encoding() -> str:
+    """Accept-Encoding listing every decoder urllib3 can use here"""
+    return make_headers(accept_encoding=True)['accept-encoding']
+
+
+def retry_after(response) -> Optional[float]:
+    """Seconds asked for by a Retry-After header (delta-seconds form only)"""
+    if response is None:
+        return None
+    try:
+        return max(0.0, float(response.headers.get('Retry-After', '')))
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, backoff: float, max_backoff: float,
+                  requested: Optional[float] = None) -> float:
+    """Delay before retry number ``attempt`` (1-based): full jitter, or Retry-After"""
+    if requested is not None:
+        return min(requested, max_backoff)
+    return random.uniform(0, min(max_backoff, backoff * 2 ** (attempt - 1)))
+
+
+class HttpClient:
+    """Pooled HTTP client with retries, a retry budget, host limits and metrics"""
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: float = 30.0,
+                 max_attempts: int = 3, backoff: float = 1.0, max_backoff: float = 60.0,
+                 per_host: int = DEFAULT_PER_HOST, pool_hosts: int = DEFAULT_POOL_HOSTS,
+                 pace: Optional[Callable[[], None]] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 retry_budget: Optional[RetryBudget] = None,
+                 metrics: Optional[RequestMetrics] = None):
+        """Create a client
+
+        Args:
+            headers: Headers sent with every request (User-Agent defaults to a browser's)
+            timeout: Seconds for connecting and for each read
+            max_attempts: Attempts per request, including the first
+            backoff: Base of the exponential backoff, in seconds
+            max_backoff: Longest wait between attempts
+            per_host: Concurrent requests (and pooled connections) per host
+            pool_hosts: Hosts whose connection pools are kept
+            pace: Called before every attempt, e.g. to wait for a rate limit
+            sleep: Used for backoff waits; may raise to abort (e.g. on stop)
+            retry_budget: Defaults to the process-wide budget
+            metrics: Defaults to the process-wide metrics
+        """
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.per_host = per_host
+        self.pace = pace
+        self.sleep = sleep
+        self.retry_budget = retry_budget or RETRY_BUDGET
+        self.metrics = metrics or METRICS
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=per_host, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': DEFAULT_USER_AGENT,
+            'Accept-Encoding': accept_encoding(),
+            'Connection': 'keep-alive',
+        })
+        if headers:
+            self.session.headers.update(headers)
+
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _slots(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying transient failures
+
+        Args:
+            method: HTTP method
+            url: URL to request
+            **kwargs: Passed to ``requests.Session.request`` (``stream=True``
+                responses must be closed by the caller)
+
+        Returns:
+            The successful response
+
+        Raises:
+            requests.RequestException: The last error once attempts or the
+                retry budget are used up, or a non-retryable HTTP error
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlparse(url).netloc
+        slots = self._slots(host)
+        self.retry_budget.deposit()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.pace:
+                self.pace()
+            response = None
+            started = time.perf_counter()
+            try:
+                with slots:
+                    response = self.session.request(method, url, **kwargs)
+                if response.status_code in RETRY_STATUSES:
+                    response.raise_for_status()
+                error = None
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                error = e
+            elapsed = time.perf_counter() - started
+            size = 0 if kwargs.get('stream') or response is None else len(response.content)
+            status = response.status_code if response is not None else None
+
+            if error is None:
+                # Success, or an error retrying cannot fix (e.g. 404)
+                self.metrics.record(host, status, elapsed, size, retry=attempt > 1, failure=not response.ok)
+                response.raise_for_status()
+                return response
+
+            can_retry = attempt < self.max_attempts
+            exhausted = can_retry and not self.retry_budget.withdraw()
+            self.metrics.record(host, status, elapsed, size, retry=attempt > 1,
+                                failure=True, exhausted=exhausted)
+            if not can_retry or exhausted:
+                if response is not None:
+                    response.close()
+                raise error
+            delay = backoff_delay(attempt, self.backoff, self.max_backoff, retry_after(response))
+            if response is not None:
+                response.close()
+            self.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHttpClient:
+    """asyncio counterpart of HttpClient (requires aiohttp)
+
+    Shares the retry policy, the process-wide retry budget and the metrics.
+    Responses are read completely before they are returned.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: float = 30.0,
+                 max_attempts: int = 3, backoff: float = 1.0, max_backoff: float = 60.0,
+                 per_host: int = DEFAULT_PER_HOST, pool_hosts: int = DEFAULT_POOL_HOSTS,
+                 pace: Optional[Callable[[], Any]] = None,
+                 retry_budget: Optional[RetryBudget] = None,
+                 metrics: Optional[RequestMetrics] = None):
+        """Create a client; arguments as for HttpClient, ``pace`` may be a coroutine function
+
+        Raises:
+            ImportError: If aiohttp is not installed
+        """
+        import aiohttp
+
+        self._aiohttp = aiohttp
+        self.timeout = aiohttp.ClientTimeout(sock_connect=timeout, sock_read=timeout)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = per_host * pool_hosts
+        self.per_host = per_host
+        self.pace = pace
+        self.retry_budget = retry_budget or RETRY_BUDGET
+        self.metrics = metrics or METRICS
+        self.headers = {'User-Agent': DEFAULT_USER_AGENT, 'Accept-Encoding': accept_encoding()}
+        self.headers.update(headers or {})
+        self.session = None
+
+    async def __aenter__(self) -> 'AsyncHttpClient':
+        connector = self._aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.per_host)
+        self.session = self._aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                                   timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def request(self, method: str, url: str, **kwargs):
+        """Send a request, retrying transient failures
+
+        Returns:
+            The aiohttp response, with its body already read
+
+        Raises:
+            aiohttp.ClientError: As HttpClient.request
+        """
+        import asyncio
+
+        aiohttp = self._aiohttp
+        host = urlparse(url).netloc
+        self.retry_budget.deposit()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.pace:
+                result = self.pace()
+                if asyncio.iscoroutine(result):
+                    await result
+            response = None
+            started = time.perf_counter()
+            try:
+                response = await self.session.request(method, url, **kwargs)
+                body = await response.read()
+                if response.status in RETRY_STATUSES:
+                    response.raise_for_status()
+                error = None
+            except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError, asyncio.TimeoutError) as e:
+                error = e
+                body = b''
+            finally:
+                if response is not None:
+                    response.release()
+            elapsed = time.perf_counter() - started
+            status = response.status if response is not None else None
+
+            if error is None:
+                self.metrics.record(host, status, elapsed, len(body), retry=attempt > 1, failure=not response.ok)
+                response.raise_for_status()
+                return response
+
+            can_retry = attempt < self.max_attempts
+            exhausted = can_retry and not self.retry_budget.withdraw()
+            self.metrics.record(host, status, elapsed, len(body), retry=attempt > 1,
+                                failure=True, exhausted=exhausted)
+            if not can_retry or exhausted:
+                raise error
+            await asyncio.sleep(backoff_delay(attempt, self.backoff, self.max_backoff, retry_after(response)))
+
+    async def get(self, url: str, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
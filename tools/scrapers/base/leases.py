@@ -0,0 +1,194 @@
+"""
+Shard Leases
+
+Coordinates several scraper processes (on one machine, or several runners
+sharing the archive directory) without double-fetching. A coordinator splits
+the work into shards, e.g. index ranges of a forum's topic listing, and
+records them in SQLite. Workers claim a shard under a time-bounded lease and
+renew it with heartbeats. If a worker dies, its lease expires and another
+worker claims the shard.
+"""
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    shard_id TEXT PRIMARY KEY,
+    params TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    heartbeat_at REAL,
+    claims INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+"""
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+
+
+@dataclass
+class Shard:
+    """A leased unit of partitioned work"""
+    shard_id: str
+    params: Dict[str, Any]
+    owner: str
+
+
+class LeaseTable:
+    """Shard registry with time-bounded leases"""
+
+    def __init__(self, path: Path, lease_seconds: float = 600.0):
+        """Open (creating if needed) the shard table
+
+        Args:
+            path: SQLite database shared by the coordinator and all workers
+            lease_seconds: How long a claim or heartbeat keeps a shard leased
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def create_shards(self, shards: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Register (shard_id, params) pairs; existing shards are kept as they are
+
+        Returns:
+            Number of new shards
+        """
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        before = self.conn.total_changes
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO shards (shard_id, params, updated_at) VALUES (?, ?, ?)',
+            [(shard_id, json.dumps(params), now) for shard_id, params in shards]
+        )
+        self.conn.execute('COMMIT')
+        return self.conn.total_changes - before
+
+    def claim(self, owner: str) -> Optional[Shard]:
+        """Lease a pending shard, or one whose lease has expired
+
+        Args:
+            owner: Unique worker identity (e.g. host:pid)
+
+        Returns:
+            The leased shard, or None if no shard is available
+        """
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute(
+                'SELECT shard_id, params FROM shards '
+                'WHERE state = ? OR (state = ? AND lease_expires < ?) '
+                'ORDER BY claims, shard_id LIMIT 1',
+                (PENDING, LEASED, now)
+            ).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    'UPDATE shards SET state = ?, owner = ?, lease_expires = ?, heartbeat_at = ?, '
+                    'claims = claims + 1, updated_at = ? WHERE shard_id = ?',
+                    (LEASED, owner, now + self.lease_seconds, now, now, row[0])
+                )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        return Shard(row[0], json.loads(row[1]), owner)
+
+    def heartbeat(self, shard: Shard) -> bool:
+        """Extend a lease
+
+        Returns:
+            False if the lease was lost (expired and taken by another worker)
+        """
+        now = time.time()
+        cursor = self.conn.execute(
+            'UPDATE shards SET lease_expires = ?, heartbeat_at = ?, updated_at = ? '
+            'WHERE shard_id = ? AND owner = ? AND state = ?',
+            (now + self.lease_seconds, now, now, shard.shard_id, shard.owner, LEASED)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, shard: Shard) -> bool:
+        """Mark a shard finished; False if the lease had been lost"""
+        cursor = self.conn.execute(
+            'UPDATE shards SET state = ?, lease_expires = NULL, updated_at = ? '
+            'WHERE shard_id = ? AND owner = ? AND state = ?',
+            (DONE, time.time(), shard.shard_id, shard.owner, LEASED)
+        )
+        return cursor.rowcount == 1
+
+    def release(self, shard: Shard):
+        """Give a shard back unfinished (e.g. on shutdown)"""
+        self.conn.execute(
+            'UPDATE shards SET state = ?, owner = NULL, lease_expires = NULL, updated_at = ? '
+            'WHERE shard_id = ? AND owner = ? AND state = ?',
+            (PENDING, time.time(), shard.shard_id, shard.owner, LEASED)
+        )
+
+    def reset_done(self) -> int:
+        """Make finished shards claimable again (for a fresh pass over the same ranges)"""
+        return self.conn.execute(
+            'UPDATE shards SET state = ?, owner = NULL WHERE state = ?', (PENDING, DONE)
+        ).rowcount
+
+    def status(self) -> Dict[str, int]:
+        """Shard counts by state, with expired leases reported as 'expired'"""
+        counts: Dict[str, int] = {}
+        now = time.time()
+        for state, expires in self.conn.execute('SELECT state, lease_expires FROM shards'):
+            if state == LEASED and expires is not None and expires < now:
+                state = 'expired'
+            counts[state] = counts.get(state, 0) + 1
+        return counts
+
+    def close(self):
+        self.conn.close()
+
+
+class Heartbeat:
+    """Background thread renewing a shard lease until stopped
+
+    Uses its own connection, since SQLite connections are per-thread.
+    ``lost`` is set if the lease could not be renewed, so the worker can stop
+    before it does work another process now owns.
+    """
+
+    def __init__(self, path: Path, shard: Shard, lease_seconds: float):
+        self.path = path
+        self.shard = shard
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'heartbeat-{shard.shard_id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        table = LeaseTable(self.path, self.lease_seconds)
+        try:
+            while not self._stop.wait(self.lease_seconds / 3):
+                if not table.heartbeat(self.shard):
+                    self.lost.set()
+                    return
+        finally:
+            table.close()
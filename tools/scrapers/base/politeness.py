@@ -0,0 +1,96 @@
+"""
+Host Politeness Budget
+
+Spaces requests to one host at least ``delay`` seconds apart across every
+process that shares the budget database. Each request reserves the next free
+slot in a single SQLite transaction and then waits until that slot, so N
+worker processes together never go faster than one polite scraper.
+
+Every scraper paces through the same database (``$HOST_BUDGET_DB``, default
+``data/host_budget.db``), so the budget also holds across different
+scrapers of one host, such as the Net54 HTML and Tapatalk scrapers.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+BUDGET_DB_ENV = 'HOST_BUDGET_DB'
+DEFAULT_BUDGET_DB = Path('data') / 'host_budget.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS host_budget (
+    host TEXT PRIMARY KEY,
+    next_slot REAL NOT NULL
+);
+"""
+
+
+def budget_path() -> Path:
+    """The budget database shared by every scraper"""
+    return Path(os.getenv(BUDGET_DB_ENV) or DEFAULT_BUDGET_DB)
+
+
+class HostBudget:
+    """Cross-process request pacing for one host"""
+
+    def __init__(self, path: Path, host: str, delay: float):
+        """Open the shared budget
+
+        Args:
+            path: SQLite database shared by all processes scraping the host
+            host: Host name the budget applies to
+            delay: Minimum seconds between two requests to the host
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.host = host
+        self.delay = delay
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def reserve(self, delay: Optional[float] = None) -> float:
+        """Reserve the next request slot without waiting
+
+        Returns:
+            Seconds to wait until the reserved slot
+        """
+        delay = self.delay if delay is None else delay
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute(
+                'SELECT next_slot FROM host_budget WHERE host = ?', (self.host,)
+            ).fetchone()
+            slot = max(now, row[0]) if row else now
+            self.conn.execute(
+                'INSERT OR REPLACE INTO host_budget (host, next_slot) VALUES (?, ?)',
+                (self.host, slot + delay)
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return slot - now
+
+    def wait(self, delay: Optional[float] = None, stop: Optional[threading.Event] = None) -> bool:
+        """Block until this process may send its next request to the host
+
+        Args:
+            delay: Spacing to reserve instead of the budget's own
+            stop: Event that ends the wait early when set
+
+        Returns:
+            True if the wait ended because ``stop`` was set (send nothing)
+        """
+        wait_seconds = self.reserve(delay)
+        stop = stop or threading.Event()
+        if wait_seconds > 0:
+            return stop.wait(wait_seconds)
+        return stop.is_set()
+
+    def close(self):
+        self.conn.close()
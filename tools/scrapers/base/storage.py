@@ -1,20 +1,29 @@
 import json
 import os
+from itertools import islice
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional
 import logging
 
+from ...logging_setup import sampled
+from ...archive.stats import ArchiveStats
+from ...archive.partitions import ProgressPartitions, atomic_write_json, locked, read_json
+from ...archive.journal import ChangeJournal, JOURNAL_NAME
+from ...archive.indexers import ArchiveIndexes
+
 
 class MultiArchiveStorage:
     """Storage that supports multiple archives with isolated data spaces"""
     
-    def __init__(self, archive_name: str, base_dir: str = 'archives'):
+    def __init__(self, archive_name: str, base_dir: str = 'archives', track_prices: bool = False):
         """Initialize storage for a specific archive
         
         Args:
             archive_name: Name of the archive (e.g., 'net54', 'heritage')
             base_dir: Base directory for all archives
+            track_prices: Append each saved lot's bids to its auction's
+                price history (see tools/archive/pricehistory.py)
         """
         self.archive_name = archive_name
         self.base_dir = Path(base_dir)
@@ -38,38 +47,72 @@ class MultiArchiveStorage:
         self.metadata_dir = self.archive_dir / 'metadata'
         self.raw_dir = self.archive_dir / 'raw'
         
-        # Create directories
-        for dir_path in [self.processed_dir, self.metadata_dir, self.raw_dir]:
-            dir_path.mkdir(parents=True, exist_ok=True)
+        # Directories are created on first write, so reading stats of an
+        # archive never touches the filesystem
         
         # Set up logging
         self.logger = logging.getLogger(f"{archive_name}_storage")
         
-        # Load or create progress tracking
+        # Progress tracking, one partition file per item type so that several
+        # scraper processes can write to the archive at once
         self.progress_file = self.metadata_dir / 'progress.json'
-        self.progress = self.load_progress()
+        self.partitions = ProgressPartitions(self.metadata_dir / 'progress')
+        self.load_progress()
+        
+        # Materialized per-type aggregates, updated on every save
+        self.stats = ArchiveStats(self.metadata_dir / 'stats.json')
+        
+        # Files written since the last commit (see tools/archive/commits.py)
+        self.journal = ChangeJournal(self.metadata_dir / JOURNAL_NAME)
+        
+        # Search and other indexes, kept current once `collectibles.py index` created them
+        self.indexes = ArchiveIndexes(self.archive_dir)
+        
+        # Bid history of lots, which re-saves would otherwise overwrite
+        self.track_prices = track_prices
+        self._price_history = None
     
     def load_progress(self) -> Dict[str, Any]:
-        """Load scraping progress from file"""
-        if self.progress_file.exists():
-            with open(self.progress_file, 'r') as f:
-                return json.load(f)
+        """Load scraping progress, migrating a single progress.json if needed"""
+        if not self.partitions.exists() and self.progress_file.exists():
+            with locked(self.progress_file):
+                if not self.partitions.exists():
+                    legacy = read_json(self.progress_file, {})
+                    for item_type, items in legacy.get('items', {}).items():
+                        self.partitions.replace(item_type, {}, items)
+                    os.replace(self.progress_file, self.progress_file.with_name('progress.json.migrated'))
+        self.partitions.load()
+        return self.progress
+    
+    @property
+    def progress(self) -> Dict[str, Any]:
+        """Merged view of all partitions, in the old progress.json layout"""
+        items = {item_type: p['entries'] for item_type, p in self.partitions.partitions.items()}
         return {
             'archive_name': self.archive_name,
             'archive_type': self.archive_type,
-            'items': {},
-            'last_update': None,
+            'items': items,
+            'last_update': self.partitions.last_update(),
             'statistics': {
-                'total_items': 0,
-                'total_size_bytes': 0
+                'total_items': sum(len(entries) for entries in items.values()),
+                'total_size_bytes': sum(entries.total('size_bytes') for entries in items.values())
             }
         }
     
+    @property
+    def price_history(self):
+        """The archive's lot price history (imported on first use, it needs NumPy)"""
+        if self._price_history is None:
+            from ...archive.pricehistory import HISTORY_DIR, PriceHistory
+            self._price_history = PriceHistory(self.archive_dir / HISTORY_DIR)
+        return self._price_history
+    
     def save_progress(self):
-        """Save current progress to file"""
-        self.progress['last_update'] = datetime.now().isoformat()
-        with open(self.progress_file, 'w') as f:
-            json.dump(self.progress, f, indent=2)
+        """Merge this process's progress and stats changes into the files"""
+        self.journal.record_many(self.partitions.flush())
+        if self.stats.save():
+            self.journal.record(self.stats.path)
+        self.journal.flush()
         self.logger.debug(f"Progress saved for {self.archive_name}")
     
     def save_item(self, item_type: str, item_id: str, data: Dict[str, Any]) -> Path:
@@ -85,28 +128,44 @@ class MultiArchiveStorage:
         """
         # Create type-specific directory
         type_dir = self.processed_dir / item_type
-        type_dir.mkdir(exist_ok=True)
+        type_dir.mkdir(parents=True, exist_ok=True)
         
         # Save item
         filename = type_dir / f"{item_id}.json"
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        old_size, old_post_count = None, 0
+        if filename.exists():
+            # Re-saving replaces the posts too, so take them out of the stats
+            old_size = filename.stat().st_size
+            try:
+                with open(filename, 'r') as f:
+                    old_post_count = len(json.load(f).get('posts') or [])
+            except ValueError:
+                pass  # Unreadable file being replaced
+        atomic_write_json(filename, data, indent=2)
+        self.journal.record(filename)
+        size = filename.stat().st_size
+        if self.track_prices and data.get('auction_id'):
+            self.journal.record_many(self.price_history.record(data))
         
         # Update progress
-        if item_type not in self.progress['items']:
-            self.progress['items'][item_type] = {}
-        
-        self.progress['items'][item_type][item_id] = {
-            'saved_at': datetime.now().isoformat(),
-            'size_bytes': filename.stat().st_size
-        }
+        self.partitions.set_entry(
+            item_type, item_id,
+            saved_at=datetime.now().isoformat(),
+            size_bytes=size
+        )
         
-        # Update statistics
-        self.progress['statistics']['total_items'] += 1
-        self.progress['statistics']['total_size_bytes'] += filename.stat().st_size
+        # Update statistics (re-saves replace the item rather than add one)
+        self.stats.record(
+            item_type,
+            new_item=old_size is None,
+            bytes_delta=size - (old_size or 0),
+            posts_delta=len(data.get('posts') or []) - old_post_count,
+            posts=data.get('posts') or ()
+        )
         
         self.save_progress()
-        self.logger.info(f"Saved {item_type} {item_id} to {filename}")
+        self.indexes.update(item_type, item_id, data, filename)
+        self.logger.info(f"Saved {item_type} {item_id} to {filename}", extra=sampled(f"save_{item_type}"))
         
         return filename
     
@@ -123,11 +182,12 @@ class MultiArchiveStorage:
             Path to saved file
         """
         type_dir = self.raw_dir / item_type
-        type_dir.mkdir(exist_ok=True)
+        type_dir.mkdir(parents=True, exist_ok=True)
         
         filename = type_dir / f"{item_id}.{extension}"
         with open(filename, 'w', encoding='utf-8') as f:
             f.write(content)
+        self.journal.record(filename)
         
         self.logger.debug(f"Saved raw {item_type} {item_id}")
         return filename
@@ -142,8 +202,8 @@ class MultiArchiveStorage:
         Returns:
             True if item exists in progress tracking
         """
-        return (item_type in self.progress['items'] and 
-                str(item_id) in self.progress['items'][item_type])
+        partition = self.partitions.partitions.get(item_type)
+        return bool(partition) and str(item_id) in partition['entries']
     
     def get_item(self, item_type: str, item_id: str) -> Optional[Dict[str, Any]]:
         """Load a previously saved item
@@ -167,17 +227,18 @@ class MultiArchiveStorage:
         Returns:
             Dictionary with archive statistics
         """
+        progress = self.progress
         stats = {
             'archive_name': self.archive_name,
             'archive_type': self.archive_type,
-            'last_update': self.progress['last_update'],
-            'total_items': self.progress['statistics']['total_items'],
-            'total_size_mb': round(self.progress['statistics']['total_size_bytes'] / (1024 * 1024), 2)
+            'last_update': progress['last_update'],
+            'total_items': progress['statistics']['total_items'],
+            'total_size_mb': round(progress['statistics']['total_size_bytes'] / (1024 * 1024), 2)
         }
         
         # Add item type breakdown
         stats['items_by_type'] = {}
-        for item_type, items in self.progress['items'].items():
+        for item_type, items in progress['items'].items():
             stats['items_by_type'][item_type] = len(items)
         
         return stats
@@ -192,11 +253,9 @@ class MultiArchiveStorage:
         Returns:
             List of item IDs
         """
-        if item_type in self.progress['items']:
-            items = list(self.progress['items'][item_type].keys())
-            if limit:
-                return items[:limit]
-            return items
+        if item_type in self.partitions.partitions:
+            entries = self.partitions.partitions[item_type]['entries']
+            return list(islice(entries, limit) if limit else entries)
         return []
     
     def export_metadata(self, output_file: Optional[Path] = None) -> Path:
@@ -209,6 +268,7 @@ class MultiArchiveStorage:
             Path to exported file
         """
         if not output_file:
+            self.metadata_dir.mkdir(parents=True, exist_ok=True)
             output_file = self.metadata_dir / f'{self.archive_name}_metadata_{datetime.now().strftime("%Y%m%d")}.json'
         
         metadata = {
@@ -222,7 +282,8 @@ class MultiArchiveStorage:
         }
         
         with open(output_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
+            # Partition entries are mappings over their snapshots, not dicts
+            json.dump(metadata, f, indent=2, default=dict)
         
         self.logger.info(f"Exported metadata to {output_file}")
         return output_file
\ No newline at end of file
@@ -1,3 +1,9 @@
-from .net54_scraper import Net54Scraper
+__all__ = ['Net54Scraper']
 
-__all__ = ['Net54Scraper']
\ No newline at end of file
+
+def __getattr__(name):
+    # Imported lazily; see tools.scrapers.registry
+    if name == 'Net54Scraper':
+        from .net54_scraper import Net54Scraper
+        return Net54Scraper
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
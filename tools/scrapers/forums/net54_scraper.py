@@ -1,11 +1,20 @@
 import sys
 import os
-# Add scripts directory to path for legacy imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../../scripts'))
 
 from ..base.base_scraper import BaseScraper
-from scraper import Net54Scraper as LegacyScraper
-from storage import DataStorage
+
+# Legacy scripts directory, put on sys.path only when a Net54Scraper is created
+LEGACY_SCRIPTS_DIR = os.path.join(os.path.dirname(__file__), '../../../scripts')
+
+
+def _load_legacy():
+    """Import the legacy scraper and storage modules from scripts/"""
+    if LEGACY_SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, LEGACY_SCRIPTS_DIR)
+    from scraper import Net54Scraper as LegacyScraper
+    from storage import DataStorage
+    return LegacyScraper, DataStorage
+
 
 class Net54Scraper(BaseScraper):
     """New Net54 scraper that wraps the legacy implementation"""
@@ -17,6 +26,7 @@ class Net54Scraper(BaseScraper):
             config_path: Path to YAML configuration file
         """
         super().__init__(config_path)
+        LegacyScraper, DataStorage = _load_legacy()
         
         # Initialize legacy scraper with new storage path
         self.legacy_scraper = LegacyScraper()
@@ -24,7 +34,7 @@ class Net54Scraper(BaseScraper):
         # Override storage to use new path structure if enabled
         if os.getenv('USE_NEW_STRUCTURE', 'false').lower() == 'true':
             archive_path = self.config['storage']['base_path']
-            self.legacy_scraper.storage = DataStorage(archive_path=archive_path)
+            self.legacy_scraper.storage = DataStorage(base_dir=archive_path)
             
     def scrape(self, forum_id=None, thread_limit=None):
         """Maintain compatibility with existing interface
@@ -38,12 +48,26 @@ class Net54Scraper(BaseScraper):
         """
         # Update delay in legacy scraper based on config
         self.legacy_scraper.delay = self.config['scraping']['delay_seconds']
+        self.legacy_scraper.should_stop = self.stopping
+        self.legacy_scraper.stop_event = self.stop_event
+        if self.deadline.bounded:
+            self.legacy_scraper.deadline = self.deadline
+            self.deadline.seed_from(self.legacy_scraper.checkpoint_file)
         
         # Run legacy scraper
-        if forum_id:
-            return self.legacy_scraper.scrape_forum_threads(forum_id, thread_limit)
-        else:
-            return self.legacy_scraper.scrape_entire_forum(thread_limit)
+        # Threads are queued in the legacy scraper's frontier and then fetched,
+        # so an interrupted run resumes from where it stopped
+        reason = 'error'
+        try:
+            result = self.legacy_scraper.scrape_entire_forum(forum_id=forum_id, thread_limit=thread_limit)
+            reason = 'complete'
+            return result
+        finally:
+            self.legacy_scraper.write_checkpoint(reason)
+    
+    def frontier_path(self):
+        """The legacy scraper's frontier database"""
+        return self.legacy_scraper.frontier.path
     
     def parse_item(self, html):
         """Parse a single item using legacy parser
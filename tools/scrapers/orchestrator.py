@@ -0,0 +1,205 @@
+"""
+Multi-archive Scrape Orchestrator
+
+Runs several archive scrapers concurrently in one process. A scraper spends
+almost all of its time waiting in its rate limiter, and archives live on
+different hosts with independent politeness budgets, so running them side by
+side makes a full refresh take about as long as the slowest archive instead
+of the sum of all of them.
+
+* Archives are grouped into one lane per host. A lane runs its archives one
+  after another, so a host never sees more than one scraper at a time.
+* Lanes share a thread pool (``max_workers``).
+* A global deadline is handed to every scraper's run budget, so each one
+  orders and cuts its remaining work to finish in time. When it passes (or
+  on Ctrl-C) every scraper's stop event is set as well; scrapers stop at
+  the next request or item boundary and leave unfinished work in their
+  frontier for the next run.
+* A reporter thread prints one combined progress line per interval, built
+  from each archive's frontier counts.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import yaml
+
+from . import registry
+from .base.frontier import Frontier
+
+
+@dataclass
+class ArchiveRun:
+    """State of one archive within an orchestrated run"""
+    name: str
+    config_path: str
+    host: str
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    status: str = 'queued'
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    frontier_path: Optional[Path] = None
+    baseline: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+
+def archive_host(config_path: str) -> str:
+    """Host an archive's scraper talks to, from its config's base_url"""
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f)
+    return urlparse(config['archive']['base_url']).netloc or config['archive']['name']
+
+
+def _frontier_totals(path: Path) -> Dict[str, int]:
+    """Frontier item counts by state, summed over item kinds"""
+    frontier = Frontier(path)
+    try:
+        totals: Dict[str, int] = {}
+        for states in frontier.counts().values():
+            for state, count in states.items():
+                totals[state] = totals.get(state, 0) + count
+        return totals
+    finally:
+        frontier.conn.close()
+
+
+class ScrapeOrchestrator:
+    """Drive several archive scrapers concurrently, one lane per host"""
+
+    def __init__(self, archives: Dict[str, Dict[str, Any]], configs_dir: str = 'configs',
+                 max_workers: Optional[int] = None, deadline: Optional[float] = None,
+                 progress_interval: float = 30.0, output: Callable[[str], None] = print):
+        """Plan a run
+
+        Args:
+            archives: Archive name -> keyword arguments for its ``scrape()``
+            configs_dir: Directory holding ``<archive>.yaml`` configs
+            max_workers: Lanes run at once (defaults to one per host)
+            deadline: Epoch time after which all scrapers are told to stop
+            progress_interval: Seconds between combined progress lines
+            output: Where progress lines go
+        """
+        self.runs: List[ArchiveRun] = []
+        for name, kwargs in archives.items():
+            config_path = str(Path(configs_dir) / f'{name}.yaml')
+            self.runs.append(ArchiveRun(name, config_path, archive_host(config_path), dict(kwargs)))
+
+        self.lanes: Dict[str, List[ArchiveRun]] = {}
+        for run in self.runs:
+            self.lanes.setdefault(run.host, []).append(run)
+
+        self.max_workers = max_workers or len(self.lanes) or 1
+        self.deadline = deadline
+        self.progress_interval = progress_interval
+        self.output = output
+        self.stop_event = threading.Event()
+        self._scrapers: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def run(self) -> List[ArchiveRun]:
+        """Run every lane to completion, the deadline, or an interrupt
+
+        Returns:
+            The archive runs with their final status
+        """
+        reporter = threading.Thread(target=self._report_loop, name='scrape-progress', daemon=True)
+        reporter.start()
+        try:
+            with ThreadPoolExecutor(self.max_workers, thread_name_prefix='lane') as pool:
+                futures = [pool.submit(self._run_lane, lane) for lane in self.lanes.values()]
+                try:
+                    while not all(f.done() for f in futures):
+                        if self.deadline and time.time() >= self.deadline and not self.stop_event.is_set():
+                            self.output('⏰ Deadline reached, stopping scrapers...')
+                            self.stop()
+                        time.sleep(0.5)
+                except KeyboardInterrupt:
+                    self.output('⚠️  Interrupted, stopping scrapers...')
+                    self.stop()
+                    raise
+        finally:
+            self.stop_event.set()
+            reporter.join(timeout=5)
+            self.output(self.progress_line())
+        return self.runs
+
+    def stop(self):
+        """Ask every running scraper to stop, and skip queued archives"""
+        self.stop_event.set()
+        with self._lock:
+            for scraper in self._scrapers.values():
+                scraper.stop_event.set()
+
+    def _run_lane(self, lane: List[ArchiveRun]):
+        for run in lane:
+            if self.stop_event.is_set():
+                run.status = 'skipped'
+                continue
+            self._run_archive(run)
+
+    def _run_archive(self, run: ArchiveRun):
+        from .base.base_scraper import ScrapeStopped
+
+        run.status = 'running'
+        run.started_at = time.time()
+        scraper = None
+        try:
+            # Built inside the lane thread, since the scraper's SQLite
+            # connections may only be used by the thread that opened them
+            scraper = registry.get_scraper_class(run.name)(run.config_path)
+            if self.deadline:
+                # Scrapers plan their remaining work against the global deadline
+                scraper.deadline.deadline = self.deadline
+            with self._lock:
+                self._scrapers[run.name] = scraper
+                if self.stop_event.is_set():
+                    scraper.stop_event.set()
+            run.frontier_path = scraper.frontier_path()
+            if run.frontier_path is not None:
+                run.baseline = _frontier_totals(run.frontier_path)
+            scraper.scrape(**run.kwargs)
+            run.status = 'stopped' if scraper.stopping() else 'done'
+        except ScrapeStopped:
+            run.status = 'stopped'
+        except Exception as e:
+            run.status = 'failed'
+            run.error = repr(e)
+            if scraper is not None:
+                scraper.logger.exception(f"Scrape of {run.name} failed")
+        finally:
+            run.finished_at = time.time()
+            with self._lock:
+                self._scrapers.pop(run.name, None)
+
+    def _report_loop(self):
+        while not self.stop_event.wait(self.progress_interval):
+            if all(run.finished_at for run in self.runs):
+                return
+            self.output(self.progress_line())
+
+    def progress_line(self) -> str:
+        """One line summarizing every archive of the run"""
+        parts = []
+        for run in self.runs:
+            part = f'{run.name} [{run.status}]'
+            if run.frontier_path is not None and run.frontier_path.exists():
+                totals = _frontier_totals(run.frontier_path)
+                new_done = totals.get('done', 0) - run.baseline.get('done', 0)
+                pending = totals.get('pending', 0) + totals.get('in_progress', 0)
+                part += f' +{new_done} done, {pending} pending'
+                if totals.get('failed'):
+                    part += f", {totals['failed']} failed"
+            if run.elapsed is not None:
+                part += f' ({run.elapsed / 60:.1f} min)'
+            parts.append(part)
+        return '📈 ' + ' | '.join(parts)
@@ -0,0 +1,53 @@
+"""
+Scraper Registry
+
+Maps an archive name (the ``archive.name`` key of its config) to the class that
+scrapes it. Entries are ``"module:Class"`` strings in the style of package entry
+points, so a scraper module and its parser dependencies (requests, bs4, lxml,
+the legacy scripts) are only imported when that archive is actually scraped.
+"""
+import importlib
+from typing import Dict, List, Type
+
+SCRAPERS: Dict[str, str] = {
+    'net54': 'tools.scrapers.forums.net54_scraper:Net54Scraper',
+    'heritage': 'tools.scrapers.auctions.heritage_scraper:HeritageScraper',
+    # Add more scrapers as they're implemented
+    # 'psa': 'tools.scrapers.forums.psa_scraper:PSAScraper',
+    # 'prewarcards': 'tools.scrapers.content.prewarcards_scraper:PrewarCardsScraper',
+}
+
+
+def register_scraper(archive_name: str, target: str):
+    """Register a scraper for an archive
+
+    Args:
+        archive_name: Archive name as used in ``archive.name`` of its config
+        target: Import path of the scraper class, as ``"package.module:Class"``
+    """
+    if ':' not in target:
+        raise ValueError(f"Scraper target must look like 'module:Class', got {target!r}")
+    SCRAPERS[archive_name] = target
+
+
+def available_scrapers() -> List[str]:
+    """Names of archives that have a registered scraper"""
+    return list(SCRAPERS)
+
+
+def get_scraper_class(archive_name: str) -> Type:
+    """Import and return the scraper class for an archive
+
+    Args:
+        archive_name: Archive name as used in ``archive.name`` of its config
+
+    Returns:
+        Scraper class (a BaseScraper subclass)
+
+    Raises:
+        KeyError: If no scraper is registered for the archive
+    """
+    target = SCRAPERS[archive_name]
+    module_name, class_name = target.split(':', 1)
+    module = importlib.import_module(module_name)
+    return getattr(module, class_name)